@@ -0,0 +1,9 @@
+"""Benchmark suite and load generator for PsQache operations.
+
+The suite drives a PsQache cache with a synthetic workload and reports its
+throughput, latency percentiles, pool wait times and peak memory as JSON, so
+runs can be stored and compared over time. It runs against a Postgres
+database, or against the in-memory backend as a baseline.
+
+Run it with `python -m benchmarks --help` for the available options.
+"""
@@ -0,0 +1,5 @@
+"""Run the benchmark suite from the command line."""
+
+from benchmarks.cli import main
+
+raise SystemExit(main())
@@ -0,0 +1,184 @@
+"""This module contains the command line interface of the benchmark suite."""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any
+
+from benchmarks.runner import DEFAULT_SCHEMA
+from benchmarks.runner import open_postgres
+from benchmarks.runner import run_workload
+from benchmarks.workload import Distribution
+from benchmarks.workload import Workload
+from psqache import PsQache
+
+DEFAULT_DSN = "postgresql://postgres@localhost/postgres"
+
+
+def distribution(spec: str) -> Distribution:
+    """Parse a weighted distribution, such as "128:0.7,4096:0.3".
+
+    Args:
+        spec (str): Comma separated choice:weight pairs. The weight may be
+            left out, in which case it is 1.
+
+    Returns:
+        Distribution: The weighted choices.
+
+    Raises:
+        argparse.ArgumentTypeError: If the distribution is malformed.
+    """
+    try:
+        pairs = [item.partition(":")[::2] for item in spec.split(",")]
+        return tuple((int(choice), float(weight or 1)) for choice, weight in pairs)
+    except ValueError:
+        msg = f"invalid distribution {spec!r}, expected choice:weight,..."
+        raise argparse.ArgumentTypeError(msg) from None
+
+
+def parser() -> argparse.ArgumentParser:
+    """Build the argument parser.
+
+    Returns:
+        argparse.ArgumentParser: The parser.
+    """
+    defaults = Workload()
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Benchmark PsQache operations and report the results as JSON.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("--backend", choices=["postgres", "memory"], default="postgres")
+    parser.add_argument(
+        "--dsn",
+        default=os.environ.get("PSQACHE_BENCHMARK_DSN", DEFAULT_DSN),
+        help="Postgres DSN, also read from PSQACHE_BENCHMARK_DSN",
+    )
+    parser.add_argument(
+        "--schema",
+        default=DEFAULT_SCHEMA,
+        help="schema of the benchmark tables, emptied before every run",
+    )
+    parser.add_argument("--pool-min-size", type=int, default=15)
+    parser.add_argument("--pool-max-size", type=int, default=25)
+    parser.add_argument("--serializer", default="json")
+    parser.add_argument("--storage", choices=["jsonb", "bytea"], default="jsonb")
+    parser.add_argument("--compressor", default=None)
+    parser.add_argument("--operations", type=int, default=defaults.operations)
+    parser.add_argument("--concurrency", type=int, default=defaults.concurrency)
+    parser.add_argument(
+        "--keys",
+        type=int,
+        default=defaults.keys,
+        help="number of distinct keys",
+    )
+    parser.add_argument(
+        "--read-ratio",
+        type=float,
+        default=defaults.read_ratio,
+        help="fraction of operations that are reads",
+    )
+    parser.add_argument(
+        "--zipf",
+        type=float,
+        default=defaults.zipf,
+        help="skew of the key popularity, 0 for uniform",
+    )
+    parser.add_argument(
+        "--value-sizes",
+        type=distribution,
+        default=defaults.value_sizes,
+        help="weighted value sizes in bytes, as size:weight,...",
+    )
+    parser.add_argument(
+        "--ttls",
+        type=distribution,
+        default=defaults.ttls,
+        help="weighted time-to-lives in seconds, as ttl:weight,...",
+    )
+    parser.add_argument(
+        "--no-preload",
+        dest="preload",
+        action="store_false",
+        help="start from an empty cache",
+    )
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=None,
+        help="file to write the results to, instead of the standard output",
+    )
+    return parser
+
+
+async def benchmark(args: argparse.Namespace) -> dict[str, Any]:
+    """Run the benchmark described by the command line arguments.
+
+    Args:
+        args (argparse.Namespace): The parsed arguments.
+
+    Returns:
+        dict[str, Any]: The results.
+    """
+    workload = Workload(
+        operations=args.operations,
+        concurrency=args.concurrency,
+        keys=args.keys,
+        read_ratio=args.read_ratio,
+        zipf=args.zipf,
+        value_sizes=args.value_sizes,
+        ttls=args.ttls,
+        preload=args.preload,
+        seed=args.seed,
+    )
+    if args.backend == "memory":
+        results = await run_workload(PsQache.use_memory_backend(), workload)
+        results["backend"] = {"name": "memory"}
+        return results
+    cache, pool = await open_postgres(
+        args.dsn,
+        schema=args.schema,
+        min_size=args.pool_min_size,
+        max_size=args.pool_max_size,
+        serializer=args.serializer,
+        storage=args.storage,
+        compressor=args.compressor,
+    )
+    try:
+        results = await run_workload(cache, workload, pool)
+    finally:
+        await pool.close()
+    results["backend"] = {
+        "name": "postgres",
+        "schema": args.schema,
+        "pool_min_size": args.pool_min_size,
+        "pool_max_size": args.pool_max_size,
+        "serializer": args.serializer,
+        "storage": args.storage,
+        "compressor": args.compressor,
+    }
+    return results
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Run the benchmark and write the results as JSON.
+
+    Args:
+        argv (Optional[list[str]]): The command line arguments. Defaults to
+            the arguments of the process.
+
+    Returns:
+        int: The exit status.
+    """
+    args = parser().parse_args(argv)
+    results = asyncio.run(benchmark(args))
+    output = json.dumps(results, indent=2)
+    if args.output is None:
+        sys.stdout.write(output + "\n")
+    else:
+        args.output.write_text(output + "\n", encoding="utf-8")
+    return 0
@@ -0,0 +1,243 @@
+"""This module contains the benchmark runner.
+
+The runner issues the operations of a workload from a number of concurrent
+workers and records the latency of every operation. With the Postgres
+backend, the pool is wrapped so the time spent waiting for a connection is
+recorded as well, which shows whether a run is bound by the pool size.
+"""
+
+import asyncio
+import datetime
+import platform
+import resource
+import sys
+import time
+from collections.abc import AsyncIterator
+from collections.abc import Iterator
+from contextlib import asynccontextmanager
+from typing import Any
+from typing import cast
+
+import asyncpg
+
+from benchmarks.workload import Operation
+from benchmarks.workload import Workload
+from benchmarks.workload import WorkloadGenerator
+from psqache import PsQache
+from psqache.backends import PostgresBackend
+
+PERCENTILES = {"p50": 0.5, "p95": 0.95, "p99": 0.99, "p999": 0.999}
+
+PRELOAD_BATCH = 1000
+"""Number of entries written per round trip when preloading the cache."""
+
+DEFAULT_SCHEMA = "psqache_benchmark"
+"""Schema of the benchmark tables, kept apart from the real cache tables."""
+
+
+def summarize(samples: list[int]) -> dict[str, float]:
+    """Summarize durations with their mean, maximum and percentiles.
+
+    Percentiles use the nearest-rank method.
+
+    Args:
+        samples (list[int]): The durations, in nanoseconds.
+
+    Returns:
+        dict[str, float]: The summary, in microseconds. Empty without samples.
+    """
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    summary = {"count": len(ordered), "mean": sum(ordered) / len(ordered) / 1000}
+    for name, quantile in PERCENTILES.items():
+        rank = max(int(quantile * len(ordered) + 0.5), 1)
+        summary[name] = ordered[rank - 1] / 1000
+    summary["max"] = ordered[-1] / 1000
+    return summary
+
+
+def peak_rss() -> int:
+    """Get the peak resident set size of the process.
+
+    Returns:
+        int: The peak resident set size in bytes.
+    """
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes.
+    return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+
+class TimedPool:
+    """Pool wrapper recording how long each connection acquisition waits."""
+
+    def __init__(self, pool: asyncpg.pool.Pool) -> None:
+        """Initialize the TimedPool.
+
+        Args:
+            pool (asyncpg.pool.Pool): The pool to wrap.
+        """
+        self.pool = pool
+        self.waits: list[int] = []
+
+    def __getattr__(self, name: str) -> Any:
+        """Forward every other attribute to the wrapped pool.
+
+        Args:
+            name (str): The name of the attribute.
+
+        Returns:
+            Any: The attribute of the wrapped pool.
+        """
+        return getattr(self.pool, name)
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[asyncpg.Connection]:
+        """Acquire a connection, recording the wait.
+
+        Yields:
+            asyncpg.Connection: The connection.
+        """
+        start = time.perf_counter_ns()
+        async with self.pool.acquire() as connection:
+            self.waits.append(time.perf_counter_ns() - start)
+            yield connection
+
+
+def quote_ident(name: str) -> str:
+    """Quote an SQL identifier.
+
+    Args:
+        name (str): The identifier.
+
+    Returns:
+        str: The identifier in double quotes, with its double quotes doubled.
+    """
+    return '"' + name.replace('"', '""') + '"'
+
+
+async def open_postgres(  # noqa: PLR0913
+    dsn: str,
+    *,
+    schema: str = DEFAULT_SCHEMA,
+    min_size: int,
+    max_size: int,
+    serializer: str,
+    storage: str,
+    compressor: str | None,
+) -> tuple[PsQache, TimedPool]:
+    """Create a cache on an empty Postgres cache table.
+
+    The cache tables are created in their own schema, set as the search path
+    of every connection, and emptied there. The tables of a cache sharing the
+    database are thus never truncated by a run.
+
+    Args:
+        dsn (str): The DSN for the Postgres database.
+        schema (str): The schema of the benchmark tables. Defaults to
+            "psqache_benchmark".
+        min_size (int): The minimum number of connections in the pool.
+        max_size (int): The maximum number of connections in the pool.
+        serializer (str): The name of the serializer.
+        storage (str): The storage layout, "jsonb" or "bytea".
+        compressor (Optional[str]): The name of the compressor.
+
+    Returns:
+        tuple[PsQache, TimedPool]: The cache and its timed pool.
+    """
+    backend = PostgresBackend(
+        serializer=serializer,
+        storage="bytea" if storage == "bytea" else "jsonb",
+        compressor=compressor,
+    )
+    pool = await backend.open_pool(
+        dsn,
+        min_size=min_size,
+        max_size=max_size,
+        server_settings={"search_path": quote_ident(schema)},
+    )
+    connection: asyncpg.Connection
+    async with pool.acquire() as connection:
+        await connection.execute(f"CREATE SCHEMA IF NOT EXISTS {quote_ident(schema)}")
+        await connection.execute(backend.queries.create_psqache_table.sql)
+        await connection.execute(backend.queries.clear_cache_entries.sql)
+    timed = TimedPool(pool)
+    backend.pool = cast(asyncpg.pool.Pool, timed)
+    return PsQache(backend), timed
+
+
+async def preload(cache: PsQache, entries: list[Operation]) -> None:
+    """Write entries to the cache in batches.
+
+    Args:
+        cache (PsQache): The cache.
+        entries (list[Operation]): The writes to make.
+    """
+    for start in range(0, len(entries), PRELOAD_BATCH):
+        batch = entries[start : start + PRELOAD_BATCH]
+        for ttl in {entry.ttl for entry in batch}:
+            await cache.aset_many(
+                {entry.key: entry.value for entry in batch if entry.ttl == ttl},
+                ttl,
+            )
+
+
+async def run_workload(
+    cache: PsQache,
+    workload: Workload,
+    pool: TimedPool | None = None,
+) -> dict[str, Any]:
+    """Run a workload against a cache and report the results.
+
+    Args:
+        cache (PsQache): The cache.
+        workload (Workload): The workload to run.
+        pool (Optional[TimedPool]): The timed pool of the cache, if any.
+
+    Returns:
+        dict[str, Any]: The results, ready to be encoded as JSON.
+    """
+    generator = WorkloadGenerator(workload)
+    operations = generator.operations()
+    if workload.preload:
+        await preload(cache, generator.preload())
+    if pool is not None:
+        pool.waits.clear()
+
+    latencies: dict[str, list[int]] = {"get": [], "set": []}
+    hits = 0
+    pending: Iterator[Operation] = iter(operations)
+
+    async def worker() -> None:
+        nonlocal hits
+        # Workers share one iterator, so every operation is issued exactly
+        # once and in order, whatever the concurrency.
+        for operation in pending:
+            start = time.perf_counter_ns()
+            if operation.kind == "get":
+                hits += await cache.aget(operation.key) is not None
+            else:
+                await cache.aset(operation.key, operation.value, operation.ttl)
+            latencies[operation.kind].append(time.perf_counter_ns() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(workload.concurrency)))
+    elapsed = time.perf_counter() - start
+
+    reads = len(latencies["get"])
+    return {
+        "timestamp": datetime.datetime.now(datetime.UTC).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "workload": workload._asdict(),
+        "elapsed_seconds": elapsed,
+        "throughput_ops_per_second": len(operations) / elapsed,
+        "hit_ratio": hits / reads if reads else None,
+        "latency_us": {
+            "all": summarize(latencies["get"] + latencies["set"]),
+            "get": summarize(latencies["get"]),
+            "set": summarize(latencies["set"]),
+        },
+        "pool_wait_us": summarize(pool.waits) if pool is not None else None,
+        "peak_rss_bytes": peak_rss(),
+    }
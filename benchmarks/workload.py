@@ -0,0 +1,148 @@
+"""This module contains the benchmark workload generator.
+
+Operations are generated up front from a seeded random generator, so a run is
+reproducible and the cost of generating them is not part of the measured
+latencies. Keys are drawn from a Zipf distribution, where the key of rank k
+is requested with a probability proportional to 1 / k**s: an exponent of zero
+gives uniform access, and the usual hot-key skew of caches is around one.
+"""
+
+import itertools
+import random
+import string
+from typing import Any
+from typing import Literal
+from typing import NamedTuple
+
+Distribution = tuple[tuple[int, float], ...]
+"""Weighted choices, as (choice, weight) pairs."""
+
+
+class Workload(NamedTuple):
+    """The parameters of a benchmark workload."""
+
+    operations: int = 100_000
+    concurrency: int = 32
+    keys: int = 10_000
+    read_ratio: float = 0.9
+    zipf: float = 1.0
+    value_sizes: Distribution = ((128, 0.7), (4096, 0.25), (65536, 0.05))
+    ttls: Distribution = ((60, 0.2), (3600, 0.8))
+    preload: bool = True
+    seed: int = 0
+
+
+class Operation(NamedTuple):
+    """A single cache operation of a workload."""
+
+    kind: Literal["get", "set"]
+    key: str
+    value: Any
+    ttl: int
+
+
+def zipf_weights(count: int, exponent: float) -> list[float]:
+    """Compute the cumulative Zipf weights of the ranks 1 to count.
+
+    Args:
+        count (int): The number of ranks.
+        exponent (float): The skew of the distribution, zero for uniform.
+
+    Returns:
+        list[float]: The cumulative weights, for `random.choices`.
+    """
+    weights = (1 / rank**exponent for rank in range(1, count + 1))
+    return list(itertools.accumulate(weights))
+
+
+class WorkloadGenerator:
+    """Generates the operations and values of a workload."""
+
+    def __init__(self, workload: Workload) -> None:
+        """Initialize the WorkloadGenerator.
+
+        Args:
+            workload (Workload): The workload to generate.
+        """
+        self.workload = workload
+        self.random = random.Random(workload.seed)  # noqa: S311
+        self.keys = [f"bench:{index}" for index in range(workload.keys)]
+        self.key_weights = zipf_weights(workload.keys, workload.zipf)
+        # One value per size is enough: backends never mutate values, and
+        # sharing them keeps the memory of the generator out of the results.
+        self.values = {size: self.value(size) for size, _ in workload.value_sizes}
+
+    def value(self, size: int) -> dict[str, str]:
+        """Build a JSON value of about the given serialized size.
+
+        The value is random text, which compresses about as well as typical
+        cached payloads.
+
+        Args:
+            size (int): The size in bytes.
+
+        Returns:
+            dict[str, str]: The value.
+        """
+        words = []
+        length = 0
+        while length < size:
+            letters = self.random.choices(
+                string.ascii_lowercase,
+                k=self.random.randint(2, 10),
+            )
+            word = "".join(letters)
+            words.append(word)
+            length += len(word) + 1
+        return {"data": " ".join(words)[: max(size - 12, 0)]}
+
+    def choose(self, distribution: Distribution) -> int:
+        """Draw a choice from a weighted distribution.
+
+        Args:
+            distribution (Distribution): The weighted choices.
+
+        Returns:
+            int: The choice drawn.
+        """
+        choices, weights = zip(*distribution, strict=True)
+        choice: int = self.random.choices(choices, weights)[0]
+        return choice
+
+    def entry(self, key: str) -> Operation:
+        """Generate a write of the given key.
+
+        Args:
+            key (str): The key to write.
+
+        Returns:
+            Operation: The write.
+        """
+        value = self.values[self.choose(self.workload.value_sizes)]
+        return Operation("set", key, value, self.choose(self.workload.ttls))
+
+    def preload(self) -> list[Operation]:
+        """Generate a write for every key, to fill the cache before a run.
+
+        Returns:
+            list[Operation]: The writes.
+        """
+        return [self.entry(key) for key in self.keys]
+
+    def operations(self) -> list[Operation]:
+        """Generate the operations of the workload.
+
+        Returns:
+            list[Operation]: The operations, in the order they are issued.
+        """
+        keys = self.random.choices(
+            self.keys,
+            cum_weights=self.key_weights,
+            k=self.workload.operations,
+        )
+        return [
+            Operation("get", key, None, 0)
+            if self.random.random() < self.workload.read_ratio
+            else self.entry(key)
+            for key in keys
+        ]
@@ -6,11 +6,39 @@ and to provide a way to check if a class implements the expected
 behavior.
 """
 
+import os
+from collections.abc import AsyncGenerator
+from collections.abc import Callable
+from collections.abc import Iterable
+from collections.abc import Mapping
+from contextlib import AbstractAsyncContextManager
 from typing import Any
+from typing import BinaryIO
+from typing import NamedTuple
 from typing import Protocol
 from typing import runtime_checkable
 
 
+class CacheEntry(NamedTuple):
+    """A cache entry with its expiry, as returned by `get_entry`.
+
+    Attributes:
+        value: The value of the entry.
+        ttl: The time-to-live in seconds the entry was last set or touched
+            with.
+        expires_in: The number of seconds left before the entry expires.
+    """
+
+    value: Any
+    ttl: int
+    expires_in: float
+
+    @property
+    def age(self) -> float:
+        """Seconds since the entry was last set or touched."""
+        return self.ttl - self.expires_in
+
+
 @runtime_checkable
 class ICache(Protocol):
     """Interface for cache engine implementations.
@@ -30,10 +58,98 @@ class ICache(Protocol):
         delete(key: str) -> None: Delete the value for the given key.
         aclear() -> None: Asynchronously remove all the entries in the cache.
         clear() -> None: Remove all the entries in the cache.
+        aclear_namespace(name: str) -> None: Asynchronously remove all the entries
+            of a namespace.
+        clear_namespace(name: str) -> None: Remove all the entries of a namespace.
+        ainvalidate_tag(tag: str) -> None: Asynchronously remove all the entries
+            with a tag.
+        invalidate_tag(tag: str) -> None: Remove all the entries with a tag.
         acleanup() -> None: Asynchronously remove the expired entries in the cache.
         cleanup() -> None: Remove the expired entries in the cache.
         ahas(key: str) -> bool: Asynchronously check if the given key is in the cache.
         has(key: str) -> bool: Check if the given key is in the cache.
+        aset_absent(key: str, ttl: Optional[int] = None) -> None: Asynchronously
+            mark the given key as known to be absent.
+        set_absent(key: str, ttl: Optional[int] = None) -> None: Mark the given
+            key as known to be absent.
+        ais_absent(key: str) -> bool: Asynchronously check if the given key is
+            known to be absent.
+        is_absent(key: str) -> bool: Check if the given key is known to be absent.
+        atouch(key: str, ttl: Optional[int] = None) -> bool: Asynchronously reset
+            the time to live of the given key.
+        touch(key: str, ttl: Optional[int] = None) -> bool: Reset the time to
+            live of the given key.
+        aget_many(keys: Iterable[str]) -> dict[str, Any]: Asynchronously get the
+            values for the given keys.
+        get_many(keys: Iterable[str]) -> dict[str, Any]: Get the values for the
+            given keys.
+        aset_many(mapping: Mapping[str, Any], ttl: Optional[int] = None) -> None:
+            Asynchronously set the values for the given keys.
+        set_many(mapping: Mapping[str, Any], ttl: Optional[int] = None) -> None:
+            Set the values for the given keys.
+        adelete_many(keys: Iterable[str]) -> None: Asynchronously delete the values
+            for the given keys.
+        delete_many(keys: Iterable[str]) -> None: Delete the values for the given
+            keys.
+        ahas_many(keys: Iterable[str]) -> dict[str, bool]: Asynchronously check
+            which of the given keys are in the cache.
+        has_many(keys: Iterable[str]) -> dict[str, bool]: Check which of the given
+            keys are in the cache.
+        atouch_many(keys: Iterable[str], ttl: Optional[int] = None) ->
+            dict[str, bool]: Asynchronously reset the time to live of the given
+            keys.
+        touch_many(keys: Iterable[str], ttl: Optional[int] = None) ->
+            dict[str, bool]: Reset the time to live of the given keys.
+        aincr(key: str, delta: int = 1, ttl: Optional[int] = None, initial: int = 0)
+            -> int: Asynchronously increment the counter of the given key.
+        incr(key: str, delta: int = 1, ttl: Optional[int] = None, initial: int = 0)
+            -> int: Increment the counter of the given key.
+        adecr(key: str, delta: int = 1, ttl: Optional[int] = None, initial: int = 0)
+            -> int: Asynchronously decrement the counter of the given key.
+        decr(key: str, delta: int = 1, ttl: Optional[int] = None, initial: int = 0)
+            -> int: Decrement the counter of the given key.
+        aincr_many(deltas: Mapping[str, int], ttl: Optional[int] = None,
+            initial: int = 0) -> dict[str, int]: Asynchronously increment the
+            counters of the given keys.
+        incr_many(deltas: Mapping[str, int], ttl: Optional[int] = None,
+            initial: int = 0) -> dict[str, int]: Increment the counters of the
+            given keys.
+        aget_counter(key: str) -> Optional[int]: Asynchronously get the value of
+            the counter of the given key.
+        get_counter(key: str) -> Optional[int]: Get the value of the counter of
+            the given key.
+        adelete_counter(key: str) -> None: Asynchronously delete the counter of
+            the given key.
+        delete_counter(key: str) -> None: Delete the counter of the given key.
+        aget_or_set(key: str, loader: Callable[[], Any], ttl: Optional[int] = None,
+            distributed: bool = False) -> Any: Asynchronously get the value for
+            the given key, loading and setting it on a miss.
+        get_or_set(key: str, loader: Callable[[], Any], ttl: Optional[int] = None,
+            distributed: bool = False) -> Any: Get the value for the given key,
+            loading and setting it on a miss.
+        aiter_keys(prefix: Optional[str] = None) -> AsyncIterator[str]: Iterate
+            over the keys in the cache.
+        aiter_items(prefix: Optional[str] = None) -> AsyncIterator[tuple[str, Any]]:
+            Iterate over the keys and values in the cache.
+        awarm(keys: Optional[Iterable[str]] = None) -> int: Asynchronously load
+            the values of the hot keys missing from the cache.
+        warm(keys: Optional[Iterable[str]] = None) -> int: Load the values of the
+            hot keys missing from the cache.
+        asave_hot_keys(top: int = 100) -> list[str]: Asynchronously save the most
+            read keys for the warm-ups.
+        save_hot_keys(top: int = 100) -> list[str]: Save the most read keys for
+            the warm-ups.
+        aexport_snapshot(output: str | os.PathLike | BinaryIO) -> int:
+            Asynchronously dump the entries to a snapshot.
+        export_snapshot(output: str | os.PathLike | BinaryIO) -> int: Dump the
+            entries to a snapshot.
+        aimport_snapshot(source: str | os.PathLike | BinaryIO) -> int:
+            Asynchronously restore the entries of a snapshot.
+        import_snapshot(source: str | os.PathLike | BinaryIO) -> int: Restore the
+            entries of a snapshot.
+
+        aclose() -> None: Asynchronously release the resources of the cache.
+        close() -> None: Release the resources of the cache.
     """
 
     async def aget(self, key: str) -> Any | None:
@@ -100,6 +216,38 @@ class ICache(Protocol):
     def clear(self) -> None:
         """Remove all the entries in the cache."""
 
+    async def aclear_namespace(self, name: str) -> None:
+        """Remove all the entries of a namespace asynchronously.
+
+        Args:
+            name (str): The name of the namespace.
+        """
+        ...
+
+    def clear_namespace(self, name: str) -> None:
+        """Remove all the entries of a namespace.
+
+        Args:
+            name (str): The name of the namespace.
+        """
+        ...
+
+    async def ainvalidate_tag(self, tag: str) -> None:
+        """Remove all the entries with a tag asynchronously.
+
+        Args:
+            tag (str): The tag.
+        """
+        ...
+
+    def invalidate_tag(self, tag: str) -> None:
+        """Remove all the entries with a tag.
+
+        Args:
+            tag (str): The tag.
+        """
+        ...
+
     async def acleanup(self) -> None:
         """Remove the expired entries in the cache asynchronously."""
         ...
@@ -130,6 +278,405 @@ class ICache(Protocol):
         """
         ...
 
+    async def aset_absent(self, key: str, ttl: int | None = None) -> None:
+        """Mark the given key as known to be absent asynchronously.
+
+        Args:
+            key (str): The key known to be absent.
+            ttl (Optional[int], optional): Time to live of the marker.
+                Defaults to None.
+        """
+        ...
+
+    def set_absent(self, key: str, ttl: int | None = None) -> None:
+        """Mark the given key as known to be absent.
+
+        Args:
+            key (str): The key known to be absent.
+            ttl (Optional[int], optional): Time to live of the marker.
+                Defaults to None.
+        """
+        ...
+
+    async def ais_absent(self, key: str) -> bool:
+        """Check if the given key is known to be absent asynchronously.
+
+        Args:
+            key (str): The key to check.
+
+        Returns:
+            bool: True if the key holds an absent marker, False otherwise.
+        """
+        ...
+
+    def is_absent(self, key: str) -> bool:
+        """Check if the given key is known to be absent.
+
+        Args:
+            key (str): The key to check.
+
+        Returns:
+            bool: True if the key holds an absent marker, False otherwise.
+        """
+        ...
+
+    async def atouch(self, key: str, ttl: int | None = None) -> bool:
+        """Reset the time to live of the given key asynchronously.
+
+        The value is left as is, which makes this cheaper than setting it
+        again, for sliding expiration.
+
+        Args:
+            key (str): The key to touch.
+            ttl (Optional[int], optional): Time to live. Defaults to None.
+
+        Returns:
+            bool: True if the key was in the cache, False otherwise.
+        """
+        ...
+
+    def touch(self, key: str, ttl: int | None = None) -> bool:
+        """Reset the time to live of the given key.
+
+        Args:
+            key (str): The key to touch.
+            ttl (Optional[int], optional): Time to live. Defaults to None.
+
+        Returns:
+            bool: True if the key was in the cache, False otherwise.
+        """
+        ...
+
+    async def aget_many(self, keys: Iterable[str]) -> dict[str, Any]:
+        """Get the values for the given keys asynchronously.
+
+        Args:
+            keys (Iterable[str]): The keys to get the values for.
+
+        Returns:
+            dict[str, Any]: The values found, keyed by key. Missing and expired
+                keys are left out.
+        """
+        ...
+
+    def get_many(self, keys: Iterable[str]) -> dict[str, Any]:
+        """Get the values for the given keys.
+
+        Args:
+            keys (Iterable[str]): The keys to get the values for.
+
+        Returns:
+            dict[str, Any]: The values found, keyed by key. Missing and expired
+                keys are left out.
+        """
+        ...
+
+    async def aset_many(
+        self,
+        mapping: Mapping[str, Any],
+        ttl: int | None = None,
+    ) -> None:
+        """Set the values for the given keys asynchronously.
+
+        Args:
+            mapping (Mapping[str, Any]): The values to set, keyed by key.
+            ttl (Optional[int], optional): Time to live. Defaults to None.
+        """
+        ...
+
+    def set_many(self, mapping: Mapping[str, Any], ttl: int | None = None) -> None:
+        """Set the values for the given keys.
+
+        Args:
+            mapping (Mapping[str, Any]): The values to set, keyed by key.
+            ttl (Optional[int], optional): Time to live. Defaults to None.
+        """
+        ...
+
+    async def adelete_many(self, keys: Iterable[str]) -> None:
+        """Delete the values for the given keys asynchronously.
+
+        Args:
+            keys (Iterable[str]): The keys to delete the values for.
+        """
+        ...
+
+    def delete_many(self, keys: Iterable[str]) -> None:
+        """Delete the values for the given keys.
+
+        Args:
+            keys (Iterable[str]): The keys to delete the values for.
+        """
+        ...
+
+    async def ahas_many(self, keys: Iterable[str]) -> dict[str, bool]:
+        """Check which of the given keys are in the cache asynchronously.
+
+        Args:
+            keys (Iterable[str]): The keys to check for.
+
+        Returns:
+            dict[str, bool]: True for the keys in the cache, False otherwise.
+        """
+        ...
+
+    def has_many(self, keys: Iterable[str]) -> dict[str, bool]:
+        """Check which of the given keys are in the cache.
+
+        Args:
+            keys (Iterable[str]): The keys to check for.
+
+        Returns:
+            dict[str, bool]: True for the keys in the cache, False otherwise.
+        """
+        ...
+
+    async def atouch_many(
+        self,
+        keys: Iterable[str],
+        ttl: int | None = None,
+    ) -> dict[str, bool]:
+        """Reset the time to live of the given keys asynchronously.
+
+        Args:
+            keys (Iterable[str]): The keys to touch.
+            ttl (Optional[int], optional): Time to live. Defaults to None.
+
+        Returns:
+            dict[str, bool]: True for the keys in the cache, False otherwise.
+        """
+        ...
+
+    def touch_many(
+        self,
+        keys: Iterable[str],
+        ttl: int | None = None,
+    ) -> dict[str, bool]:
+        """Reset the time to live of the given keys.
+
+        Args:
+            keys (Iterable[str]): The keys to touch.
+            ttl (Optional[int], optional): Time to live. Defaults to None.
+
+        Returns:
+            dict[str, bool]: True for the keys in the cache, False otherwise.
+        """
+        ...
+
+    async def aincr(
+        self,
+        key: str,
+        delta: int = 1,
+        ttl: int | None = None,
+        initial: int = 0,
+    ) -> int:
+        """Increment the counter of the given key asynchronously.
+
+        Counters are kept apart from the values of the cache. A counter that
+        does not exist or has expired starts from `initial` and expires
+        after `ttl`; increments do not extend its time to live.
+
+        Args:
+            key (str): The key of the counter.
+            delta (int): The amount to add. Defaults to 1.
+            ttl (Optional[int], optional): Time to live. Defaults to None.
+            initial (int): The value of a new counter. Defaults to 0.
+
+        Returns:
+            int: The new value of the counter.
+        """
+        ...
+
+    def incr(
+        self,
+        key: str,
+        delta: int = 1,
+        ttl: int | None = None,
+        initial: int = 0,
+    ) -> int:
+        """Increment the counter of the given key.
+
+        Args:
+            key (str): The key of the counter.
+            delta (int): The amount to add. Defaults to 1.
+            ttl (Optional[int], optional): Time to live. Defaults to None.
+            initial (int): The value of a new counter. Defaults to 0.
+
+        Returns:
+            int: The new value of the counter.
+        """
+        ...
+
+    async def adecr(
+        self,
+        key: str,
+        delta: int = 1,
+        ttl: int | None = None,
+        initial: int = 0,
+    ) -> int:
+        """Decrement the counter of the given key asynchronously.
+
+        Args:
+            key (str): The key of the counter.
+            delta (int): The amount to subtract. Defaults to 1.
+            ttl (Optional[int], optional): Time to live. Defaults to None.
+            initial (int): The value of a new counter. Defaults to 0.
+
+        Returns:
+            int: The new value of the counter.
+        """
+        ...
+
+    def decr(
+        self,
+        key: str,
+        delta: int = 1,
+        ttl: int | None = None,
+        initial: int = 0,
+    ) -> int:
+        """Decrement the counter of the given key.
+
+        Args:
+            key (str): The key of the counter.
+            delta (int): The amount to subtract. Defaults to 1.
+            ttl (Optional[int], optional): Time to live. Defaults to None.
+            initial (int): The value of a new counter. Defaults to 0.
+
+        Returns:
+            int: The new value of the counter.
+        """
+        ...
+
+    async def aincr_many(
+        self,
+        deltas: Mapping[str, int],
+        ttl: int | None = None,
+        initial: int = 0,
+    ) -> dict[str, int]:
+        """Increment the counters of the given keys asynchronously.
+
+        Args:
+            deltas (Mapping[str, int]): The amounts to add, keyed by key.
+            ttl (Optional[int], optional): Time to live. Defaults to None.
+            initial (int): The value of new counters. Defaults to 0.
+
+        Returns:
+            dict[str, int]: The new values of the counters, keyed by key.
+        """
+        ...
+
+    def incr_many(
+        self,
+        deltas: Mapping[str, int],
+        ttl: int | None = None,
+        initial: int = 0,
+    ) -> dict[str, int]:
+        """Increment the counters of the given keys.
+
+        Args:
+            deltas (Mapping[str, int]): The amounts to add, keyed by key.
+            ttl (Optional[int], optional): Time to live. Defaults to None.
+            initial (int): The value of new counters. Defaults to 0.
+
+        Returns:
+            dict[str, int]: The new values of the counters, keyed by key.
+        """
+        ...
+
+    async def aget_counter(self, key: str) -> int | None:
+        """Get the value of the counter of the given key asynchronously.
+
+        Args:
+            key (str): The key of the counter.
+
+        Returns:
+            Optional[int]: The value of the counter, None if it does not exist
+                or has expired.
+        """
+        ...
+
+    def get_counter(self, key: str) -> int | None:
+        """Get the value of the counter of the given key.
+
+        Args:
+            key (str): The key of the counter.
+
+        Returns:
+            Optional[int]: The value of the counter, None if it does not exist
+                or has expired.
+        """
+        ...
+
+    async def adelete_counter(self, key: str) -> None:
+        """Delete the counter of the given key asynchronously.
+
+        Args:
+            key (str): The key of the counter.
+        """
+        ...
+
+    def delete_counter(self, key: str) -> None:
+        """Delete the counter of the given key.
+
+        Args:
+            key (str): The key of the counter.
+        """
+        ...
+
+    async def aget_or_set(
+        self,
+        key: str,
+        loader: Callable[[], Any],
+        ttl: int | None = None,
+        *,
+        distributed: bool = False,
+    ) -> Any:
+        """Get the value for the given key, loading and setting it on a miss.
+
+        Concurrent misses for the same key only call the loader once.
+
+        Args:
+            key (str): The key to get the value for.
+            loader (Callable[[], Any]): Function or coroutine function returning
+                the value to set on a miss.
+            ttl (Optional[int], optional): Time to live. Defaults to None.
+            distributed (bool): Also deduplicate loads across processes.
+
+        Returns:
+            Any: The cached or loaded value for the given key.
+        """
+        ...
+
+    def get_or_set(
+        self,
+        key: str,
+        loader: Callable[[], Any],
+        ttl: int | None = None,
+        *,
+        distributed: bool = False,
+    ) -> Any:
+        """Get the value for the given key, loading and setting it on a miss.
+
+        Args:
+            key (str): The key to get the value for.
+            loader (Callable[[], Any]): Function or coroutine function returning
+                the value to set on a miss.
+            ttl (Optional[int], optional): Time to live. Defaults to None.
+            distributed (bool): Also deduplicate loads across processes.
+
+        Returns:
+            Any: The cached or loaded value for the given key.
+        """
+        ...
+
+    async def aclose(self) -> None:
+        """Release the resources of the cache asynchronously."""
+        ...
+
+    def close(self) -> None:
+        """Release the resources of the cache."""
+        ...
+
 
 @runtime_checkable
 class ICacheBackend(Protocol):
@@ -141,11 +688,38 @@ class ICacheBackend(Protocol):
 
     Methods:
         get(key: str) -> Optional[dict]: Get the value for the given key.
+        get_entry(key: str) -> Optional[CacheEntry]: Get the value for the given
+            key, with its expiry.
         set(key: str, value: dict, ttl: int) -> None: Set the value for the given key.
         delete(key: str) -> None: Delete the value for the given key.
         clear() -> None: Remove all the entries in the repository.
         cleanup() -> None: Remove the expired entries in the repository.
         has(key: str) -> bool: Check if the given key is in the repository.
+        get_many(keys: list[str]) -> dict[str, dict]: Get the values for the given
+            keys.
+        get_entries(keys: list[str]) -> dict[str, CacheEntry]: Get the values for
+            the given keys, with their expiry.
+        set_many(mapping: Mapping[str, dict], ttl: int) -> None: Set the values for
+            the given keys.
+        import_entries(mapping: Mapping[str, Any], ttl: int) -> int: Bulk load the
+            values for the given keys.
+        delete_many(keys: list[str]) -> None: Delete the values for the given keys.
+        has_many(keys: list[str]) -> dict[str, bool]: Check which of the given keys
+            are in the repository.
+        touch(key: str, ttl: int) -> bool: Reset the time-to-live of the given key.
+        touch_many(keys: list[str], ttl: int) -> dict[str, bool]: Reset the
+            time-to-live of the given keys.
+        incr(key: str, delta: int, ttl: int, initial: int) -> int: Increment the
+            counter of the given key.
+        incr_many(deltas: Mapping[str, int], ttl: int, initial: int) ->
+            dict[str, int]: Increment the counters of the given keys.
+        iter_keys(prefix: Optional[str], chunk_size: int) -> AsyncIterator[list[str]]:
+            Iterate over the keys, in chunks.
+        iter_items(prefix: Optional[str], chunk_size: int) ->
+            AsyncIterator[dict[str, Any]]: Iterate over the entries, in chunks.
+        lock(key: str) -> AbstractAsyncContextManager[bool]: Try to take the lock
+            used to load the value for the given key.
+        close() -> None: Release the resources of the backend.
     """
 
     async def get(self, key: str) -> dict | None:
@@ -159,6 +733,17 @@ class ICacheBackend(Protocol):
         """
         ...
 
+    async def get_entry(self, key: str) -> CacheEntry | None:
+        """Retrieve a cache entry by key, with its expiry.
+
+        Args:
+            key: The key to retrieve.
+
+        Returns:
+            The entry, or None if not found or expired.
+        """
+        ...
+
     async def set(self, key: str, value: dict, ttl: int) -> None:
         """Set or update a cache entry with a time-to-live.
 
@@ -195,3 +780,363 @@ class ICacheBackend(Protocol):
             True if the entry exists and is not expired, otherwise False.
         """
         ...
+
+    async def get_many(self, keys: list[str]) -> dict[str, dict]:
+        """Retrieve many cache entries by key in a single round trip.
+
+        Args:
+            keys: The keys to retrieve.
+
+        Returns:
+            The values found, keyed by key. Missing and expired keys are left out.
+        """
+        ...
+
+    async def get_entries(self, keys: list[str]) -> dict[str, CacheEntry]:
+        """Retrieve many cache entries by key with their expiry, in one round trip.
+
+        Args:
+            keys: The keys to retrieve.
+
+        Returns:
+            The entries found, keyed by key. Missing and expired keys are left out.
+        """
+        ...
+
+    async def set_many(self, mapping: Mapping[str, dict], ttl: int) -> None:
+        """Set or update many cache entries in a single round trip.
+
+        Args:
+            mapping: The values to set, keyed by key.
+            ttl: Time-to-live in seconds for the entries.
+        """
+        ...
+
+    async def import_entries(self, mapping: Mapping[str, Any], ttl: int) -> int:
+        """Set many cache entries in bulk, such as to warm up the cache.
+
+        Args:
+            mapping: The values to set, keyed by key.
+            ttl: Time-to-live in seconds for the entries.
+
+        Returns:
+            The number of entries written.
+        """
+        ...
+
+    async def delete_many(self, keys: list[str]) -> None:
+        """Delete many cache entries by key in a single round trip.
+
+        Args:
+            keys: The keys to delete.
+        """
+        ...
+
+    async def has_many(self, keys: list[str]) -> dict[str, bool]:
+        """Check which of the given keys exist and are not expired.
+
+        Args:
+            keys: The keys to check.
+
+        Returns:
+            True for the keys that exist and are not expired, otherwise False.
+        """
+        ...
+
+    async def touch(self, key: str, ttl: int) -> bool:
+        """Reset the time-to-live of a cache entry without rewriting its value.
+
+        Args:
+            key: The key to touch.
+            ttl: Time-to-live in seconds for the entry, from now.
+
+        Returns:
+            True if the entry exists and is not expired, otherwise False.
+        """
+        ...
+
+    async def touch_many(self, keys: list[str], ttl: int) -> dict[str, bool]:
+        """Reset the time-to-live of many cache entries in a single round trip.
+
+        Args:
+            keys: The keys to touch.
+            ttl: Time-to-live in seconds for the entries, from now.
+
+        Returns:
+            True for the keys that exist and are not expired, otherwise False.
+        """
+        ...
+
+    async def incr(self, key: str, delta: int, ttl: int, initial: int) -> int:
+        """Increment a counter atomically.
+
+        Args:
+            key: The key of the counter.
+            delta: The amount to add, negative to decrement.
+            ttl: Time-to-live in seconds of the counter, if it is created.
+            initial: The value of the counter, if it is created.
+
+        Returns:
+            The new value of the counter.
+        """
+        ...
+
+    async def incr_many(
+        self,
+        deltas: Mapping[str, int],
+        ttl: int,
+        initial: int,
+    ) -> dict[str, int]:
+        """Increment many counters atomically in a single round trip.
+
+        Args:
+            deltas: The amounts to add, keyed by key.
+            ttl: Time-to-live in seconds of the counters that are created.
+            initial: The value of the counters that are created.
+
+        Returns:
+            The new values of the counters, keyed by key.
+        """
+        ...
+
+    async def get_counter(self, key: str) -> int | None:
+        """Get the value of a counter by key.
+
+        Args:
+            key: The key of the counter.
+
+        Returns:
+            The value of the counter, or None if it does not exist or has
+            expired.
+        """
+        ...
+
+    async def delete_counter(self, key: str) -> None:
+        """Delete a counter by key.
+
+        Args:
+            key: The key of the counter.
+        """
+        ...
+
+    def iter_keys(
+        self,
+        prefix: str | None,
+        chunk_size: int,
+    ) -> AsyncGenerator[list[str], None]:
+        """Iterate over the keys of the entries that are not expired.
+
+        Args:
+            prefix: The prefix of the keys to iterate over, None for all keys.
+            chunk_size: The maximum number of keys per chunk.
+
+        Returns:
+            An asynchronous iterator over chunks of keys, in key order.
+        """
+        ...
+
+    def iter_items(
+        self,
+        prefix: str | None,
+        chunk_size: int,
+    ) -> AsyncGenerator[dict[str, Any], None]:
+        """Iterate over the entries that are not expired.
+
+        Args:
+            prefix: The prefix of the keys to iterate over, None for all keys.
+            chunk_size: The maximum number of entries per chunk.
+
+        Returns:
+            An asynchronous iterator over chunks of values keyed by key, in key
+            order.
+        """
+        ...
+
+    def lock(self, key: str) -> AbstractAsyncContextManager[bool]:
+        """Try to take the lock used to load the value for a key.
+
+        The lock is shared by every process using the repository, so a single
+        process recomputes an expired value while the others wait for it.
+
+        Args:
+            key: The key to lock.
+
+        Returns:
+            A context manager yielding True if the lock was taken, otherwise
+            False. The lock is held until the context manager exits.
+        """
+        ...
+
+    async def close(self) -> None:
+        """Release the resources of the backend, such as its connections."""
+        ...
+
+
+@runtime_checkable
+class ISnapshotBackend(Protocol):
+    """Interface for cache backends that can be dumped to a snapshot file.
+
+    Methods:
+        export_snapshot(output: str | os.PathLike | BinaryIO) -> int: Dump the
+            entries that are not expired.
+        import_snapshot(source: str | os.PathLike | BinaryIO) -> int: Restore
+            the entries of a dump.
+    """
+
+    async def export_snapshot(self, output: str | os.PathLike[str] | BinaryIO) -> int:
+        """Export the entries that are not expired to a snapshot.
+
+        Args:
+            output: The path of the snapshot file, or a binary file to write
+                it to.
+
+        Returns:
+            The number of entries exported.
+        """
+        ...
+
+    async def import_snapshot(self, source: str | os.PathLike[str] | BinaryIO) -> int:
+        """Import the entries of a snapshot, keeping their expiry.
+
+        Args:
+            source: The path of the snapshot file, or a binary file to read it
+                from.
+
+        Returns:
+            The number of entries written.
+        """
+        ...
+
+
+@runtime_checkable
+class ISerializer(Protocol):
+    """Interface for value serializer implementations.
+
+    This interface defines the expected behavior for serializers, which turn
+    cached values into bytes and back.
+
+    Attributes:
+        name (str): The name the serializer is registered under.
+        json (bool): Whether the serialized values are JSON text, which can be
+            stored in a JSONB column.
+
+    Methods:
+        dumps(value: Any) -> bytes: Serialize a value.
+        loads(data: bytes) -> Any: Deserialize a value.
+    """
+
+    name: str
+    json: bool
+
+    def dumps(self, value: Any) -> bytes:
+        """Serialize a value.
+
+        Args:
+            value: The value to serialize.
+
+        Returns:
+            The serialized value.
+        """
+        ...
+
+    def loads(self, data: bytes) -> Any:
+        """Deserialize a value.
+
+        Args:
+            data: The serialized value.
+
+        Returns:
+            The deserialized value.
+        """
+        ...
+
+
+@runtime_checkable
+class ICompressor(Protocol):
+    """Interface for value compressor implementations.
+
+    This interface defines the expected behavior for compressors, which
+    shrink serialized values before they are stored.
+
+    Attributes:
+        name (str): The name the compressor is registered under.
+        id (int): The codec id recorded in the header of compressed payloads.
+            Ids are stored in the database, so they must never change.
+
+    Methods:
+        compress(data: bytes) -> bytes: Compress serialized data.
+        decompress(data: bytes) -> bytes: Decompress compressed data.
+    """
+
+    name: str
+    id: int
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress serialized data.
+
+        Args:
+            data: The data to compress.
+
+        Returns:
+            The compressed data.
+        """
+        ...
+
+    def decompress(self, data: bytes) -> bytes:
+        """Decompress compressed data.
+
+        Args:
+            data: The compressed data.
+
+        Returns:
+            The decompressed data.
+        """
+        ...
+
+
+@runtime_checkable
+class IMetricsSink(Protocol):
+    """Interface for metrics sink implementations.
+
+    This interface defines the expected behavior for sinks, which receive the
+    measures of instrumented backends and caches. Sinks are called on the hot
+    path, so they must be cheap and must not block.
+
+    Methods:
+        increment(name: str, amount: int, operation: str) -> None: Add to a
+            counter.
+        observe(name: str, seconds: float, operation: str) -> None: Record a
+            duration in a histogram.
+        gauge(name: str, value: float) -> None: Set the value of a gauge.
+    """
+
+    def increment(self, name: str, amount: int, operation: str) -> None:
+        """Add to a counter.
+
+        Args:
+            name: The name of the counter.
+            amount: The amount to add.
+            operation: The cache operation measured, empty when the measure
+                is not specific to an operation.
+        """
+        ...
+
+    def observe(self, name: str, seconds: float, operation: str) -> None:
+        """Record a duration in a histogram.
+
+        Args:
+            name: The name of the histogram.
+            seconds: The duration in seconds.
+            operation: The cache operation measured, empty when the measure
+                is not specific to an operation.
+        """
+        ...
+
+    def gauge(self, name: str, value: float) -> None:
+        """Set the value of a gauge.
+
+        Args:
+            name: The name of the gauge.
+            value: The current value.
+        """
+        ...
@@ -0,0 +1,449 @@
+"""This module contains the key-space analytics of the cache.
+
+Which keys dominate the traffic, how many distinct keys each namespace holds
+and how well each namespace is served by the cache cannot be read off the
+table without scanning it. The analytics backend records every key read and
+written into streaming sketches of bounded memory instead:
+
+- a count-min sketch (Cormode and Muthukrishnan, 2005) estimates how often
+  each key was read, never under-counting, and a top-K heap keeps the keys
+  with the highest estimates;
+- a HyperLogLog (Flajolet et al., 2007) per namespace estimates the number
+  of distinct keys read or written in it;
+- hit and miss counters per namespace give its hit ratio.
+
+The namespace of a key is the part before its first separator, such as
+`user` for `user:42`. Combined with `PostgresBackend.table_report`, this
+shows what to keep in a local tier, what to compress and how to size the
+cache.
+"""
+
+import heapq
+import math
+from collections.abc import Mapping
+from typing import Any
+from typing import NamedTuple
+
+from psqache.abcs import CacheEntry
+from psqache.abcs import ICacheBackend
+from psqache.backends import BackendWrapper
+from psqache.shards import key_hash
+
+OVERFLOW_NAMESPACE = "*"
+"""Namespace the keys of the namespaces beyond the tracked ones count in."""
+
+
+class CountMinSketch:
+    """Count-min sketch estimating the frequency of keys.
+
+    Estimates are never below the true count, and above it by at most
+    `e / width` of the total count with probability `1 - exp(-depth)`.
+    """
+
+    def __init__(self, width: int = 2048, depth: int = 4) -> None:
+        """Initialize the CountMinSketch.
+
+        Args:
+            width (int): The number of counters per row.
+            depth (int): The number of rows, each with its own hash.
+        """
+        self.width = width
+        self.depth = depth
+        self.counters = [0] * (width * depth)
+
+    def add(self, key: str, count: int = 1) -> int:
+        """Count occurrences of a key.
+
+        Args:
+            key (str): The key.
+            count (int): The number of occurrences.
+
+        Returns:
+            int: The new estimate of the frequency of the key.
+        """
+        # Double hashing derives the hash of each row from a single hash.
+        hashed = key_hash(key)
+        low, high = hashed & 0xFFFFFFFF, hashed >> 32
+        estimates = []
+        for row in range(self.depth):
+            index = row * self.width + (low + row * high) % self.width
+            self.counters[index] += count
+            estimates.append(self.counters[index])
+        return min(estimates)
+
+    def estimate(self, key: str) -> int:
+        """Estimate the frequency of a key.
+
+        Args:
+            key (str): The key.
+
+        Returns:
+            int: The estimate, at least the true frequency.
+        """
+        hashed = key_hash(key)
+        low, high = hashed & 0xFFFFFFFF, hashed >> 32
+        return min(
+            self.counters[row * self.width + (low + row * high) % self.width]
+            for row in range(self.depth)
+        )
+
+
+class TopK:
+    """The K keys with the highest frequency estimates.
+
+    A min-heap orders the tracked keys, so a key only replaces the least
+    frequent one when its estimate is higher. Outdated heap items are skipped
+    when they reach the top, and dropped when the heap grows too large.
+    """
+
+    def __init__(self, size: int = 100) -> None:
+        """Initialize the TopK.
+
+        Args:
+            size (int): The number of keys tracked.
+        """
+        self.size = size
+        self.counts: dict[str, int] = {}
+        self.heap: list[tuple[int, str]] = []
+
+    def offer(self, key: str, estimate: int) -> None:
+        """Update the estimate of a key, tracking it if it is frequent enough.
+
+        Args:
+            key (str): The key.
+            estimate (int): The new frequency estimate of the key.
+        """
+        if key in self.counts or len(self.counts) < self.size:
+            self.counts[key] = estimate
+            heapq.heappush(self.heap, (estimate, key))
+            if len(self.heap) > 4 * self.size:
+                self.heap = [(count, key) for key, count in self.counts.items()]
+                heapq.heapify(self.heap)
+            return
+        while self.counts.get(self.heap[0][1]) != self.heap[0][0]:
+            heapq.heappop(self.heap)
+        if estimate > self.heap[0][0]:
+            _, evicted = heapq.heapreplace(self.heap, (estimate, key))
+            del self.counts[evicted]
+            self.counts[key] = estimate
+
+    def items(self) -> list[tuple[str, int]]:
+        """List the tracked keys, most frequent first.
+
+        Returns:
+            list[tuple[str, int]]: The keys and their frequency estimates.
+        """
+        return sorted(self.counts.items(), key=lambda item: (-item[1], item[0]))
+
+
+class HyperLogLog:
+    """HyperLogLog estimating the number of distinct keys.
+
+    It holds `2 ** precision` one-byte registers, for a standard error of
+    `1.04 / sqrt(2 ** precision)`: about 1.6% with the default precision.
+    """
+
+    def __init__(self, precision: int = 12) -> None:
+        """Initialize the HyperLogLog.
+
+        Args:
+            precision (int): The number of hash bits selecting a register,
+                from 4 to 16.
+        """
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, key: str) -> None:
+        """Record a key.
+
+        Args:
+            key (str): The key.
+        """
+        hashed = key_hash(key)
+        bits = 64 - self.precision
+        index = hashed >> bits
+        rest = hashed & ((1 << bits) - 1)
+        rank = bits - rest.bit_length() + 1
+        self.registers[index] = max(self.registers[index], rank)
+
+    def count(self) -> int:
+        """Estimate the number of distinct keys recorded.
+
+        Returns:
+            int: The estimate.
+        """
+        size = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / size)
+        estimate = alpha * size * size / sum(2.0**-rank for rank in self.registers)
+        empty = self.registers.count(0)
+        if estimate <= 2.5 * size and empty:
+            # Linear counting is more accurate for small cardinalities.
+            estimate = size * math.log(size / empty)
+        return round(estimate)
+
+
+class HitRatio(NamedTuple):
+    """The reads of a namespace that hit and missed the cache.
+
+    Attributes:
+        hits: The number of keys read that were found.
+        misses: The number of keys read that were missing or expired.
+    """
+
+    hits: int
+    misses: int
+
+    @property
+    def ratio(self) -> float | None:
+        """The share of the keys read that were found, None before any read."""
+        if not self.hits + self.misses:
+            return None
+        return self.hits / (self.hits + self.misses)
+
+
+class AnalyticsReport(NamedTuple):
+    """The state of the key-space analytics at a point in time.
+
+    Attributes:
+        hot_keys: The most read keys and their estimated reads, most read
+            first.
+        distinct_keys: The estimated number of distinct keys read or written,
+            keyed by namespace.
+        hit_ratios: The hits and misses of the reads, keyed by namespace.
+    """
+
+    hot_keys: list[tuple[str, int]]
+    distinct_keys: dict[str, int]
+    hit_ratios: dict[str, HitRatio]
+
+
+class KeyAnalytics:
+    """Streaming analytics of the keys read and written.
+
+    Memory is bounded: the count-min sketch and the top-K heap have a fixed
+    size, and so has each namespace, up to `max_namespaces` of them. Keys of
+    further namespaces are counted in the `OVERFLOW_NAMESPACE` namespace.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        *,
+        top_k: int = 100,
+        width: int = 2048,
+        depth: int = 4,
+        precision: int = 12,
+        separator: str = ":",
+        max_namespaces: int = 64,
+    ) -> None:
+        """Initialize the KeyAnalytics.
+
+        Args:
+            top_k (int): The number of hot keys tracked.
+            width (int): The number of counters per row of the count-min
+                sketch.
+            depth (int): The number of rows of the count-min sketch.
+            precision (int): The precision of the HyperLogLog of each
+                namespace, which takes `2 ** precision` bytes.
+            separator (str): The separator ending the namespace of a key.
+            max_namespaces (int): The number of namespaces tracked.
+        """
+        self.top_k = top_k
+        self.width = width
+        self.depth = depth
+        self.precision = precision
+        self.separator = separator
+        self.max_namespaces = max_namespaces
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget every key recorded."""
+        self.sketch = CountMinSketch(self.width, self.depth)
+        self.hot = TopK(self.top_k)
+        self.distinct: dict[str, HyperLogLog] = {}
+        self.hits: dict[str, int] = {}
+        self.misses: dict[str, int] = {}
+
+    def namespace(self, key: str) -> str:
+        """Get the namespace of a key, or the overflow namespace.
+
+        Args:
+            key (str): The key.
+
+        Returns:
+            str: The part of the key before the separator, empty without
+                separator, or the overflow namespace once `max_namespaces`
+                other namespaces are tracked.
+        """
+        head, separator, _ = key.partition(self.separator)
+        namespace = head if separator else ""
+        if namespace in self.distinct or len(self.distinct) < self.max_namespaces:
+            return namespace
+        return OVERFLOW_NAMESPACE
+
+    def record_key(self, key: str) -> str:
+        """Record a key in the distinct keys of its namespace.
+
+        Args:
+            key (str): The key.
+
+        Returns:
+            str: The namespace the key was recorded in.
+        """
+        namespace = self.namespace(key)
+        distinct = self.distinct.get(namespace)
+        if distinct is None:
+            distinct = self.distinct[namespace] = HyperLogLog(self.precision)
+        distinct.add(key)
+        return namespace
+
+    def record_read(self, key: str, *, hit: bool) -> None:
+        """Record a read of a key.
+
+        Args:
+            key (str): The key read.
+            hit (bool): Whether the key was found.
+        """
+        namespace = self.record_key(key)
+        counts = self.hits if hit else self.misses
+        counts[namespace] = counts.get(namespace, 0) + 1
+        self.hot.offer(key, self.sketch.add(key))
+
+    def record_write(self, key: str) -> None:
+        """Record a write of a key.
+
+        Args:
+            key (str): The key written.
+        """
+        self.record_key(key)
+
+    def report(self) -> AnalyticsReport:
+        """Report the hot keys, distinct keys and hit ratios.
+
+        Returns:
+            AnalyticsReport: The report.
+        """
+        namespaces = self.hits.keys() | self.misses.keys()
+        return AnalyticsReport(
+            self.hot.items(),
+            {
+                namespace: distinct.count()
+                for namespace, distinct in self.distinct.items()
+            },
+            {
+                namespace: HitRatio(
+                    self.hits.get(namespace, 0),
+                    self.misses.get(namespace, 0),
+                )
+                for namespace in sorted(namespaces)
+            },
+        )
+
+
+class AnalyticsBackend(BackendWrapper):
+    """Backend recording the keys read and written into key-space analytics.
+
+    Reads record a hit or a miss per key, writes record their keys. Every
+    other operation is forwarded as is.
+    Implements the ICacheBackend interface.
+    """
+
+    def __init__(self, backend: ICacheBackend, analytics: KeyAnalytics) -> None:
+        """Initialize the AnalyticsBackend.
+
+        Args:
+            backend (ICacheBackend): The backend to analyze.
+            analytics (KeyAnalytics): The analytics recording the keys.
+        """
+        super().__init__(backend)
+        self.analytics = analytics
+
+    async def get(self, key: str) -> Any | None:
+        """Retrieve a cache entry by key, recording the read.
+
+        Args:
+            key: The key to retrieve.
+
+        Returns:
+            The value associated with the key, or None if not found or expired.
+        """
+        value = await self.backend.get(key)
+        self.analytics.record_read(key, hit=value is not None)
+        return value
+
+    async def get_entry(self, key: str) -> CacheEntry | None:
+        """Retrieve a cache entry by key with its expiry, recording the read.
+
+        Args:
+            key: The key to retrieve.
+
+        Returns:
+            The entry, or None if not found or expired.
+        """
+        entry = await self.backend.get_entry(key)
+        self.analytics.record_read(key, hit=entry is not None)
+        return entry
+
+    async def get_many(self, keys: list[str]) -> dict[str, Any]:
+        """Retrieve many cache entries, recording the read of every key.
+
+        Args:
+            keys: The keys to retrieve.
+
+        Returns:
+            The values found, keyed by key. Missing and expired keys are left out.
+        """
+        found = await self.backend.get_many(keys)
+        for key in keys:
+            self.analytics.record_read(key, hit=key in found)
+        return found
+
+    async def get_entries(self, keys: list[str]) -> dict[str, CacheEntry]:
+        """Retrieve many cache entries with their expiry, recording every read.
+
+        Args:
+            keys: The keys to retrieve.
+
+        Returns:
+            The entries found, keyed by key. Missing and expired keys are left out.
+        """
+        found = await self.backend.get_entries(keys)
+        for key in keys:
+            self.analytics.record_read(key, hit=key in found)
+        return found
+
+    async def set(self, key: str, value: dict, ttl: int) -> None:
+        """Set or update a cache entry, recording the write.
+
+        Args:
+            key: The key to set.
+            value: The value to associate with the key.
+            ttl: Time-to-live in seconds for the entry.
+        """
+        await self.backend.set(key, value, ttl)
+        self.analytics.record_write(key)
+
+    async def set_many(self, mapping: Mapping[str, dict], ttl: int) -> None:
+        """Set or update many cache entries, recording every write.
+
+        Args:
+            mapping: The values to set, keyed by key.
+            ttl: Time-to-live in seconds for the entries.
+        """
+        await self.backend.set_many(mapping, ttl)
+        for key in mapping:
+            self.analytics.record_write(key)
+
+    async def import_entries(self, mapping: Mapping[str, Any], ttl: int) -> int:
+        """Set many cache entries in bulk, recording the write of every key.
+
+        Args:
+            mapping: The values to set, keyed by key.
+            ttl: Time-to-live in seconds for the entries.
+
+        Returns:
+            The number of entries written.
+        """
+        imported = await self.backend.import_entries(mapping, ttl)
+        for key in mapping:
+            self.analytics.record_write(key)
+        return imported
@@ -1,27 +1,709 @@
 """This module contains the postgres cache backend implementation."""
 
+import asyncio
+import contextvars
+import datetime
 import json
+import math
+import os
+import time
+import uuid
+from collections.abc import AsyncGenerator
+from collections.abc import AsyncIterator
+from collections.abc import Callable
+from collections.abc import Mapping
+from contextlib import AbstractAsyncContextManager
+from contextlib import AsyncExitStack
+from contextlib import asynccontextmanager
+from contextlib import nullcontext
 from typing import Any
+from typing import BinaryIO
+from typing import Literal
+from typing import NamedTuple
 
 import asyncpg
 
+from psqache.abcs import CacheEntry
+from psqache.abcs import ICacheBackend
+from psqache.abcs import ICompressor
+from psqache.abcs import IMetricsSink
+from psqache.abcs import ISerializer
+from psqache.abcs import ISnapshotBackend
+from psqache.compressors import get_codec
+from psqache.compressors import get_compressor
+from psqache.metrics import BYTES_IN
+from psqache.metrics import BYTES_OUT
+from psqache.metrics import DESERIALIZE_SECONDS
+from psqache.metrics import POOL_ACQUIRE_SECONDS
+from psqache.metrics import POOL_SATURATION
+from psqache.metrics import QUERY_SECONDS
+from psqache.metrics import SERIALIZE_SECONDS
 from psqache.queries import Queries
+from psqache.serializers import JsonSerializer
+from psqache.serializers import get_serializer
 
+Storage = Literal["jsonb", "bytea"]
 
-class PostgresBackend:
+JSONB_FORMAT_VERSION = b"\x01"
+"""Version byte prefixing the JSON text in the JSONB binary format."""
+
+UNCOMPRESSED = 0
+"""Codec id in the header of payloads that are not compressed."""
+
+FULL_SAMPLE = 100.0
+"""Sampling percentage covering every page of the table."""
+
+
+class EvictionStats(NamedTuple):
+    """Statistics of the eviction sweeps of a backend.
+
+    Attributes:
+        sweeps: The number of sweeps that found the cache over capacity.
+        evicted: The number of entries evicted since the backend started.
+        evicted_bytes: The total size of the values evicted.
+        entries: The number of entries measured by the last sweep.
+        bytes: The total size of the values measured by the last sweep.
+    """
+
+    sweeps: int
+    evicted: int
+    evicted_bytes: int
+    entries: int
+    bytes: int
+
+
+class TableReport(NamedTuple):
+    """Report of the size of the cache and of the distribution of its entries.
+
+    Attributes:
+        entries: The number of live entries.
+        table_bytes: The size on disk of the cache table, with its indexes
+            and TOAST data.
+        value_sizes: The median, 90th and 99th percentiles and maximum of the
+            sizes in bytes of the stored values, zero without entries.
+        ttl_buckets: The TTL thresholds in seconds of the TTL histogram.
+        ttl_counts: The number of live entries per TTL bucket: bucket i
+            counts the TTLs from threshold i - 1 and below threshold i, the
+            first and last buckets being open ended.
+    """
+
+    entries: int
+    table_bytes: int
+    value_sizes: tuple[int, int, int, int]
+    ttl_buckets: tuple[int, ...]
+    ttl_counts: tuple[int, ...]
+
+
+def encode_jsonb(data: bytes) -> bytes:
+    """Encode serialized JSON into the JSONB binary format.
+
+    Args:
+        data (bytes): The JSON text.
+
+    Returns:
+        bytes: The JSONB binary representation of the text.
+    """
+    return JSONB_FORMAT_VERSION + data
+
+
+def snapshot_backend(backend: ICacheBackend) -> ISnapshotBackend:
+    """Get a backend that can be dumped to a snapshot file.
+
+    Args:
+        backend (ICacheBackend): The backend.
+
+    Returns:
+        ISnapshotBackend: The backend itself.
+
+    Raises:
+        TypeError: If the backend does not support snapshots.
+    """
+    if not isinstance(backend, ISnapshotBackend):
+        msg = f"{type(backend).__name__} does not support snapshots"
+        raise TypeError(msg)
+    return backend
+
+
+class PostgresBackend:  # noqa: PLR0904
     """Postgres backend implementation of the cache.
 
     This class implements the cache backend using a Postgres database.
-    Implements the ICacheBackend interface.
+    Implements the ICacheBackend and ISnapshotBackend interfaces.
+
+    When a notify channel is configured, every write also sends the changed
+    keys on that channel in the same transaction, so processes holding local
+    copies of the entries can invalidate them.
+
+    Values are serialized in Python by the configured serializer and stored
+    either in the `value` JSONB column or, in the BYTEA storage layout, as raw
+    bytes in the `payload` column, which Postgres stores without parsing. The
+    JSONB layout requires a JSON serializer. Connections must be initialized
+    with `init_connection`, which registers a JSONB codec so asyncpg hands
+    JSONB values to the serializer directly.
+
+    With a compressor configured, serialized values of at least
+    `compression_threshold` bytes are compressed and stored in the `payload`
+    column whatever the storage layout. Every payload starts with a one byte
+    header holding the codec id of its compressor, or zero when it is not
+    compressed, so entries are read correctly whichever compressor wrote them.
+    Compressing or decompressing values of at least `offload_threshold` bytes
+    runs in a worker thread, so it does not block the event loop.
+
+    The statements of the cache operations are prepared once per connection,
+    when the pool opens it, and reused from the asyncpg statement cache. Behind
+    PgBouncer in transaction pooling mode, where a statement prepared on one
+    server connection may be executed on another, the statement cache is
+    disabled instead.
+
+    With a capacity configured, in entries and/or in bytes of stored values,
+    `cleanup` also runs an eviction sweep once the cache is over capacity,
+    evicting entries down to `EVICTION_TARGET` of the capacity. Eviction
+    approximates LRU: reads record a coarse last access time, written at most
+    once per `access_granularity`, and each batch evicts the least recently
+    used entries of a random sample of the table.
+
+    With a metrics sink, the backend reports the waits for a pool connection,
+    the time connections are held, the pool saturation, and the time and
+    bytes of (de)serializing values. Without one, it measures nothing.
+
+    Snapshots of the live entries are exported and imported with binary COPY,
+    and `import_entries` writes many entries with COPY as well. Imports copy
+    the entries into a temporary staging table, then merge them into the
+    cache in batches of `IMPORT_BATCH_SIZE` keys, one transaction each, so
+    the locks of a large import are held briefly. The staging table belongs
+    to a session, so imports do not work through PgBouncer in transaction
+    pooling mode.
     """
 
-    def __init__(self, pool: asyncpg.pool.Pool) -> None:
+    queries = Queries
+    """The queries of the schema the backend stores entries in."""
+
+    NOTIFY_PAYLOAD_LIMIT = 7900
+    """Maximum size of a notification payload, below Postgres' 8000 bytes."""
+
+    CLEANUP_BATCH_SIZE = 5000
+    """Maximum number of expired entries deleted per statement by cleanup."""
+
+    EVICTION_TARGET = 0.9
+    """Share of the capacity an eviction sweep brings the cache down to."""
+
+    EVICTED_PER_SAMPLE = 0.25
+    """Share of each eviction sample evicted, its least recently used part."""
+
+    IMPORT_BATCH_SIZE = 1000
+    """Maximum number of keys merged per transaction by imports."""
+
+    PREPARED_QUERIES: tuple[str, ...] = (
+        "get_cache_entry",
+        "get_cache_entries",
+        "get_tracked_cache_entry",
+        "get_tracked_cache_entries",
+        "set_cache_entry",
+        "set_cache_entries",
+        "delete_cache_entry",
+        "delete_cache_entries",
+        "has_cache_entry",
+        "has_cache_entries",
+        "touch_cache_entry",
+        "touch_cache_entries",
+        "increment_counter",
+        "increment_counters",
+        "get_counter",
+        "lock_cache_entry",
+    )
+    """Names of the queries prepared on every new connection."""
+
+    def __init__(  # noqa: PLR0913
+        self,
+        pool: asyncpg.pool.Pool | None = None,
+        notify_channel: str | None = None,
+        *,
+        serializer: str | ISerializer = "json",
+        storage: Storage = "jsonb",
+        compressor: str | ICompressor | None = None,
+        compression_threshold: int = 1024,
+        offload_threshold: int = 64 * 1024,
+        max_entries: int | None = None,
+        max_bytes: int | None = None,
+        access_granularity: datetime.timedelta = datetime.timedelta(minutes=1),
+        eviction_sample_size: int = 2000,
+        statement_cache_size: int = 100,
+        pgbouncer: bool = False,
+        logged: bool = False,
+        metrics: IMetricsSink | None = None,
+    ) -> None:
         """Initialize the PostgresBackend.
 
         Args:
-            pool (asyncpg.pool.Pool): The pool to use for database connections.
+            pool (Optional[asyncpg.pool.Pool]): The pool to use for database
+                connections. Defaults to None, in which case the pool must be
+                created with `create_pool` before the backend is used. A pool
+                created elsewhere must pass `init_connection` of the backend
+                as its `init` argument, which registers the JSONB codec:
+                without it, JSONB values are written and read as text.
+            notify_channel (Optional[str]): The channel to send invalidation
+                messages on. Defaults to None, which sends no messages.
+            serializer (str | ISerializer): The serializer, or the name of the
+                serializer, to use for values. Defaults to "json".
+            storage (Storage): The storage layout, "jsonb" or "bytea".
+                Defaults to "jsonb".
+            compressor (Optional[str | ICompressor]): The compressor, or the
+                name of the compressor, to use for large values: "zlib", "lz4"
+                or "zstd". Defaults to None, which disables compression.
+            compression_threshold (int): The serialized size in bytes from
+                which values are compressed.
+            offload_threshold (int): The size in bytes from which values are
+                compressed and decompressed in a worker thread.
+            max_entries (Optional[int]): The maximum number of entries.
+                Defaults to None, which does not bound the number of entries.
+            max_bytes (Optional[int]): The maximum total size in bytes of the
+                stored values. Defaults to None, which does not bound it.
+            access_granularity (datetime.timedelta): How old the last access
+                time of an entry must be before a read updates it. Only used
+                with a capacity.
+            eviction_sample_size (int): The approximate number of entries
+                sampled per eviction batch.
+            statement_cache_size (int): The size of the prepared statement
+                cache of every connection. It must hold at least the prepared
+                queries. Zero disables prepared statements.
+            pgbouncer (bool): Whether connections go through PgBouncer in
+                transaction pooling mode, which disables the statement cache.
+            logged (bool): Whether `create_table` makes the tables logged, so
+                they are replicated to standbys. Defaults to False, which keeps
+                them unlogged and out of the WAL.
+            metrics (Optional[IMetricsSink]): The sink receiving the pool,
+                query and serialization measures. Defaults to None, which
+                measures nothing.
+
+        Raises:
+            ValueError: If the JSONB layout is used with a serializer that does
+                not produce JSON.
+        """
+        self.serializer = get_serializer(serializer)
+        if storage == "jsonb" and not self.serializer.json:
+            msg = f"The {self.serializer.name} serializer requires bytea storage"
+            raise ValueError(msg)
+        self.storage = storage
+        # The JSONB codec is registered even in the BYTEA layout, so entries
+        # written by processes using the JSONB layout can still be read.
+        self.json_serializer = (
+            self.serializer if self.serializer.json else JsonSerializer()
+        )
+        self.compressor = None if compressor is None else get_compressor(compressor)
+        self.compression_threshold = compression_threshold
+        self.offload_threshold = offload_threshold
+        self.codecs: dict[int, ICompressor] = {}
+        if self.compressor is not None:
+            self.codecs[self.compressor.id] = self.compressor
+        self.pool: asyncpg.pool.Pool
+        if pool is not None:
+            self.pool = pool
+        self.notify_channel = notify_channel
+        self.origin = uuid.uuid4().hex
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.access_granularity = access_granularity
+        self.eviction_sample_size = eviction_sample_size
+        self.statement_cache_size = 0 if pgbouncer else statement_cache_size
+        self.logged = logged
+        self.metrics = metrics
+        self.sweeps = 0
+        self.evicted = 0
+        self.evicted_bytes = 0
+        self.usage = (0, 0)
+        # The connection of the lock held by a task, reused by the operations
+        # that task runs while holding the lock.
+        self.held: contextvars.ContextVar[
+            tuple[asyncio.Task[Any] | None, asyncpg.Connection] | None
+        ] = contextvars.ContextVar(f"psqache_lock_{self.origin}", default=None)
+
+    @property
+    def bounded(self) -> bool:
+        """Whether the cache has a capacity, so accesses are tracked."""
+        return self.max_entries is not None or self.max_bytes is not None
+
+    @property
+    def eviction_stats(self) -> EvictionStats:
+        """The statistics of the eviction sweeps."""
+        return EvictionStats(
+            self.sweeps,
+            self.evicted,
+            self.evicted_bytes,
+            *self.usage,
+        )
+
+    def create_pool(self, dsn: str, **options: Any) -> asyncpg.pool.Pool:
+        """Create the pool of the backend, with initialized connections.
+
+        Args:
+            dsn (str): The DSN for the Postgres database.
+            **options (Any): Other arguments for `asyncpg.create_pool`.
+
+        Returns:
+            asyncpg.pool.Pool: The pool, which must be awaited before use.
+        """
+        self.pool = asyncpg.create_pool(
+            dsn=dsn,
+            init=self.init_connection,
+            statement_cache_size=self.statement_cache_size,
+            **options,
+        )
+        return self.pool
+
+    async def open_pool(self, dsn: str, **options: Any) -> asyncpg.pool.Pool:
+        """Create the pool of the backend on the running loop and connect it.
+
+        Args:
+            dsn (str): The DSN for the Postgres database.
+            **options (Any): Other arguments for `asyncpg.create_pool`.
+
+        Returns:
+            asyncpg.pool.Pool: The connected pool.
+        """
+        pool = self.create_pool(dsn, **options)
+        await pool
+        return pool
+
+    async def create_table(self) -> None:
+        """Create the cache tables, unless they already exist.
+
+        Processes creating the tables at the same time wait for each other,
+        as concurrent `CREATE TABLE IF NOT EXISTS` statements can fail. In
+        the logged mode, the tables are then made logged. The statements of
+        the cache operations are then prepared on the connection, as its
+        statements may have been skipped or invalidated by the schema changes.
+        """
+        connection: asyncpg.Connection
+        async with self.acquire() as connection:
+            async with connection.transaction():
+                await connection.execute(self.queries.lock_schema_changes.sql)
+                await connection.execute(self.queries.create_psqache_table.sql)
+                if self.logged:
+                    await connection.execute(
+                        self.queries.set_cache_tables_logged.sql,
+                    )
+            await self.prepare_statements(connection)
+
+    async def prepare_pool(self) -> None:
+        """Prepare the statements of the cache operations on the whole pool.
+
+        The `min_size` connections of the pool are held at once, so each of
+        them prepares its statements. Connections opened before the cache
+        tables existed thus get them at startup instead of on first use.
+        """
+        async with AsyncExitStack() as stack:
+            connections = [
+                await stack.enter_async_context(self.acquire())
+                for _ in range(self.pool.get_min_size())
+            ]
+            await asyncio.gather(
+                *(self.prepare_statements(connection) for connection in connections),
+            )
+
+    async def replication_lag(self) -> float | None:
+        """Measure how far the server of the pool lags behind the primary.
+
+        Returns:
+            Optional[float]: The lag in seconds, zero on the primary, or None
+                if it is unknown.
+        """
+        connection: asyncpg.Connection
+        async with self.acquire() as connection:
+            lag: float | None = await connection.fetchval(
+                self.queries.get_replication_lag.sql,
+            )
+            return lag
+
+    async def close(self) -> None:
+        """Close the pool, waiting for the connections in use to be released."""
+        await self.pool.close()
+
+    def acquire(self) -> AbstractAsyncContextManager[asyncpg.Connection]:
+        """Acquire a connection of the pool, measured when metrics are enabled.
+
+        A task holding a lock gets the connection of its lock instead, so it
+        never waits for a second connection while holding one: otherwise, as
+        many lock holders as the pool has connections would wait forever.
+
+        Returns:
+            AbstractAsyncContextManager: The context holding the connection.
+        """
+        held = self.held.get()
+        if held is not None and held[0] is asyncio.current_task():
+            return nullcontext(held[1])
+        if self.metrics is None:
+            acquiring: AbstractAsyncContextManager[asyncpg.Connection]
+            acquiring = self.pool.acquire()
+            return acquiring
+        return self.measured_acquire(self.metrics)
+
+    @asynccontextmanager
+    async def measured_acquire(
+        self,
+        metrics: IMetricsSink,
+    ) -> AsyncIterator[asyncpg.Connection]:
+        """Acquire a connection of the pool, measuring the wait and its use.
+
+        Args:
+            metrics (IMetricsSink): The sink receiving the measures.
+
+        Yields:
+            asyncpg.Connection: The connection, held until the block exits.
+        """
+        start = time.perf_counter()
+        connection: asyncpg.Connection
+        async with self.pool.acquire() as connection:
+            acquired = time.perf_counter()
+            metrics.observe(POOL_ACQUIRE_SECONDS, acquired - start, "")
+            metrics.gauge(
+                POOL_SATURATION,
+                (self.pool.get_size() - self.pool.get_idle_size())
+                / self.pool.get_max_size(),
+            )
+            try:
+                yield connection
+            finally:
+                metrics.observe(QUERY_SECONDS, time.perf_counter() - acquired, "")
+
+    async def init_connection(self, connection: asyncpg.Connection) -> None:
+        """Initialize a new pool connection.
+
+        Registers a binary JSONB codec running the serializer, so JSONB values
+        are decoded by asyncpg instead of being returned as text. Pools not
+        created by `create_pool` must run it as their `init` argument. Then
+        prepares the statements of the cache operations.
+
+        Args:
+            connection (asyncpg.Connection): The connection to initialize.
+        """
+        await connection.set_type_codec(
+            "jsonb",
+            schema="pg_catalog",
+            format="binary",
+            encoder=encode_jsonb,
+            decoder=self.decode_jsonb,
+        )
+        await self.prepare_statements(connection)
+
+    async def prepare_statements(self, connection: asyncpg.Connection) -> None:
+        """Prepare the statements of the cache operations on a connection.
+
+        The statements go to the statement cache of the connection, so no
+        operation pays for parsing and planning its query. Nothing is prepared
+        when the statement cache is disabled, nor before the cache tables
+        exist: `create_table` prepares the statements once it created them.
+
+        Args:
+            connection (asyncpg.Connection): The connection to prepare the
+                statements on.
+        """
+        if not self.statement_cache_size:
+            return
+        try:
+            for name in self.PREPARED_QUERIES:
+                # asyncpg has no public way to fill the statement cache, which
+                # fetch, fetchval and execute look their statements up in.
+                await connection._prepare(  # noqa: SLF001
+                    getattr(self.queries, name).sql,
+                    use_cache=True,
+                )
+        except asyncpg.UndefinedTableError:
+            return
+
+    def decode_jsonb(self, data: bytes) -> Any:
+        """Deserialize a value received in the JSONB binary format.
+
+        Args:
+            data (bytes): The JSONB binary representation of the value.
+
+        Returns:
+            Any: The value.
+        """
+        if self.metrics is None:
+            return self.json_serializer.loads(data[1:])
+        start = time.perf_counter()
+        value = self.json_serializer.loads(data[1:])
+        self.metrics.observe(DESERIALIZE_SECONDS, time.perf_counter() - start, "")
+        self.metrics.increment(BYTES_IN, len(data), "")
+        return value
+
+    async def offload(self, size: int, func: Callable[..., Any], *args: Any) -> Any:
+        """Call a function, in a worker thread if its input is large.
+
+        Args:
+            size (int): The size of the input in bytes.
+            func (Callable): The function to call.
+            *args (Any): The arguments to call the function with.
+
+        Returns:
+            Any: The result of the function.
+        """
+        if size >= self.offload_threshold:
+            return await asyncio.to_thread(func, *args)
+        return func(*args)
+
+    @staticmethod
+    def compress(compressor: ICompressor, data: bytes) -> bytes:
+        """Compress serialized data into a payload with a codec header.
+
+        Data that does not shrink is stored uncompressed.
+
+        Args:
+            compressor (ICompressor): The compressor to use.
+            data (bytes): The serialized value.
+
+        Returns:
+            bytes: The payload.
+        """
+        compressed = compressor.compress(data)
+        if len(compressed) < len(data):
+            return bytes((compressor.id,)) + compressed
+        return bytes((UNCOMPRESSED,)) + data
+
+    def load(self, payload: bytes) -> Any:
+        """Decompress and deserialize a payload with a codec header.
+
+        Args:
+            payload (bytes): The payload.
+
+        Returns:
+            Any: The value.
+        """
+        codec, data = payload[0], payload[1:]
+        if codec != UNCOMPRESSED:
+            if codec not in self.codecs:
+                self.codecs[codec] = get_codec(codec)
+            data = self.codecs[codec].decompress(data)
+        return self.serializer.loads(data)
+
+    async def encode(self, value: Any) -> tuple[bytes | None, bytes | None]:
+        """Serialize a value into the columns of the storage layout.
+
+        Args:
+            value (Any): The value to serialize.
+
+        Returns:
+            tuple: The JSONB value and the BYTEA payload, only one of which is
+                set.
+        """
+        start = time.perf_counter() if self.metrics is not None else 0.0
+        data = self.serializer.dumps(value)
+        compressor = self.compressor
+        encoded: tuple[bytes | None, bytes | None]
+        if compressor is not None and len(data) >= self.compression_threshold:
+            payload = await self.offload(len(data), self.compress, compressor, data)
+            encoded, size = (None, payload), len(payload)
+        elif self.storage == "jsonb":
+            encoded, size = (data, None), len(data)
+        else:
+            encoded, size = (None, bytes((UNCOMPRESSED,)) + data), len(data) + 1
+        if self.metrics is not None:
+            self.metrics.observe(SERIALIZE_SECONDS, time.perf_counter() - start, "")
+            self.metrics.increment(BYTES_OUT, size, "")
+        return encoded
+
+    async def decode(self, record: Mapping[str, Any] | None) -> Any | None:
+        """Deserialize a value from the columns of a row.
+
+        Args:
+            record (Optional[Mapping[str, Any]]): The row, with the value and
+                payload columns.
+
+        Returns:
+            Any: The value, or None if there is no row.
+        """
+        if record is None:
+            return None
+        payload = record["payload"]
+        if payload is None:
+            return record["value"]
+        if self.metrics is None:
+            return await self.offload(len(payload), self.load, payload)
+        start = time.perf_counter()
+        value = await self.offload(len(payload), self.load, payload)
+        self.metrics.observe(DESERIALIZE_SECONDS, time.perf_counter() - start, "")
+        self.metrics.increment(BYTES_IN, len(payload), "")
+        return value
+
+    def invalidation_payloads(self, keys: list[str] | None) -> list[str]:
+        """Build the invalidation messages for the given keys.
+
+        Keys are split across as many messages as needed to keep every
+        payload under the Postgres limit. Messages carry the origin of this
+        backend so a process can ignore its own invalidations.
+
+        Args:
+            keys (Optional[list[str]]): The changed keys, or None when every
+                entry was removed.
+
+        Returns:
+            list[str]: The JSON encoded payloads.
+        """
+        if keys is None:
+            return [json.dumps({"origin": self.origin, "keys": None})]
+        payloads: list[str] = []
+        chunk: list[str] = []
+        size = 0
+        for key in keys:
+            key_size = len(json.dumps(key)) + 2
+            if chunk and size + key_size > self.NOTIFY_PAYLOAD_LIMIT:
+                payloads.append(json.dumps({"origin": self.origin, "keys": chunk}))
+                chunk, size = [], 0
+            chunk.append(key)
+            size += key_size
+        if chunk:
+            payloads.append(json.dumps({"origin": self.origin, "keys": chunk}))
+        return payloads
+
+    @asynccontextmanager
+    async def invalidating(
+        self,
+        connection: asyncpg.Connection,
+        keys: list[str] | None,
+    ) -> AsyncIterator[None]:
+        """Send invalidation messages for the writes made inside the block.
+
+        The writes and the messages run in one transaction, so the messages
+        are delivered if and only if the writes are committed. Nothing is
+        sent when no notify channel is configured.
+
+        Args:
+            connection (asyncpg.Connection): The connection making the writes.
+            keys (Optional[list[str]]): The changed keys, or None when every
+                entry is removed.
+
+        Yields:
+            None: Control to the block making the writes.
+        """
+        if self.notify_channel is None:
+            yield
+            return
+        async with connection.transaction():
+            yield
+            await connection.execute(
+                self.queries.notify_cache_invalidation.sql,
+                self.notify_channel,
+                self.invalidation_payloads(keys),
+            )
+
+    async def fetch_entry(self, key: str) -> asyncpg.Record | None:
+        """Fetch the row of a cache entry, tracking the access when bounded.
+
+        Args:
+            key: The key to fetch.
+
+        Returns:
+            The row of the entry, or None if not found or expired.
         """
-        self.pool = pool
+        connection: asyncpg.Connection
+        async with self.acquire() as connection:
+            if self.bounded:
+                return await connection.fetchrow(
+                    self.queries.get_tracked_cache_entry.sql,
+                    key,
+                    self.access_granularity,
+                )
+            return await connection.fetchrow(self.queries.get_cache_entry.sql, key)
 
     async def get(self, key: str) -> Any | None:
         """Retrieve a cache entry by key.
@@ -32,10 +714,25 @@ class PostgresBackend:
         Returns:
             The value associated with the key, or None if not found or expired.
         """
-        connection: asyncpg.Connection
-        async with self.pool.acquire() as connection:
-            value = await connection.fetchval(Queries.get_cache_entry.sql, key)
-            return json.loads(value)
+        return await self.decode(await self.fetch_entry(key))
+
+    async def get_entry(self, key: str) -> CacheEntry | None:
+        """Retrieve a cache entry by key, with its expiry.
+
+        Args:
+            key: The key to retrieve.
+
+        Returns:
+            The entry, or None if not found or expired.
+        """
+        record = await self.fetch_entry(key)
+        if record is None:
+            return None
+        return CacheEntry(
+            await self.decode(record),
+            record["ttl"],
+            record["expires_in"],
+        )
 
     async def set(self, key: str, value: dict, ttl: int) -> None:
         """Set or update a cache entry with a time-to-live.
@@ -46,11 +743,14 @@ class PostgresBackend:
             ttl: Time-to-live in seconds for the entry.
         """
         connection: asyncpg.Connection
-        async with self.pool.acquire() as connection:
+        async with (
+            self.acquire() as connection,
+            self.invalidating(connection, [key]),
+        ):
             await connection.execute(
-                Queries.set_cache_entry.sql,
+                self.queries.set_cache_entry.sql,
                 key,
-                json.dumps(value),
+                *await self.encode(value),
                 ttl,
             )
 
@@ -61,20 +761,142 @@ class PostgresBackend:
             key: The key to delete.
         """
         connection: asyncpg.Connection
-        async with self.pool.acquire() as connection:
-            await connection.execute(Queries.delete_cache_entry.sql, key)
+        async with (
+            self.acquire() as connection,
+            self.invalidating(connection, [key]),
+        ):
+            await connection.execute(self.queries.delete_cache_entry.sql, key)
 
     async def clear(self) -> None:
         """Clear all cache entries."""
         connection: asyncpg.Connection
-        async with self.pool.acquire() as connection:
-            await connection.execute(Queries.clear_cache_entries.sql)
+        async with (
+            self.acquire() as connection,
+            self.invalidating(connection, None),
+        ):
+            await connection.execute(self.queries.clear_cache_entries.sql)
 
     async def cleanup(self) -> None:
-        """Delete all expired cache entries."""
+        """Delete all expired cache entries and counters, in bounded batches.
+
+        Each batch is a separate statement, so no lock is held for the whole
+        cleanup. For continuous cleanup with pacing, use an ExpiryReaper.
+        When the cache has a capacity, an eviction sweep runs afterwards.
+        """
         connection: asyncpg.Connection
-        async with self.pool.acquire() as connection:
-            await connection.execute(Queries.cleanup_expired_cache_entries.sql)
+        async with self.acquire() as connection:
+            for query in (
+                self.queries.cleanup_expired_cache_entries,
+                self.queries.cleanup_expired_counters,
+            ):
+                reaped = self.CLEANUP_BATCH_SIZE
+                while reaped >= self.CLEANUP_BATCH_SIZE:
+                    reaped = await connection.fetchval(
+                        query.sql,
+                        self.CLEANUP_BATCH_SIZE,
+                    )
+        if self.bounded:
+            await self.evict()
+
+    async def table_report(
+        self,
+        ttl_buckets: tuple[int, ...] = (60, 3600, 86400, 7 * 86400),
+    ) -> TableReport:
+        """Report the size of the cache and the distribution of its entries.
+
+        This scans the whole table, so it is meant to be run on demand, to
+        decide what to compress, what to keep in a local tier and how to
+        size the cache.
+
+        Args:
+            ttl_buckets (tuple[int, ...]): The sorted TTL thresholds in
+                seconds of the TTL histogram. Defaults to a minute, an hour, a
+                day and a week.
+
+        Returns:
+            TableReport: The report.
+        """
+        connection: asyncpg.Connection
+        async with self.acquire() as connection:
+            record = await connection.fetchrow(
+                self.queries.get_cache_report.sql,
+                list(ttl_buckets),
+            )
+        value_sizes = record["value_sizes"] or (0, 0, 0, 0)
+        return TableReport(
+            record["entries"],
+            record["table_bytes"],
+            (value_sizes[0], value_sizes[1], value_sizes[2], value_sizes[3]),
+            ttl_buckets,
+            tuple(record["ttl_counts"]),
+        )
+
+    def excess(self, entries: int, size: int) -> int:
+        """Compute how many entries to evict to get down to the target.
+
+        The number of entries to evict for the size is estimated from the
+        average size of the entries.
+
+        Args:
+            entries (int): The number of entries.
+            size (int): The total size of the values in bytes.
+
+        Returns:
+            int: The number of entries to evict, zero or less if none.
+        """
+        excess = 0
+        if self.max_entries is not None:
+            excess = entries - int(self.max_entries * self.EVICTION_TARGET)
+        if self.max_bytes is not None and size > 0:
+            extra = size - self.max_bytes * self.EVICTION_TARGET
+            excess = max(excess, math.ceil(extra / (size / entries)))
+        return excess
+
+    async def evict(self) -> int:
+        """Evict entries until the cache is back under its capacity.
+
+        Nothing is evicted unless the cache is over its capacity, in which
+        case entries are evicted in batches down to `EVICTION_TARGET` of the
+        capacity, so sweeps do not run again right away.
+
+        Returns:
+            int: The number of entries evicted.
+        """
+        connection: asyncpg.Connection
+        async with self.acquire() as connection:
+            usage = await connection.fetchrow(self.queries.get_cache_usage.sql)
+            entries, size = usage["entries"], usage["bytes"]
+            self.usage = (entries, size)
+            over = (self.max_entries is not None and entries > self.max_entries) or (
+                self.max_bytes is not None and size > self.max_bytes
+            )
+            if not over:
+                return 0
+            self.sweeps += 1
+            evicted = 0
+            sample = self.eviction_sample_size
+            batch_size = max(int(sample * self.EVICTED_PER_SAMPLE), 1)
+            percent = min(FULL_SAMPLE * sample / entries, FULL_SAMPLE)
+            while (excess := self.excess(entries, size)) > 0:
+                record = await connection.fetchrow(
+                    self.queries.evict_cache_entries.sql,
+                    min(excess, batch_size),
+                    percent,
+                )
+                if not record["evicted"]:
+                    # The sample missed every entry: sample more pages, and
+                    # stop once the whole table has nothing left to evict.
+                    if percent >= FULL_SAMPLE:
+                        break
+                    percent = min(percent * 2, FULL_SAMPLE)
+                    continue
+                evicted += record["evicted"]
+                entries -= record["evicted"]
+                size -= record["bytes"]
+                self.evicted += record["evicted"]
+                self.evicted_bytes += record["bytes"]
+            self.usage = (entries, size)
+            return evicted
 
     async def has(self, key: str) -> bool:
         """Check if a cache entry exists and is not expired.
@@ -86,6 +908,1082 @@ class PostgresBackend:
             True if the entry exists and is not expired, otherwise False.
         """
         connection: asyncpg.Connection
-        async with self.pool.acquire() as connection:
-            res = await connection.execute(Queries.has_cache_entry.sql, key)
-            return bool(res)
+        async with self.acquire() as connection:
+            found = await connection.fetchval(self.queries.has_cache_entry.sql, key)
+            return bool(found)
+
+    async def fetch_entries(self, keys: list[str]) -> list[asyncpg.Record]:
+        """Fetch the rows of many entries, tracking the accesses if bounded.
+
+        Args:
+            keys: The keys to fetch.
+
+        Returns:
+            The rows of the entries found. Missing and expired keys are left out.
+        """
+        records: list[asyncpg.Record]
+        connection: asyncpg.Connection
+        async with self.acquire() as connection:
+            if self.bounded:
+                records = await connection.fetch(
+                    self.queries.get_tracked_cache_entries.sql,
+                    keys,
+                    self.access_granularity,
+                )
+            else:
+                records = await connection.fetch(
+                    self.queries.get_cache_entries.sql,
+                    keys,
+                )
+            return records
+
+    async def get_many(self, keys: list[str]) -> dict[str, Any]:
+        """Retrieve many cache entries by key in a single round trip.
+
+        Args:
+            keys: The keys to retrieve.
+
+        Returns:
+            The values found, keyed by key. Missing and expired keys are left out.
+        """
+        return {
+            record["key"]: await self.decode(record)
+            for record in await self.fetch_entries(keys)
+        }
+
+    async def get_entries(self, keys: list[str]) -> dict[str, CacheEntry]:
+        """Retrieve many cache entries by key with their expiry, in one round trip.
+
+        Args:
+            keys: The keys to retrieve.
+
+        Returns:
+            The entries found, keyed by key. Missing and expired keys are left out.
+        """
+        return {
+            record["key"]: CacheEntry(
+                await self.decode(record),
+                record["ttl"],
+                record["expires_in"],
+            )
+            for record in await self.fetch_entries(keys)
+        }
+
+    async def set_many(self, mapping: Mapping[str, dict], ttl: int) -> None:
+        """Set or update many cache entries in a single round trip.
+
+        Args:
+            mapping: The values to set, keyed by key.
+            ttl: Time-to-live in seconds for the entries.
+        """
+        if not mapping:
+            return
+        encoded = [await self.encode(value) for value in mapping.values()]
+        values, payloads = zip(*encoded, strict=True)
+        connection: asyncpg.Connection
+        async with (
+            self.acquire() as connection,
+            self.invalidating(connection, list(mapping)),
+        ):
+            await connection.execute(
+                self.queries.set_cache_entries.sql,
+                list(mapping),
+                list(values),
+                list(payloads),
+                [ttl] * len(mapping),
+            )
+
+    async def delete_many(self, keys: list[str]) -> None:
+        """Delete many cache entries by key in a single round trip.
+
+        Args:
+            keys: The keys to delete.
+        """
+        connection: asyncpg.Connection
+        async with (
+            self.acquire() as connection,
+            self.invalidating(connection, keys),
+        ):
+            await connection.execute(self.queries.delete_cache_entries.sql, keys)
+
+    async def has_many(self, keys: list[str]) -> dict[str, bool]:
+        """Check which of the given keys exist and are not expired.
+
+        Args:
+            keys: The keys to check.
+
+        Returns:
+            True for the keys that exist and are not expired, otherwise False.
+        """
+        connection: asyncpg.Connection
+        async with self.acquire() as connection:
+            records = await connection.fetch(self.queries.has_cache_entries.sql, keys)
+            found = {record["key"] for record in records}
+            return {key: key in found for key in keys}
+
+    async def touch(self, key: str, ttl: int) -> bool:
+        """Reset the time-to-live of a cache entry without rewriting its value.
+
+        Only the expiry metadata is updated, which Postgres can do as a HOT
+        update that writes neither the value nor the indexes.
+
+        Args:
+            key: The key to touch.
+            ttl: Time-to-live in seconds for the entry, from now.
+
+        Returns:
+            True if the entry exists and is not expired, otherwise False.
+        """
+        connection: asyncpg.Connection
+        async with self.acquire() as connection:
+            touched = await connection.fetchval(
+                self.queries.touch_cache_entry.sql,
+                key,
+                ttl,
+            )
+            return bool(touched)
+
+    async def touch_many(self, keys: list[str], ttl: int) -> dict[str, bool]:
+        """Reset the time-to-live of many cache entries in a single round trip.
+
+        Args:
+            keys: The keys to touch.
+            ttl: Time-to-live in seconds for the entries, from now.
+
+        Returns:
+            True for the keys that exist and are not expired, otherwise False.
+        """
+        connection: asyncpg.Connection
+        async with self.acquire() as connection:
+            records = await connection.fetch(
+                self.queries.touch_cache_entries.sql,
+                keys,
+                ttl,
+            )
+            touched = {record["key"] for record in records}
+            return {key: key in touched for key in keys}
+
+    async def incr(self, key: str, delta: int, ttl: int, initial: int) -> int:
+        """Increment a counter atomically, in a single statement.
+
+        Counters are stored as integers in their own table, so an increment
+        neither reads the counter first nor rewrites a JSONB value.
+
+        Args:
+            key: The key of the counter.
+            delta: The amount to add, negative to decrement.
+            ttl: Time-to-live in seconds of the counter, if it is created.
+            initial: The value of the counter, if it is created.
+
+        Returns:
+            The new value of the counter.
+        """
+        connection: asyncpg.Connection
+        async with self.acquire() as connection:
+            value: int = await connection.fetchval(
+                self.queries.increment_counter.sql,
+                key,
+                delta,
+                ttl,
+                initial,
+            )
+            return value
+
+    async def incr_many(
+        self,
+        deltas: Mapping[str, int],
+        ttl: int,
+        initial: int,
+    ) -> dict[str, int]:
+        """Increment many counters atomically in a single round trip.
+
+        Args:
+            deltas: The amounts to add, keyed by key.
+            ttl: Time-to-live in seconds of the counters that are created.
+            initial: The value of the counters that are created.
+
+        Returns:
+            The new values of the counters, keyed by key.
+        """
+        connection: asyncpg.Connection
+        async with self.acquire() as connection:
+            records = await connection.fetch(
+                self.queries.increment_counters.sql,
+                list(deltas),
+                list(deltas.values()),
+                ttl,
+                initial,
+            )
+            return {record["key"]: record["value"] for record in records}
+
+    async def get_counter(self, key: str) -> int | None:
+        """Get the value of a counter by key.
+
+        Args:
+            key: The key of the counter.
+
+        Returns:
+            The value of the counter, or None if it does not exist or has
+            expired.
+        """
+        connection: asyncpg.Connection
+        async with self.acquire() as connection:
+            value: int | None = await connection.fetchval(
+                self.queries.get_counter.sql,
+                key,
+            )
+            return value
+
+    async def delete_counter(self, key: str) -> None:
+        """Delete a counter by key.
+
+        Args:
+            key: The key of the counter.
+        """
+        connection: asyncpg.Connection
+        async with self.acquire() as connection:
+            await connection.execute(self.queries.delete_counter.sql, key)
+
+    async def iter_keys(
+        self,
+        prefix: str | None,
+        chunk_size: int,
+    ) -> AsyncGenerator[list[str], None]:
+        """Iterate over the keys of the entries that are not expired.
+
+        The keys are read through a server-side cursor, one chunk per round
+        trip, so memory use does not grow with the table. A connection and a
+        transaction are held open until the iteration ends.
+
+        Args:
+            prefix: The prefix of the keys to iterate over, None for all keys.
+            chunk_size: The maximum number of keys per chunk.
+
+        Yields:
+            The chunks of keys, in key order.
+        """
+        connection: asyncpg.Connection
+        async with self.acquire() as connection, connection.transaction():
+            cursor = await connection.cursor(self.queries.iter_cache_keys.sql, prefix)
+            while records := await cursor.fetch(chunk_size):
+                yield [record["key"] for record in records]
+
+    async def iter_items(
+        self,
+        prefix: str | None,
+        chunk_size: int,
+    ) -> AsyncGenerator[dict[str, Any], None]:
+        """Iterate over the entries that are not expired.
+
+        The entries are read through a server-side cursor, like the keys of
+        `iter_keys`.
+
+        Args:
+            prefix: The prefix of the keys to iterate over, None for all keys.
+            chunk_size: The maximum number of entries per chunk.
+
+        Yields:
+            The chunks of values keyed by key, in key order.
+        """
+        connection: asyncpg.Connection
+        async with self.acquire() as connection, connection.transaction():
+            cursor = await connection.cursor(
+                self.queries.iter_cache_entries.sql,
+                prefix,
+            )
+            while records := await cursor.fetch(chunk_size):
+                yield {record["key"]: await self.decode(record) for record in records}
+
+    async def export_snapshot(self, output: str | os.PathLike[str] | BinaryIO) -> int:
+        """Export the entries that are not expired, with binary COPY.
+
+        The snapshot holds the stored columns of the entries, so it is
+        imported without deserializing the values, by backends of either
+        schema. Entries keep their expiry across the export and import.
+
+        Args:
+            output: The path of the snapshot file, or a binary file to write
+                it to.
+
+        Returns:
+            The number of entries exported.
+        """
+        connection: asyncpg.Connection
+        async with self.acquire() as connection:
+            status = await connection.copy_from_query(
+                self.queries.export_cache_entries.sql,
+                output=output,
+                format="binary",
+            )
+        return int(status.split()[-1])
+
+    async def import_snapshot(self, source: str | os.PathLike[str] | BinaryIO) -> int:
+        """Import the entries of a snapshot, with binary COPY.
+
+        Entries that expired since the export are skipped, and so are those
+        whose cached entry is more recent.
+
+        Args:
+            source: The path of the snapshot file, or a binary file to read it
+                from.
+
+        Returns:
+            The number of entries written.
+        """
+        async with self.staging() as connection:
+            await connection.copy_to_table(
+                "psqache_import",
+                source=source,
+                format="binary",
+            )
+            return await self.merge_staged(connection)
+
+    async def import_entries(self, mapping: Mapping[str, Any], ttl: int) -> int:
+        """Set many cache entries with COPY, such as to warm up the cache.
+
+        Unlike `set_many`, the entries are sent in the COPY binary format and
+        merged in batches, which suits large bulk loads.
+
+        Args:
+            mapping: The values to set, keyed by key.
+            ttl: Time-to-live in seconds for the entries.
+
+        Returns:
+            The number of entries written.
+        """
+        encoded = [await self.encode(value) for value in mapping.values()]
+        async with self.staging() as connection:
+            await connection.copy_records_to_table(
+                "psqache_import",
+                records=[
+                    (key, value, payload, ttl, None)
+                    for key, (value, payload) in zip(mapping, encoded, strict=True)
+                ],
+            )
+            return await self.merge_staged(connection)
+
+    @asynccontextmanager
+    async def staging(self) -> AsyncIterator[asyncpg.Connection]:
+        """Hold a connection with an empty staging table of imported entries.
+
+        Yields:
+            asyncpg.Connection: The connection, whose staging table is dropped
+                when the block exits.
+        """
+        connection: asyncpg.Connection
+        async with self.acquire() as connection:
+            await connection.execute(self.queries.create_import_table.sql)
+            try:
+                yield connection
+            finally:
+                await connection.execute(self.queries.drop_import_table.sql)
+
+    async def merge_staged(self, connection: asyncpg.Connection) -> int:
+        """Merge the staged entries into the cache, in batches of keys.
+
+        Args:
+            connection (asyncpg.Connection): The connection holding the
+                staging table.
+
+        Returns:
+            int: The number of entries written.
+        """
+        merged = 0
+        last = None
+        while keys := await connection.fetchval(
+            self.queries.next_import_keys.sql,
+            last,
+            self.IMPORT_BATCH_SIZE,
+        ):
+            async with (
+                connection.transaction(),
+                self.invalidating(connection, keys),
+            ):
+                merged += await self.merge_batch(connection, keys)
+            last = keys[-1]
+        return merged
+
+    async def merge_batch(self, connection: asyncpg.Connection, keys: list[str]) -> int:
+        """Merge the staged entries of a batch of keys into the cache.
+
+        Args:
+            connection (asyncpg.Connection): The connection holding the
+                staging table, in a transaction.
+            keys (list[str]): The keys of the batch.
+
+        Returns:
+            int: The number of entries written.
+        """
+        merged: int = await connection.fetchval(
+            self.queries.merge_imported_entries.sql,
+            keys,
+        )
+        return merged
+
+    @asynccontextmanager
+    async def lock(self, key: str) -> AsyncIterator[bool]:
+        """Try to take the advisory lock used to load the value for a key.
+
+        The lock is transaction scoped, so a connection is held with an open
+        transaction until the context manager exits. The operations the task
+        runs meanwhile use that connection, in the transaction of the lock.
+
+        Args:
+            key: The key to lock.
+
+        Yields:
+            True if the lock was taken, otherwise False.
+        """
+        connection: asyncpg.Connection
+        async with self.acquire() as connection, connection.transaction():
+            locked = await connection.fetchval(self.queries.lock_cache_entry.sql, key)
+            token = self.held.set((asyncio.current_task(), connection))
+            try:
+                yield locked
+            finally:
+                self.held.reset(token)
+
+
+class MemoryBackend:
+    """In-memory backend implementation of the cache.
+
+    Entries are held in a dict in the current process, with their expiry
+    checked on access. The backend has no network round trips and no
+    serialization, which makes it a baseline for measuring the overhead of
+    the other backends, and a stand-in for them in tests and development.
+
+    Values are stored and returned by reference: callers must not mutate
+    them. Implements the ICacheBackend interface.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the MemoryBackend."""
+        self.entries: dict[str, tuple[Any, float, int]] = {}
+        self.counters: dict[str, tuple[int, float]] = {}
+        self.locks: set[str] = set()
+
+    def lookup(self, key: str) -> Any | None:
+        """Get the value for a key, dropping it if it has expired.
+
+        Args:
+            key (str): The key to look up.
+
+        Returns:
+            Any: The value, or None if not found or expired.
+        """
+        entry = self.lookup_entry(key)
+        return None if entry is None else entry.value
+
+    def lookup_entry(self, key: str) -> CacheEntry | None:
+        """Get the entry of a key, dropping it if it has expired.
+
+        Args:
+            key (str): The key to look up.
+
+        Returns:
+            Optional[CacheEntry]: The entry, or None if not found or expired.
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at, ttl = entry
+        expires_in = expires_at - time.monotonic()
+        if expires_in <= 0:
+            del self.entries[key]
+            return None
+        return CacheEntry(value, ttl, expires_in)
+
+    async def get(self, key: str) -> Any | None:
+        """Retrieve a cache entry by key.
+
+        Args:
+            key: The key to retrieve.
+
+        Returns:
+            The value associated with the key, or None if not found or expired.
+        """
+        return self.lookup(key)
+
+    async def get_entry(self, key: str) -> CacheEntry | None:
+        """Retrieve a cache entry by key, with its expiry.
+
+        Args:
+            key: The key to retrieve.
+
+        Returns:
+            The entry, or None if not found or expired.
+        """
+        return self.lookup_entry(key)
+
+    async def set(self, key: str, value: dict, ttl: int) -> None:
+        """Set or update a cache entry with a time-to-live.
+
+        Args:
+            key: The key to set.
+            value: The value to associate with the key.
+            ttl: Time-to-live in seconds for the entry.
+        """
+        self.entries[key] = (value, time.monotonic() + ttl, ttl)
+
+    async def delete(self, key: str) -> None:
+        """Delete a cache entry by key.
+
+        Args:
+            key: The key to delete.
+        """
+        self.entries.pop(key, None)
+
+    async def clear(self) -> None:
+        """Clear all cache entries and counters."""
+        self.entries.clear()
+        self.counters.clear()
+
+    async def cleanup(self) -> None:
+        """Delete all expired cache entries and counters."""
+        now = time.monotonic()
+        self.entries = {
+            key: entry for key, entry in self.entries.items() if entry[1] > now
+        }
+        self.counters = {
+            key: counter for key, counter in self.counters.items() if counter[1] > now
+        }
+
+    async def has(self, key: str) -> bool:
+        """Check if a cache entry exists and is not expired.
+
+        Args:
+            key: The key to check.
+
+        Returns:
+            True if the entry exists and is not expired, otherwise False.
+        """
+        return self.lookup(key) is not None
+
+    async def get_many(self, keys: list[str]) -> dict[str, Any]:
+        """Retrieve many cache entries by key.
+
+        Args:
+            keys: The keys to retrieve.
+
+        Returns:
+            The values found, keyed by key. Missing and expired keys are left out.
+        """
+        found = {key: self.lookup(key) for key in keys}
+        return {key: value for key, value in found.items() if value is not None}
+
+    async def get_entries(self, keys: list[str]) -> dict[str, CacheEntry]:
+        """Retrieve many cache entries by key, with their expiry.
+
+        Args:
+            keys: The keys to retrieve.
+
+        Returns:
+            The entries found, keyed by key. Missing and expired keys are left out.
+        """
+        found = {key: self.lookup_entry(key) for key in keys}
+        return {key: entry for key, entry in found.items() if entry is not None}
+
+    async def set_many(self, mapping: Mapping[str, dict], ttl: int) -> None:
+        """Set or update many cache entries.
+
+        Args:
+            mapping: The values to set, keyed by key.
+            ttl: Time-to-live in seconds for the entries.
+        """
+        expires_at = time.monotonic() + ttl
+        for key, value in mapping.items():
+            self.entries[key] = (value, expires_at, ttl)
+
+    async def import_entries(self, mapping: Mapping[str, Any], ttl: int) -> int:
+        """Set many cache entries in bulk, such as to warm up the cache.
+
+        Args:
+            mapping: The values to set, keyed by key.
+            ttl: Time-to-live in seconds for the entries.
+
+        Returns:
+            The number of entries written.
+        """
+        await self.set_many(mapping, ttl)
+        return len(mapping)
+
+    async def delete_many(self, keys: list[str]) -> None:
+        """Delete many cache entries by key.
+
+        Args:
+            keys: The keys to delete.
+        """
+        for key in keys:
+            self.entries.pop(key, None)
+
+    async def has_many(self, keys: list[str]) -> dict[str, bool]:
+        """Check which of the given keys exist and are not expired.
+
+        Args:
+            keys: The keys to check.
+
+        Returns:
+            True for the keys that exist and are not expired, otherwise False.
+        """
+        return {key: self.lookup(key) is not None for key in keys}
+
+    async def touch(self, key: str, ttl: int) -> bool:
+        """Reset the time-to-live of a cache entry.
+
+        Args:
+            key: The key to touch.
+            ttl: Time-to-live in seconds for the entry, from now.
+
+        Returns:
+            True if the entry exists and is not expired, otherwise False.
+        """
+        value = self.lookup(key)
+        if value is None:
+            return False
+        self.entries[key] = (value, time.monotonic() + ttl, ttl)
+        return True
+
+    async def touch_many(self, keys: list[str], ttl: int) -> dict[str, bool]:
+        """Reset the time-to-live of many cache entries.
+
+        Args:
+            keys: The keys to touch.
+            ttl: Time-to-live in seconds for the entries, from now.
+
+        Returns:
+            True for the keys that exist and are not expired, otherwise False.
+        """
+        return {key: await self.touch(key, ttl) for key in keys}
+
+    async def incr(self, key: str, delta: int, ttl: int, initial: int) -> int:
+        """Increment a counter.
+
+        Args:
+            key: The key of the counter.
+            delta: The amount to add, negative to decrement.
+            ttl: Time-to-live in seconds of the counter, if it is created.
+            initial: The value of the counter, if it is created.
+
+        Returns:
+            The new value of the counter.
+        """
+        now = time.monotonic()
+        value, expires_at = self.counters.get(key, (initial, now + ttl))
+        if expires_at <= now:
+            value, expires_at = initial, now + ttl
+        self.counters[key] = (value + delta, expires_at)
+        return value + delta
+
+    async def incr_many(
+        self,
+        deltas: Mapping[str, int],
+        ttl: int,
+        initial: int,
+    ) -> dict[str, int]:
+        """Increment many counters.
+
+        Args:
+            deltas: The amounts to add, keyed by key.
+            ttl: Time-to-live in seconds of the counters that are created.
+            initial: The value of the counters that are created.
+
+        Returns:
+            The new values of the counters, keyed by key.
+        """
+        return {
+            key: await self.incr(key, delta, ttl, initial)
+            for key, delta in deltas.items()
+        }
+
+    async def get_counter(self, key: str) -> int | None:
+        """Get the value of a counter by key.
+
+        Args:
+            key: The key of the counter.
+
+        Returns:
+            The value of the counter, or None if it does not exist or has
+            expired.
+        """
+        counter = self.counters.get(key)
+        if counter is None:
+            return None
+        value, expires_at = counter
+        if expires_at <= time.monotonic():
+            del self.counters[key]
+            return None
+        return value
+
+    async def delete_counter(self, key: str) -> None:
+        """Delete a counter by key.
+
+        Args:
+            key: The key of the counter.
+        """
+        self.counters.pop(key, None)
+
+    async def iter_keys(
+        self,
+        prefix: str | None,
+        chunk_size: int,
+    ) -> AsyncGenerator[list[str], None]:
+        """Iterate over the keys of the entries that are not expired.
+
+        Args:
+            prefix: The prefix of the keys to iterate over, None for all keys.
+            chunk_size: The maximum number of keys per chunk.
+
+        Yields:
+            The chunks of keys, in key order.
+        """
+        async for chunk in self.iter_items(prefix, chunk_size):
+            yield list(chunk)
+
+    async def iter_items(
+        self,
+        prefix: str | None,
+        chunk_size: int,
+    ) -> AsyncGenerator[dict[str, Any], None]:
+        """Iterate over the entries that are not expired.
+
+        The keys are sorted when the iteration starts, so entries set during
+        the iteration are left out.
+
+        Args:
+            prefix: The prefix of the keys to iterate over, None for all keys.
+            chunk_size: The maximum number of entries per chunk.
+
+        Yields:
+            The chunks of values keyed by key, in key order.
+        """
+        chunk: dict[str, Any] = {}
+        for key in sorted(self.entries):
+            if prefix is not None and not key.startswith(prefix):
+                continue
+            value = self.lookup(key)
+            if value is None:
+                continue
+            chunk[key] = value
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = {}
+        if chunk:
+            yield chunk
+
+    @asynccontextmanager
+    async def lock(self, key: str) -> AsyncIterator[bool]:
+        """Try to take the lock used to load the value for a key.
+
+        The lock is only shared within the current process.
+
+        Args:
+            key: The key to lock.
+
+        Yields:
+            True if the lock was taken, otherwise False.
+        """
+        if key in self.locks:
+            yield False
+            return
+        self.locks.add(key)
+        try:
+            yield True
+        finally:
+            self.locks.discard(key)
+
+    async def close(self) -> None:
+        """Release the resources of the backend, which holds none."""
+
+
+class BackendWrapper:
+    """Base class for backends that wrap another backend.
+
+    Every operation is forwarded to the wrapped backend. Subclasses override
+    the operations they want to change and inherit the rest, so layers such
+    as coalescing or local tiers can be stacked on top of any backend.
+    Snapshots are forwarded too, when the wrapped backend supports them.
+    Implements the ICacheBackend and ISnapshotBackend interfaces.
+    """
+
+    def __init__(self, backend: ICacheBackend) -> None:
+        """Initialize the BackendWrapper.
+
+        Args:
+            backend (ICacheBackend): The backend to wrap.
+        """
+        self.backend = backend
+
+    async def get(self, key: str) -> Any | None:
+        """Retrieve a cache entry by key.
+
+        Args:
+            key: The key to retrieve.
+
+        Returns:
+            The value associated with the key, or None if not found or expired.
+        """
+        return await self.backend.get(key)
+
+    async def get_entry(self, key: str) -> CacheEntry | None:
+        """Retrieve a cache entry by key, with its expiry.
+
+        Args:
+            key: The key to retrieve.
+
+        Returns:
+            The entry, or None if not found or expired.
+        """
+        return await self.backend.get_entry(key)
+
+    async def set(self, key: str, value: dict, ttl: int) -> None:
+        """Set or update a cache entry with a time-to-live.
+
+        Args:
+            key: The key to set.
+            value: The value to associate with the key.
+            ttl: Time-to-live in seconds for the entry.
+        """
+        await self.backend.set(key, value, ttl)
+
+    async def delete(self, key: str) -> None:
+        """Delete a cache entry by key.
+
+        Args:
+            key: The key to delete.
+        """
+        await self.backend.delete(key)
+
+    async def clear(self) -> None:
+        """Clear all cache entries."""
+        await self.backend.clear()
+
+    async def cleanup(self) -> None:
+        """Delete all expired cache entries."""
+        await self.backend.cleanup()
+
+    async def has(self, key: str) -> bool:
+        """Check if a cache entry exists and is not expired.
+
+        Args:
+            key: The key to check.
+
+        Returns:
+            True if the entry exists and is not expired, otherwise False.
+        """
+        return await self.backend.has(key)
+
+    async def get_many(self, keys: list[str]) -> dict[str, Any]:
+        """Retrieve many cache entries by key in a single round trip.
+
+        Args:
+            keys: The keys to retrieve.
+
+        Returns:
+            The values found, keyed by key. Missing and expired keys are left out.
+        """
+        return await self.backend.get_many(keys)
+
+    async def get_entries(self, keys: list[str]) -> dict[str, CacheEntry]:
+        """Retrieve many cache entries by key with their expiry, in one round trip.
+
+        Args:
+            keys: The keys to retrieve.
+
+        Returns:
+            The entries found, keyed by key. Missing and expired keys are left out.
+        """
+        return await self.backend.get_entries(keys)
+
+    async def set_many(self, mapping: Mapping[str, dict], ttl: int) -> None:
+        """Set or update many cache entries in a single round trip.
+
+        Args:
+            mapping: The values to set, keyed by key.
+            ttl: Time-to-live in seconds for the entries.
+        """
+        await self.backend.set_many(mapping, ttl)
+
+    async def import_entries(self, mapping: Mapping[str, Any], ttl: int) -> int:
+        """Set many cache entries in bulk, such as to warm up the cache.
+
+        Args:
+            mapping: The values to set, keyed by key.
+            ttl: Time-to-live in seconds for the entries.
+
+        Returns:
+            The number of entries written.
+        """
+        return await self.backend.import_entries(mapping, ttl)
+
+    async def delete_many(self, keys: list[str]) -> None:
+        """Delete many cache entries by key in a single round trip.
+
+        Args:
+            keys: The keys to delete.
+        """
+        await self.backend.delete_many(keys)
+
+    async def has_many(self, keys: list[str]) -> dict[str, bool]:
+        """Check which of the given keys exist and are not expired.
+
+        Args:
+            keys: The keys to check.
+
+        Returns:
+            True for the keys that exist and are not expired, otherwise False.
+        """
+        return await self.backend.has_many(keys)
+
+    async def touch(self, key: str, ttl: int) -> bool:
+        """Reset the time-to-live of a cache entry without rewriting its value.
+
+        Args:
+            key: The key to touch.
+            ttl: Time-to-live in seconds for the entry, from now.
+
+        Returns:
+            True if the entry exists and is not expired, otherwise False.
+        """
+        return await self.backend.touch(key, ttl)
+
+    async def touch_many(self, keys: list[str], ttl: int) -> dict[str, bool]:
+        """Reset the time-to-live of many cache entries in a single round trip.
+
+        Args:
+            keys: The keys to touch.
+            ttl: Time-to-live in seconds for the entries, from now.
+
+        Returns:
+            True for the keys that exist and are not expired, otherwise False.
+        """
+        return await self.backend.touch_many(keys, ttl)
+
+    async def incr(self, key: str, delta: int, ttl: int, initial: int) -> int:
+        """Increment a counter atomically.
+
+        Args:
+            key: The key of the counter.
+            delta: The amount to add, negative to decrement.
+            ttl: Time-to-live in seconds of the counter, if it is created.
+            initial: The value of the counter, if it is created.
+
+        Returns:
+            The new value of the counter.
+        """
+        return await self.backend.incr(key, delta, ttl, initial)
+
+    async def incr_many(
+        self,
+        deltas: Mapping[str, int],
+        ttl: int,
+        initial: int,
+    ) -> dict[str, int]:
+        """Increment many counters atomically in a single round trip.
+
+        Args:
+            deltas: The amounts to add, keyed by key.
+            ttl: Time-to-live in seconds of the counters that are created.
+            initial: The value of the counters that are created.
+
+        Returns:
+            The new values of the counters, keyed by key.
+        """
+        return await self.backend.incr_many(deltas, ttl, initial)
+
+    async def get_counter(self, key: str) -> int | None:
+        """Get the value of a counter by key.
+
+        Args:
+            key: The key of the counter.
+
+        Returns:
+            The value of the counter, or None if it does not exist or has
+            expired.
+        """
+        return await self.backend.get_counter(key)
+
+    async def delete_counter(self, key: str) -> None:
+        """Delete a counter by key.
+
+        Args:
+            key: The key of the counter.
+        """
+        await self.backend.delete_counter(key)
+
+    def iter_keys(
+        self,
+        prefix: str | None,
+        chunk_size: int,
+    ) -> AsyncGenerator[list[str], None]:
+        """Iterate over the keys of the entries that are not expired.
+
+        Args:
+            prefix: The prefix of the keys to iterate over, None for all keys.
+            chunk_size: The maximum number of keys per chunk.
+
+        Returns:
+            An asynchronous iterator over chunks of keys, in key order.
+        """
+        return self.backend.iter_keys(prefix, chunk_size)
+
+    def iter_items(
+        self,
+        prefix: str | None,
+        chunk_size: int,
+    ) -> AsyncGenerator[dict[str, Any], None]:
+        """Iterate over the entries that are not expired.
+
+        Args:
+            prefix: The prefix of the keys to iterate over, None for all keys.
+            chunk_size: The maximum number of entries per chunk.
+
+        Returns:
+            An asynchronous iterator over chunks of values keyed by key, in key
+            order.
+        """
+        return self.backend.iter_items(prefix, chunk_size)
+
+    async def export_snapshot(self, output: str | os.PathLike[str] | BinaryIO) -> int:
+        """Export the entries of the wrapped backend to a snapshot.
+
+        A TypeError is raised if the wrapped backend has no snapshots.
+
+        Args:
+            output: The path of the snapshot file, or a binary file to write
+                it to.
+
+        Returns:
+            The number of entries exported.
+        """
+        return await snapshot_backend(self.backend).export_snapshot(output)
+
+    async def import_snapshot(self, source: str | os.PathLike[str] | BinaryIO) -> int:
+        """Import the entries of a snapshot into the wrapped backend.
+
+        A TypeError is raised if the wrapped backend has no snapshots.
+
+        Args:
+            source: The path of the snapshot file, or a binary file to read it
+                from.
+
+        Returns:
+            The number of entries written.
+        """
+        return await snapshot_backend(self.backend).import_snapshot(source)
+
+    @asynccontextmanager
+    async def lock(self, key: str) -> AsyncIterator[bool]:
+        """Try to take the lock used to load the value for a key.
+
+        Args:
+            key: The key to lock.
+
+        Yields:
+            True if the lock was taken, otherwise False.
+        """
+        async with self.backend.lock(key) as locked:
+            yield locked
+
+    async def close(self) -> None:
+        """Release the resources of the wrapped backend."""
+        await self.backend.close()
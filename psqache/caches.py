@@ -1,37 +1,199 @@
 """This module contains the cache implementations."""
 
+import asyncio
+import contextlib
+import functools
+import inspect
+import logging
+import math
+import os
+import random
+import time
+from collections import OrderedDict
+from collections.abc import AsyncIterator
+from collections.abc import Awaitable
+from collections.abc import Callable
+from collections.abc import Coroutine
+from collections.abc import Iterable
+from collections.abc import Mapping
+from collections.abc import Sequence
 from typing import Any
+from typing import BinaryIO
+from typing import NamedTuple
 
-import asyncpg
 from asgiref.sync import async_to_sync
 
+from psqache.abcs import CacheEntry
 from psqache.abcs import ICacheBackend
+from psqache.abcs import ICompressor
+from psqache.abcs import IMetricsSink
+from psqache.abcs import ISerializer
+from psqache.analytics import AnalyticsBackend
+from psqache.analytics import KeyAnalytics
+from psqache.backends import MemoryBackend
 from psqache.backends import PostgresBackend
+from psqache.backends import Storage
+from psqache.backends import snapshot_backend
+from psqache.decorators import CachedFunction
+from psqache.decorators import P
+from psqache.decorators import R
+from psqache.decorators import cached
+from psqache.instrumentation import InstrumentedBackend
+from psqache.namespaces import NAMESPACE_PREFIX
+from psqache.namespaces import TAG_INVALIDATIONS_KEY
+from psqache.namespaces import TAG_PREFIX
+from psqache.namespaces import TAGS_FIELD
+from psqache.namespaces import VALUE_FIELD
+from psqache.namespaces import Generations
+from psqache.namespaces import Invalidations
+from psqache.namespaces import is_tagged
+from psqache.namespaces import tag_value
+from psqache.negative import ABSENT
+from psqache.negative import BloomFilter
+from psqache.negative import is_absent
+from psqache.replicas import ReplicatedBackend
+from psqache.runners import LoopThread
+from psqache.runners import T
+from psqache.runners import resolve
 
+logger = logging.getLogger(__name__)
 
-class PsQache:
+
+class RegisteredLoader(NamedTuple):
+    """A loader refreshing the entries of the keys starting with a prefix.
+
+    Attributes:
+        loader: Function or coroutine function returning the value of the key
+            it is given.
+        ttl: Time to live of the refreshed entries, None for the default.
+        soft_ttl: Age in seconds from which an entry is stale, None to only
+            refresh entries early.
+        beta: Weight of the early refreshes. Zero disables them, values above
+            one make them happen earlier.
+    """
+
+    loader: Callable[[str], Any]
+    ttl: int | None
+    soft_ttl: int | None
+    beta: float
+
+
+class PsQache:  # noqa: PLR0904
     """PsQache Cache implementation.
 
     Implements the ICache interface.
     Uses Postgres as the default cache backend.
+
+    Synchronous methods run their asynchronous counterpart to completion.
+    With a LoopThread runner they all run on the runner's loop, which holds
+    the connection pool, so synchronous callers such as WSGI workers reuse a
+    single pool from any number of threads.
     """
 
     DEFAULT_TTL = 28 * 24 * 60 * 60  # 4 weeks
+    LOCK_POLL_INTERVAL = 0.05  # 50 milliseconds
+    LOCK_WAIT_TIMEOUT = 5.0  # 5 seconds
+    COMPUTE_TIMES_SIZE = 10_000  # keys
+    NEGATIVE_TTL = 60  # 1 minute
+    GENERATION_CACHE_TTL = 1.0  # 1 second
+    ITERATION_CHUNK_SIZE = 1000  # entries
+    HOT_KEYS_KEY = "psqache:hot_keys"
 
-    def __init__(self, backend: ICacheBackend) -> None:
+    def __init__(  # noqa: PLR0913
+        self,
+        backend: ICacheBackend,
+        runner: LoopThread | None = None,
+        *,
+        metrics: IMetricsSink | None = None,
+        analytics: KeyAnalytics | None = None,
+        negative_ttl: int | None = None,
+        absent_filter: BloomFilter | None = None,
+    ) -> None:
         """Initialize the PsQache cache.
 
         Args:
             backend (ICacheBackend): The cache backend to use.
+            runner (Optional[LoopThread]): The loop thread running the
+                synchronous calls. Defaults to None, in which case every
+                synchronous call runs through `async_to_sync`.
+            metrics (Optional[IMetricsSink]): The sink receiving the measures
+                of the cache operations, such as a `Metrics` instance. The
+                backend is then wrapped in an InstrumentedBackend. Defaults to
+                None, which measures nothing.
+            analytics (Optional[KeyAnalytics]): The analytics recording the
+                keys read and written, through an AnalyticsBackend. Defaults to
+                None, which records nothing.
+            negative_ttl (Optional[int]): Time to live of the absent markers
+                set when a loader of `aget_or_set` returns None. Defaults to
+                None, in which case None values are not cached.
+            absent_filter (Optional[BloomFilter]): The filter of the keys
+                recently confirmed absent, whose reads then skip the backend.
+                Defaults to None, which reads every key from the backend.
         """
+        if analytics is not None:
+            backend = AnalyticsBackend(backend, analytics)
+        if metrics is not None:
+            backend = InstrumentedBackend(backend, metrics)
         self.backend: ICacheBackend = backend
+        self.metrics = metrics
+        self.analytics = analytics
+        self.runner = runner
+        self.negative_ttl = negative_ttl
+        self.absent_filter = absent_filter
+        self.generations = Generations(backend, self.GENERATION_CACHE_TTL)
+        self.tag_invalidations = Invalidations(backend, self.GENERATION_CACHE_TTL)
+        self._loading: dict[str, asyncio.Task[Any]] = {}
+        self._loaders: dict[str, RegisteredLoader] = {}
+        self._compute_times: OrderedDict[str, float] = OrderedDict()
+        # Whether the runner was created for the cache, so closing stops it.
+        self.owns_runner = False
+
+    def run(self, coroutine: Coroutine[Any, Any, T]) -> T:
+        """Run a coroutine to completion on behalf of a synchronous caller.
+
+        Args:
+            coroutine (Coroutine): The coroutine to run.
+
+        Returns:
+            Any: The result of the coroutine.
+        """
+        if self.runner is not None:
+            return self.runner.run(coroutine)
+        return async_to_sync(resolve)(coroutine)
+
+    async def __aenter__(self) -> "PsQache":
+        """Enter the context of the cache.
+
+        Returns:
+            PsQache: The cache itself.
+        """
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        """Close the cache when leaving its context.
+
+        Args:
+            *exc_info (object): The exception raised in the context, if any.
+        """
+        await self.aclose()
 
     @classmethod
-    def use_postgres_backend(
+    def use_postgres_backend(  # noqa: PLR0913
         cls,
         dsn: str,
         min_size: int = 15,
         max_size: int = 25,
+        *,
+        serializer: str | ISerializer = "json",
+        storage: Storage = "jsonb",
+        compressor: str | ICompressor | None = None,
+        compression_threshold: int = 1024,
+        max_entries: int | None = None,
+        max_bytes: int | None = None,
+        statement_cache_size: int = 100,
+        pgbouncer: bool = False,
+        runner: LoopThread | None = None,
+        metrics: IMetricsSink | None = None,
     ) -> "PsQache":
         """Create a PsQache instance with the Postgres backend.
 
@@ -39,15 +201,142 @@ class PsQache:
             dsn (str): The DSN for the Postgres database.
             min_size (int): The minimum number of connections in the pool.
             max_size (int): The maximum number of connections in the pool.
+            serializer (str | ISerializer): The serializer, or the name of the
+                serializer, to use for values: "json", "orjson", "pickle" or
+                "msgpack". Defaults to "json".
+            storage (Storage): The storage layout, "jsonb" or "bytea". Binary
+                serializers require "bytea". Defaults to "jsonb".
+            compressor (Optional[str | ICompressor]): The compressor, or the
+                name of the compressor, to use for large values: "zlib", "lz4"
+                or "zstd". Defaults to None, which disables compression.
+            compression_threshold (int): The serialized size in bytes from
+                which values are compressed.
+            max_entries (Optional[int]): The maximum number of entries, above
+                which `cleanup` evicts the least recently used entries.
+            max_bytes (Optional[int]): The maximum total size in bytes of the
+                stored values, above which `cleanup` evicts entries.
+            statement_cache_size (int): The size of the prepared statement
+                cache of every connection. Zero disables prepared statements.
+            pgbouncer (bool): Whether connections go through PgBouncer in
+                transaction pooling mode, which disables prepared statements.
+            runner (Optional[LoopThread]): The loop thread running the
+                synchronous calls. The pool is created and connected on the
+                runner's loop, so it must only be used through the runner.
+                Defaults to a new loop thread, stopped by `close`. Async
+                applications should use `open_postgres_backend` instead.
+            metrics (Optional[IMetricsSink]): The sink receiving the measures
+                of the cache operations and of the backend. Defaults to None,
+                which measures nothing.
 
         Returns:
             PsQache: The PsQache instance with the Postgres backend.
         """
-        return cls(
-            backend=PostgresBackend(
-                pool=asyncpg.create_pool(dsn=dsn, min_size=min_size, max_size=max_size),
-            ),
+        backend = PostgresBackend(
+            serializer=serializer,
+            storage=storage,
+            compressor=compressor,
+            compression_threshold=compression_threshold,
+            max_entries=max_entries,
+            max_bytes=max_bytes,
+            statement_cache_size=statement_cache_size,
+            pgbouncer=pgbouncer,
+            metrics=metrics,
         )
+        owns_runner = runner is None
+        if runner is None:
+            runner = LoopThread()
+        runner.run(backend.open_pool(dsn, min_size=min_size, max_size=max_size))
+        cache = cls(backend=backend, runner=runner, metrics=metrics)
+        cache.owns_runner = owns_runner
+        return cache
+
+    @classmethod
+    async def open_postgres_backend(
+        cls,
+        dsn: str,
+        min_size: int = 15,
+        max_size: int = 25,
+        *,
+        create_table: bool = False,
+        replicas: Sequence[str] = (),
+        **options: Any,
+    ) -> "PsQache":
+        """Create a PsQache instance with a connected Postgres backend.
+
+        Unlike `use_postgres_backend`, the pool is connected on the running
+        loop before the cache is returned: its `min_size` connections are
+        opened, and the statements of the cache operations prepared on each,
+        at startup instead of on the first requests. The cache closes the pool
+        when used as an async context manager.
+
+        With replicas, reads are served by streaming replicas of the database
+        through a ReplicatedBackend. Replicas can only read logged tables, see
+        the `logged` option of the PostgresBackend.
+
+        Example:
+            ```python
+            async with await PsQache.open_postgres_backend(dsn) as cache:
+                await cache.aset("key", {"value": 1})
+            ```
+
+        Args:
+            dsn (str): The DSN for the Postgres database.
+            min_size (int): The number of connections opened at startup and
+                kept in the pool.
+            max_size (int): The maximum number of connections in the pool.
+            create_table (bool): Whether to create the cache tables if they do
+                not exist. Defaults to False.
+            replicas (Sequence[str]): The DSNs of the read replicas, each
+                connected with a pool of the same size. Defaults to none.
+            **options (Any): Other arguments for the PostgresBackend, such as
+                the serializer or the storage layout. A `metrics` sink also
+                measures the cache operations.
+
+        Returns:
+            PsQache: The PsQache instance with the Postgres backend.
+        """
+        backend = PostgresBackend(**options)
+        await backend.open_pool(dsn, min_size=min_size, max_size=max_size)
+        opened = [backend]
+        try:
+            if create_table:
+                await backend.create_table()
+                # Connections opened before the tables existed prepared nothing.
+                await backend.prepare_pool()
+            # Replicas cannot record accesses, which writes to the table.
+            replica_options = {**options, "max_entries": None, "max_bytes": None}
+            for replica_dsn in replicas:
+                replica = PostgresBackend(**replica_options)
+                await replica.open_pool(
+                    replica_dsn,
+                    min_size=min_size,
+                    max_size=max_size,
+                )
+                opened.append(replica)
+        except BaseException:
+            for opened_backend in opened:
+                await opened_backend.close()
+            raise
+        metrics = options.get("metrics")
+        if replicas:
+            return cls(
+                backend=ReplicatedBackend(backend, opened[1:]),
+                metrics=metrics,
+            )
+        return cls(backend=backend, metrics=metrics)
+
+    @classmethod
+    def use_memory_backend(cls, runner: LoopThread | None = None) -> "PsQache":
+        """Create a PsQache instance with the in-memory backend.
+
+        Args:
+            runner (Optional[LoopThread]): The loop thread running the
+                synchronous calls.
+
+        Returns:
+            PsQache: The PsQache instance with the in-memory backend.
+        """
+        return cls(backend=MemoryBackend(), runner=runner)
 
     async def aget(self, key: str) -> dict[Any, Any] | None:
         """Get the value for the given key asynchronously.
@@ -56,23 +345,62 @@ class PsQache:
             key (str): The key to get the value for.
 
         Returns:
-            Optional[Any]: The value for the given key.
+            Optional[Any]: The value for the given key, None if it is missing
+                or known to be absent.
         """
-        return await self.backend.get(key)
+        value = await self._get(key)
+        return None if is_absent(value) else value
+
+    def get(self, key: str) -> dict[Any, Any] | None:
+        """Get the value for the given key.
 
-    get = async_to_sync(aget)
+        Args:
+            key (str): The key to get the value for.
+
+        Returns:
+            Optional[Any]: The value for the given key.
+        """
+        return self.run(self.aget(key))
 
-    async def aset(self, key: str, value: Any, ttl: int | None = None) -> None:
+    async def aset(
+        self,
+        key: str,
+        value: Any,
+        ttl: int | None = None,
+        *,
+        tags: Iterable[str] = (),
+    ) -> None:
         """Set the value for the given key asynchronously.
 
         Args:
             key (str): The key to set the value for.
             value (Any): The value to set for the given key.
             ttl (Optional[int], optional): Time to live. Defaults to None.
+            tags (Iterable[str]): The tags invalidating the entry, see
+                `ainvalidate_tag`. Defaults to none.
         """
+        self._forget_absent([key])
+        value = await self._tagged(value, tags)
         await self.backend.set(key, value, ttl or self.DEFAULT_TTL)
 
-    set = async_to_sync(aset)
+    def set(
+        self,
+        key: str,
+        value: Any,
+        ttl: int | None = None,
+        *,
+        tags: Iterable[str] = (),
+    ) -> None:
+        """Set the value for the given key.
+
+        Args:
+            key (str): The key to set the value for.
+            value (Any): The value to set for the given key.
+            ttl (Optional[int], optional): Time to live. Defaults to None.
+            tags (Iterable[str]): The tags invalidating the entry. Defaults to
+                none.
+        """
+        self.run(self.aset(key, value, ttl, tags=tags))
 
     async def adelete(self, key: str) -> None:
         """Delete the value for the given key asynchronously.
@@ -80,31 +408,1579 @@ class PsQache:
         Args:
             key (str): The key to delete the value for.
         """
+        self._forget_absent([key])
         await self.backend.delete(key)
 
-    delete = async_to_sync(adelete)
+    def delete(self, key: str) -> None:
+        """Delete the value for the given key.
+
+        Args:
+            key (str): The key to delete the value for.
+        """
+        self.run(self.adelete(key))
 
     async def ahas(self, key: str) -> bool:
         """Check if the given key is in the cache asynchronously.
 
+        Once a tag was invalidated, the value of an existing entry is read
+        too, so that an entry invalidated through one of its tags is reported
+        missing.
+
+        Args:
+            key (str): The key to check.
+
+        Returns:
+            bool: True if the key is in the cache, False otherwise.
+        """
+        if not await self.backend.has(key):
+            return False
+        if not await self._tags_invalidated():
+            return True
+        return key in await self._untag(await self.backend.get_many([key]))
+
+    def has(self, key: str) -> bool:
+        """Check if the given key is in the cache.
+
         Args:
             key (str): The key to check.
 
         Returns:
             bool: True if the key is in the cache, False otherwise.
         """
-        return await self.backend.has(key)
+        return self.run(self.ahas(key))
+
+    async def aset_absent(self, key: str, ttl: int | None = None) -> None:
+        """Mark the given key as known to be absent asynchronously.
+
+        The marker is a compact entry of its own: `aget` returns None for it,
+        `aget_or_set` returns None without calling its loader, and `ahas`
+        still finds it. The key is also added to the absent filter, if any.
+
+        Args:
+            key (str): The key known to be absent.
+            ttl (Optional[int], optional): Time to live of the marker.
+                Defaults to None, in which case the negative TTL or
+                NEGATIVE_TTL is used.
+        """
+        await self.backend.set(key, ABSENT, ttl or self._negative_ttl)
+        if self.absent_filter is not None:
+            self.absent_filter.add(key)
+
+    def set_absent(self, key: str, ttl: int | None = None) -> None:
+        """Mark the given key as known to be absent.
+
+        Args:
+            key (str): The key known to be absent.
+            ttl (Optional[int], optional): Time to live of the marker.
+                Defaults to None.
+        """
+        self.run(self.aset_absent(key, ttl))
+
+    async def ais_absent(self, key: str) -> bool:
+        """Check if the given key is known to be absent asynchronously.
+
+        Args:
+            key (str): The key to check.
+
+        Returns:
+            bool: True if the key holds an absent marker, False if it holds a
+                value or is missing.
+        """
+        return is_absent(await self._get(key))
+
+    def is_absent(self, key: str) -> bool:
+        """Check if the given key is known to be absent.
+
+        Args:
+            key (str): The key to check.
+
+        Returns:
+            bool: True if the key holds an absent marker, False otherwise.
+        """
+        return self.run(self.ais_absent(key))
 
-    has = async_to_sync(ahas)
+    async def atouch(self, key: str, ttl: int | None = None) -> bool:
+        """Reset the time to live of the given key asynchronously.
+
+        Only the expiry of the entry is updated, its value is not written
+        again, which makes sliding expiration cheap.
+
+        Args:
+            key (str): The key to touch.
+            ttl (Optional[int], optional): Time to live. Defaults to None.
+
+        Returns:
+            bool: True if the key was in the cache, False otherwise.
+        """
+        return await self.backend.touch(key, ttl or self.DEFAULT_TTL)
+
+    def touch(self, key: str, ttl: int | None = None) -> bool:
+        """Reset the time to live of the given key.
+
+        Args:
+            key (str): The key to touch.
+            ttl (Optional[int], optional): Time to live. Defaults to None.
+
+        Returns:
+            bool: True if the key was in the cache, False otherwise.
+        """
+        return self.run(self.atouch(key, ttl))
 
     async def aclear(self) -> None:
         """Clear all cache entries asynchronously."""
+        if self.absent_filter is not None:
+            self.absent_filter.clear()
         await self.backend.clear()
 
-    clear = async_to_sync(aclear)
+    def clear(self) -> None:
+        """Clear all cache entries."""
+        self.run(self.aclear())
 
     async def acleanup(self) -> None:
         """Delete all expired cache entries asynchronously."""
         await self.backend.cleanup()
 
-    cleanup = async_to_sync(acleanup)
+    def cleanup(self) -> None:
+        """Delete all expired cache entries."""
+        self.run(self.acleanup())
+
+    async def aget_many(self, keys: Iterable[str]) -> dict[str, Any]:
+        """Get the values for the given keys asynchronously.
+
+        All the keys are fetched in a single round trip to the backend.
+
+        Args:
+            keys (Iterable[str]): The keys to get the values for.
+
+        Returns:
+            dict[str, Any]: The values found, keyed by key. Missing and expired
+                keys are left out.
+        """
+        keys = list(keys)
+        if not keys:
+            return {}
+        found = await self._untag(await self.backend.get_many(keys))
+        return {key: value for key, value in found.items() if not is_absent(value)}
+
+    def get_many(self, keys: Iterable[str]) -> dict[str, Any]:
+        """Get the values for the given keys.
+
+        All the keys are fetched in a single round trip to the backend.
+
+        Args:
+            keys (Iterable[str]): The keys to get the values for.
+
+        Returns:
+            dict[str, Any]: The values found, keyed by key. Missing and expired
+                keys are left out.
+        """
+        return self.run(self.aget_many(keys))
+
+    async def aset_many(
+        self,
+        mapping: Mapping[str, Any],
+        ttl: int | None = None,
+        *,
+        tags: Iterable[str] = (),
+    ) -> None:
+        """Set the values for the given keys asynchronously.
+
+        All the entries are written in a single round trip to the backend.
+
+        Args:
+            mapping (Mapping[str, Any]): The values to set, keyed by key.
+            ttl (Optional[int], optional): Time to live. Defaults to None.
+            tags (Iterable[str]): The tags invalidating every entry, see
+                `ainvalidate_tag`. Defaults to none.
+        """
+        if not mapping:
+            return
+        self._forget_absent(mapping)
+        tags = list(tags)
+        if tags:
+            generations = await self._tag_generations(tags)
+            mapping = {
+                key: tag_value(value, generations) for key, value in mapping.items()
+            }
+        await self.backend.set_many(mapping, ttl or self.DEFAULT_TTL)
+
+    def set_many(
+        self,
+        mapping: Mapping[str, Any],
+        ttl: int | None = None,
+        *,
+        tags: Iterable[str] = (),
+    ) -> None:
+        """Set the values for the given keys.
+
+        All the entries are written in a single round trip to the backend.
+
+        Args:
+            mapping (Mapping[str, Any]): The values to set, keyed by key.
+            ttl (Optional[int], optional): Time to live. Defaults to None.
+            tags (Iterable[str]): The tags invalidating every entry. Defaults
+                to none.
+        """
+        self.run(self.aset_many(mapping, ttl, tags=tags))
+
+    async def adelete_many(self, keys: Iterable[str]) -> None:
+        """Delete the values for the given keys asynchronously.
+
+        Args:
+            keys (Iterable[str]): The keys to delete the values for.
+        """
+        keys = list(keys)
+        if keys:
+            self._forget_absent(keys)
+            await self.backend.delete_many(keys)
+
+    def delete_many(self, keys: Iterable[str]) -> None:
+        """Delete the values for the given keys.
+
+        Args:
+            keys (Iterable[str]): The keys to delete the values for.
+        """
+        self.run(self.adelete_many(keys))
+
+    async def ahas_many(self, keys: Iterable[str]) -> dict[str, bool]:
+        """Check which of the given keys are in the cache asynchronously.
+
+        Once a tag was invalidated, the values of the existing entries are
+        read too, so that entries invalidated through one of their tags are
+        reported missing, as `aget_many` would report them.
+
+        Args:
+            keys (Iterable[str]): The keys to check.
+
+        Returns:
+            dict[str, bool]: True for the keys in the cache, False otherwise.
+        """
+        keys = list(keys)
+        if not keys:
+            return {}
+        found = await self.backend.has_many(keys)
+        present = [key for key, exists in found.items() if exists]
+        if present and await self._tags_invalidated():
+            valid = await self._untag(await self.backend.get_many(present))
+            found.update({key: key in valid for key in present})
+        return found
+
+    def has_many(self, keys: Iterable[str]) -> dict[str, bool]:
+        """Check which of the given keys are in the cache.
+
+        Args:
+            keys (Iterable[str]): The keys to check.
+
+        Returns:
+            dict[str, bool]: True for the keys in the cache, False otherwise.
+        """
+        return self.run(self.ahas_many(keys))
+
+    async def atouch_many(
+        self,
+        keys: Iterable[str],
+        ttl: int | None = None,
+    ) -> dict[str, bool]:
+        """Reset the time to live of the given keys asynchronously.
+
+        All the keys are touched in a single round trip to the backend.
+
+        Args:
+            keys (Iterable[str]): The keys to touch.
+            ttl (Optional[int], optional): Time to live. Defaults to None.
+
+        Returns:
+            dict[str, bool]: True for the keys in the cache, False otherwise.
+        """
+        keys = list(keys)
+        if not keys:
+            return {}
+        return await self.backend.touch_many(keys, ttl or self.DEFAULT_TTL)
+
+    def touch_many(
+        self,
+        keys: Iterable[str],
+        ttl: int | None = None,
+    ) -> dict[str, bool]:
+        """Reset the time to live of the given keys.
+
+        Args:
+            keys (Iterable[str]): The keys to touch.
+            ttl (Optional[int], optional): Time to live. Defaults to None.
+
+        Returns:
+            dict[str, bool]: True for the keys in the cache, False otherwise.
+        """
+        return self.run(self.atouch_many(keys, ttl))
+
+    async def aincr(
+        self,
+        key: str,
+        delta: int = 1,
+        ttl: int | None = None,
+        initial: int = 0,
+    ) -> int:
+        """Increment the counter of the given key asynchronously.
+
+        The increment is a single atomic statement on the backend, so
+        concurrent increments are never lost. Counters are kept apart from
+        the values of the cache. A counter that does not exist or has expired
+        starts from `initial` and expires after `ttl`; increments do not
+        extend its time to live, which makes fixed window rate limits simple.
+
+        Args:
+            key (str): The key of the counter.
+            delta (int): The amount to add. Defaults to 1.
+            ttl (Optional[int], optional): Time to live. Defaults to None.
+            initial (int): The value of a new counter. Defaults to 0.
+
+        Returns:
+            int: The new value of the counter.
+        """
+        return await self.backend.incr(key, delta, ttl or self.DEFAULT_TTL, initial)
+
+    def incr(
+        self,
+        key: str,
+        delta: int = 1,
+        ttl: int | None = None,
+        initial: int = 0,
+    ) -> int:
+        """Increment the counter of the given key.
+
+        Args:
+            key (str): The key of the counter.
+            delta (int): The amount to add. Defaults to 1.
+            ttl (Optional[int], optional): Time to live. Defaults to None.
+            initial (int): The value of a new counter. Defaults to 0.
+
+        Returns:
+            int: The new value of the counter.
+        """
+        return self.run(self.aincr(key, delta, ttl, initial))
+
+    async def adecr(
+        self,
+        key: str,
+        delta: int = 1,
+        ttl: int | None = None,
+        initial: int = 0,
+    ) -> int:
+        """Decrement the counter of the given key asynchronously.
+
+        Args:
+            key (str): The key of the counter.
+            delta (int): The amount to subtract. Defaults to 1.
+            ttl (Optional[int], optional): Time to live. Defaults to None.
+            initial (int): The value of a new counter. Defaults to 0.
+
+        Returns:
+            int: The new value of the counter.
+        """
+        return await self.aincr(key, -delta, ttl, initial)
+
+    def decr(
+        self,
+        key: str,
+        delta: int = 1,
+        ttl: int | None = None,
+        initial: int = 0,
+    ) -> int:
+        """Decrement the counter of the given key.
+
+        Args:
+            key (str): The key of the counter.
+            delta (int): The amount to subtract. Defaults to 1.
+            ttl (Optional[int], optional): Time to live. Defaults to None.
+            initial (int): The value of a new counter. Defaults to 0.
+
+        Returns:
+            int: The new value of the counter.
+        """
+        return self.run(self.adecr(key, delta, ttl, initial))
+
+    async def aincr_many(
+        self,
+        deltas: Mapping[str, int],
+        ttl: int | None = None,
+        initial: int = 0,
+    ) -> dict[str, int]:
+        """Increment the counters of the given keys asynchronously.
+
+        All the counters are incremented in a single round trip to the
+        backend, in key order, so concurrent batches do not deadlock.
+
+        Args:
+            deltas (Mapping[str, int]): The amounts to add, keyed by key.
+            ttl (Optional[int], optional): Time to live. Defaults to None.
+            initial (int): The value of new counters. Defaults to 0.
+
+        Returns:
+            dict[str, int]: The new values of the counters, keyed by key.
+        """
+        if not deltas:
+            return {}
+        return await self.backend.incr_many(
+            dict(sorted(deltas.items())),
+            ttl or self.DEFAULT_TTL,
+            initial,
+        )
+
+    def incr_many(
+        self,
+        deltas: Mapping[str, int],
+        ttl: int | None = None,
+        initial: int = 0,
+    ) -> dict[str, int]:
+        """Increment the counters of the given keys.
+
+        Args:
+            deltas (Mapping[str, int]): The amounts to add, keyed by key.
+            ttl (Optional[int], optional): Time to live. Defaults to None.
+            initial (int): The value of new counters. Defaults to 0.
+
+        Returns:
+            dict[str, int]: The new values of the counters, keyed by key.
+        """
+        return self.run(self.aincr_many(deltas, ttl, initial))
+
+    async def aget_counter(self, key: str) -> int | None:
+        """Get the value of the counter of the given key asynchronously.
+
+        Reading a counter neither creates it nor extends its time to live.
+
+        Args:
+            key (str): The key of the counter.
+
+        Returns:
+            Optional[int]: The value of the counter, None if it does not exist
+                or has expired.
+        """
+        return await self.backend.get_counter(key)
+
+    def get_counter(self, key: str) -> int | None:
+        """Get the value of the counter of the given key.
+
+        Args:
+            key (str): The key of the counter.
+
+        Returns:
+            Optional[int]: The value of the counter, None if it does not exist
+                or has expired.
+        """
+        return self.run(self.aget_counter(key))
+
+    async def adelete_counter(self, key: str) -> None:
+        """Delete the counter of the given key asynchronously.
+
+        Counters are kept apart from the values of the cache, so `adelete`
+        leaves them alone. The next increment starts the counter over from
+        its initial value, which resets a rate limit window early.
+
+        Args:
+            key (str): The key of the counter.
+        """
+        await self.backend.delete_counter(key)
+
+    def delete_counter(self, key: str) -> None:
+        """Delete the counter of the given key.
+
+        Args:
+            key (str): The key of the counter.
+        """
+        self.run(self.adelete_counter(key))
+
+    async def aget_or_set(
+        self,
+        key: str,
+        loader: Callable[[], Any],
+        ttl: int | None = None,
+        *,
+        distributed: bool = False,
+        tags: Iterable[str] = (),
+    ) -> Any:
+        """Get the value for the given key, loading and setting it on a miss.
+
+        Concurrent misses for the same key in this process share a single
+        load, so the loader runs once however many callers are waiting. With
+        `distributed`, the load is also guarded by a lock shared with other
+        processes: the process holding it runs the loader while the others
+        poll the cache for the value, for up to LOCK_WAIT_TIMEOUT seconds.
+        With a negative TTL, a None loaded is cached as an absent marker, so
+        the loader is not called again for the key until the marker expires.
+
+        Args:
+            key (str): The key to get the value for.
+            loader (Callable[[], Any]): Function or coroutine function returning
+                the value to set on a miss. None values are only cached with a
+                negative TTL.
+            ttl (Optional[int], optional): Time to live. Defaults to None.
+            distributed (bool): Also deduplicate loads across processes.
+            tags (Iterable[str]): The tags invalidating the loaded entry, see
+                `ainvalidate_tag`. Defaults to none.
+
+        Returns:
+            Any: The cached or loaded value for the given key.
+        """
+        value = await self._get(key)
+        if is_absent(value):
+            return None
+        if value is not None:
+            return value
+        task = self._loading.get(key)
+        if task is None or task.get_loop() is not asyncio.get_running_loop():
+            load = self._load_distributed if distributed else self._load
+            task = asyncio.ensure_future(
+                load(key, loader, ttl or self.DEFAULT_TTL, tuple(tags)),
+            )
+            self._loading[key] = task
+            task.add_done_callback(lambda done: self._loaded(key, done))
+        # Shield the shared load so one cancelled caller does not cancel it
+        # for every other caller waiting on the same key.
+        value = await asyncio.shield(task)
+        return None if is_absent(value) else value
+
+    def get_or_set(
+        self,
+        key: str,
+        loader: Callable[[], Any],
+        ttl: int | None = None,
+        *,
+        distributed: bool = False,
+        tags: Iterable[str] = (),
+    ) -> Any:
+        """Get the value for the given key, loading and setting it on a miss.
+
+        With a loop thread, a synchronous loader runs in a worker thread, so a
+        slow load does not hold up the calls of the other threads sharing the
+        loop.
+
+        Args:
+            key (str): The key to get the value for.
+            loader (Callable[[], Any]): Function or coroutine function returning
+                the value to set on a miss. None values are only cached with a
+                negative TTL.
+            ttl (Optional[int], optional): Time to live. Defaults to None.
+            distributed (bool): Also deduplicate loads across processes.
+            tags (Iterable[str]): The tags invalidating the loaded entry.
+                Defaults to none.
+
+        Returns:
+            Any: The cached or loaded value for the given key.
+        """
+        if self.runner is not None and not inspect.iscoroutinefunction(loader):
+            loader = functools.partial(asyncio.to_thread, loader)
+        return self.run(
+            self.aget_or_set(key, loader, ttl, distributed=distributed, tags=tags),
+        )
+
+    def register_loader(
+        self,
+        prefix: str,
+        loader: Callable[[str], Any],
+        ttl: int | None = None,
+        *,
+        soft_ttl: int | None = None,
+        beta: float = 1.0,
+    ) -> None:
+        """Register the loader refreshing the entries of keys with a prefix.
+
+        Reads of these keys through `aget` or `aget_or_set` return the cached
+        value, stale or not, and refresh it in the background once the entry
+        is older than `soft_ttl`. Entries are also refreshed early, at random
+        (XFetch): the closer an entry is to its expiry and the longer its last
+        load took in this process, the likelier a read refreshes it, so hot
+        keys are reloaded by a single caller before they expire instead of by
+        every caller at once after.
+
+        Each process refreshes a key once at a time, and only one process
+        refreshes it, holding the lock of the key. The refresh runs on the
+        event loop of the read, so synchronous callers need a runner. When
+        prefixes overlap, the longest one applies.
+
+        Args:
+            prefix (str): The prefix of the keys, empty for every key.
+            loader (Callable[[str], Any]): Function or coroutine function
+                returning the value of the key it is given.
+            ttl (Optional[int], optional): Time to live of the refreshed
+                entries. Defaults to None.
+            soft_ttl (Optional[int]): Age in seconds from which an entry is
+                refreshed. Defaults to None, which only refreshes early.
+            beta (float): Weight of the early refreshes. Zero disables them.
+        """
+        self._loaders[prefix] = RegisteredLoader(loader, ttl, soft_ttl, beta)
+
+    def namespace(self, name: str) -> "Namespace":
+        """Get a view of the cache whose keys are in a namespace.
+
+        Args:
+            name (str): The name of the namespace, such as `tenant:42`.
+
+        Returns:
+            Namespace: The view of the namespace.
+        """
+        return Namespace(self, name)
+
+    async def aclear_namespace(self, name: str) -> None:
+        """Clear every entry of a namespace asynchronously.
+
+        The generation of the namespace is incremented, so its entries are
+        looked up under new keys: nothing is scanned, locked or deleted, and
+        the entries left behind are reclaimed as they expire. Other processes
+        see the change within GENERATION_CACHE_TTL seconds.
+
+        Args:
+            name (str): The name of the namespace.
+        """
+        await self.generations.advance(NAMESPACE_PREFIX + name)
+
+    def clear_namespace(self, name: str) -> None:
+        """Clear every entry of a namespace.
+
+        Args:
+            name (str): The name of the namespace.
+        """
+        self.run(self.aclear_namespace(name))
+
+    async def ainvalidate_tag(self, tag: str) -> None:
+        """Invalidate every entry with a tag asynchronously.
+
+        The generation of the tag is incremented, so reads treat the entries
+        set with the previous generation as missing: nothing is scanned,
+        locked or deleted, and the entries left behind are reclaimed as they
+        expire. Other processes see the change within GENERATION_CACHE_TTL
+        seconds.
+
+        Args:
+            tag (str): The tag.
+        """
+        await self.generations.advance(TAG_PREFIX + tag)
+        await self.tag_invalidations.advance(TAG_INVALIDATIONS_KEY)
+
+    def invalidate_tag(self, tag: str) -> None:
+        """Invalidate every entry with a tag.
+
+        Args:
+            tag (str): The tag.
+        """
+        self.run(self.ainvalidate_tag(tag))
+
+    async def aiter_keys(self, prefix: str | None = None) -> AsyncIterator[str]:
+        """Iterate over the keys of the entries in the cache.
+
+        Keys are fetched from the backend in chunks of ITERATION_CHUNK_SIZE,
+        through a server-side cursor with Postgres, so memory use does not
+        grow with the size of the cache. Keys of absent markers and of
+        entries invalidated by a tag are included, as their values are not
+        read.
+
+        Args:
+            prefix (Optional[str]): The prefix of the keys to iterate over.
+                Defaults to None, which iterates over every key.
+
+        Yields:
+            str: The keys, in key order.
+        """
+        # Closing the chunks when the iteration stops early releases the
+        # connection and the transaction of the cursor at once.
+        async with contextlib.aclosing(
+            self.backend.iter_keys(prefix, self.ITERATION_CHUNK_SIZE),
+        ) as chunks:
+            async for chunk in chunks:
+                for key in chunk:
+                    yield key
+
+    async def aiter_items(
+        self,
+        prefix: str | None = None,
+    ) -> AsyncIterator[tuple[str, Any]]:
+        """Iterate over the keys and values of the entries in the cache.
+
+        Entries are fetched from the backend in chunks, like the keys of
+        `aiter_keys`. Absent markers and entries invalidated by a tag are
+        left out.
+
+        Args:
+            prefix (Optional[str]): The prefix of the keys to iterate over.
+                Defaults to None, which iterates over every entry.
+
+        Yields:
+            tuple[str, Any]: The keys and values, in key order.
+        """
+        async with contextlib.aclosing(
+            self.backend.iter_items(prefix, self.ITERATION_CHUNK_SIZE),
+        ) as chunks:
+            async for chunk in chunks:
+                for key, value in (await self._untag(chunk)).items():
+                    if not is_absent(value):
+                        yield key, value
+
+    async def awarm(
+        self,
+        keys: Iterable[str] | None = None,
+        loader: Callable[[str], Any] | None = None,
+        ttl: int | None = None,
+        *,
+        top: int = 100,
+        concurrency: int = 10,
+    ) -> int:
+        """Warm the cache up asynchronously, such as before serving traffic.
+
+        The keys are read in a single round trip, which fills the local tier
+        of a TieredBackend, and the values of the missing ones are loaded,
+        with at most `concurrency` loads at a time, then written in bulk with
+        the backend's `import_entries`. A load that fails is logged and
+        skipped, so a warm-up never fails as a whole.
+
+        Args:
+            keys (Optional[Iterable[str]]): The keys to warm up. Defaults to
+                None, which takes the first `top` hot keys saved by
+                `asave_hot_keys`, possibly by another process.
+            loader (Optional[Callable[[str], Any]]): Function or coroutine
+                function returning the value of the key it is given. Defaults
+                to None, which uses the loaders registered with
+                `register_loader`; keys without one are only read.
+            ttl (Optional[int], optional): Time to live of the loaded entries.
+                Defaults to None.
+            top (int): The number of saved hot keys warmed up by default.
+            concurrency (int): The maximum number of loads running at a time.
+
+        Returns:
+            int: The number of keys cached after the warm-up.
+        """
+        if keys is None:
+            saved = await self.backend.get(self.HOT_KEYS_KEY)
+            keys = [] if saved is None else saved["keys"][:top]
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return 0
+        found = await self._untag(await self.backend.get_many(keys))
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def load_key(key: str) -> tuple[str, Any, int] | None:
+            registered = self._loader_for(key)
+            if loader is not None:
+                load, load_ttl = loader, ttl
+            elif registered is not None:
+                load, load_ttl = registered.loader, ttl or registered.ttl
+            else:
+                return None
+            async with semaphore:
+                try:
+                    value = await self._compute(key, functools.partial(load, key))
+                except Exception:
+                    logger.exception("Warming %r failed", key)
+                    return None
+            return key, value, load_ttl or self.DEFAULT_TTL
+
+        batches: dict[int, dict[str, Any]] = {}
+        for loaded in await asyncio.gather(
+            *(load_key(key) for key in keys if key not in found),
+        ):
+            if loaded is not None and loaded[1] is not None:
+                key, value, load_ttl = loaded
+                batches.setdefault(load_ttl, {})[key] = value
+        imported = 0
+        for batch_ttl, batch in batches.items():
+            imported += await self.backend.import_entries(batch, batch_ttl)
+            self._forget_absent(batch)
+        return sum(not is_absent(value) for value in found.values()) + imported
+
+    def warm(
+        self,
+        keys: Iterable[str] | None = None,
+        loader: Callable[[str], Any] | None = None,
+        ttl: int | None = None,
+        *,
+        top: int = 100,
+        concurrency: int = 10,
+    ) -> int:
+        """Warm the cache up, such as before serving traffic.
+
+        With a loop thread, a synchronous loader runs in worker threads, so
+        the loads run concurrently.
+
+        Args:
+            keys (Optional[Iterable[str]]): The keys to warm up. Defaults to
+                None, which takes the saved hot keys.
+            loader (Optional[Callable[[str], Any]]): Function or coroutine
+                function returning the value of the key it is given. Defaults
+                to None, which uses the registered loaders.
+            ttl (Optional[int], optional): Time to live of the loaded entries.
+                Defaults to None.
+            top (int): The number of saved hot keys warmed up by default.
+            concurrency (int): The maximum number of loads running at a time.
+
+        Returns:
+            int: The number of keys cached after the warm-up.
+        """
+        if (
+            self.runner is not None
+            and loader is not None
+            and not inspect.iscoroutinefunction(loader)
+        ):
+            blocking_loader = loader
+
+            def threaded_loader(key: str) -> Awaitable[Any]:
+                return asyncio.to_thread(blocking_loader, key)
+
+            loader = threaded_loader
+        return self.run(
+            self.awarm(keys, loader, ttl, top=top, concurrency=concurrency),
+        )
+
+    async def asave_hot_keys(self, top: int = 100, ttl: int | None = None) -> list[str]:
+        """Save the most read keys of the analytics in the cache asynchronously.
+
+        The keys are stored in the `HOT_KEYS_KEY` entry, where `awarm` finds
+        them in any process, including a new one whose analytics are still
+        empty. A snapshot exported afterwards carries them too. Each save
+        replaces the keys of the previous one.
+
+        Args:
+            top (int): The number of most read keys to save.
+            ttl (Optional[int], optional): Time to live of the saved keys.
+                Defaults to None, in which case DEFAULT_TTL is used.
+
+        Returns:
+            list[str]: The keys saved, most read first. None are saved without
+                analytics.
+        """
+        if self.analytics is None:
+            return []
+        keys = [key for key, _ in self.analytics.report().hot_keys[:top]]
+        await self.backend.set(
+            self.HOT_KEYS_KEY,
+            {"keys": keys},
+            ttl or self.DEFAULT_TTL,
+        )
+        return keys
+
+    def save_hot_keys(self, top: int = 100, ttl: int | None = None) -> list[str]:
+        """Save the most read keys of the analytics in the cache.
+
+        Args:
+            top (int): The number of most read keys to save.
+            ttl (Optional[int], optional): Time to live of the saved keys.
+                Defaults to None.
+
+        Returns:
+            list[str]: The keys saved, most read first.
+        """
+        return self.run(self.asave_hot_keys(top, ttl))
+
+    async def aexport_snapshot(self, output: str | os.PathLike[str] | BinaryIO) -> int:
+        """Export the entries that are not expired to a snapshot asynchronously.
+
+        With analytics, the hot keys are saved first, so a process restoring
+        the snapshot can warm them up. Backends without snapshots, such as
+        the in-memory one, raise a TypeError.
+
+        Args:
+            output (str | os.PathLike | BinaryIO): The path of the snapshot
+                file, or a binary file to write it to.
+
+        Returns:
+            int: The number of entries exported.
+        """
+        backend = snapshot_backend(self.backend)
+        await self.asave_hot_keys()
+        return await backend.export_snapshot(output)
+
+    def export_snapshot(self, output: str | os.PathLike[str] | BinaryIO) -> int:
+        """Export the entries that are not expired to a snapshot.
+
+        Args:
+            output (str | os.PathLike | BinaryIO): The path of the snapshot
+                file, or a binary file to write it to.
+
+        Returns:
+            int: The number of entries exported.
+        """
+        return self.run(self.aexport_snapshot(output))
+
+    async def aimport_snapshot(self, source: str | os.PathLike[str] | BinaryIO) -> int:
+        """Import the entries of a snapshot asynchronously.
+
+        Entries keep their expiry, and fresher cached entries are kept.
+        Backends without snapshots raise a TypeError.
+
+        Args:
+            source (str | os.PathLike | BinaryIO): The path of the snapshot
+                file, or a binary file to read it from.
+
+        Returns:
+            int: The number of entries written.
+        """
+        return await snapshot_backend(self.backend).import_snapshot(source)
+
+    def import_snapshot(self, source: str | os.PathLike[str] | BinaryIO) -> int:
+        """Import the entries of a snapshot.
+
+        Args:
+            source (str | os.PathLike | BinaryIO): The path of the snapshot
+                file, or a binary file to read it from.
+
+        Returns:
+            int: The number of entries written.
+        """
+        return self.run(self.aimport_snapshot(source))
+
+    async def aclose(self) -> None:
+        """Release the resources of the cache asynchronously.
+
+        With the Postgres backend, the pool is closed once the connections in
+        use have been released.
+        """
+        await self.backend.close()
+
+    def close(self) -> None:
+        """Release the resources of the cache.
+
+        A loop thread created by `use_postgres_backend` is stopped as well.
+        """
+        self.run(self.aclose())
+        if self.owns_runner and self.runner is not None:
+            self.runner.stop()
+
+    @property
+    def _negative_ttl(self) -> int:
+        """The time to live of the absent markers."""
+        return self.negative_ttl or self.NEGATIVE_TTL
+
+    async def _get(self, key: str) -> Any:
+        """Get the value or absent marker of a key, refreshing stale entries.
+
+        Keys in the absent filter skip the backend.
+
+        Args:
+            key (str): The key to get the value for.
+
+        Returns:
+            Any: The value or absent marker of the key, None if it is missing.
+        """
+        if self.absent_filter is not None and key in self.absent_filter:
+            return ABSENT
+        registered = self._loader_for(key) if self._loaders else None
+        if registered is None:
+            value = await self._read(key)
+        else:
+            entry = await self.backend.get_entry(key)
+            if entry is None:
+                return None
+            tags = tuple(entry.value[TAGS_FIELD]) if is_tagged(entry.value) else ()
+            value = (await self._untag({key: entry.value})).get(key)
+            if (
+                value is not None
+                and not is_absent(value)
+                and self._is_stale(key, entry, registered)
+            ):
+                self._refresh(key, registered, tags)
+        if self.absent_filter is not None and is_absent(value):
+            self.absent_filter.add(key)
+        return value
+
+    async def _read(self, key: str) -> Any:
+        """Read the value of a key from the backend, unless its tags changed.
+
+        Args:
+            key (str): The key to read.
+
+        Returns:
+            Any: The value or absent marker of the key, None if it is missing
+                or one of its tags was invalidated.
+        """
+        value = await self.backend.get(key)
+        if not is_tagged(value):
+            return value
+        return (await self._untag({key: value})).get(key)
+
+    async def _tag_generations(self, tags: Iterable[str]) -> dict[str, int]:
+        """Get the current generation of tags.
+
+        Args:
+            tags (Iterable[str]): The tags.
+
+        Returns:
+            dict[str, int]: The generations, keyed by tag.
+        """
+        generations = await self.generations.get_many(TAG_PREFIX + tag for tag in tags)
+        return {
+            key.removeprefix(TAG_PREFIX): value for key, value in generations.items()
+        }
+
+    async def _tags_invalidated(self) -> bool:
+        """Check whether a tag was ever invalidated.
+
+        Returns:
+            bool: True if tagged entries may have been invalidated.
+        """
+        counts = await self.tag_invalidations.get_many([TAG_INVALIDATIONS_KEY])
+        return any(counts.values())
+
+    async def _tagged(self, value: Any, tags: Iterable[str]) -> Any:
+        """Wrap a value with the current generation of its tags, if any.
+
+        Args:
+            value (Any): The value.
+            tags (Iterable[str]): The tags of the value.
+
+        Returns:
+            Any: The tagged value, or the value itself without tags.
+        """
+        tags = list(tags)
+        if not tags:
+            return value
+        return tag_value(value, await self._tag_generations(tags))
+
+    async def _untag(self, found: dict[str, Any]) -> dict[str, Any]:
+        """Unwrap tagged values, leaving out those whose tags changed.
+
+        The generations of all the tags are read at once.
+
+        Args:
+            found (dict[str, Any]): The values read, keyed by key.
+
+        Returns:
+            dict[str, Any]: The values still valid, keyed by key.
+        """
+        tagged = {key: value for key, value in found.items() if is_tagged(value)}
+        if not tagged:
+            return found
+        current = await self._tag_generations(
+            {tag for value in tagged.values() for tag in value[TAGS_FIELD]},
+        )
+        values = {key: value for key, value in found.items() if key not in tagged}
+        for key, value in tagged.items():
+            if all(
+                current[tag] == generation
+                for tag, generation in value[TAGS_FIELD].items()
+            ):
+                values[key] = value[VALUE_FIELD]
+        return values
+
+    def _forget_absent(self, keys: Iterable[str]) -> None:
+        """Clear the absent filter if it may hold any of the given keys.
+
+        Args:
+            keys (Iterable[str]): The keys written or deleted.
+        """
+        if self.absent_filter is not None and any(
+            key in self.absent_filter for key in keys
+        ):
+            self.absent_filter.clear()
+
+    def _loaded(self, key: str, task: asyncio.Task[Any]) -> None:
+        """Forget a finished load.
+
+        Args:
+            key (str): The key the value was loaded for.
+            task (asyncio.Task): The finished load.
+        """
+        if self._loading.get(key) is task:
+            del self._loading[key]
+        if not task.cancelled():
+            # Mark the error as retrieved in case every caller was cancelled.
+            task.exception()
+
+    def _loader_for(self, key: str) -> RegisteredLoader | None:
+        """Find the registered loader of a key.
+
+        Args:
+            key (str): The key.
+
+        Returns:
+            Optional[RegisteredLoader]: The loader of the longest prefix of the
+                key, or None if no prefix matches.
+        """
+        prefixes = [prefix for prefix in self._loaders if key.startswith(prefix)]
+        if not prefixes:
+            return None
+        return self._loaders[max(prefixes, key=len)]
+
+    def _is_stale(
+        self,
+        key: str,
+        entry: CacheEntry,
+        registered: RegisteredLoader,
+    ) -> bool:
+        """Decide whether a read refreshes an entry.
+
+        Args:
+            key (str): The key of the entry.
+            entry (CacheEntry): The entry read.
+            registered (RegisteredLoader): The loader of the key.
+
+        Returns:
+            bool: Whether the entry is stale or drawn for an early refresh.
+        """
+        if registered.soft_ttl is not None and entry.age >= registered.soft_ttl:
+            return True
+        compute_time = self._compute_times.get(key)
+        if compute_time is None:
+            return False
+        # XFetch: refresh when now - delta * beta * log(rand) reaches the expiry.
+        draw = -math.log(1.0 - random.random())  # noqa: S311
+        return compute_time * registered.beta * draw >= entry.expires_in
+
+    def _refresh(
+        self,
+        key: str,
+        registered: RegisteredLoader,
+        tags: Sequence[str] = (),
+    ) -> None:
+        """Refresh an entry in the background, unless it is being loaded.
+
+        Args:
+            key (str): The key of the entry.
+            registered (RegisteredLoader): The loader of the key.
+            tags (Sequence[str]): The tags of the entry, kept when refreshed.
+        """
+        task = self._loading.get(key)
+        if task is not None and task.get_loop() is asyncio.get_running_loop():
+            return
+        loader = functools.partial(registered.loader, key)
+        ttl = registered.ttl or self.DEFAULT_TTL
+        task = asyncio.ensure_future(self._refresh_entry(key, loader, ttl, tags))
+        self._loading[key] = task
+        task.add_done_callback(lambda done: self._loaded(key, done))
+
+    async def _refresh_entry(
+        self,
+        key: str,
+        loader: Callable[[], Any],
+        ttl: int,
+        tags: Sequence[str] = (),
+    ) -> Any:
+        """Reload an entry, unless another process is reloading it.
+
+        With the Postgres backend, the reload writes on the connection of the
+        lock, so refreshes never wait for a second connection while holding
+        one, however many run at once.
+
+        Args:
+            key (str): The key of the entry.
+            loader (Callable[[], Any]): Function or coroutine function returning
+                the value to set.
+            ttl (int): Time to live.
+            tags (Sequence[str]): The tags of the entry.
+
+        Returns:
+            Any: The reloaded value, or the cached one when another process
+                holds the lock or the load fails.
+        """
+        try:
+            async with self.backend.lock(key) as locked:
+                if locked:
+                    return await self._load(key, loader, ttl, tags)
+            return await self._read(key)
+        except Exception:
+            logger.exception("Refreshing %r failed", key)
+            return None
+
+    async def _load(
+        self,
+        key: str,
+        loader: Callable[[], Any],
+        ttl: int,
+        tags: Sequence[str] = (),
+    ) -> Any:
+        """Call the loader and set the value it returns.
+
+        Args:
+            key (str): The key to load the value for.
+            loader (Callable[[], Any]): Function or coroutine function returning
+                the value to set.
+            ttl (int): Time to live.
+            tags (Sequence[str]): The tags of the value.
+
+        Returns:
+            Any: The loaded value.
+        """
+        value = await self._compute(key, loader)
+        if value is not None:
+            await self.backend.set(key, await self._tagged(value, tags), ttl)
+        elif self.negative_ttl is not None:
+            await self.aset_absent(key)
+        return value
+
+    async def _compute(self, key: str, loader: Callable[[], Any]) -> Any:
+        """Call the loader, recording how long it took.
+
+        Args:
+            key (str): The key to compute the value of.
+            loader (Callable[[], Any]): Function or coroutine function returning
+                the value.
+
+        Returns:
+            Any: The computed value.
+        """
+        start = time.perf_counter()
+        value = loader()
+        if inspect.isawaitable(value):
+            value = await value
+        self._compute_times[key] = time.perf_counter() - start
+        self._compute_times.move_to_end(key)
+        if len(self._compute_times) > self.COMPUTE_TIMES_SIZE:
+            self._compute_times.popitem(last=False)
+        return value
+
+    async def _load_distributed(
+        self,
+        key: str,
+        loader: Callable[[], Any],
+        ttl: int,
+        tags: Sequence[str] = (),
+    ) -> Any:
+        """Load the value while holding the lock shared across processes.
+
+        Args:
+            key (str): The key to load the value for.
+            loader (Callable[[], Any]): Function or coroutine function returning
+                the value to set.
+            ttl (int): Time to live.
+            tags (Sequence[str]): The tags of the value.
+
+        Returns:
+            Any: The loaded value, or the value set by the lock holder.
+        """
+        async with self.backend.lock(key) as locked:
+            if locked:
+                # Another process may have set it between the miss and the lock.
+                value = await self._read(key)
+                if value is not None:
+                    return value
+                return await self._load(key, loader, ttl, tags)
+        deadline = time.monotonic() + self.LOCK_WAIT_TIMEOUT
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.LOCK_POLL_INTERVAL)
+            value = await self._read(key)
+            if value is not None:
+                return value
+        return await self._load(key, loader, ttl, tags)
+
+    def cached(
+        self,
+        ttl: int | None = None,
+        key: str | Callable[..., str] | None = None,
+        namespace: str | None = None,
+        *,
+        distributed: bool = False,
+    ) -> Callable[[Callable[P, R]], CachedFunction[P, R]]:
+        """Cache the results of a function or coroutine function.
+
+        Keys are built from the arguments of each call. Concurrent calls with
+        the same arguments only call the function once. The decorated function
+        also gets `invalidate`, `bypass` and `key` helpers taking the same
+        arguments as the function.
+
+        Example:
+            ```python
+            @cache.cached(ttl=60, namespace="users")
+            async def get_user(user_id: int) -> dict: ...
+
+
+            await get_user.invalidate(42)
+            ```
+
+        Args:
+            ttl (Optional[int]): Time to live of the results. Defaults to None.
+            key (Optional[str | Callable]): A format string rendered with the
+                arguments by name, or a function returning the key part from
+                the arguments. Defaults to all the arguments.
+            namespace (Optional[str]): The prefix of the keys. Defaults to the
+                qualified name of the function when no key is given.
+            distributed (bool): Also deduplicate calls across processes.
+
+        Returns:
+            Callable: The decorator.
+        """
+        return cached(self, ttl, key, namespace, distributed=distributed)
+
+
+class Namespace:
+    """A view of the cache whose keys are in a namespace.
+
+    Keys are prefixed with the name of the namespace and its current
+    generation, so `aclear` invalidates every entry of the namespace at once
+    by incrementing the generation. Get it with `PsQache.namespace`.
+    """
+
+    def __init__(self, cache: PsQache, name: str) -> None:
+        """Initialize the Namespace.
+
+        Args:
+            cache (PsQache): The cache holding the entries.
+            name (str): The name of the namespace.
+        """
+        self.cache = cache
+        self.name = name
+
+    async def prefix(self) -> str:
+        """Get the prefix of the keys of the current generation.
+
+        Returns:
+            str: The name and current generation of the namespace.
+        """
+        counter = NAMESPACE_PREFIX + self.name
+        generations = await self.cache.generations.get_many([counter])
+        return f"{self.name}:{generations[counter]}:"
+
+    async def key(self, key: str) -> str:
+        """Get the cache key of a key of the namespace.
+
+        Args:
+            key (str): The key in the namespace.
+
+        Returns:
+            str: The key in the cache.
+        """
+        return await self.prefix() + key
+
+    async def aget(self, key: str) -> Any | None:
+        """Get the value for the given key asynchronously.
+
+        Args:
+            key (str): The key to get the value for.
+
+        Returns:
+            Optional[Any]: The value for the given key.
+        """
+        return await self.cache.aget(await self.key(key))
+
+    def get(self, key: str) -> Any | None:
+        """Get the value for the given key.
+
+        Args:
+            key (str): The key to get the value for.
+
+        Returns:
+            Optional[Any]: The value for the given key.
+        """
+        return self.cache.run(self.aget(key))
+
+    async def aset(
+        self,
+        key: str,
+        value: Any,
+        ttl: int | None = None,
+        *,
+        tags: Iterable[str] = (),
+    ) -> None:
+        """Set the value for the given key asynchronously.
+
+        Args:
+            key (str): The key to set the value for.
+            value (Any): The value to set for the given key.
+            ttl (Optional[int], optional): Time to live. Defaults to None.
+            tags (Iterable[str]): The tags invalidating the entry. Defaults to
+                none.
+        """
+        await self.cache.aset(await self.key(key), value, ttl, tags=tags)
+
+    def set(
+        self,
+        key: str,
+        value: Any,
+        ttl: int | None = None,
+        *,
+        tags: Iterable[str] = (),
+    ) -> None:
+        """Set the value for the given key.
+
+        Args:
+            key (str): The key to set the value for.
+            value (Any): The value to set for the given key.
+            ttl (Optional[int], optional): Time to live. Defaults to None.
+            tags (Iterable[str]): The tags invalidating the entry. Defaults to
+                none.
+        """
+        self.cache.run(self.aset(key, value, ttl, tags=tags))
+
+    async def adelete(self, key: str) -> None:
+        """Delete the value for the given key asynchronously.
+
+        Args:
+            key (str): The key to delete the value for.
+        """
+        await self.cache.adelete(await self.key(key))
+
+    def delete(self, key: str) -> None:
+        """Delete the value for the given key.
+
+        Args:
+            key (str): The key to delete the value for.
+        """
+        self.cache.run(self.adelete(key))
+
+    async def ahas(self, key: str) -> bool:
+        """Check if the given key is in the namespace asynchronously.
+
+        Args:
+            key (str): The key to check.
+
+        Returns:
+            bool: True if the key is in the namespace, False otherwise.
+        """
+        return await self.cache.ahas(await self.key(key))
+
+    def has(self, key: str) -> bool:
+        """Check if the given key is in the namespace.
+
+        Args:
+            key (str): The key to check.
+
+        Returns:
+            bool: True if the key is in the namespace, False otherwise.
+        """
+        return self.cache.run(self.ahas(key))
+
+    async def aget_many(self, keys: Iterable[str]) -> dict[str, Any]:
+        """Get the values for the given keys asynchronously.
+
+        Args:
+            keys (Iterable[str]): The keys to get the values for.
+
+        Returns:
+            dict[str, Any]: The values found, keyed by key in the namespace.
+        """
+        prefix = await self.prefix()
+        found = await self.cache.aget_many(prefix + key for key in keys)
+        return {key.removeprefix(prefix): value for key, value in found.items()}
+
+    def get_many(self, keys: Iterable[str]) -> dict[str, Any]:
+        """Get the values for the given keys.
+
+        Args:
+            keys (Iterable[str]): The keys to get the values for.
+
+        Returns:
+            dict[str, Any]: The values found, keyed by key in the namespace.
+        """
+        return self.cache.run(self.aget_many(keys))
+
+    async def aset_many(
+        self,
+        mapping: Mapping[str, Any],
+        ttl: int | None = None,
+        *,
+        tags: Iterable[str] = (),
+    ) -> None:
+        """Set the values for the given keys asynchronously.
+
+        Args:
+            mapping (Mapping[str, Any]): The values to set, keyed by key.
+            ttl (Optional[int], optional): Time to live. Defaults to None.
+            tags (Iterable[str]): The tags invalidating every entry. Defaults
+                to none.
+        """
+        prefix = await self.prefix()
+        await self.cache.aset_many(
+            {prefix + key: value for key, value in mapping.items()},
+            ttl,
+            tags=tags,
+        )
+
+    def set_many(
+        self,
+        mapping: Mapping[str, Any],
+        ttl: int | None = None,
+        *,
+        tags: Iterable[str] = (),
+    ) -> None:
+        """Set the values for the given keys.
+
+        Args:
+            mapping (Mapping[str, Any]): The values to set, keyed by key.
+            ttl (Optional[int], optional): Time to live. Defaults to None.
+            tags (Iterable[str]): The tags invalidating every entry. Defaults
+                to none.
+        """
+        self.cache.run(self.aset_many(mapping, ttl, tags=tags))
+
+    async def adelete_many(self, keys: Iterable[str]) -> None:
+        """Delete the values for the given keys asynchronously.
+
+        Args:
+            keys (Iterable[str]): The keys to delete the values for.
+        """
+        prefix = await self.prefix()
+        await self.cache.adelete_many(prefix + key for key in keys)
+
+    def delete_many(self, keys: Iterable[str]) -> None:
+        """Delete the values for the given keys.
+
+        Args:
+            keys (Iterable[str]): The keys to delete the values for.
+        """
+        self.cache.run(self.adelete_many(keys))
+
+    async def aget_or_set(
+        self,
+        key: str,
+        loader: Callable[[], Any],
+        ttl: int | None = None,
+        *,
+        distributed: bool = False,
+        tags: Iterable[str] = (),
+    ) -> Any:
+        """Get the value for the given key, loading and setting it on a miss.
+
+        Args:
+            key (str): The key to get the value for.
+            loader (Callable[[], Any]): Function or coroutine function returning
+                the value to set on a miss.
+            ttl (Optional[int], optional): Time to live. Defaults to None.
+            distributed (bool): Also deduplicate loads across processes.
+            tags (Iterable[str]): The tags invalidating the loaded entry.
+                Defaults to none.
+
+        Returns:
+            Any: The cached or loaded value for the given key.
+        """
+        return await self.cache.aget_or_set(
+            await self.key(key),
+            loader,
+            ttl,
+            distributed=distributed,
+            tags=tags,
+        )
+
+    def get_or_set(
+        self,
+        key: str,
+        loader: Callable[[], Any],
+        ttl: int | None = None,
+        *,
+        distributed: bool = False,
+        tags: Iterable[str] = (),
+    ) -> Any:
+        """Get the value for the given key, loading and setting it on a miss.
+
+        Args:
+            key (str): The key to get the value for.
+            loader (Callable[[], Any]): Function or coroutine function returning
+                the value to set on a miss.
+            ttl (Optional[int], optional): Time to live. Defaults to None.
+            distributed (bool): Also deduplicate loads across processes.
+            tags (Iterable[str]): The tags invalidating the loaded entry.
+                Defaults to none.
+
+        Returns:
+            Any: The cached or loaded value for the given key.
+        """
+        return self.cache.get_or_set(
+            self.cache.run(self.key(key)),
+            loader,
+            ttl,
+            distributed=distributed,
+            tags=tags,
+        )
+
+    async def aclear(self) -> None:
+        """Clear every entry of the namespace asynchronously."""
+        await self.cache.aclear_namespace(self.name)
+
+    def clear(self) -> None:
+        """Clear every entry of the namespace."""
+        self.cache.run(self.aclear())
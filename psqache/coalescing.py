@@ -0,0 +1,156 @@
+"""This module contains the request coalescing backend.
+
+Concurrent lookups issued in the same event-loop tick each acquire their own
+pool connection. Under burst load this drains the pool and later calls start
+queueing behind it. The coalescing backend collects the keys requested within
+a short window and resolves all of them with a single batched query, fanning
+the results back out to the waiting callers.
+"""
+
+import asyncio
+from collections.abc import Awaitable
+from collections.abc import Callable
+from typing import Any
+
+from psqache.abcs import ICacheBackend
+from psqache.backends import BackendWrapper
+
+
+class Coalescer:
+    """Collects concurrent single-key lookups into batched loads.
+
+    Lookups for the same key share a single pending future, so a key is only
+    requested once per batch however many callers are waiting on it.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[list[str]], Awaitable[dict[str, Any]]],
+        window: float,
+        max_batch: int,
+    ) -> None:
+        """Initialize the Coalescer.
+
+        Args:
+            loader (Callable): Coroutine function resolving a list of keys in
+                one round trip. Keys missing from its result resolve to None.
+            window (float): Seconds to wait for more keys before flushing.
+                Zero flushes on the next event-loop iteration.
+            max_batch (int): Number of keys that triggers an immediate flush.
+        """
+        self.loader = loader
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: dict[str, asyncio.Future[Any]] = {}
+        self._handle: asyncio.TimerHandle | asyncio.Handle | None = None
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    async def load(self, key: str) -> Any | None:
+        """Load the value for the given key as part of the next batch.
+
+        Args:
+            key (str): The key to load.
+
+        Returns:
+            Optional[Any]: The value the loader returned for the key.
+        """
+        future = self._pending.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._pending[key] = future
+            if len(self._pending) >= self.max_batch:
+                self.flush()
+            elif self._handle is None:
+                self._handle = (
+                    loop.call_later(self.window, self.flush)
+                    if self.window > 0
+                    else loop.call_soon(self.flush)
+                )
+        # Shield the shared future so one cancelled caller does not cancel
+        # the lookup for every other caller waiting on the same key.
+        return await asyncio.shield(future)
+
+    def flush(self) -> None:
+        """Send the pending keys to the loader as one batch."""
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        pending, self._pending = self._pending, {}
+        if pending:
+            task = asyncio.get_running_loop().create_task(self._resolve(pending))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _resolve(self, pending: dict[str, asyncio.Future[Any]]) -> None:
+        """Run the loader and fan the results out to the waiting futures.
+
+        Args:
+            pending (dict[str, asyncio.Future]): The futures to resolve, keyed
+                by key.
+        """
+        try:
+            results = await self.loader(list(pending))
+        except Exception as exc:  # noqa: BLE001
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        except BaseException:
+            # Cancel the callers when the batch itself is cancelled, e.g. on
+            # shutdown, so nobody waits on a future that is never resolved.
+            for future in pending.values():
+                future.cancel()
+            raise
+        for key, future in pending.items():
+            if not future.done():
+                future.set_result(results.get(key))
+
+
+class CoalescingBackend(BackendWrapper):
+    """Backend that coalesces concurrent lookups into batched queries.
+
+    Concurrent `get` and `has` calls are collected for up to `window` seconds,
+    or until `max_batch` distinct keys are waiting, and resolved with a single
+    `get_many`/`has_many` call on the wrapped backend. Every other operation
+    is forwarded unchanged. Implements the ICacheBackend interface.
+    """
+
+    def __init__(
+        self,
+        backend: ICacheBackend,
+        window: float = 0.001,
+        max_batch: int = 100,
+    ) -> None:
+        """Initialize the CoalescingBackend.
+
+        Args:
+            backend (ICacheBackend): The backend to send the batched queries to.
+            window (float): Seconds to collect keys for before querying.
+            max_batch (int): Number of distinct keys that triggers a query.
+        """
+        super().__init__(backend)
+        self.getter = Coalescer(backend.get_many, window, max_batch)
+        self.checker = Coalescer(backend.has_many, window, max_batch)
+
+    async def get(self, key: str) -> Any | None:
+        """Retrieve a cache entry by key as part of the next batch.
+
+        Args:
+            key: The key to retrieve.
+
+        Returns:
+            The value associated with the key, or None if not found or expired.
+        """
+        return await self.getter.load(key)
+
+    async def has(self, key: str) -> bool:
+        """Check if a cache entry exists as part of the next batch.
+
+        Args:
+            key: The key to check.
+
+        Returns:
+            True if the entry exists and is not expired, otherwise False.
+        """
+        return bool(await self.checker.load(key))
@@ -0,0 +1,219 @@
+"""This module contains the value compressors.
+
+Large serialized values are compressed before they are stored, which reduces
+both the network transfer of every read and write and the TOAST storage they
+use in Postgres. Each compressor has a fixed codec id, recorded in the header
+of the stored payload, so entries written with different compressors, or
+without compression, can be read side by side.
+
+The lz4 and zstd compressors are only available when the corresponding
+package is installed.
+"""
+
+import threading
+import zlib
+
+from psqache.abcs import ICompressor
+from psqache.serializers import import_optional
+
+
+class ZlibCompressor:
+    """Compressor using the standard library zlib module.
+
+    Implements the ICompressor interface.
+    """
+
+    name = "zlib"
+    id = 1
+
+    def __init__(self, level: int = 6) -> None:
+        """Initialize the ZlibCompressor.
+
+        Args:
+            level (int): The compression level, from 1 (fastest) to 9
+                (smallest).
+        """
+        self.level = level
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress serialized data.
+
+        Args:
+            data (bytes): The data to compress.
+
+        Returns:
+            bytes: The compressed data.
+        """
+        return zlib.compress(data, self.level)
+
+    @staticmethod
+    def decompress(data: bytes) -> bytes:
+        """Decompress compressed data.
+
+        Args:
+            data (bytes): The compressed data.
+
+        Returns:
+            bytes: The decompressed data.
+        """
+        return zlib.decompress(data)
+
+
+class Lz4Compressor:
+    """Compressor using lz4 frames, trading ratio for speed.
+
+    Implements the ICompressor interface.
+    """
+
+    name = "lz4"
+    id = 2
+
+    def __init__(self, level: int = 0) -> None:
+        """Initialize the Lz4Compressor.
+
+        Args:
+            level (int): The compression level, 0 for the fast mode and up to
+                16 for the high compression mode.
+        """
+        self.level = level
+        self.frame = import_optional("lz4.frame", "The lz4 compressor")
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress serialized data.
+
+        Args:
+            data (bytes): The data to compress.
+
+        Returns:
+            bytes: The compressed data.
+        """
+        compressed: bytes = self.frame.compress(data, compression_level=self.level)
+        return compressed
+
+    def decompress(self, data: bytes) -> bytes:
+        """Decompress compressed data.
+
+        Args:
+            data (bytes): The compressed data.
+
+        Returns:
+            bytes: The decompressed data.
+        """
+        decompressed: bytes = self.frame.decompress(data)
+        return decompressed
+
+
+class ZstdCompressor:
+    """Compressor using zstandard, with a better ratio than zlib at its speed.
+
+    A zstd context must not be used by several threads at once, while large
+    values are compressed in worker threads, so every thread gets its own
+    compression and decompression contexts.
+
+    Implements the ICompressor interface.
+    """
+
+    name = "zstd"
+    id = 3
+
+    def __init__(self, level: int = 3) -> None:
+        """Initialize the ZstdCompressor.
+
+        Args:
+            level (int): The compression level, from 1 (fastest) to 22
+                (smallest).
+        """
+        self.zstandard = import_optional("zstandard", "The zstd compressor")
+        self.level = level
+        self.local = threading.local()
+        self.contexts()
+
+    def contexts(self) -> threading.local:
+        """Get the zstd contexts of the current thread, creating them if needed.
+
+        Returns:
+            threading.local: The thread-local holder of the compressor and
+                decompressor.
+        """
+        local = self.local
+        if not hasattr(local, "compressor"):
+            local.compressor = self.zstandard.ZstdCompressor(level=self.level)
+            local.decompressor = self.zstandard.ZstdDecompressor()
+        return local
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress serialized data.
+
+        Args:
+            data (bytes): The data to compress.
+
+        Returns:
+            bytes: The compressed data.
+        """
+        compressed: bytes = self.contexts().compressor.compress(data)
+        return compressed
+
+    def decompress(self, data: bytes) -> bytes:
+        """Decompress compressed data.
+
+        Args:
+            data (bytes): The compressed data.
+
+        Returns:
+            bytes: The decompressed data.
+        """
+        decompressed: bytes = self.contexts().decompressor.decompress(data)
+        return decompressed
+
+
+COMPRESSORS: dict[str, type[ICompressor]] = {
+    compressor.name: compressor
+    for compressor in (ZlibCompressor, Lz4Compressor, ZstdCompressor)
+}
+
+CODECS: dict[int, type[ICompressor]] = {
+    compressor.id: compressor for compressor in COMPRESSORS.values()
+}
+
+
+def get_compressor(compressor: str | ICompressor) -> ICompressor:
+    """Get a compressor by name.
+
+    Args:
+        compressor (str | ICompressor): The name of the compressor, or a
+            compressor instance which is returned as is.
+
+    Returns:
+        ICompressor: The compressor.
+
+    Raises:
+        ValueError: If there is no compressor with the given name.
+    """
+    if not isinstance(compressor, str):
+        return compressor
+    try:
+        compressor_class = COMPRESSORS[compressor]
+    except KeyError:
+        msg = f"Unknown compressor {compressor!r}, expected one of {list(COMPRESSORS)}"
+        raise ValueError(msg) from None
+    return compressor_class()
+
+
+def get_codec(codec: int) -> ICompressor:
+    """Get the compressor for the codec id of a stored payload.
+
+    Args:
+        codec (int): The codec id.
+
+    Returns:
+        ICompressor: The compressor.
+
+    Raises:
+        ValueError: If there is no compressor with the given codec id.
+    """
+    try:
+        compressor_class = CODECS[codec]
+    except KeyError:
+        msg = f"Unknown compression codec {codec}"
+        raise ValueError(msg) from None
+    return compressor_class()
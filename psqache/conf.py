@@ -7,3 +7,4 @@ from pathlib import Path
 
 ROOT_DIR = Path(__file__).parent.parent
 QUERY_FILE_PATH = ROOT_DIR / "psqache/queries.sql"
+PARTITIONED_QUERY_FILE_PATH = ROOT_DIR / "psqache/partitioned.sql"
@@ -0,0 +1,199 @@
+"""This module contains the function caching decorator.
+
+The decorator caches the result of a function under a key built from its
+arguments. Keys are built on every call, so everything that can be derived
+from the function signature is computed once, when the function is decorated,
+and the per-call work is limited to mapping the arguments to their names.
+"""
+
+import functools
+import hashlib
+import inspect
+from collections.abc import Callable
+from typing import Any
+from typing import ParamSpec
+from typing import Protocol
+from typing import TypeVar
+from typing import cast
+
+from psqache.abcs import ICache
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+MAX_KEY_LENGTH = 250
+"""Keys longer than this are shortened by hashing their argument part."""
+
+
+class CachedFunction(Protocol[P, R]):
+    """A function wrapped by the caching decorator.
+
+    Attributes:
+        invalidate: Delete the cached result for the given arguments. Returns
+            a coroutine when the wrapped function is a coroutine function.
+        bypass: Call the wrapped function without reading or writing the cache.
+        key: Build the cache key for the given arguments.
+    """
+
+    invalidate: Callable[P, Any]
+    bypass: Callable[P, R]
+    key: Callable[P, str]
+
+    def __call__(self, *args: P.args, **kwargs: P.kwargs) -> R:
+        """Call the function, returning the cached result when there is one."""
+        ...
+
+
+class KeyBuilder:
+    """Builds cache keys from the arguments of a function.
+
+    The signature of the function is inspected once, when the builder is
+    created. Arguments are mapped to their parameter names, with defaults
+    filled in, so a call passing an argument by position or by keyword gets
+    the same key.
+
+    Argument values are rendered with `repr`, so they must have a stable
+    representation, or a custom key must be given.
+    """
+
+    def __init__(
+        self,
+        func: Callable[..., Any],
+        key: str | Callable[..., str] | None = None,
+        namespace: str | None = None,
+    ) -> None:
+        """Initialize the KeyBuilder.
+
+        Args:
+            func (Callable): The function to build keys for.
+            key (Optional[str | Callable]): A format string rendered with the
+                arguments by name, or a function returning the key part from
+                the arguments. Defaults to all the arguments.
+            namespace (Optional[str]): The prefix of the keys. Defaults to the
+                qualified name of the function when no key is given.
+        """
+        self.key = key
+        if namespace is None and key is None:
+            namespace = f"{func.__module__}.{func.__qualname__}"
+        self.prefix = f"{namespace}:" if namespace else ""
+        self.positional: list[str] = []
+        self.var_positional: str | None = None
+        self.defaults: dict[str, Any] = {}
+        for parameter in inspect.signature(func).parameters.values():
+            if parameter.kind is parameter.VAR_POSITIONAL:
+                self.var_positional = parameter.name
+                continue
+            if parameter.kind is parameter.VAR_KEYWORD:
+                continue
+            if parameter.kind is not parameter.KEYWORD_ONLY:
+                self.positional.append(parameter.name)
+            if parameter.default is not parameter.empty:
+                self.defaults[parameter.name] = parameter.default
+        self.arity = len(self.positional)
+
+    def bind(self, args: tuple[Any, ...], kwargs: dict[str, Any]) -> dict[str, Any]:
+        """Map the arguments of a call to their parameter names.
+
+        Args:
+            args (tuple): The positional arguments of the call.
+            kwargs (dict): The keyword arguments of the call.
+
+        Returns:
+            dict[str, Any]: The arguments by parameter name, defaults included.
+        """
+        bound = self.defaults.copy()
+        bound.update(zip(self.positional, args, strict=False))
+        if len(args) > self.arity:
+            bound[self.var_positional or "*"] = args[self.arity :]
+        bound.update(kwargs)
+        return bound
+
+    def __call__(self, args: tuple[Any, ...], kwargs: dict[str, Any]) -> str:
+        """Build the cache key for the arguments of a call.
+
+        Args:
+            args (tuple): The positional arguments of the call.
+            kwargs (dict): The keyword arguments of the call.
+
+        Returns:
+            str: The cache key.
+        """
+        if callable(self.key):
+            part = self.key(*args, **kwargs)
+        elif self.key is not None:
+            part = self.key.format_map(self.bind(args, kwargs))
+        else:
+            bound = self.bind(args, kwargs)
+            part = ",".join(f"{name}={bound[name]!r}" for name in sorted(bound))
+        if len(self.prefix) + len(part) > MAX_KEY_LENGTH:
+            part = hashlib.blake2b(part.encode(), digest_size=16).hexdigest()
+        return self.prefix + part
+
+
+def cached(
+    cache: ICache,
+    ttl: int | None = None,
+    key: str | Callable[..., str] | None = None,
+    namespace: str | None = None,
+    *,
+    distributed: bool = False,
+) -> Callable[[Callable[P, R]], CachedFunction[P, R]]:
+    """Cache the results of a function or coroutine function.
+
+    Results are read and written with get-or-set semantics, so concurrent
+    calls with the same arguments only call the function once.
+
+    Args:
+        cache (ICache): The cache to store the results in.
+        ttl (Optional[int]): Time to live of the results. Defaults to None.
+        key (Optional[str | Callable]): A format string rendered with the
+            arguments by name, or a function returning the key part from the
+            arguments. Defaults to all the arguments.
+        namespace (Optional[str]): The prefix of the keys. Defaults to the
+            qualified name of the function when no key is given.
+        distributed (bool): Also deduplicate calls across processes.
+
+    Returns:
+        Callable: The decorator.
+    """
+
+    def decorator(func: Callable[P, R]) -> CachedFunction[P, R]:
+        build_key = KeyBuilder(func, key=key, namespace=namespace)
+        wrapper: Callable[..., Any]
+        invalidate: Callable[..., Any]
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def wrapper(*args: Any, **kwargs: Any) -> Any:
+                return await cache.aget_or_set(
+                    build_key(args, kwargs),
+                    lambda: func(*args, **kwargs),
+                    ttl,
+                    distributed=distributed,
+                )
+
+            async def invalidate(*args: Any, **kwargs: Any) -> None:
+                await cache.adelete(build_key(args, kwargs))
+
+        else:
+
+            @functools.wraps(func)
+            def wrapper(*args: Any, **kwargs: Any) -> Any:
+                return cache.get_or_set(
+                    build_key(args, kwargs),
+                    lambda: func(*args, **kwargs),
+                    ttl,
+                    distributed=distributed,
+                )
+
+            def invalidate(*args: Any, **kwargs: Any) -> None:
+                cache.delete(build_key(args, kwargs))
+
+        cached_function = cast(CachedFunction[P, R], wrapper)
+        cached_function.invalidate = invalidate
+        cached_function.bypass = func
+        cached_function.key = lambda *args, **kwargs: build_key(args, kwargs)
+        return cached_function
+
+    return decorator
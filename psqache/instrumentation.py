@@ -0,0 +1,292 @@
+"""This module contains the instrumented cache backend.
+
+The instrumented backend measures the operations of the backend it wraps:
+their durations and errors, the hits and misses of the reads, and the
+entries written and deleted. It reports them to a metrics sink, see
+`psqache.metrics`. The Postgres backend reports the pool, query and
+serialization measures itself when it is given a sink.
+"""
+
+import time
+from collections.abc import Awaitable
+from collections.abc import Mapping
+from typing import Any
+from typing import TypeVar
+
+from psqache.abcs import CacheEntry
+from psqache.abcs import ICacheBackend
+from psqache.abcs import IMetricsSink
+from psqache.backends import BackendWrapper
+from psqache.metrics import DELETES
+from psqache.metrics import ERRORS
+from psqache.metrics import HITS
+from psqache.metrics import MISSES
+from psqache.metrics import OPERATION_SECONDS
+from psqache.metrics import SETS
+
+T = TypeVar("T")
+
+
+class InstrumentedBackend(BackendWrapper):
+    """Backend reporting the measures of the operations of another backend.
+
+    Every operation records its duration, and its error if it raises, under
+    its name. Reads count a hit or a miss per key, writes and deletes count
+    their entries. The lock is forwarded without measures.
+    Implements the ICacheBackend interface.
+    """
+
+    def __init__(self, backend: ICacheBackend, sink: IMetricsSink) -> None:
+        """Initialize the InstrumentedBackend.
+
+        Args:
+            backend (ICacheBackend): The backend to measure.
+            sink (IMetricsSink): The sink receiving the measures.
+        """
+        super().__init__(backend)
+        self.sink = sink
+
+    async def measure(self, operation: str, awaitable: Awaitable[T]) -> T:
+        """Await an operation, recording its duration and error.
+
+        Args:
+            operation (str): The name of the operation.
+            awaitable (Awaitable): The operation.
+
+        Returns:
+            Any: The result of the operation.
+        """
+        start = time.perf_counter()
+        try:
+            return await awaitable
+        except Exception:
+            self.sink.increment(ERRORS, 1, operation)
+            raise
+        finally:
+            self.sink.observe(
+                OPERATION_SECONDS,
+                time.perf_counter() - start,
+                operation,
+            )
+
+    async def get(self, key: str) -> Any | None:
+        """Retrieve a cache entry by key, counting a hit or a miss.
+
+        Args:
+            key: The key to retrieve.
+
+        Returns:
+            The value associated with the key, or None if not found or expired.
+        """
+        value = await self.measure("get", self.backend.get(key))
+        self.sink.increment(HITS if value is not None else MISSES, 1, "get")
+        return value
+
+    async def get_entry(self, key: str) -> CacheEntry | None:
+        """Retrieve a cache entry with its expiry, counting a hit or a miss.
+
+        Args:
+            key: The key to retrieve.
+
+        Returns:
+            The entry, or None if not found or expired.
+        """
+        entry = await self.measure("get_entry", self.backend.get_entry(key))
+        self.sink.increment(HITS if entry is not None else MISSES, 1, "get_entry")
+        return entry
+
+    async def set(self, key: str, value: dict, ttl: int) -> None:
+        """Set or update a cache entry with a time-to-live.
+
+        Args:
+            key: The key to set.
+            value: The value to associate with the key.
+            ttl: Time-to-live in seconds for the entry.
+        """
+        await self.measure("set", self.backend.set(key, value, ttl))
+        self.sink.increment(SETS, 1, "set")
+
+    async def delete(self, key: str) -> None:
+        """Delete a cache entry by key.
+
+        Args:
+            key: The key to delete.
+        """
+        await self.measure("delete", self.backend.delete(key))
+        self.sink.increment(DELETES, 1, "delete")
+
+    async def clear(self) -> None:
+        """Clear all cache entries."""
+        await self.measure("clear", self.backend.clear())
+
+    async def cleanup(self) -> None:
+        """Delete all expired cache entries."""
+        await self.measure("cleanup", self.backend.cleanup())
+
+    async def has(self, key: str) -> bool:
+        """Check if a cache entry exists and is not expired.
+
+        Args:
+            key: The key to check.
+
+        Returns:
+            True if the entry exists and is not expired, otherwise False.
+        """
+        return await self.measure("has", self.backend.has(key))
+
+    async def get_many(self, keys: list[str]) -> dict[str, Any]:
+        """Retrieve many cache entries, counting a hit or a miss per key.
+
+        Args:
+            keys: The keys to retrieve.
+
+        Returns:
+            The values found, keyed by key. Missing and expired keys are left out.
+        """
+        found = await self.measure("get_many", self.backend.get_many(keys))
+        self.sink.increment(HITS, len(found), "get_many")
+        self.sink.increment(MISSES, len(keys) - len(found), "get_many")
+        return found
+
+    async def get_entries(self, keys: list[str]) -> dict[str, CacheEntry]:
+        """Retrieve many cache entries with their expiry, counting hits and misses.
+
+        Args:
+            keys: The keys to retrieve.
+
+        Returns:
+            The entries found, keyed by key. Missing and expired keys are left out.
+        """
+        found = await self.measure("get_entries", self.backend.get_entries(keys))
+        self.sink.increment(HITS, len(found), "get_entries")
+        self.sink.increment(MISSES, len(keys) - len(found), "get_entries")
+        return found
+
+    async def set_many(self, mapping: Mapping[str, dict], ttl: int) -> None:
+        """Set or update many cache entries in a single round trip.
+
+        Args:
+            mapping: The values to set, keyed by key.
+            ttl: Time-to-live in seconds for the entries.
+        """
+        await self.measure("set_many", self.backend.set_many(mapping, ttl))
+        self.sink.increment(SETS, len(mapping), "set_many")
+
+    async def import_entries(self, mapping: Mapping[str, Any], ttl: int) -> int:
+        """Set many cache entries in bulk, counting the entries written.
+
+        Args:
+            mapping: The values to set, keyed by key.
+            ttl: Time-to-live in seconds for the entries.
+
+        Returns:
+            The number of entries written.
+        """
+        imported = await self.measure(
+            "import_entries",
+            self.backend.import_entries(mapping, ttl),
+        )
+        self.sink.increment(SETS, imported, "import_entries")
+        return imported
+
+    async def delete_many(self, keys: list[str]) -> None:
+        """Delete many cache entries by key in a single round trip.
+
+        Args:
+            keys: The keys to delete.
+        """
+        await self.measure("delete_many", self.backend.delete_many(keys))
+        self.sink.increment(DELETES, len(keys), "delete_many")
+
+    async def has_many(self, keys: list[str]) -> dict[str, bool]:
+        """Check which of the given keys exist and are not expired.
+
+        Args:
+            keys: The keys to check.
+
+        Returns:
+            True for the keys that exist and are not expired, otherwise False.
+        """
+        return await self.measure("has_many", self.backend.has_many(keys))
+
+    async def touch(self, key: str, ttl: int) -> bool:
+        """Reset the time-to-live of a cache entry without rewriting its value.
+
+        Args:
+            key: The key to touch.
+            ttl: Time-to-live in seconds for the entry, from now.
+
+        Returns:
+            True if the entry exists and is not expired, otherwise False.
+        """
+        return await self.measure("touch", self.backend.touch(key, ttl))
+
+    async def touch_many(self, keys: list[str], ttl: int) -> dict[str, bool]:
+        """Reset the time-to-live of many cache entries in a single round trip.
+
+        Args:
+            keys: The keys to touch.
+            ttl: Time-to-live in seconds for the entries, from now.
+
+        Returns:
+            True for the keys that exist and are not expired, otherwise False.
+        """
+        return await self.measure("touch_many", self.backend.touch_many(keys, ttl))
+
+    async def incr(self, key: str, delta: int, ttl: int, initial: int) -> int:
+        """Increment a counter atomically.
+
+        Args:
+            key: The key of the counter.
+            delta: The amount to add, negative to decrement.
+            ttl: Time-to-live in seconds of the counter, if it is created.
+            initial: The value of the counter, if it is created.
+
+        Returns:
+            The new value of the counter.
+        """
+        return await self.measure(
+            "incr",
+            self.backend.incr(key, delta, ttl, initial),
+        )
+
+    async def incr_many(
+        self,
+        deltas: Mapping[str, int],
+        ttl: int,
+        initial: int,
+    ) -> dict[str, int]:
+        """Increment many counters atomically in a single round trip.
+
+        Args:
+            deltas: The amounts to add, keyed by key.
+            ttl: Time-to-live in seconds of the counters that are created.
+            initial: The value of the counters that are created.
+
+        Returns:
+            The new values of the counters, keyed by key.
+        """
+        return await self.measure(
+            "incr_many",
+            self.backend.incr_many(deltas, ttl, initial),
+        )
+
+    async def get_counter(self, key: str) -> int | None:
+        """Get the value of a counter by key.
+
+        Args:
+            key: The key of the counter.
+
+        Returns:
+            The value of the counter, or None if it does not exist or has
+            expired.
+        """
+        return await self.measure("get_counter", self.backend.get_counter(key))
+
+    async def delete_counter(self, key: str) -> None:
+        """Delete a counter by key.
+
+        Args:
+            key: The key of the counter.
+        """
+        await self.measure("delete_counter", self.backend.delete_counter(key))
@@ -0,0 +1,133 @@
+"""This module contains the cross-process invalidation listener.
+
+A local tier only stays correct across processes if every write made by one
+process evicts the copies held by the others. The Postgres backend can send
+the changed keys on a NOTIFY channel; the listener in this module receives
+them on a dedicated connection and evicts the keys from the local cache.
+
+Notifications sent while the listener is disconnected are lost, so the whole
+local cache is flushed whenever the connection is lost or re-established.
+"""
+
+import asyncio
+import contextlib
+import json
+import logging
+
+import asyncpg
+
+from psqache.tiers import LocalCache
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidationListener:
+    """Evicts keys from a local cache when other processes change them.
+
+    The listener runs as a background task holding its own connection, so it
+    never takes a connection from the backend pool.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        dsn: str,
+        channel: str,
+        local: LocalCache,
+        *,
+        origin: str | None = None,
+        ping_interval: float = 30,
+        max_reconnect_delay: float = 30,
+    ) -> None:
+        """Initialize the InvalidationListener.
+
+        Args:
+            dsn (str): The DSN for the Postgres database.
+            channel (str): The channel the backends send invalidations on.
+            local (LocalCache): The local cache to evict keys from.
+            origin (Optional[str]): The origin of the backend writing through
+                the local cache. Its own messages are ignored, since the local
+                cache is already up to date with those writes.
+            ping_interval (float): Seconds between connection health checks.
+            max_reconnect_delay (float): Upper bound of the reconnect backoff.
+        """
+        self.dsn = dsn
+        self.channel = channel
+        self.local = local
+        self.origin = origin
+        self.ping_interval = ping_interval
+        self.max_reconnect_delay = max_reconnect_delay
+        self.task: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        """Start listening in a background task."""
+        if self.task is None or self.task.done():
+            self.task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self) -> None:
+        """Stop listening and close the connection."""
+        if self.task is not None:
+            self.task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self.task
+            self.task = None
+
+    def handle(
+        self,
+        _connection: asyncpg.Connection,
+        _pid: int,
+        _channel: str,
+        payload: str,
+    ) -> None:
+        """Evict the keys named in an invalidation message.
+
+        Args:
+            _connection (asyncpg.Connection): The listening connection.
+            _pid (int): The process id of the notifying server backend.
+            _channel (str): The channel the message was sent on.
+            payload (str): The JSON encoded message.
+        """
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            logger.warning("Flushing local cache on malformed invalidation message")
+            self.local.clear()
+            return
+        if self.origin is not None and message.get("origin") == self.origin:
+            return
+        keys = message.get("keys")
+        if keys is None:
+            self.local.clear()
+            return
+        for key in keys:
+            self.local.delete(key)
+
+    async def listen(self) -> None:
+        """Listen on a single connection until it is lost."""
+        lost = asyncio.Event()
+        connection: asyncpg.Connection = await asyncpg.connect(self.dsn)
+        try:
+            connection.add_termination_listener(lambda _: lost.set())
+            await connection.add_listener(self.channel, self.handle)
+            # Anything sent before LISTEN took effect was missed.
+            self.local.clear()
+            while not lost.is_set():
+                with contextlib.suppress(TimeoutError):
+                    await asyncio.wait_for(lost.wait(), self.ping_interval)
+                if not lost.is_set():
+                    await connection.execute("SELECT 1")
+        finally:
+            with contextlib.suppress(Exception):
+                await connection.close()
+
+    async def run(self) -> None:
+        """Listen forever, reconnecting with backoff when the connection is lost."""
+        delay = 0.0
+        while True:
+            try:
+                await self.listen()
+                delay = 0.1
+            except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError):
+                logger.warning("Invalidation listener connection failed", exc_info=True)
+                delay = min(max(delay * 2, 0.1), self.max_reconnect_delay)
+            self.local.clear()
+            await asyncio.sleep(delay)
@@ -0,0 +1,205 @@
+"""This module contains the background expiry reaper.
+
+Expired entries are never returned, but they stay in the table until they
+are deleted. Deleting a large backlog in one statement holds its locks for a
+long time, spikes I/O and leaves the table bloated. The reaper instead runs
+in the background and deletes expired entries in bounded batches, paced to a
+target rate and paused while the application is using most of the pool.
+
+Only one process reaps at a time: the reaper holding a session advisory lock
+on its own connection leads, and the others wait to take over.
+"""
+
+import asyncio
+import contextlib
+import logging
+import time
+from typing import Any
+from typing import NamedTuple
+
+import asyncpg
+
+from psqache.queries import Queries
+
+logger = logging.getLogger(__name__)
+
+
+class ReaperStats(NamedTuple):
+    """Statistics of an expiry reaper.
+
+    Attributes:
+        leader: Whether this reaper holds the lock and is reaping.
+        reaped: The number of entries deleted since the reaper started.
+        batches: The number of batches run since the reaper started.
+        lag: Seconds between the expiry and the deletion of the oldest entry
+            of the last batch, showing how far behind the reaper is.
+        backoffs: The number of times the reaper paused for a busy pool.
+    """
+
+    leader: bool
+    reaped: int
+    batches: int
+    lag: float
+    backoffs: int
+
+
+class ExpiryReaper:
+    """Deletes expired entries in the background, in paced batches.
+
+    The reaper runs as a background task holding its own connection, which
+    also holds the advisory lock electing the single reaping process.
+    """
+
+    LOCK_NAME = "reaper"
+    """Name of the maintenance lock held by the leading reaper."""
+
+    def __init__(  # noqa: PLR0913
+        self,
+        dsn: str,
+        pool: asyncpg.pool.Pool | None = None,
+        *,
+        batch_size: int = 1000,
+        rows_per_second: float = 5000,
+        idle_interval: float = 10,
+        max_pool_utilization: float = 0.8,
+        backoff_interval: float = 1,
+        max_reconnect_delay: float = 30,
+        queries: Any = Queries,
+    ) -> None:
+        """Initialize the ExpiryReaper.
+
+        Args:
+            dsn (str): The DSN for the Postgres database.
+            pool (Optional[asyncpg.pool.Pool]): The pool of the application,
+                whose utilization is watched. Defaults to None, which never
+                backs off.
+            batch_size (int): The maximum number of entries deleted per batch.
+            rows_per_second (float): The target deletion rate.
+            idle_interval (float): Seconds to wait once there is nothing left
+                to delete, and between attempts to take the lock.
+            max_pool_utilization (float): The fraction of the pool in use from
+                which the reaper pauses.
+            backoff_interval (float): Seconds to pause for when the pool is busy.
+            max_reconnect_delay (float): Upper bound of the reconnect backoff.
+            queries (Any): The queries of the schema to clean up, such as the
+                `queries` of the backend. Defaults to the regular cache table.
+        """
+        self.dsn = dsn
+        self.pool = pool
+        self.batch_size = batch_size
+        self.rows_per_second = rows_per_second
+        self.idle_interval = idle_interval
+        self.max_pool_utilization = max_pool_utilization
+        self.backoff_interval = backoff_interval
+        self.max_reconnect_delay = max_reconnect_delay
+        self.queries = queries
+        self.leader = False
+        self.reaped = 0
+        self.batches = 0
+        self.lag = 0.0
+        self.backoffs = 0
+        self.task: asyncio.Task[None] | None = None
+
+    @property
+    def stats(self) -> ReaperStats:
+        """The statistics of the reaper."""
+        return ReaperStats(
+            self.leader,
+            self.reaped,
+            self.batches,
+            self.lag,
+            self.backoffs,
+        )
+
+    def start(self) -> None:
+        """Start reaping in a background task."""
+        if self.task is None or self.task.done():
+            self.task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self) -> None:
+        """Stop reaping and close the connection, releasing the lock."""
+        if self.task is not None:
+            self.task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self.task
+            self.task = None
+
+    def pool_utilization(self) -> float:
+        """Compute the fraction of the pool connections in use.
+
+        Returns:
+            float: The fraction of the maximum pool size in use.
+        """
+        if self.pool is None:
+            return 0.0
+        in_use: int = self.pool.get_size() - self.pool.get_idle_size()
+        size: int = self.pool.get_max_size()
+        return in_use / size
+
+    async def reap(self, connection: asyncpg.Connection) -> int:
+        """Delete one batch of expired entries.
+
+        Args:
+            connection (asyncpg.Connection): The connection of the reaper.
+
+        Returns:
+            int: The number of entries deleted.
+        """
+        record = await connection.fetchrow(
+            self.queries.cleanup_expired_cache_entries.sql,
+            self.batch_size,
+        )
+        reaped: int = record["reaped"]
+        self.batches += 1
+        self.reaped += reaped
+        self.lag = record["lag"]
+        return reaped
+
+    async def lead(self, connection: asyncpg.Connection) -> None:
+        """Wait until the connection holds the lock of the reaper.
+
+        Args:
+            connection (asyncpg.Connection): The connection of the reaper.
+        """
+        sql = self.queries.lock_maintenance_task.sql
+        while True:
+            if await connection.fetchval(sql, self.LOCK_NAME):
+                self.leader = True
+                return
+            await asyncio.sleep(self.idle_interval)
+
+    async def reap_forever(self) -> None:
+        """Take the lock and reap on a single connection until it fails."""
+        connection: asyncpg.Connection = await asyncpg.connect(self.dsn)
+        try:
+            await self.lead(connection)
+            while True:
+                if self.pool_utilization() >= self.max_pool_utilization:
+                    self.backoffs += 1
+                    await asyncio.sleep(self.backoff_interval)
+                    continue
+                start = time.monotonic()
+                reaped = await self.reap(connection)
+                if reaped < self.batch_size:
+                    await asyncio.sleep(self.idle_interval)
+                    continue
+                elapsed = time.monotonic() - start
+                await asyncio.sleep(max(reaped / self.rows_per_second - elapsed, 0))
+        finally:
+            self.leader = False
+            with contextlib.suppress(Exception):
+                await connection.close()
+
+    async def run(self) -> None:
+        """Reap forever, reconnecting with backoff when the connection fails."""
+        delay = 0.0
+        while True:
+            batches = self.batches
+            try:
+                await self.reap_forever()
+            except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError):
+                logger.warning("Expiry reaper connection failed", exc_info=True)
+            if self.batches > batches:
+                delay = 0.0
+            delay = min(max(delay * 2, 0.1), self.max_reconnect_delay)
+            await asyncio.sleep(delay)
@@ -0,0 +1,472 @@
+"""This module contains the metrics sinks of the cache.
+
+Instrumented backends and caches report their measures to a sink, an
+IMetricsSink, through three calls: `increment` for counters, `observe` for
+durations and `gauge` for current values. `Metrics` keeps them in process,
+for snapshots and the Prometheus text format, and `OpenTelemetrySink`
+forwards them to the instruments of an OpenTelemetry meter.
+
+Nothing is measured unless a sink is configured: the instrumented code only
+checks that its sink is None, so disabled metrics cost a comparison per
+operation and allocate nothing.
+"""
+
+import bisect
+from collections.abc import Sequence
+from typing import Any
+from typing import NamedTuple
+
+HITS = "hits"
+"""Counter of the keys read that were found."""
+
+MISSES = "misses"
+"""Counter of the keys read that were missing or expired."""
+
+SETS = "sets"
+"""Counter of the entries written."""
+
+DELETES = "deletes"
+"""Counter of the entries deleted."""
+
+ERRORS = "errors"
+"""Counter of the operations that raised an error."""
+
+BYTES_IN = "bytes_in"
+"""Counter of the bytes of the values read from the database."""
+
+BYTES_OUT = "bytes_out"
+"""Counter of the bytes of the values written to the database."""
+
+OPERATION_SECONDS = "operation_seconds"
+"""Histogram of the durations of the cache operations."""
+
+POOL_ACQUIRE_SECONDS = "pool_acquire_seconds"
+"""Histogram of the waits for a pool connection."""
+
+QUERY_SECONDS = "query_seconds"
+"""Histogram of the durations pool connections are held for queries."""
+
+SERIALIZE_SECONDS = "serialize_seconds"
+"""Histogram of the durations of serializing and compressing values."""
+
+DESERIALIZE_SECONDS = "deserialize_seconds"
+"""Histogram of the durations of decompressing and deserializing values."""
+
+POOL_SATURATION = "pool_saturation"
+"""Gauge of the share of the pool's maximum size in use, from 0 to 1."""
+
+DESCRIPTIONS = {
+    HITS: "Keys read that were found.",
+    MISSES: "Keys read that were missing or expired.",
+    SETS: "Entries written.",
+    DELETES: "Entries deleted.",
+    ERRORS: "Operations that raised an error.",
+    BYTES_IN: "Bytes of the values read from the database.",
+    BYTES_OUT: "Bytes of the values written to the database.",
+    OPERATION_SECONDS: "Durations of the cache operations.",
+    POOL_ACQUIRE_SECONDS: "Waits for a pool connection.",
+    QUERY_SECONDS: "Durations pool connections are held for queries.",
+    SERIALIZE_SECONDS: "Durations of serializing and compressing values.",
+    DESERIALIZE_SECONDS: "Durations of decompressing and deserializing values.",
+    POOL_SATURATION: "Share of the maximum size of the pool in use.",
+}
+"""Descriptions of the metrics, for the exported formats."""
+
+LATENCY_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+)
+"""Upper bounds in seconds of the histogram buckets, from 0.1ms to 2.5s."""
+
+
+class HistogramSnapshot(NamedTuple):
+    """The state of a histogram at a point in time.
+
+    Attributes:
+        buckets: The upper bounds of the buckets, in seconds.
+        counts: The number of durations in each bucket, the last one counting
+            the durations above every bound.
+        sum: The total of the durations.
+        observations: The number of durations.
+    """
+
+    buckets: tuple[float, ...]
+    counts: tuple[int, ...]
+    sum: float
+    observations: int
+
+    def quantile(self, quantile: float) -> float:
+        """Estimate a quantile as the upper bound of the bucket holding it.
+
+        Args:
+            quantile (float): The quantile, from 0 to 1.
+
+        Returns:
+            float: The estimate in seconds, infinite when the quantile is
+                above every bound, zero when the histogram is empty.
+        """
+        if not self.observations:
+            return 0.0
+        rank = quantile * self.observations
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts, strict=False):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class MetricsSnapshot(NamedTuple):
+    """The state of in-process metrics at a point in time.
+
+    Measures that are not specific to an operation are keyed by an empty
+    operation name.
+
+    Attributes:
+        counters: The counters, keyed by name, then by operation.
+        histograms: The histograms, keyed by name, then by operation.
+        gauges: The gauges, keyed by name.
+    """
+
+    counters: dict[str, dict[str, int]]
+    histograms: dict[str, dict[str, HistogramSnapshot]]
+    gauges: dict[str, float]
+
+    def total(self, name: str) -> int:
+        """Add up a counter over every operation.
+
+        Args:
+            name (str): The name of the counter.
+
+        Returns:
+            int: The total of the counter, zero if it was never incremented.
+        """
+        return sum(self.counters.get(name, {}).values())
+
+    @property
+    def hit_ratio(self) -> float | None:
+        """The share of the keys read that were found, None before any read."""
+        hits, misses = self.total(HITS), self.total(MISSES)
+        if not hits + misses:
+            return None
+        return hits / (hits + misses)
+
+
+class Histogram:
+    """Histogram of durations over fixed buckets."""
+
+    __slots__ = ("buckets", "counts", "observations", "sum")
+
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        """Initialize the Histogram.
+
+        Args:
+            buckets (tuple[float, ...]): The sorted upper bounds of the
+                buckets, in seconds.
+        """
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.observations = 0
+
+    def observe(self, seconds: float) -> None:
+        """Record a duration.
+
+        Args:
+            seconds (float): The duration in seconds.
+        """
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.sum += seconds
+        self.observations += 1
+
+    def snapshot(self) -> HistogramSnapshot:
+        """Copy the state of the histogram.
+
+        Returns:
+            HistogramSnapshot: The state of the histogram.
+        """
+        return HistogramSnapshot(
+            self.buckets,
+            tuple(self.counts),
+            self.sum,
+            self.observations,
+        )
+
+
+class Metrics:
+    """Metrics sink keeping the measures in process.
+
+    Counters, histograms and gauges are created on their first measure.
+    Read them with `snapshot`, or export them in the Prometheus text format
+    with `prometheus`. Implements the IMetricsSink interface.
+    """
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        """Initialize the Metrics.
+
+        Args:
+            buckets (Sequence[float]): The upper bounds in seconds of the
+                buckets of the histograms.
+        """
+        self.buckets = tuple(sorted(buckets))
+        self.counters: dict[str, dict[str, int]] = {}
+        self.histograms: dict[str, dict[str, Histogram]] = {}
+        self.gauges: dict[str, float] = {}
+
+    def increment(self, name: str, amount: int, operation: str) -> None:
+        """Add to a counter.
+
+        Args:
+            name (str): The name of the counter.
+            amount (int): The amount to add.
+            operation (str): The cache operation measured, or empty.
+        """
+        counters = self.counters.get(name)
+        if counters is None:
+            counters = self.counters[name] = {}
+        counters[operation] = counters.get(operation, 0) + amount
+
+    def observe(self, name: str, seconds: float, operation: str) -> None:
+        """Record a duration in a histogram.
+
+        Args:
+            name (str): The name of the histogram.
+            seconds (float): The duration in seconds.
+            operation (str): The cache operation measured, or empty.
+        """
+        histograms = self.histograms.get(name)
+        if histograms is None:
+            histograms = self.histograms[name] = {}
+        histogram = histograms.get(operation)
+        if histogram is None:
+            histogram = histograms[operation] = Histogram(self.buckets)
+        histogram.observe(seconds)
+
+    def gauge(self, name: str, value: float) -> None:
+        """Set the value of a gauge.
+
+        Args:
+            name (str): The name of the gauge.
+            value (float): The current value.
+        """
+        self.gauges[name] = value
+
+    def snapshot(self) -> MetricsSnapshot:
+        """Copy the measures.
+
+        Returns:
+            MetricsSnapshot: The state of the metrics.
+        """
+        return MetricsSnapshot(
+            {name: dict(counters) for name, counters in self.counters.items()},
+            {
+                name: {
+                    operation: histogram.snapshot()
+                    for operation, histogram in histograms.items()
+                }
+                for name, histograms in self.histograms.items()
+            },
+            dict(self.gauges),
+        )
+
+    def reset(self) -> None:
+        """Forget every measure."""
+        self.counters.clear()
+        self.histograms.clear()
+        self.gauges.clear()
+
+    def prometheus(self, namespace: str = "psqache") -> str:
+        """Export the measures in the Prometheus text format.
+
+        Args:
+            namespace (str): The prefix of the metric names.
+
+        Returns:
+            str: The exposition text, to serve on a metrics endpoint.
+        """
+        return render_prometheus(self.snapshot(), namespace)
+
+
+def labels(operation: str, **extra: str) -> str:
+    """Format the labels of a Prometheus sample.
+
+    Args:
+        operation (str): The cache operation, omitted when empty.
+        **extra (str): Other labels.
+
+    Returns:
+        str: The labels in braces, or an empty string without labels.
+    """
+    pairs = {"operation": operation} if operation else {}
+    pairs.update(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in pairs.items()) + "}"
+
+
+def render_prometheus(snapshot: MetricsSnapshot, namespace: str = "psqache") -> str:
+    """Render a snapshot in the Prometheus text exposition format.
+
+    Args:
+        snapshot (MetricsSnapshot): The measures.
+        namespace (str): The prefix of the metric names.
+
+    Returns:
+        str: The exposition text.
+    """
+    lines: list[str] = []
+    for name, counters in snapshot.counters.items():
+        metric = f"{namespace}_{name}_total"
+        lines.extend(header(metric, name, "counter"))
+        lines.extend(
+            f"{metric}{labels(operation)} {value}"
+            for operation, value in counters.items()
+        )
+    for name, histograms in snapshot.histograms.items():
+        metric = f"{namespace}_{name}"
+        lines.extend(header(metric, name, "histogram"))
+        for operation, histogram in histograms.items():
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts, strict=False):
+                cumulative += count
+                lines.append(
+                    f"{metric}_bucket{labels(operation, le=str(bound))} {cumulative}",
+                )
+            lines.extend((
+                f"{metric}_bucket{labels(operation, le='+Inf')} "
+                f"{histogram.observations}",
+                f"{metric}_sum{labels(operation)} {histogram.sum}",
+                f"{metric}_count{labels(operation)} {histogram.observations}",
+            ))
+    for name, value in snapshot.gauges.items():
+        metric = f"{namespace}_{name}"
+        lines.extend((*header(metric, name, "gauge"), f"{metric} {value}"))
+    return "".join(f"{line}\n" for line in lines)
+
+
+def header(metric: str, name: str, kind: str) -> tuple[str, str]:
+    """Build the HELP and TYPE lines of a Prometheus metric.
+
+    Args:
+        metric (str): The exported name of the metric.
+        name (str): The name of the measure.
+        kind (str): The Prometheus type of the metric.
+
+    Returns:
+        tuple[str, str]: The two lines.
+    """
+    return (
+        f"# HELP {metric} {DESCRIPTIONS.get(name, name)}",
+        f"# TYPE {metric} {kind}",
+    )
+
+
+class OpenTelemetrySink:
+    """Metrics sink forwarding the measures to an OpenTelemetry meter.
+
+    Instruments are created on their first measure, named after the metric
+    with a namespace prefix, such as `psqache.hits`, and the operation is
+    recorded as the `operation` attribute. The meter is only used through
+    the OpenTelemetry metrics API, which this package does not depend on.
+    Implements the IMetricsSink interface.
+    """
+
+    def __init__(self, meter: Any, namespace: str = "psqache") -> None:
+        """Initialize the OpenTelemetrySink.
+
+        Args:
+            meter (opentelemetry.metrics.Meter): The meter creating the
+                instruments.
+            namespace (str): The prefix of the instrument names.
+        """
+        self.meter = meter
+        self.namespace = namespace
+        self.instruments: dict[str, Any] = {}
+        self.attributes: dict[str, dict[str, str]] = {}
+
+    def instrument(self, kind: str, name: str, unit: str) -> Any:
+        """Get the instrument of a metric, creating it on first use.
+
+        Args:
+            kind (str): The kind of instrument: "counter", "histogram" or
+                "gauge".
+            name (str): The name of the metric.
+            unit (str): The unit of the metric.
+
+        Returns:
+            Any: The instrument.
+        """
+        instrument = self.instruments.get(name)
+        if instrument is None:
+            create = getattr(self.meter, f"create_{kind}")
+            instrument = self.instruments[name] = create(
+                f"{self.namespace}.{name}",
+                unit=unit,
+                description=DESCRIPTIONS.get(name, ""),
+            )
+        return instrument
+
+    def attributes_of(self, operation: str) -> dict[str, str] | None:
+        """Get the attributes of the measures of an operation.
+
+        Args:
+            operation (str): The cache operation, or empty.
+
+        Returns:
+            Optional[dict[str, str]]: The attributes, shared by every measure
+                of the operation, or None without an operation.
+        """
+        if not operation:
+            return None
+        attributes = self.attributes.get(operation)
+        if attributes is None:
+            attributes = self.attributes[operation] = {"operation": operation}
+        return attributes
+
+    def increment(self, name: str, amount: int, operation: str) -> None:
+        """Add to the counter of a metric.
+
+        Args:
+            name (str): The name of the counter.
+            amount (int): The amount to add.
+            operation (str): The cache operation measured, or empty.
+        """
+        unit = "By" if name in {BYTES_IN, BYTES_OUT} else "1"
+        self.instrument("counter", name, unit).add(
+            amount,
+            self.attributes_of(operation),
+        )
+
+    def observe(self, name: str, seconds: float, operation: str) -> None:
+        """Record a duration in the histogram of a metric.
+
+        Args:
+            name (str): The name of the histogram.
+            seconds (float): The duration in seconds.
+            operation (str): The cache operation measured, or empty.
+        """
+        self.instrument("histogram", name, "s").record(
+            seconds,
+            self.attributes_of(operation),
+        )
+
+    def gauge(self, name: str, value: float) -> None:
+        """Set the value of the gauge of a metric.
+
+        Args:
+            name (str): The name of the gauge.
+            value (float): The current value.
+        """
+        self.instrument("gauge", name, "1").set(value)
@@ -0,0 +1,201 @@
+"""This module contains the generations of the namespaces and tags.
+
+Deleting every entry of a tenant one by one means finding them first, which
+scans the keys. Namespaces and tags are invalidated in constant time instead,
+with generation counters:
+
+- the keys of the entries of a namespace embed the current generation of the
+  namespace, so clearing it increments the generation and later reads look
+  the entries up under new keys;
+- an entry with tags stores the current generation of each of its tags along
+  with its value, and reads treat it as missing once one of them changed.
+
+Nothing is deleted or locked: the entries left behind are never read again,
+and are reclaimed when they expire, or evicted first by a capacity as they
+are the least recently used.
+
+Generations are counters of the backend, shared by every process. They start
+from the current time in milliseconds, so a counter that expired or was
+cleared never goes back to a generation already used. Each process caches
+them for a short time, so it sees the invalidations of other processes after
+at most that long, and its own at once.
+"""
+
+import time
+from collections import OrderedDict
+from collections.abc import Iterable
+from typing import Any
+
+from psqache.abcs import ICacheBackend
+
+NAMESPACE_PREFIX = "psqache:namespace:"
+"""Prefix of the keys of the generation counters of namespaces."""
+
+TAG_PREFIX = "psqache:tag:"
+"""Prefix of the keys of the generation counters of tags."""
+
+TAG_INVALIDATIONS_KEY = "psqache:tag_invalidations"
+"""Key of the counter of the tag invalidations."""
+
+MAX_COUNTER_TTL = 2**31 - 1
+"""The longest time-to-live of a counter, in seconds."""
+
+TAGS_FIELD = "__psqache_tags__"
+"""Field of a tagged entry holding the generations of its tags."""
+
+VALUE_FIELD = "value"
+"""Field of a tagged entry holding its value."""
+
+
+def tag_value(value: Any, generations: dict[str, int]) -> dict[str, Any]:
+    """Wrap a value with the generations of its tags.
+
+    Args:
+        value (Any): The value.
+        generations (dict[str, int]): The current generations, keyed by tag.
+
+    Returns:
+        dict[str, Any]: The tagged value.
+    """
+    return {TAGS_FIELD: generations, VALUE_FIELD: value}
+
+
+def is_tagged(value: Any) -> bool:
+    """Check whether a cached value is a tagged value.
+
+    Args:
+        value (Any): The cached value.
+
+    Returns:
+        bool: True if the value was wrapped by `tag_value`, otherwise False.
+    """
+    return (
+        isinstance(value, dict)
+        and len(value) == 2  # noqa: PLR2004
+        and TAGS_FIELD in value
+        and VALUE_FIELD in value
+    )
+
+
+class Generations:
+    """The generations of namespaces and tags, cached by this process.
+
+    Generations are read by incrementing their counters by zero, which
+    creates the missing ones, in a single round trip for many of them.
+    """
+
+    def __init__(
+        self,
+        backend: ICacheBackend,
+        ttl: float = 1.0,
+        max_size: int = 10_000,
+        counter_ttl: int = 365 * 24 * 60 * 60,
+    ) -> None:
+        """Initialize the Generations.
+
+        Args:
+            backend (ICacheBackend): The backend holding the counters.
+            ttl (float): Seconds a generation is cached by this process.
+            max_size (int): The number of generations cached, the least
+                recently read ones being dropped first.
+            counter_ttl (int): Time to live in seconds of the counters.
+        """
+        self.backend = backend
+        self.ttl = ttl
+        self.max_size = max_size
+        self.counter_ttl = counter_ttl
+        self.cached: OrderedDict[str, tuple[int, float]] = OrderedDict()
+
+    @staticmethod
+    def initial() -> int:
+        """Get the generation of a new counter.
+
+        Returns:
+            int: The current time in milliseconds.
+        """
+        return time.time_ns() // 1_000_000
+
+    def remember(self, key: str, generation: int) -> None:
+        """Cache the generation of a counter.
+
+        Args:
+            key (str): The key of the counter.
+            generation (int): The generation.
+        """
+        self.cached[key] = (generation, time.monotonic() + self.ttl)
+        self.cached.move_to_end(key)
+        if len(self.cached) > self.max_size:
+            self.cached.popitem(last=False)
+
+    async def get_many(self, keys: Iterable[str]) -> dict[str, int]:
+        """Get the current generation of counters.
+
+        Args:
+            keys (Iterable[str]): The keys of the counters.
+
+        Returns:
+            dict[str, int]: The generations, keyed by counter key.
+        """
+        now = time.monotonic()
+        generations: dict[str, int] = {}
+        missing = []
+        for key in keys:
+            cached = self.cached.get(key)
+            if cached is not None and cached[1] > now:
+                generations[key] = cached[0]
+                self.cached.move_to_end(key)
+            else:
+                missing.append(key)
+        if missing:
+            # Counters are locked in key order, so batches do not deadlock.
+            fetched = await self.backend.incr_many(
+                dict.fromkeys(sorted(missing), 0),
+                self.counter_ttl,
+                self.initial(),
+            )
+            for key, generation in fetched.items():
+                self.remember(key, generation)
+            generations.update(fetched)
+        return generations
+
+    async def advance(self, key: str) -> int:
+        """Increment the generation of a counter.
+
+        Args:
+            key (str): The key of the counter.
+
+        Returns:
+            int: The new generation.
+        """
+        generation = await self.backend.incr(key, 1, self.counter_ttl, self.initial())
+        self.remember(key, generation)
+        return generation
+
+
+class Invalidations(Generations):
+    """The number of tag invalidations, cached by this process.
+
+    Existence checks do not read values, so they cannot see the generations
+    of the tags of an entry. Until a tag was invalidated no tagged entry can
+    be stale, and the checks are answered without reading values. Unlike
+    generations, the counter starts from zero, and it lives as long as a
+    counter can since going back to zero would hide invalidated entries.
+    """
+
+    def __init__(self, backend: ICacheBackend, ttl: float = 1.0) -> None:
+        """Initialize the Invalidations.
+
+        Args:
+            backend (ICacheBackend): The backend holding the counter.
+            ttl (float): Seconds the count is cached by this process.
+        """
+        super().__init__(backend, ttl, max_size=1, counter_ttl=MAX_COUNTER_TTL)
+
+    @staticmethod
+    def initial() -> int:
+        """Get the value of a new counter.
+
+        Returns:
+            int: Zero.
+        """
+        return 0
@@ -0,0 +1,129 @@
+"""This module contains the negative caching helpers.
+
+Lookups of keys that do not exist, such as unknown ids sent by bots, miss the
+cache every time and load the value again every time. Negative caching stores
+a compact marker for these keys instead, with a short time to live of its own,
+so the next lookups hit the marker and skip the load.
+
+A Bloom filter (Bloom, 1970) of the keys recently confirmed absent also skips
+the round trip to the backend for them. It can answer that a key is absent
+when it is not, with a configurable false-positive rate, but never the
+opposite. Keys cannot be removed from it, so it is cleared as a whole when a
+key it may hold is written or deleted, and once it is `max_age` old, which
+bounds how long it hides the writes of other processes.
+"""
+
+import math
+import time
+from typing import Any
+
+from psqache.shards import key_hash
+
+ABSENT: dict[str, int] = {"__psqache_absent__": 1}
+"""The value stored for keys known to be absent."""
+
+
+def is_absent(value: Any) -> bool:
+    """Check whether a cached value is the marker of an absent key.
+
+    Args:
+        value (Any): The cached value.
+
+    Returns:
+        bool: True if the value is the absent marker, otherwise False.
+    """
+    return isinstance(value, dict) and value == ABSENT
+
+
+class BloomFilter:
+    """Bloom filter of the keys recently confirmed absent.
+
+    It holds `capacity` keys at the given false-positive rate, and is cleared
+    once it holds more or once it is older than `max_age` seconds.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 100_000,
+        error_rate: float = 0.01,
+        max_age: float | None = 60.0,
+    ) -> None:
+        """Initialize the BloomFilter.
+
+        Args:
+            capacity (int): The number of keys held before it is cleared.
+            error_rate (float): The false-positive rate at full capacity.
+            max_age (Optional[float]): Seconds after which it is cleared, None
+                to only clear it on writes. Defaults to one minute.
+        """
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.max_age = max_age
+        self.size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.clear()
+
+    def __len__(self) -> int:
+        """Count the keys added since the filter was last cleared.
+
+        Returns:
+            int: The number of keys added.
+        """
+        return self.count
+
+    def __contains__(self, key: object) -> bool:
+        """Check whether a key may have been added.
+
+        Args:
+            key (object): The key.
+
+        Returns:
+            bool: False if the key was not added, True if it probably was.
+        """
+        if not self.count or not isinstance(key, str):
+            return False
+        if self.expired:
+            self.clear()
+            return False
+        return all(
+            self.bits[index >> 3] & (1 << (index & 7)) for index in self.indexes(key)
+        )
+
+    @property
+    def expired(self) -> bool:
+        """Whether the filter is older than `max_age`."""
+        return (
+            self.max_age is not None and time.monotonic() - self.created >= self.max_age
+        )
+
+    def indexes(self, key: str) -> list[int]:
+        """Get the bits of a key.
+
+        Args:
+            key (str): The key.
+
+        Returns:
+            list[int]: The index of each of its `hashes` bits.
+        """
+        # Double hashing derives the hash of each bit from a single hash.
+        hashed = key_hash(key)
+        low, high = hashed & 0xFFFFFFFF, hashed >> 32
+        return [(low + index * high) % self.size for index in range(self.hashes)]
+
+    def add(self, key: str) -> None:
+        """Add a key, clearing the filter first once it is full.
+
+        Args:
+            key (str): The key.
+        """
+        if self.count >= self.capacity or self.expired:
+            self.clear()
+        for index in self.indexes(key):
+            self.bits[index >> 3] |= 1 << (index & 7)
+        self.count += 1
+
+    def clear(self) -> None:
+        """Remove every key."""
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+        self.created = time.monotonic()
@@ -0,0 +1,516 @@
+-- name: create_psqache_table
+/*
+ Create a table to store cache entries, range partitioned by expiry.
+
+ The table has the same columns as the `psqache` table, except that
+ `expires_at` is a regular column set on write, since generated columns
+ cannot be part of a partition key.
+
+ Entries are stored in one partition per bucket of expiry time, named after
+ the epoch of the start of the bucket, plus a default partition for entries
+ expiring beyond the partitions created so far. Once a bucket has expired,
+ its whole partition is dropped instead of deleting its rows one by one.
+
+ A partitioned table cannot be unlogged itself, but its partitions are, so
+ cache entries are still not written to the WAL. Keys are unique per
+ partition only, so writes serialize on an advisory lock of their keys.
+ */
+CREATE TABLE IF NOT EXISTS psqache_partitioned (
+    key TEXT NOT NULL,
+    value JSONB,
+    payload BYTEA,
+    ttl INT NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    last_access TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    size INT NOT NULL DEFAULT 0,
+    CHECK ((value IS NULL) <> (payload IS NULL))
+) PARTITION BY RANGE (expires_at);
+-- Index on key, created on every partition, to look entries up by key.
+CREATE INDEX IF NOT EXISTS idx_partitioned_key ON psqache_partitioned (key);
+CREATE UNLOGGED TABLE IF NOT EXISTS psqache_partitioned_default
+PARTITION OF psqache_partitioned DEFAULT;
+-- Index on expires_at, to clean up the default partition in batches.
+CREATE INDEX IF NOT EXISTS idx_partitioned_default_expires_at
+ON psqache_partitioned_default (expires_at);
+/*
+ Create a table to store counters, apart from the cache entries so they are
+ incremented in place as integers instead of rewriting JSONB values. A
+ counter expires after the time-to-live it was created with; incrementing an
+ expired counter starts it over.
+ */
+CREATE UNLOGGED TABLE IF NOT EXISTS psqache_counters (
+    key TEXT PRIMARY KEY,
+    value BIGINT NOT NULL,
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL
+) WITH (fillfactor = 70);
+/*
+ Create the partitions of the current bucket and the given number of
+ following buckets, unless they already exist. Entries of a new bucket that
+ were written to the default partition are moved to its partition before it
+ is attached. Return the number of partitions created.
+ */
+CREATE OR REPLACE FUNCTION psqache_create_partitions(
+    bucket INTERVAL, ahead INT
+) RETURNS INT LANGUAGE plpgsql AS $$
+DECLARE
+    bucket_seconds DOUBLE PRECISION := EXTRACT(EPOCH FROM bucket);
+    lower_bound TIMESTAMP WITH TIME ZONE := TO_TIMESTAMP(
+        FLOOR(EXTRACT(EPOCH FROM NOW()) / bucket_seconds) * bucket_seconds
+    );
+    upper_bound TIMESTAMP WITH TIME ZONE;
+    partition_name TEXT;
+    -- New partitions are logged or not like the default partition.
+    persistence TEXT := CASE
+        WHEN (
+            SELECT relpersistence FROM pg_class
+            WHERE oid = 'psqache_partitioned_default'::REGCLASS
+        ) = 'u' THEN 'UNLOGGED'
+        ELSE ''
+    END;
+    created INT := 0;
+BEGIN
+    PERFORM PG_ADVISORY_XACT_LOCK(HASHTEXT('psqache'), HASHTEXT('partitions'));
+    FOR i IN 0..ahead LOOP
+        upper_bound := lower_bound + bucket;
+        partition_name := FORMAT(
+            'psqache_partitioned_%s', EXTRACT(EPOCH FROM lower_bound)::BIGINT
+        );
+        IF TO_REGCLASS(partition_name) IS NULL THEN
+            EXECUTE FORMAT(
+                'CREATE %s TABLE %I (LIKE psqache_partitioned '
+                'INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+                persistence, partition_name
+            );
+            EXECUTE FORMAT(
+                'WITH moved AS (DELETE FROM psqache_partitioned_default '
+                'WHERE expires_at >= %L AND expires_at < %L RETURNING *) '
+                'INSERT INTO %I SELECT * FROM moved',
+                lower_bound, upper_bound, partition_name
+            );
+            EXECUTE FORMAT(
+                'ALTER TABLE psqache_partitioned ATTACH PARTITION %I '
+                'FOR VALUES FROM (%L) TO (%L)',
+                partition_name, lower_bound, upper_bound
+            );
+            created := created + 1;
+        END IF;
+        lower_bound := upper_bound;
+    END LOOP;
+    RETURN created;
+END $$;
+/*
+ Drop the partitions whose whole bucket has expired. Return the number of
+ partitions dropped.
+ */
+CREATE OR REPLACE FUNCTION psqache_drop_expired_partitions(
+    bucket INTERVAL
+) RETURNS INT LANGUAGE plpgsql AS $$
+DECLARE
+    partition_name TEXT;
+    dropped INT := 0;
+BEGIN
+    PERFORM PG_ADVISORY_XACT_LOCK(HASHTEXT('psqache'), HASHTEXT('partitions'));
+    FOR partition_name IN
+        SELECT child.relname
+        FROM pg_inherits
+        INNER JOIN pg_class AS child ON pg_inherits.inhrelid = child.oid
+        WHERE
+            pg_inherits.inhparent = 'psqache_partitioned'::REGCLASS
+            AND child.relname ~ '^psqache_partitioned_[0-9]+$'
+    LOOP
+        IF TO_TIMESTAMP(
+            SUBSTRING(partition_name FROM '[0-9]+$')::BIGINT
+        ) + bucket <= NOW() THEN
+            EXECUTE FORMAT('DROP TABLE %I', partition_name);
+            dropped := dropped + 1;
+        END IF;
+    END LOOP;
+    RETURN dropped;
+END $$;
+-- name: create_partitions
+/*
+ Create the partitions of the current bucket ($1) and of the given number of
+ following buckets ($2). Return the number of partitions created.
+ */
+SELECT PSQACHE_CREATE_PARTITIONS($1::INTERVAL, $2::INT) AS created;
+-- name: drop_expired_partitions
+/*
+ Drop the partitions of bucket size $1 whose whole bucket has expired.
+ Return the number of partitions dropped.
+ */
+SELECT PSQACHE_DROP_EXPIRED_PARTITIONS($1::INTERVAL) AS dropped;
+-- name: lock_cache_writes
+/*
+ Take the advisory locks serializing the writes of the given keys.
+
+ Keys are only unique within a partition, so a write of a key deletes its
+ previous entry and inserts a new one while holding this lock, which is
+ released when the enclosing transaction ends. The lock must be taken in a
+ statement of its own, so the write that follows sees the entries committed
+ by the writers it waited for. Locks are taken in a fixed order to avoid
+ deadlocks between batches.
+ */
+SELECT PG_ADVISORY_XACT_LOCK(HASHTEXT('psqache.write'), keys.hash)
+FROM (
+    SELECT DISTINCT HASHTEXT(key) AS hash
+    FROM UNNEST($1::TEXT []) AS key
+) AS keys
+ORDER BY keys.hash;
+-- name: set_cache_entry
+/*
+ Set a cache entry.
+
+ Delete the previous entry of the key, wherever its expiry put it, and
+ insert the new entry into the partition of its new expiry. Must run after
+ lock_cache_writes, in the same transaction.
+ */
+WITH deleted AS (
+    DELETE FROM psqache_partitioned
+    WHERE key = $1
+)
+
+INSERT INTO psqache_partitioned (
+    key, value, payload, ttl, created_at, expires_at, size
+)
+VALUES (
+    $1,
+    $2,
+    $3,
+    $4::INT,
+    NOW(),
+    NOW() + $4::INT * INTERVAL '1 second',
+    COALESCE(OCTET_LENGTH($3::BYTEA), PG_COLUMN_SIZE($2::JSONB))
+);
+-- name: cleanup_expired_cache_entries
+/*
+ Cleanup expired cache entries of the default partition.
+
+ Expired entries of the other partitions are removed by dropping their
+ partition, so only the default partition is cleaned up row by row. Delete
+ at most the given number of expired entries ($1), skipping rows locked by
+ other sessions.
+
+ Return the number of deleted entries and the lag, in seconds, of the
+ oldest one: how long after its expiry it was deleted.
+ */
+WITH reaped AS (
+    DELETE FROM psqache_partitioned_default
+    WHERE ctid = ANY(ARRAY(
+        SELECT ctid FROM psqache_partitioned_default
+        WHERE expires_at <= NOW()
+        LIMIT $1
+        FOR UPDATE SKIP LOCKED
+    ))
+    RETURNING expires_at
+)
+
+SELECT
+    COUNT(*) AS reaped,
+    COALESCE(EXTRACT(EPOCH FROM NOW() - MIN(expires_at)), 0)::FLOAT AS lag
+FROM reaped;
+-- name: set_cache_entries
+/*
+ Set many cache entries.
+
+ The keys, values, payloads and time-to-lives are passed as parallel arrays.
+ The previous entries of the keys are deleted and the new entries inserted
+ into the partitions of their new expiry, in key order like the regular
+ table. Must run after lock_cache_writes, in the same transaction.
+ */
+WITH deleted AS (
+    DELETE FROM psqache_partitioned
+    WHERE key = ANY($1::TEXT [])
+)
+
+INSERT INTO psqache_partitioned (
+    key, value, payload, ttl, created_at, expires_at, size
+)
+SELECT
+    entry.key,
+    entry.value,
+    entry.payload,
+    entry.ttl,
+    NOW(),
+    NOW() + entry.ttl * INTERVAL '1 second',
+    COALESCE(OCTET_LENGTH(entry.payload), PG_COLUMN_SIZE(entry.value))
+FROM UNNEST(
+    $1::TEXT [], $2::JSONB [], $3::BYTEA [], $4::INT []
+) AS entry (key, value, payload, ttl)
+ORDER BY entry.key;
+-- name: get_tracked_cache_entry
+/*
+ Get a cache entry by key, tracking the access.
+
+ Same as get_cache_entry, but the last access time of the entry is set to
+ now when it is older than the given access granularity ($2). Row locations
+ are not unique across partitions, so the entry is updated by key.
+ */
+WITH touched AS (
+    UPDATE psqache_partitioned
+    SET last_access = NOW()
+    WHERE key IN (
+        SELECT key FROM psqache_partitioned
+        WHERE
+            key = $1
+            AND expires_at > NOW()
+            AND last_access < NOW() - $2::INTERVAL
+        FOR UPDATE SKIP LOCKED
+    )
+)
+
+SELECT
+    value,
+    payload,
+    ttl,
+    EXTRACT(EPOCH FROM expires_at - NOW())::FLOAT8 AS expires_in
+FROM psqache_partitioned
+WHERE
+    key = $1
+    AND expires_at > NOW();
+-- name: get_tracked_cache_entries
+/*
+ Get many cache entries by key, tracking the accesses.
+
+ Same as get_cache_entries, but the last access time of the entries found is
+ set to now when it is older than the given access granularity ($2).
+ */
+WITH touched AS (
+    UPDATE psqache_partitioned
+    SET last_access = NOW()
+    WHERE key IN (
+        SELECT key FROM psqache_partitioned
+        WHERE
+            key = ANY($1::TEXT [])
+            AND expires_at > NOW()
+            AND last_access < NOW() - $2::INTERVAL
+        FOR UPDATE SKIP LOCKED
+    )
+)
+
+SELECT
+    key,
+    value,
+    payload,
+    ttl,
+    EXTRACT(EPOCH FROM expires_at - NOW())::FLOAT8 AS expires_in
+FROM psqache_partitioned
+WHERE
+    key = ANY($1::TEXT [])
+    AND expires_at > NOW();
+-- name: touch_cache_entry
+/*
+ Reset the time-to-live of a cache entry.
+
+ The new expiry usually falls into another partition, so Postgres moves the
+ row, value included. Must run after lock_cache_writes, in the same
+ transaction. Return TRUE if the entry was touched, no row otherwise.
+ */
+UPDATE psqache_partitioned
+SET
+    ttl = $2,
+    created_at = NOW(),
+    expires_at = NOW() + $2::INT * INTERVAL '1 second',
+    last_access = NOW()
+WHERE
+    key = $1
+    AND expires_at > NOW()
+RETURNING TRUE AS touched;
+-- name: touch_cache_entries
+/*
+ Reset the time-to-live of many cache entries.
+
+ Must run after lock_cache_writes, in the same transaction. The rows are
+ locked in key order like in the regular table. Return the keys of the
+ entries that existed, had not expired and were touched.
+ */
+WITH locked AS (
+    SELECT key
+    FROM psqache_partitioned
+    WHERE
+        key = ANY($1::TEXT [])
+        AND expires_at > NOW()
+    ORDER BY key
+    FOR UPDATE
+)
+
+UPDATE psqache_partitioned AS entry
+SET
+    ttl = $2,
+    created_at = NOW(),
+    expires_at = NOW() + $2::INT * INTERVAL '1 second',
+    last_access = NOW()
+FROM locked
+WHERE entry.key = locked.key
+RETURNING entry.key;
+-- name: merge_imported_entries
+/*
+ Merge the staged entries of the given keys ($1) into the cache.
+
+ Same as in the regular table: the most recent staged entry of each key that
+ has not expired replaces the cached entry, unless the cached one is at
+ least as recent and has not expired. The replaced entries are deleted and
+ the staged ones inserted into the partitions of their expiry. Must run
+ after lock_cache_writes, in the same transaction. Return the number of
+ entries written.
+ */
+WITH staged AS (
+    SELECT DISTINCT ON (key)
+        key,
+        value,
+        payload,
+        ttl,
+        COALESCE(created_at, NOW()) AS created_at,
+        COALESCE(created_at, NOW()) + ttl * INTERVAL '1 second' AS expires_at
+    FROM psqache_import
+    WHERE
+        key = ANY($1::TEXT [])
+        AND COALESCE(created_at, NOW()) + ttl * INTERVAL '1 second' > NOW()
+    ORDER BY key ASC, COALESCE(created_at, NOW()) DESC
+),
+
+newer AS (
+    SELECT staged.*
+    FROM staged
+    WHERE NOT EXISTS (
+        SELECT 1
+        FROM psqache_partitioned AS cached
+        WHERE
+            cached.key = staged.key
+            AND cached.expires_at > NOW()
+            AND cached.created_at >= staged.created_at
+    )
+),
+
+deleted AS (
+    DELETE FROM psqache_partitioned AS cached
+    USING newer
+    WHERE cached.key = newer.key
+),
+
+merged AS (
+    INSERT INTO psqache_partitioned (
+        key, value, payload, ttl, created_at, expires_at, size
+    )
+    SELECT
+        key,
+        value,
+        payload,
+        ttl,
+        created_at,
+        expires_at,
+        COALESCE(OCTET_LENGTH(payload), PG_COLUMN_SIZE(value))
+    FROM newer
+    RETURNING 1
+)
+
+SELECT COUNT(*) AS merged
+FROM merged;
+-- name: get_cache_report
+/*
+ Report the size of the cache and the distribution of its live entries.
+
+ Return the number of live entries, the size on disk of the cache table
+ with its indexes and TOAST data, the median, 90th and 99th percentiles and
+ maximum of the stored value sizes, and the number of live entries per TTL
+ bucket: given the sorted TTL thresholds in seconds ($1), bucket i counts
+ the entries whose TTL is at least threshold i - 1 and below threshold i,
+ the first and last buckets being open ended.
+
+ This scans every partition, so it is only run on demand.
+ */
+WITH live AS (
+    SELECT
+        size,
+        ttl
+    FROM psqache_partitioned
+    WHERE expires_at > NOW()
+),
+
+ttl_buckets AS (
+    SELECT
+        WIDTH_BUCKET(ttl, $1::INT []) AS bucket,
+        COUNT(*) AS entries
+    FROM live
+    GROUP BY bucket
+)
+
+SELECT
+    sizes.entries,
+    (
+        SELECT COALESCE(SUM(PG_TOTAL_RELATION_SIZE(relid)), 0)::BIGINT
+        FROM PG_PARTITION_TREE('psqache_partitioned')
+    ) AS table_bytes,
+    sizes.value_sizes,
+    ARRAY(
+        SELECT COALESCE(ttl_buckets.entries, 0)
+        FROM GENERATE_SERIES(0, CARDINALITY($1::INT [])) AS bucket
+        LEFT JOIN ttl_buckets USING (bucket)
+        ORDER BY bucket
+    ) AS ttl_counts
+FROM (
+    SELECT
+        COUNT(*) AS entries,
+        PERCENTILE_DISC(ARRAY[0.5, 0.9, 0.99, 1.0]::FLOAT8 []) WITHIN GROUP (
+            ORDER BY size
+        ) AS value_sizes
+    FROM live
+) AS sizes;
+-- name: evict_cache_entries
+/*
+ Evict the least recently used entries of a random sample of the table.
+
+ Sample the given percentage ($2) of the pages of every partition, and
+ delete at most the given number of its entries ($1): the expired ones
+ first, then the ones accessed the longest ago. Rows locked by other
+ sessions are skipped. Row locations are not unique across partitions, so
+ the sampled entries are deleted by key.
+
+ Return the number of evicted entries and the total size of their values.
+ */
+WITH evicted AS (
+    DELETE FROM psqache_partitioned
+    WHERE key IN (
+        SELECT key FROM psqache_partitioned TABLESAMPLE SYSTEM ($2::REAL)
+        ORDER BY expires_at <= NOW() DESC, last_access ASC
+        LIMIT $1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING size
+)
+
+SELECT
+    COUNT(*) AS evicted,
+    COALESCE(SUM(size), 0)::BIGINT AS bytes
+FROM evicted;
+-- name: set_cache_tables_logged
+/*
+ Make the partitions and the counter table logged, so their changes are
+ written to the WAL and replicated to standbys, where unlogged tables cannot
+ be read. Each table is rewritten, which is quick while it is still small.
+ Partitions created afterwards are logged like the default partition.
+ */
+DO $$
+DECLARE
+    partition_name TEXT;
+BEGIN
+    FOR partition_name IN
+        SELECT child.relname
+        FROM pg_inherits
+        INNER JOIN pg_class AS child ON pg_inherits.inhrelid = child.oid
+        WHERE
+            pg_inherits.inhparent = 'psqache_partitioned'::REGCLASS
+            AND child.relpersistence = 'u'
+    LOOP
+        EXECUTE FORMAT('ALTER TABLE %I SET LOGGED', partition_name);
+    END LOOP;
+    ALTER TABLE psqache_counters SET LOGGED;
+END $$;
+-- name: drop_cache_table
+/*
+ Drop the cache table, its partitions, its maintenance functions and the
+ counter table.
+ */
+DROP TABLE IF EXISTS psqache_partitioned, psqache_counters;
+DROP FUNCTION IF EXISTS psqache_create_partitions(INTERVAL, INT);
+DROP FUNCTION IF EXISTS psqache_drop_expired_partitions(INTERVAL);
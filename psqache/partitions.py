@@ -0,0 +1,217 @@
+"""This module contains the time-partitioned Postgres cache backend.
+
+Under heavy write churn, deleting expired rows from a single table leaves it
+bloated and keeps autovacuum busy. The partitioned backend stores entries in
+a table range partitioned by expiry time, with one partition per bucket of
+time, so expired entries are removed by dropping whole partitions, a
+metadata-only operation, instead of deleting rows.
+
+The schema is created by the `create_psqache_table` query of
+`PartitionedQueries`. Partitions are created ahead of time by `cleanup`,
+which must run at least once per bucket. By default, buckets span a day and
+enough of them are created to cover the default time-to-live of four weeks;
+entries expiring beyond the created partitions go to a default partition,
+which is cleaned up row by row.
+"""
+
+import datetime
+import math
+from collections.abc import Mapping
+from typing import Any
+
+import asyncpg
+
+from psqache.backends import PostgresBackend
+from psqache.queries import PartitionedQueries
+
+
+class PartitionedPostgresBackend(PostgresBackend):
+    """Postgres backend storing entries in a table partitioned by expiry.
+
+    Reads work by key across partitions, pruning the expired ones. Keys are
+    only unique within a partition, so a write takes an advisory lock on its
+    keys, deletes their previous entries and inserts the new ones, which
+    moves an entry to another partition when its time-to-live changes.
+
+    The bucket size must not change once partitions have been created.
+    Implements the ICacheBackend interface.
+    """
+
+    queries = PartitionedQueries
+
+    PREPARED_QUERIES = (*PostgresBackend.PREPARED_QUERIES, "lock_cache_writes")
+
+    def __init__(
+        self,
+        pool: asyncpg.pool.Pool | None = None,
+        notify_channel: str | None = None,
+        *,
+        bucket: datetime.timedelta = datetime.timedelta(days=1),
+        max_ttl: datetime.timedelta = datetime.timedelta(days=28),
+        partitions_ahead: int | None = None,
+        **options: Any,
+    ) -> None:
+        """Initialize the PartitionedPostgresBackend.
+
+        Args:
+            pool (Optional[asyncpg.pool.Pool]): The pool to use for database
+                connections.
+            notify_channel (Optional[str]): The channel to send invalidation
+                messages on.
+            bucket (datetime.timedelta): The span of expiry times stored in
+                each partition, such as an hour or a day.
+            max_ttl (datetime.timedelta): The longest time-to-live of the
+                entries, which the partitions cover. Defaults to the default
+                time-to-live of PsQache.
+            partitions_ahead (Optional[int]): The number of partitions to
+                create after the one of the current bucket. Defaults to enough
+                buckets to cover max_ttl, plus one for a bucket elapsing
+                between cleanups.
+            **options (Any): Other arguments for the PostgresBackend.
+        """
+        super().__init__(pool, notify_channel, **options)
+        self.bucket = bucket
+        if partitions_ahead is None:
+            partitions_ahead = math.ceil(max_ttl / bucket) + 1
+        self.partitions_ahead = partitions_ahead
+
+    async def set(self, key: str, value: dict, ttl: int) -> None:
+        """Set or update a cache entry with a time-to-live.
+
+        Args:
+            key: The key to set.
+            value: The value to associate with the key.
+            ttl: Time-to-live in seconds for the entry.
+        """
+        encoded = await self.encode(value)
+        connection: asyncpg.Connection
+        async with (
+            self.acquire() as connection,
+            connection.transaction(),
+            self.invalidating(connection, [key]),
+        ):
+            await connection.execute(self.queries.lock_cache_writes.sql, [key])
+            await connection.execute(
+                self.queries.set_cache_entry.sql,
+                key,
+                *encoded,
+                ttl,
+            )
+
+    async def set_many(self, mapping: Mapping[str, dict], ttl: int) -> None:
+        """Set or update many cache entries in a single round trip.
+
+        Args:
+            mapping: The values to set, keyed by key.
+            ttl: Time-to-live in seconds for the entries.
+        """
+        if not mapping:
+            return
+        encoded = [await self.encode(value) for value in mapping.values()]
+        values, payloads = zip(*encoded, strict=True)
+        keys = list(mapping)
+        connection: asyncpg.Connection
+        async with (
+            self.acquire() as connection,
+            connection.transaction(),
+            self.invalidating(connection, keys),
+        ):
+            await connection.execute(self.queries.lock_cache_writes.sql, keys)
+            await connection.execute(
+                self.queries.set_cache_entries.sql,
+                keys,
+                list(values),
+                list(payloads),
+                [ttl] * len(keys),
+            )
+
+    async def touch(self, key: str, ttl: int) -> bool:
+        """Reset the time-to-live of a cache entry.
+
+        The entry usually moves to the partition of its new expiry, so unlike
+        in the regular table, its value is written again.
+
+        Args:
+            key: The key to touch.
+            ttl: Time-to-live in seconds for the entry, from now.
+
+        Returns:
+            True if the entry exists and is not expired, otherwise False.
+        """
+        connection: asyncpg.Connection
+        async with self.acquire() as connection, connection.transaction():
+            await connection.execute(self.queries.lock_cache_writes.sql, [key])
+            touched = await connection.fetchval(
+                self.queries.touch_cache_entry.sql,
+                key,
+                ttl,
+            )
+            return bool(touched)
+
+    async def touch_many(self, keys: list[str], ttl: int) -> dict[str, bool]:
+        """Reset the time-to-live of many cache entries in a single round trip.
+
+        Args:
+            keys: The keys to touch.
+            ttl: Time-to-live in seconds for the entries, from now.
+
+        Returns:
+            True for the keys that exist and are not expired, otherwise False.
+        """
+        connection: asyncpg.Connection
+        async with self.acquire() as connection, connection.transaction():
+            await connection.execute(self.queries.lock_cache_writes.sql, keys)
+            records = await connection.fetch(
+                self.queries.touch_cache_entries.sql,
+                keys,
+                ttl,
+            )
+            touched = {record["key"] for record in records}
+            return {key: key in touched for key in keys}
+
+    async def merge_batch(self, connection: asyncpg.Connection, keys: list[str]) -> int:
+        """Merge the staged entries of a batch of keys into the cache.
+
+        Args:
+            connection (asyncpg.Connection): The connection holding the
+                staging table, in a transaction.
+            keys (list[str]): The keys of the batch.
+
+        Returns:
+            int: The number of entries written.
+        """
+        await connection.execute(self.queries.lock_cache_writes.sql, keys)
+        return await super().merge_batch(connection, keys)
+
+    async def maintain_partitions(self) -> tuple[int, int]:
+        """Drop the expired partitions and create the upcoming ones.
+
+        Returns:
+            tuple[int, int]: The number of partitions created and dropped.
+        """
+        connection: asyncpg.Connection
+        async with self.acquire() as connection:
+            dropped = await connection.fetchval(
+                self.queries.drop_expired_partitions.sql,
+                self.bucket,
+            )
+            created = await connection.fetchval(
+                self.queries.create_partitions.sql,
+                self.bucket,
+                self.partitions_ahead,
+            )
+        return created, dropped
+
+    async def create_table(self) -> None:
+        """Create the cache tables and the partitions of the upcoming buckets."""
+        await super().create_table()
+        await self.maintain_partitions()
+
+    async def cleanup(self) -> None:
+        """Maintain the partitions and delete the expired default entries.
+
+        Expired partitions are dropped and upcoming ones created, then the
+        expired entries of the default partition are deleted in batches.
+        """
+        await self.maintain_partitions()
+        await super().cleanup()
@@ -1,10 +1,57 @@
 """This module holds the SQL queries used in the application.
 
 This module loads SQL queries from a file and provides them as an object.
+The partitioned queries run the same queries on the time-partitioned cache
+table: its file only holds the queries that differ, such as the write and
+cleanup paths, and the others are taken from the shared file.
 """
 
+import re
+
 import aiosql
 
+from psqache.conf import PARTITIONED_QUERY_FILE_PATH
 from psqache.conf import QUERY_FILE_PATH
 
+# Matches the name line starting each query of a query file.
+QUERY_NAME = re.compile(r"^-- name: (\w+)", re.MULTILINE)
+# Matches the cache table name, but not the tables or strings it prefixes.
+CACHE_TABLE = re.compile(r"(?<![\w'])psqache(?![\w'.])")
+
+
+def split_queries(sql: str) -> dict[str, str]:
+    """Split the text of a query file into its queries.
+
+    Args:
+        sql (str): The text of the query file.
+
+    Returns:
+        dict[str, str]: The text of each query, keyed by query name.
+    """
+    matches = list(QUERY_NAME.finditer(sql))
+    ends = [match.start() for match in matches[1:]] + [len(sql)]
+    return {
+        match[1]: sql[match.start() : end]
+        for match, end in zip(matches, ends, strict=True)
+    }
+
+
+def load_partitioned_queries() -> str:
+    """Build the text of the partitioned queries.
+
+    The shared queries are run on the partitioned table, and overridden by the
+    queries of the partitioned query file.
+
+    Returns:
+        str: The text of all the partitioned queries.
+    """
+    shared = CACHE_TABLE.sub("psqache_partitioned", QUERY_FILE_PATH.read_text())
+    queries = {
+        **split_queries(shared),
+        **split_queries(PARTITIONED_QUERY_FILE_PATH.read_text()),
+    }
+    return "".join(queries.values())
+
+
 Queries = aiosql.from_path(QUERY_FILE_PATH, "asyncpg")
+PartitionedQueries = aiosql.from_str(load_partitioned_queries(), "asyncpg")
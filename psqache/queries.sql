@@ -4,25 +4,87 @@
 
  The table has the following columns:
  - key (TEXT): The key of the cache entry.
- - value (JSONB): The value of the cache entry.
+ - value (JSONB): The value of the cache entry, in the JSONB storage layout.
+ - payload (BYTEA): The serialized value of the cache entry, in the BYTEA
+   storage layout or when it is compressed, behind a one byte header
+   holding the id of the compression codec. Exactly one of value and
+   payload is set.
  - ttl (INT): The time-to-live of the cache entry in seconds.
  - created_at (TIMESTAMP): The time when the cache entry was created.
  - expires_at (TIMESTAMP): The time when the cache entry will expire.
+ - last_access (TIMESTAMP): The time when the cache entry was last written
+   or read, only tracked when the backend has a capacity, and only updated
+   once it is older than the access granularity.
+ - size (INT): The size in bytes of the stored value, counted against the
+   capacity of the cache.
 
  The table is unlogged to avoid writing cache entries to the WAL.
+
+ Pages are left 30% free, so touching an entry or recording an access can
+ write the new row version on the same page as a heap-only tuple (HOT)
+ update. HOT updates require that no indexed column changes, which is why
+ expires_at only has a BRIN index: from Postgres 16, changes to columns
+ covered by summarizing indexes still allow HOT updates. An update that
+ does not change the value also keeps its TOAST data as is.
  */
 CREATE UNLOGGED TABLE IF NOT EXISTS psqache (
     key TEXT PRIMARY KEY,
-    value JSONB NOT NULL,
+    value JSONB,
+    payload BYTEA,
     ttl INT NOT NULL,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     expires_at TIMESTAMP WITH TIME ZONE GENERATED ALWAYS AS (
         created_at + (ttl || ' seconds')::INTERVAL
-    ) STORED
+    ) STORED,
+    last_access TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    size INT NOT NULL DEFAULT 0,
+    CHECK ((value IS NULL) <> (payload IS NULL))
+) WITH (fillfactor = 70);
+-- Add the eviction columns to tables created by earlier versions.
+ALTER TABLE psqache
+ADD COLUMN IF NOT EXISTS last_access TIMESTAMP WITH TIME ZONE NOT NULL
+DEFAULT NOW(),
+ADD COLUMN IF NOT EXISTS size INT NOT NULL DEFAULT 0;
+-- Add the BYTEA storage layout to tables created by earlier versions, whose
+-- values were all JSONB.
+ALTER TABLE psqache
+ADD COLUMN IF NOT EXISTS payload BYTEA,
+ALTER COLUMN value DROP NOT NULL;
+/*
+ Add the check of the storage layouts to tables created by earlier versions,
+ under the name Postgres gives the check of new tables. The existing rows all
+ have a JSONB value, so the check is not validated against them, which would
+ scan the table.
+ */
+DO $$
+BEGIN
+    ALTER TABLE psqache ADD CONSTRAINT psqache_check
+    CHECK ((value IS NULL) <> (payload IS NULL)) NOT VALID;
+EXCEPTION
+    WHEN duplicate_object THEN NULL;
+END
+$$;
+-- Apply the fillfactor to tables created by earlier versions, for new pages.
+ALTER TABLE psqache SET (fillfactor = 70);
+-- BRIN index on expires_at column to speed up cleanup of expired cache
+-- entries. Entries are mostly appended in expiry order, which BRIN ranges
+-- summarize well. It replaces the B-tree index of earlier versions, whose
+-- maintenance made every change of expires_at a non-HOT update.
+DROP INDEX IF EXISTS idx_expires_at;
+CREATE INDEX IF NOT EXISTS idx_expires_at_brin ON psqache USING brin (
+    expires_at
 );
--- Index on expires_at column to speed up cleanup of expired cache entries.
-CREATE INDEX IF NOT EXISTS idx_expires_at ON psqache (expires_at)
-WHERE expires_at <= NOW();
+/*
+ Create a table to store counters, apart from the cache entries so they are
+ incremented in place as integers instead of rewriting JSONB values. A
+ counter expires after the time-to-live it was created with; incrementing an
+ expired counter starts it over.
+ */
+CREATE UNLOGGED TABLE IF NOT EXISTS psqache_counters (
+    key TEXT PRIMARY KEY,
+    value BIGINT NOT NULL,
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL
+) WITH (fillfactor = 70);
 -- name: set_cache_entry
 /*
  Set a cache entry.
@@ -32,24 +94,39 @@ WHERE expires_at <= NOW();
 
  The cache entry will expire after the given time-to-live (ttl) in seconds.
  This function automatically updates `created_at` for existing entries to
- reset the expiration time.
+ reset the expiration time. The upsert is a single parameterized statement,
+ so it can be prepared once per connection.
  */
-DO $$ BEGIN
-INSERT INTO psqache (key, value, ttl, created_at)
-VALUES ($1, $2, $3, NOW()) ON CONFLICT (key) DO
+INSERT INTO psqache (key, value, payload, ttl, created_at, size)
+VALUES (
+    $1,
+    $2::JSONB,
+    $3::BYTEA,
+    $4::INT,
+    NOW(),
+    COALESCE(OCTET_LENGTH($3::BYTEA), PG_COLUMN_SIZE($2::JSONB))
+) ON CONFLICT (key) DO
 UPDATE
 SET value = EXCLUDED.value,
+    payload = EXCLUDED.payload,
     ttl = EXCLUDED.ttl,
-    created_at = NOW();
-END $$;
+    created_at = NOW(),
+    last_access = NOW(),
+    size = EXCLUDED.size;
 -- name: get_cache_entry
 /*
  Get a cache entry by key.
 
- If the cache entry exists and has not expired, return the value.
- Otherwise, return NULL.
+ If the cache entry exists and has not expired, return the value and the
+ payload, only one of which is set, along with the time-to-live the entry
+ was set with and the seconds left before it expires. Otherwise, return no
+ row.
  */
-SELECT value
+SELECT
+    value,
+    payload,
+    ttl,
+    EXTRACT(EPOCH FROM expires_at - NOW())::FLOAT8 AS expires_in
 FROM psqache
 WHERE
     key = $1
@@ -65,17 +142,36 @@ DELETE FROM psqache
 WHERE key = $1;
 -- name: clear_cache_entries
 /*
- Clear all cache entries.
+ Clear all cache entries and counters.
  */
-TRUNCATE psqache;
+TRUNCATE psqache, psqache_counters;
 -- name: cleanup_expired_cache_entries
 /*
  Cleanup expired cache entries.
 
- Delete all cache entries that have expired.
+ Delete at most the given number of expired cache entries ($1), so each
+ call holds its locks briefly and a large backlog is worked off in batches.
+ Rows locked by other sessions are skipped rather than waited for. The rows
+ are deleted by ctid, which locates them without another index lookup.
+
+ Return the number of deleted entries and the lag, in seconds, of the
+ oldest one: how long after its expiry it was deleted.
  */
-DELETE FROM psqache
-WHERE expires_at <= NOW();
+WITH reaped AS (
+    DELETE FROM psqache
+    WHERE ctid = ANY(ARRAY(
+        SELECT ctid FROM psqache
+        WHERE expires_at <= NOW()
+        LIMIT $1
+        FOR UPDATE SKIP LOCKED
+    ))
+    RETURNING expires_at
+)
+
+SELECT
+    COUNT(*) AS reaped,
+    COALESCE(EXTRACT(EPOCH FROM NOW() - MIN(expires_at)), 0)::FLOAT AS lag
+FROM reaped;
 -- name: has_cache_entry
 /*
  Check if a cache entry exists by key.
@@ -90,8 +186,550 @@ SELECT EXISTS(
         key = $1
         AND expires_at > NOW()
 ) AS entry_exists;
+-- name: get_cache_entries
+/*
+ Get many cache entries by key.
+
+ Return the key, value and payload of every entry whose key is in the given
+ array and has not expired, along with the time-to-live the entry was set
+ with and the seconds left before it expires. Missing and expired keys are
+ not returned.
+ */
+SELECT
+    key,
+    value,
+    payload,
+    ttl,
+    EXTRACT(EPOCH FROM expires_at - NOW())::FLOAT8 AS expires_in
+FROM psqache
+WHERE
+    key = ANY($1::TEXT [])
+    AND expires_at > NOW();
+-- name: set_cache_entries
+/*
+ Set many cache entries.
+
+ The keys, values, payloads and time-to-lives are passed as parallel arrays
+ and unnested into rows, so the whole batch is upserted in a single
+ statement. Existing entries are updated and their `created_at` is reset.
+ Rows are written in key order, so concurrent batches lock the rows of the
+ keys they share in the same order instead of deadlocking.
+ */
+INSERT INTO psqache (key, value, payload, ttl, created_at, size)
+SELECT
+    entry.key,
+    entry.value,
+    entry.payload,
+    entry.ttl,
+    NOW(),
+    COALESCE(OCTET_LENGTH(entry.payload), PG_COLUMN_SIZE(entry.value))
+FROM UNNEST(
+    $1::TEXT [], $2::JSONB [], $3::BYTEA [], $4::INT []
+) AS entry (key, value, payload, ttl)
+ORDER BY entry.key
+ON CONFLICT (key) DO
+UPDATE
+SET value = EXCLUDED.value,
+    payload = EXCLUDED.payload,
+    ttl = EXCLUDED.ttl,
+    created_at = NOW(),
+    last_access = NOW(),
+    size = EXCLUDED.size;
+-- name: delete_cache_entries
+/*
+ Delete many cache entries by key.
+
+ Keys that do not exist are ignored. The rows are locked in key order before
+ they are deleted, so concurrent batches do not deadlock.
+ */
+WITH locked AS (
+    SELECT key
+    FROM psqache
+    WHERE key = ANY($1::TEXT [])
+    ORDER BY key
+    FOR UPDATE
+)
+
+DELETE FROM psqache AS entry
+USING locked
+WHERE entry.key = locked.key;
+-- name: has_cache_entries
+/*
+ Check which of the given keys exist in the cache.
+
+ Return the keys of the entries that exist and have not expired.
+ */
+SELECT key
+FROM psqache
+WHERE
+    key = ANY($1::TEXT [])
+    AND expires_at > NOW();
+-- name: get_tracked_cache_entry
+/*
+ Get a cache entry by key, tracking the access.
+
+ Same as get_cache_entry, but the last access time of the entry is set to
+ now when it is older than the given access granularity ($2), so a hot
+ entry is written at most once per granularity instead of on every read.
+ Entries locked by other sessions are not waited for. The column is not
+ indexed, so the update can be a heap-only tuple update.
+ */
+WITH touched AS (
+    UPDATE psqache
+    SET last_access = NOW()
+    WHERE ctid = ANY(ARRAY(
+        SELECT ctid FROM psqache
+        WHERE
+            key = $1
+            AND last_access < NOW() - $2::INTERVAL
+        FOR UPDATE SKIP LOCKED
+    ))
+)
+
+SELECT
+    value,
+    payload,
+    ttl,
+    EXTRACT(EPOCH FROM expires_at - NOW())::FLOAT8 AS expires_in
+FROM psqache
+WHERE
+    key = $1
+    AND expires_at > NOW();
+-- name: get_tracked_cache_entries
+/*
+ Get many cache entries by key, tracking the accesses.
+
+ Same as get_cache_entries, but the last access time of the entries found is
+ set to now when it is older than the given access granularity ($2).
+ */
+WITH touched AS (
+    UPDATE psqache
+    SET last_access = NOW()
+    WHERE ctid = ANY(ARRAY(
+        SELECT ctid FROM psqache
+        WHERE
+            key = ANY($1::TEXT [])
+            AND last_access < NOW() - $2::INTERVAL
+        FOR UPDATE SKIP LOCKED
+    ))
+)
+
+SELECT
+    key,
+    value,
+    payload,
+    ttl,
+    EXTRACT(EPOCH FROM expires_at - NOW())::FLOAT8 AS expires_in
+FROM psqache
+WHERE
+    key = ANY($1::TEXT [])
+    AND expires_at > NOW();
+-- name: touch_cache_entry
+/*
+ Reset the time-to-live of a cache entry, without rewriting its value.
+
+ If the cache entry exists and has not expired, it expires after the given
+ time-to-live ($2) from now. Only the expiry metadata of the row changes,
+ which allows a HOT update. Return TRUE if the entry was touched, no row
+ otherwise.
+ */
+UPDATE psqache
+SET
+    ttl = $2,
+    created_at = NOW(),
+    last_access = NOW()
+WHERE
+    key = $1
+    AND expires_at > NOW()
+RETURNING TRUE AS touched;
+-- name: touch_cache_entries
+/*
+ Reset the time-to-live of many cache entries, without rewriting their values.
+
+ The rows are locked in key order before they are updated, so concurrent
+ batches do not deadlock. Return the keys of the entries that existed, had
+ not expired and were touched.
+ */
+WITH locked AS (
+    SELECT key
+    FROM psqache
+    WHERE
+        key = ANY($1::TEXT [])
+        AND expires_at > NOW()
+    ORDER BY key
+    FOR UPDATE
+)
+
+UPDATE psqache AS entry
+SET
+    ttl = $2,
+    created_at = NOW(),
+    last_access = NOW()
+FROM locked
+WHERE entry.key = locked.key
+RETURNING entry.key;
+-- name: iter_cache_keys
+/*
+ Iterate over the keys of the cache entries, in key order.
+
+ Return the key of every entry that has not expired and whose key starts
+ with the given prefix ($1), or of every entry when the prefix is NULL.
+ Meant to be read through a server-side cursor, in chunks.
+ */
+SELECT key
+FROM psqache
+WHERE
+    expires_at > NOW()
+    AND ($1::TEXT IS NULL OR STARTS_WITH(key, $1::TEXT))
+ORDER BY key;
+-- name: iter_cache_entries
+/*
+ Iterate over the cache entries, in key order.
+
+ Same as iter_cache_keys, but return the value and the payload of the
+ entries along with their key.
+ */
+SELECT
+    key,
+    value,
+    payload
+FROM psqache
+WHERE
+    expires_at > NOW()
+    AND ($1::TEXT IS NULL OR STARTS_WITH(key, $1::TEXT))
+ORDER BY key;
+-- name: export_cache_entries
+/*
+ Export the cache entries that have not expired.
+
+ Return the columns of a snapshot: the key, value, payload, time-to-live
+ and creation time of every entry, so an imported entry expires when the
+ exported one would have. Meant to be copied out in the binary format.
+ */
+SELECT
+    key,
+    value,
+    payload,
+    ttl,
+    created_at
+FROM psqache
+WHERE expires_at > NOW();
+-- name: create_import_table
+/*
+ Create the staging table of the entries imported by the session.
+
+ Entries are copied into this temporary table in bulk, then merged into the
+ cache in batches of keys. It has the columns of a snapshot; a NULL
+ creation time stands for the time of the merge. A table left behind by an
+ earlier import of the session is dropped first.
+ */
+DROP TABLE IF EXISTS pg_temp.psqache_import;
+CREATE TEMPORARY TABLE psqache_import (
+    key TEXT NOT NULL,
+    value JSONB,
+    payload BYTEA,
+    ttl INT NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE
+);
+CREATE INDEX ON psqache_import (key);
+-- name: drop_import_table
+/*
+ Drop the staging table of the entries imported by the session.
+ */
+DROP TABLE IF EXISTS pg_temp.psqache_import;
+-- name: next_import_keys
+/*
+ Get the next batch of keys of the staging table.
+
+ Return, in key order, at most the given number ($2) of distinct keys after
+ the given key ($1), or the first keys when it is NULL.
+ */
+SELECT ARRAY(
+    SELECT DISTINCT key
+    FROM psqache_import
+    WHERE $1::TEXT IS NULL OR key > $1::TEXT
+    ORDER BY key
+    LIMIT $2::INT
+) AS keys;
+-- name: merge_imported_entries
+/*
+ Merge the staged entries of the given keys ($1) into the cache.
+
+ The most recent staged entry of each key that has not expired replaces the
+ cached entry, unless the cached one is at least as recent and has not
+ expired, so an import never overwrites a fresher value. Entries keep the
+ time-to-live and creation time they were staged with. Return the number of
+ entries written.
+ */
+WITH merged AS (
+    INSERT INTO psqache (key, value, payload, ttl, created_at, size)
+    SELECT DISTINCT ON (staged.key)
+        staged.key,
+        staged.value,
+        staged.payload,
+        staged.ttl,
+        COALESCE(staged.created_at, NOW()),
+        COALESCE(OCTET_LENGTH(staged.payload), PG_COLUMN_SIZE(staged.value))
+    FROM psqache_import AS staged
+    WHERE
+        staged.key = ANY($1::TEXT [])
+        AND COALESCE(staged.created_at, NOW())
+        + staged.ttl * INTERVAL '1 second' > NOW()
+    ORDER BY staged.key ASC, COALESCE(staged.created_at, NOW()) DESC
+    ON CONFLICT (key) DO
+    UPDATE
+    SET value = EXCLUDED.value,
+        payload = EXCLUDED.payload,
+        ttl = EXCLUDED.ttl,
+        created_at = EXCLUDED.created_at,
+        last_access = NOW(),
+        size = EXCLUDED.size
+    WHERE
+        psqache.created_at < EXCLUDED.created_at
+        OR psqache.expires_at <= NOW()
+    RETURNING 1
+)
+
+SELECT COUNT(*) AS merged
+FROM merged;
+-- name: get_cache_usage
+/*
+ Get the number of cache entries and the total size of their values.
+
+ This scans the whole table, so it is only run by eviction sweeps.
+ */
+SELECT
+    COUNT(*) AS entries,
+    COALESCE(SUM(size), 0)::BIGINT AS bytes
+FROM psqache;
+-- name: get_cache_report
+/*
+ Report the size of the cache and the distribution of its live entries.
+
+ Return the number of live entries, the size on disk of the cache table
+ with its indexes and TOAST data, the median, 90th and 99th percentiles and
+ maximum of the stored value sizes, and the number of live entries per TTL
+ bucket: given the sorted TTL thresholds in seconds ($1), bucket i counts
+ the entries whose TTL is at least threshold i - 1 and below threshold i,
+ the first and last buckets being open ended.
+
+ This scans the whole table, so it is only run on demand.
+ */
+WITH live AS (
+    SELECT
+        size,
+        ttl
+    FROM psqache
+    WHERE expires_at > NOW()
+),
+
+ttl_buckets AS (
+    SELECT
+        WIDTH_BUCKET(ttl, $1::INT []) AS bucket,
+        COUNT(*) AS entries
+    FROM live
+    GROUP BY bucket
+)
+
+SELECT
+    sizes.entries,
+    PG_TOTAL_RELATION_SIZE('psqache') AS table_bytes,
+    sizes.value_sizes,
+    ARRAY(
+        SELECT COALESCE(ttl_buckets.entries, 0)
+        FROM GENERATE_SERIES(0, CARDINALITY($1::INT [])) AS bucket
+        LEFT JOIN ttl_buckets USING (bucket)
+        ORDER BY bucket
+    ) AS ttl_counts
+FROM (
+    SELECT
+        COUNT(*) AS entries,
+        PERCENTILE_DISC(ARRAY[0.5, 0.9, 0.99, 1.0]::FLOAT8 []) WITHIN GROUP (
+            ORDER BY size
+        ) AS value_sizes
+    FROM live
+) AS sizes;
+-- name: evict_cache_entries
+/*
+ Evict the least recently used entries of a random sample of the table.
+
+ Sample the given percentage ($2) of the table pages, and delete at most
+ the given number of its entries ($1): the expired ones first, then the
+ ones accessed the longest ago. Like the sampled eviction of Redis, this
+ approximates LRU without keeping the entries ordered by access. Rows
+ locked by other sessions are skipped.
+
+ Return the number of evicted entries and the total size of their values.
+ */
+WITH evicted AS (
+    DELETE FROM psqache
+    WHERE ctid = ANY(ARRAY(
+        SELECT ctid FROM psqache TABLESAMPLE SYSTEM ($2::REAL)
+        ORDER BY expires_at <= NOW() DESC, last_access ASC
+        LIMIT $1
+        FOR UPDATE SKIP LOCKED
+    ))
+    RETURNING size
+)
+
+SELECT
+    COUNT(*) AS evicted,
+    COALESCE(SUM(size), 0)::BIGINT AS bytes
+FROM evicted;
+-- name: increment_counter
+/*
+ Increment a counter.
+
+ Add the given delta ($2) to the counter, creating it with the given
+ initial value ($4) and time-to-live ($3) in seconds if it does not exist
+ or has expired. The increment is a single atomic statement, so concurrent
+ increments are never lost. Return the new value.
+ */
+INSERT INTO psqache_counters AS counter (key, value, expires_at)
+VALUES ($1, $4::BIGINT + $2::BIGINT, NOW() + $3::INT * INTERVAL '1 second')
+ON CONFLICT (key) DO
+UPDATE
+SET
+    value = CASE
+        WHEN counter.expires_at <= NOW() THEN EXCLUDED.value
+        ELSE counter.value + $2::BIGINT
+    END,
+    expires_at = CASE
+        WHEN counter.expires_at <= NOW() THEN EXCLUDED.expires_at
+        ELSE counter.expires_at
+    END
+RETURNING value;
+-- name: increment_counters
+/*
+ Increment many counters.
+
+ The keys and deltas are passed as parallel arrays, sorted by key so that
+ concurrent batches lock the counters in the same order. Counters are
+ created as in increment_counter; the inserted value holds the initial value
+ plus the delta, so the delta of an existing counter is recovered from it.
+ Return the key and new value of every counter.
+ */
+INSERT INTO psqache_counters AS counter (key, value, expires_at)
+SELECT
+    entry.key,
+    $4::BIGINT + entry.delta,
+    NOW() + $3::INT * INTERVAL '1 second'
+FROM UNNEST($1::TEXT [], $2::BIGINT []) AS entry (key, delta)
+ORDER BY entry.key
+ON CONFLICT (key) DO
+UPDATE
+SET
+    value = CASE
+        WHEN counter.expires_at <= NOW() THEN EXCLUDED.value
+        ELSE counter.value + EXCLUDED.value - $4::BIGINT
+    END,
+    expires_at = CASE
+        WHEN counter.expires_at <= NOW() THEN EXCLUDED.expires_at
+        ELSE counter.expires_at
+    END
+RETURNING key, value;
+-- name: get_counter
+/*
+ Get a counter by key.
+
+ If the counter exists and has not expired, return its value. Otherwise,
+ return no row.
+ */
+SELECT value
+FROM psqache_counters
+WHERE
+    key = $1
+    AND expires_at > NOW();
+-- name: delete_counter
+/*
+ Delete a counter by key.
+
+ If the counter exists, delete it, so the next increment starts it over.
+ If the counter with the specified key does not exist, no action is taken.
+ */
+DELETE FROM psqache_counters
+WHERE key = $1;
+-- name: cleanup_expired_counters
+/*
+ Cleanup expired counters.
+
+ Delete at most the given number of expired counters ($1), skipping rows
+ locked by other sessions. Return the number of deleted counters.
+ */
+WITH reaped AS (
+    DELETE FROM psqache_counters
+    WHERE ctid = ANY(ARRAY(
+        SELECT ctid FROM psqache_counters
+        WHERE expires_at <= NOW()
+        LIMIT $1
+        FOR UPDATE SKIP LOCKED
+    ))
+    RETURNING 1
+)
+
+SELECT COUNT(*) AS reaped
+FROM reaped;
+-- name: notify_cache_invalidation
+/*
+ Send cache invalidation messages.
+
+ Each payload in the given array is sent as one notification on the given
+ channel. Notifications are only delivered when the enclosing transaction
+ commits, so listeners never see invalidations for rolled back writes.
+ */
+SELECT PG_NOTIFY($1, payload)
+FROM UNNEST($2::TEXT []) AS payload;
+-- name: lock_cache_entry
+/*
+ Try to take the advisory lock of a cache entry.
+
+ The lock is keyed on the hash of the key and released when the enclosing
+ transaction ends. Return TRUE if the lock was taken, FALSE if another
+ session holds it.
+ */
+SELECT PG_TRY_ADVISORY_XACT_LOCK(HASHTEXT($1)) AS locked;
+-- name: lock_maintenance_task
+/*
+ Try to take the advisory lock of a maintenance task, such as the reaper.
+
+ The lock is session scoped, so the session holding it runs the task until
+ it disconnects or releases the lock. It uses the two-key form of advisory
+ locks, which never collides with the locks of cache entries. Return TRUE
+ if the lock was taken, FALSE if another session holds it.
+ */
+SELECT PG_TRY_ADVISORY_LOCK(HASHTEXT('psqache'), HASHTEXT($1)) AS locked;
+-- name: get_replication_lag
+/*
+ Get how many seconds the server lags behind the primary when it is a
+ standby, or zero on the primary itself. A standby that has replayed all
+ the WAL it received is not lagging, even if nothing was written for a
+ while. Return NULL when the lag is unknown.
+ */
+SELECT (CASE
+    WHEN NOT PG_IS_IN_RECOVERY() THEN 0
+    WHEN PG_LAST_WAL_RECEIVE_LSN() = PG_LAST_WAL_REPLAY_LSN() THEN 0
+    ELSE EXTRACT(EPOCH FROM NOW() - PG_LAST_XACT_REPLAY_TIMESTAMP())
+END)::FLOAT8 AS lag;
+-- name: set_cache_tables_logged
+/*
+ Make the cache and counter tables logged, so their changes are written to
+ the WAL and replicated to standbys, where unlogged tables cannot be read.
+ Each table is rewritten, which is quick while it is still small.
+ */
+ALTER TABLE psqache SET LOGGED;
+ALTER TABLE psqache_counters SET LOGGED;
+-- name: lock_schema_changes
+/*
+ Wait for the advisory lock guarding changes to the schema.
+
+ Concurrent CREATE ... IF NOT EXISTS statements can still fail on the
+ catalog's unique constraints, so processes starting at the same time
+ create the schema one after the other. The lock is released when the
+ enclosing transaction ends.
+ */
+SELECT PG_ADVISORY_XACT_LOCK(HASHTEXT('psqache'), HASHTEXT('schema'));
 -- name: drop_cache_table
 /*
- Drop the cache table.
+ Drop the cache and counter tables.
  */
-DROP TABLE IF EXISTS psqache;
+DROP TABLE IF EXISTS psqache, psqache_counters;
@@ -0,0 +1,371 @@
+"""This module contains the read-replica routing backend.
+
+A single Postgres server serves every read of the cache, although streaming
+replicas hold a copy of the cache table once it is logged. The replicated
+backend sends writes to the primary backend and spreads reads over backends
+connected to the replicas, so read throughput grows with the number of
+replicas instead of with the size of the primary.
+
+Reads go to the replica with the fewest reads in flight. Replicas lagging
+more than `max_lag` behind the primary, or failing, are skipped until their
+lag is measured again, and reads fall back to the primary when no replica is
+available. A read that has not completed within the recent p95 latency of
+the replicas is hedged: it is sent to a second replica and the first answer
+wins, which cuts the tail latency caused by a slow or stalled replica.
+
+Replicas apply changes asynchronously, so a read can miss a write made up to
+`max_lag` seconds earlier.
+"""
+
+import asyncio
+import contextlib
+import logging
+import math
+import time
+from collections import deque
+from collections.abc import Awaitable
+from collections.abc import Callable
+from collections.abc import Sequence
+from typing import Any
+from typing import NamedTuple
+from typing import TypeVar
+
+import asyncpg
+
+from psqache.abcs import CacheEntry
+from psqache.abcs import ICacheBackend
+from psqache.backends import BackendWrapper
+from psqache.backends import PostgresBackend
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class ReplicaStats(NamedTuple):
+    """Statistics of the reads of a replicated backend.
+
+    Attributes:
+        replica_reads: The number of reads sent to a replica, hedges included.
+        primary_reads: The number of reads that fell back to the primary.
+        hedged_reads: The number of reads sent to a second replica.
+        errors: The number of replica reads that failed.
+        lags: The last measured lag of each replica in seconds, None when
+            unknown.
+    """
+
+    replica_reads: int
+    primary_reads: int
+    hedged_reads: int
+    errors: int
+    lags: tuple[float | None, ...]
+
+
+class ReplicatedBackend(BackendWrapper):
+    """Backend routing reads to read replicas and writes to the primary.
+
+    `get`, `get_entry`, `has`, `get_many` and `has_many` are served by the
+    replicas, every other operation by the wrapped primary backend. The
+    replica backends must not have a capacity, as recording accesses writes
+    to the table, so with a capacity only the reads falling back to the
+    primary are tracked.
+    Implements the ICacheBackend interface.
+    """
+
+    ERRORS = (OSError, asyncpg.PostgresError, asyncpg.InterfaceError)
+    """Errors of a replica read that fall back to the primary."""
+
+    MIN_HEDGE_SAMPLES = 100
+    """Number of replica read latencies between two updates of the hedging
+    delay, and before reads are hedged at all."""
+
+    def __init__(  # noqa: PLR0913
+        self,
+        backend: ICacheBackend,
+        replicas: Sequence[PostgresBackend],
+        *,
+        max_lag: float = 1.0,
+        lag_interval: float = 1.0,
+        hedge: bool = True,
+        hedge_quantile: float = 0.95,
+        min_hedge_delay: float = 0.001,
+        latency_window: int = 1000,
+    ) -> None:
+        """Initialize the ReplicatedBackend.
+
+        Args:
+            backend (ICacheBackend): The backend of the primary.
+            replicas (Sequence[PostgresBackend]): The backends connected to
+                the replicas.
+            max_lag (float): The lag in seconds above which a replica is not
+                read from.
+            lag_interval (float): Seconds between two measures of the lag of
+                the replicas.
+            hedge (bool): Whether slow reads are sent to a second replica.
+            hedge_quantile (float): The quantile of the recent replica read
+                latencies after which a read is hedged.
+            min_hedge_delay (float): The minimum delay in seconds before a
+                read is hedged.
+            latency_window (int): The number of recent replica read latencies
+                the hedging delay is computed from.
+        """
+        super().__init__(backend)
+        self.replicas = list(replicas)
+        self.max_lag = max_lag
+        self.lag_interval = lag_interval
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.min_hedge_delay = min_hedge_delay
+        self.latencies: deque[float] = deque(maxlen=latency_window)
+        self.samples = 0
+        self.hedge_delay: float | None = None
+        self.lags: list[float | None] = [None] * len(self.replicas)
+        # Replicas are assumed available until their lag is first measured.
+        self.healthy = [True] * len(self.replicas)
+        self.in_flight = [0] * len(self.replicas)
+        self.replica_reads = 0
+        self.primary_reads = 0
+        self.hedged_reads = 0
+        self.errors = 0
+        self._turn = 0
+        self._measured = -math.inf
+        self._measuring: asyncio.Task[None] | None = None
+
+    @property
+    def stats(self) -> ReplicaStats:
+        """The statistics of the reads."""
+        return ReplicaStats(
+            self.replica_reads,
+            self.primary_reads,
+            self.hedged_reads,
+            self.errors,
+            tuple(self.lags),
+        )
+
+    async def measure_lag(self) -> None:
+        """Measure the lag of every replica and update their availability.
+
+        A replica whose lag cannot be measured is not available.
+        """
+        lags = await asyncio.gather(
+            *(replica.replication_lag() for replica in self.replicas),
+            return_exceptions=True,
+        )
+        for index, lag in enumerate(lags):
+            self.lags[index] = lag if isinstance(lag, float) else None
+            self.healthy[index] = isinstance(lag, float) and lag <= self.max_lag
+
+    def schedule_lag_measure(self) -> None:
+        """Measure the lag in the background once it is `lag_interval` old."""
+        now = time.monotonic()
+        if now - self._measured < self.lag_interval:
+            return
+        if self._measuring is None or self._measuring.done():
+            self._measured = now
+            self._measuring = asyncio.get_running_loop().create_task(
+                self.measure_lag(),
+            )
+
+    def choose(self, exclude: int | None = None) -> int | None:
+        """Choose the available replica with the fewest reads in flight.
+
+        Ties are broken in turn, so idle replicas share the reads evenly.
+
+        Args:
+            exclude (Optional[int]): The index of a replica not to choose.
+
+        Returns:
+            Optional[int]: The index of the replica, or None if none is
+                available.
+        """
+        count = len(self.replicas)
+        candidates = [
+            index for index in range(count) if self.healthy[index] and index != exclude
+        ]
+        if not candidates:
+            return None
+        self._turn += 1
+        return min(
+            candidates,
+            key=lambda index: (self.in_flight[index], (index - self._turn) % count),
+        )
+
+    def record_latency(self, latency: float) -> None:
+        """Record the latency of a replica read and update the hedging delay.
+
+        The delay is recomputed once per `MIN_HEDGE_SAMPLES` reads, so reads
+        do not sort the latencies every time.
+
+        Args:
+            latency (float): The latency in seconds.
+        """
+        self.latencies.append(latency)
+        self.samples += 1
+        if self.samples % self.MIN_HEDGE_SAMPLES:
+            return
+        ordered = sorted(self.latencies)
+        rank = min(int(self.hedge_quantile * len(ordered)), len(ordered) - 1)
+        self.hedge_delay = max(ordered[rank], self.min_hedge_delay)
+
+    async def read_replica(
+        self,
+        operation: Callable[[ICacheBackend], Awaitable[T]],
+        index: int,
+    ) -> T:
+        """Run a read on a replica, recording its latency.
+
+        A replica whose read fails is not available until its lag is
+        measured again.
+
+        Args:
+            operation (Callable): The read, given the backend to run on.
+            index (int): The index of the replica.
+
+        Returns:
+            Any: The result of the read.
+        """
+        self.replica_reads += 1
+        self.in_flight[index] += 1
+        start = time.perf_counter()
+        try:
+            result = await operation(self.replicas[index])
+        except self.ERRORS:
+            self.errors += 1
+            self.healthy[index] = False
+            raise
+        finally:
+            self.in_flight[index] -= 1
+        self.record_latency(time.perf_counter() - start)
+        return result
+
+    async def read_hedged(
+        self,
+        operation: Callable[[ICacheBackend], Awaitable[T]],
+        index: int,
+    ) -> T:
+        """Run a read on a replica, and on a second one if it is slow.
+
+        Args:
+            operation (Callable): The read, given the backend to run on.
+            index (int): The index of the first replica.
+
+        Returns:
+            Any: The result of the first read to succeed.
+        """
+        loop = asyncio.get_running_loop()
+        tasks = {loop.create_task(self.read_replica(operation, index))}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_delay)
+            second = None if done else self.choose(exclude=index)
+            if second is not None:
+                self.hedged_reads += 1
+                tasks.add(loop.create_task(self.read_replica(operation, second)))
+            while True:
+                done, _ = await asyncio.wait(
+                    tasks,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                for task in done:
+                    tasks.discard(task)
+                    if task.exception() is None or not tasks:
+                        return task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def read(self, operation: Callable[[ICacheBackend], Awaitable[T]]) -> T:
+        """Run a read on the replicas, falling back to the primary.
+
+        Args:
+            operation (Callable): The read, given the backend to run on.
+
+        Returns:
+            Any: The result of the read.
+        """
+        self.schedule_lag_measure()
+        index = self.choose()
+        if index is not None:
+            try:
+                if self.hedge and self.hedge_delay is not None:
+                    return await self.read_hedged(operation, index)
+                return await self.read_replica(operation, index)
+            except self.ERRORS:
+                logger.warning("Replica read failed", exc_info=True)
+        self.primary_reads += 1
+        return await operation(self.backend)
+
+    async def get(self, key: str) -> Any | None:
+        """Retrieve a cache entry by key from a replica.
+
+        Args:
+            key: The key to retrieve.
+
+        Returns:
+            The value associated with the key, or None if not found or expired.
+        """
+        return await self.read(lambda backend: backend.get(key))
+
+    async def get_entry(self, key: str) -> CacheEntry | None:
+        """Retrieve a cache entry by key from a replica, with its expiry.
+
+        Args:
+            key: The key to retrieve.
+
+        Returns:
+            The entry, or None if not found or expired.
+        """
+        return await self.read(lambda backend: backend.get_entry(key))
+
+    async def has(self, key: str) -> bool:
+        """Check on a replica if a cache entry exists and is not expired.
+
+        Args:
+            key: The key to check.
+
+        Returns:
+            True if the key exists and is not expired, otherwise False.
+        """
+        return await self.read(lambda backend: backend.has(key))
+
+    async def get_many(self, keys: list[str]) -> dict[str, Any]:
+        """Retrieve many cache entries from a replica in a single round trip.
+
+        Args:
+            keys: The keys to retrieve.
+
+        Returns:
+            The values of the keys that exist and are not expired.
+        """
+        return await self.read(lambda backend: backend.get_many(keys))
+
+    async def get_entries(self, keys: list[str]) -> dict[str, CacheEntry]:
+        """Retrieve many cache entries with their expiry from a replica.
+
+        Args:
+            keys: The keys to retrieve.
+
+        Returns:
+            The entries of the keys that exist and are not expired.
+        """
+        return await self.read(lambda backend: backend.get_entries(keys))
+
+    async def has_many(self, keys: list[str]) -> dict[str, bool]:
+        """Check on a replica which cache entries exist and are not expired.
+
+        Args:
+            keys: The keys to check.
+
+        Returns:
+            True for the keys that exist and are not expired, otherwise False.
+        """
+        return await self.read(lambda backend: backend.has_many(keys))
+
+    async def close(self) -> None:
+        """Stop measuring the lag and close the primary and replica backends."""
+        if self._measuring is not None:
+            self._measuring.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._measuring
+        await super().close()
+        for replica in self.replicas:
+            await replica.close()
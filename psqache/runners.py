@@ -0,0 +1,112 @@
+"""This module contains the event-loop thread used by synchronous callers.
+
+Running every synchronous call through `async_to_sync` starts a fresh event
+loop hop per call, and an asyncpg pool is bound to the loop it was created
+on, so it cannot be shared between those calls. The loop thread runs a single
+event loop forever in a daemon thread. Synchronous callers submit coroutines
+to it and block on the result, so the pool and every other piece of async
+state lives on one loop and is reused across calls.
+"""
+
+import asyncio
+import threading
+from collections.abc import Awaitable
+from collections.abc import Coroutine
+from typing import Any
+from typing import TypeVar
+
+T = TypeVar("T")
+
+
+async def resolve(awaitable: Awaitable[T]) -> T:
+    """Await an awaitable, turning it into a coroutine function call.
+
+    Args:
+        awaitable (Awaitable): The awaitable to await.
+
+    Returns:
+        Any: The result of the awaitable.
+    """
+    return await awaitable
+
+
+class LoopThread:
+    """Event loop running forever in a dedicated daemon thread.
+
+    `run` is thread-safe: any number of threads, such as the threads of a
+    threaded WSGI worker, can submit coroutines concurrently. The coroutines
+    all run on the loop thread, so state they share needs no locking. The
+    thread is started on first use and does not survive a fork, so it must be
+    created in the worker process rather than before forking.
+    """
+
+    def __init__(self, name: str = "psqache-loop") -> None:
+        """Initialize the LoopThread.
+
+        Args:
+            name (str): The name of the thread.
+        """
+        self.name = name
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def start(self) -> asyncio.AbstractEventLoop:
+        """Start the thread, unless it is already running.
+
+        Returns:
+            asyncio.AbstractEventLoop: The loop running in the thread.
+        """
+        with self._lock:
+            if self.loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(
+                    target=self._serve,
+                    args=(loop,),
+                    name=self.name,
+                    daemon=True,
+                )
+                thread.start()
+                self.loop, self.thread = loop, thread
+            return self.loop
+
+    @staticmethod
+    def _serve(loop: asyncio.AbstractEventLoop) -> None:
+        """Run the loop until it is stopped.
+
+        Args:
+            loop (asyncio.AbstractEventLoop): The loop to run.
+        """
+        asyncio.set_event_loop(loop)
+        loop.run_forever()
+
+    def run(self, coroutine: Coroutine[Any, Any, T]) -> T:
+        """Run a coroutine on the loop and wait for its result.
+
+        Args:
+            coroutine (Coroutine): The coroutine to run.
+
+        Returns:
+            Any: The result of the coroutine.
+
+        Raises:
+            RuntimeError: If called from the loop thread itself, which would
+                wait forever on a coroutine that can never run.
+        """
+        loop = self.loop or self.start()
+        if threading.current_thread() is self.thread:
+            coroutine.close()
+            msg = "LoopThread.run cannot be called from the loop thread"
+            raise RuntimeError(msg)
+        return asyncio.run_coroutine_threadsafe(coroutine, loop).result()
+
+    def stop(self) -> None:
+        """Stop the loop, wait for the thread to exit and close the loop."""
+        with self._lock:
+            loop, thread = self.loop, self.thread
+            self.loop = self.thread = None
+        if loop is None or thread is None:
+            return
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
@@ -0,0 +1,215 @@
+"""This module contains the value serializers.
+
+Serializers turn cached values into bytes and back. JSON serializers produce
+text that Postgres can store as JSONB; binary serializers can store any value
+their format supports, but require the BYTEA storage layout.
+
+The orjson and msgpack serializers are only available when the corresponding
+package is installed.
+"""
+
+import importlib
+import json
+import pickle  # noqa: S403
+from types import ModuleType
+from typing import Any
+
+from psqache.abcs import ISerializer
+
+
+def import_optional(module: str, feature: str) -> ModuleType:
+    """Import the optional package a feature depends on.
+
+    Args:
+        module (str): The name of the package.
+        feature (str): The feature needing it, for the error message.
+
+    Returns:
+        ModuleType: The imported package.
+
+    Raises:
+        ImportError: If the package is not installed.
+    """
+    try:
+        return importlib.import_module(module)
+    except ImportError as exc:
+        msg = f"{feature} requires the {module} package"
+        raise ImportError(msg) from exc
+
+
+class JsonSerializer:
+    """Serializer using the standard library json module.
+
+    Implements the ISerializer interface.
+    """
+
+    name = "json"
+    json = True
+
+    @staticmethod
+    def dumps(value: Any) -> bytes:
+        """Serialize a value.
+
+        Args:
+            value (Any): The value to serialize.
+
+        Returns:
+            bytes: The serialized value.
+        """
+        return json.dumps(value, separators=(",", ":")).encode()
+
+    @staticmethod
+    def loads(data: bytes) -> Any:
+        """Deserialize a value.
+
+        Args:
+            data (bytes): The serialized value.
+
+        Returns:
+            Any: The deserialized value.
+        """
+        return json.loads(data)
+
+
+class OrjsonSerializer:
+    """Serializer using orjson, a fast JSON library.
+
+    Implements the ISerializer interface.
+    """
+
+    name = "orjson"
+    json = True
+
+    def __init__(self) -> None:
+        """Initialize the OrjsonSerializer."""
+        self.orjson = import_optional("orjson", "The orjson serializer")
+
+    def dumps(self, value: Any) -> bytes:
+        """Serialize a value.
+
+        Args:
+            value (Any): The value to serialize.
+
+        Returns:
+            bytes: The serialized value.
+        """
+        data: bytes = self.orjson.dumps(value)
+        return data
+
+    def loads(self, data: bytes) -> Any:
+        """Deserialize a value.
+
+        Args:
+            data (bytes): The serialized value.
+
+        Returns:
+            Any: The deserialized value.
+        """
+        return self.orjson.loads(data)
+
+
+class PickleSerializer:
+    """Serializer using pickle, supporting most Python objects.
+
+    Only use it with a database that untrusted parties cannot write to, since
+    unpickling data can execute arbitrary code.
+    Implements the ISerializer interface.
+    """
+
+    name = "pickle"
+    json = False
+
+    @staticmethod
+    def dumps(value: Any) -> bytes:
+        """Serialize a value.
+
+        Args:
+            value (Any): The value to serialize.
+
+        Returns:
+            bytes: The serialized value.
+        """
+        return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def loads(data: bytes) -> Any:
+        """Deserialize a value.
+
+        Args:
+            data (bytes): The serialized value.
+
+        Returns:
+            Any: The deserialized value.
+        """
+        return pickle.loads(data)  # noqa: S301
+
+
+class MsgpackSerializer:
+    """Serializer using msgpack, a compact binary format.
+
+    Implements the ISerializer interface.
+    """
+
+    name = "msgpack"
+    json = False
+
+    def __init__(self) -> None:
+        """Initialize the MsgpackSerializer."""
+        self.msgpack = import_optional("msgpack", "The msgpack serializer")
+
+    def dumps(self, value: Any) -> bytes:
+        """Serialize a value.
+
+        Args:
+            value (Any): The value to serialize.
+
+        Returns:
+            bytes: The serialized value.
+        """
+        data: bytes = self.msgpack.packb(value)
+        return data
+
+    def loads(self, data: bytes) -> Any:
+        """Deserialize a value.
+
+        Args:
+            data (bytes): The serialized value.
+
+        Returns:
+            Any: The deserialized value.
+        """
+        return self.msgpack.unpackb(data)
+
+
+SERIALIZERS: dict[str, type[ISerializer]] = {
+    serializer.name: serializer
+    for serializer in (
+        JsonSerializer,
+        OrjsonSerializer,
+        PickleSerializer,
+        MsgpackSerializer,
+    )
+}
+
+
+def get_serializer(serializer: str | ISerializer) -> ISerializer:
+    """Get a serializer by name.
+
+    Args:
+        serializer (str | ISerializer): The name of the serializer, or a
+            serializer instance which is returned as is.
+
+    Returns:
+        ISerializer: The serializer.
+
+    Raises:
+        ValueError: If there is no serializer with the given name.
+    """
+    if not isinstance(serializer, str):
+        return serializer
+    try:
+        serializer_class = SERIALIZERS[serializer]
+    except KeyError:
+        msg = f"Unknown serializer {serializer!r}, expected one of {list(SERIALIZERS)}"
+        raise ValueError(msg) from None
+    return serializer_class()
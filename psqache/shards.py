@@ -0,0 +1,559 @@
+"""This module contains the sharded cache backend.
+
+A single Postgres server absorbs every write of the cache. The sharded
+backend spreads the keys over several backends, usually PostgresBackends
+connected to different servers, so the write throughput grows with the
+number of shards.
+
+Keys are routed with jump consistent hashing (Lamping and Veach, 2014): it
+needs no ring to store, spreads keys evenly, and when a shard is added, only
+the share of keys the new shard takes moves, all of them to the new shard.
+Shards can therefore be added, but never removed or reordered.
+"""
+
+import asyncio
+import hashlib
+import time
+from collections import deque
+from collections.abc import AsyncGenerator
+from collections.abc import AsyncIterator
+from collections.abc import Awaitable
+from collections.abc import Callable
+from collections.abc import Mapping
+from collections.abc import Sequence
+from contextlib import asynccontextmanager
+from typing import Any
+from typing import NamedTuple
+from typing import TypeVar
+
+from psqache.abcs import CacheEntry
+from psqache.abcs import ICacheBackend
+
+T = TypeVar("T")
+
+JUMP_MULTIPLIER = 2862933555777941757
+"""Multiplier of the linear congruential generator of jump hashing."""
+
+
+def key_hash(key: str) -> int:
+    """Hash a key to 64 bits, identically in every process.
+
+    Args:
+        key (str): The key to hash.
+
+    Returns:
+        int: The unsigned 64-bit hash of the key.
+    """
+    digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+def jump_hash(key: int, buckets: int) -> int:
+    """Map a 64-bit key to a bucket with jump consistent hashing.
+
+    Args:
+        key (int): The unsigned 64-bit key.
+        buckets (int): The number of buckets.
+
+    Returns:
+        int: The bucket of the key, from zero to `buckets - 1`.
+    """
+    bucket, jump = -1, 0
+    while jump < buckets:
+        bucket = jump
+        key = (key * JUMP_MULTIPLIER + 1) & 0xFFFFFFFFFFFFFFFF
+        jump = int((bucket + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return bucket
+
+
+class ShardStats(NamedTuple):
+    """Statistics of the operations of a shard.
+
+    Latencies are computed over the recent operations of the shard.
+
+    Attributes:
+        operations: The number of operations run on the shard.
+        errors: The number of operations that failed.
+        p50: The median latency in seconds.
+        p95: The 95th percentile latency in seconds.
+        p99: The 99th percentile latency in seconds.
+    """
+
+    operations: int
+    errors: int
+    p50: float
+    p95: float
+    p99: float
+
+
+class ShardedBackend:
+    """Backend spreading the keys over several shard backends.
+
+    Single-key operations run on the shard of their key. Batch operations are
+    split per shard and the batches run concurrently, as do `clear`,
+    `cleanup` and `close` on every shard. Implements the ICacheBackend
+    interface.
+    """
+
+    def __init__(
+        self,
+        shards: Sequence[ICacheBackend],
+        latency_window: int = 1000,
+    ) -> None:
+        """Initialize the ShardedBackend.
+
+        Args:
+            shards (Sequence[ICacheBackend]): The shard backends. Every
+                process must list them in the same order.
+            latency_window (int): The number of recent operations of each
+                shard its latencies are computed from.
+
+        Raises:
+            ValueError: If there is no shard.
+        """
+        if not shards:
+            msg = "A sharded backend requires at least one shard"
+            raise ValueError(msg)
+        self.shards: list[ICacheBackend] = []
+        self.latency_window = latency_window
+        self.latencies: list[deque[float]] = []
+        self.operations: list[int] = []
+        self.errors: list[int] = []
+        for shard in shards:
+            self.add_shard(shard)
+
+    @property
+    def stats(self) -> list[ShardStats]:
+        """The statistics of every shard, in shard order."""
+        stats = []
+        for index, latencies in enumerate(self.latencies):
+            ordered = sorted(latencies) or [0.0]
+            quantiles = [
+                ordered[min(int(quantile * len(ordered)), len(ordered) - 1)]
+                for quantile in (0.5, 0.95, 0.99)
+            ]
+            stats.append(
+                ShardStats(self.operations[index], self.errors[index], *quantiles),
+            )
+        return stats
+
+    def add_shard(self, shard: ICacheBackend) -> None:
+        """Add a shard after the existing ones.
+
+        About `1 / len(shards)` of the keys move to the new shard, where they
+        are missing until written again. Their previous entries stay on their
+        former shards until they expire.
+
+        Args:
+            shard (ICacheBackend): The backend of the new shard.
+        """
+        self.shards.append(shard)
+        self.latencies.append(deque(maxlen=self.latency_window))
+        self.operations.append(0)
+        self.errors.append(0)
+
+    def shard_of(self, key: str) -> int:
+        """Get the index of the shard holding a key.
+
+        Args:
+            key (str): The key.
+
+        Returns:
+            int: The index of the shard.
+        """
+        return jump_hash(key_hash(key), len(self.shards))
+
+    def group(self, keys: list[str]) -> dict[int, list[str]]:
+        """Group keys by the index of their shard.
+
+        Args:
+            keys (list[str]): The keys to group.
+
+        Returns:
+            dict[int, list[str]]: The keys of each shard, in their order.
+        """
+        groups: dict[int, list[str]] = {}
+        for key in keys:
+            groups.setdefault(self.shard_of(key), []).append(key)
+        return groups
+
+    async def call(
+        self,
+        index: int,
+        operation: Callable[..., Awaitable[T]],
+        *args: Any,
+    ) -> T:
+        """Run an operation on a shard, recording its latency.
+
+        Args:
+            index (int): The index of the shard.
+            operation (Callable): The operation, given the shard backend and
+                the arguments.
+            *args (Any): Other arguments of the operation.
+
+        Returns:
+            Any: The result of the operation.
+        """
+        self.operations[index] += 1
+        start = time.perf_counter()
+        try:
+            return await operation(self.shards[index], *args)
+        except Exception:
+            self.errors[index] += 1
+            raise
+        finally:
+            self.latencies[index].append(time.perf_counter() - start)
+
+    async def fan_out(
+        self,
+        operation: Callable[[ICacheBackend], Awaitable[T]],
+    ) -> list[T]:
+        """Run an operation on every shard concurrently.
+
+        Args:
+            operation (Callable): The operation, given the shard backend.
+
+        Returns:
+            list[Any]: The results of the operation, in shard order.
+        """
+        return await asyncio.gather(
+            *(self.call(index, operation) for index in range(len(self.shards))),
+        )
+
+    async def get(self, key: str) -> Any | None:
+        """Retrieve a cache entry by key from its shard.
+
+        Args:
+            key: The key to retrieve.
+
+        Returns:
+            The value associated with the key, or None if not found or expired.
+        """
+        return await self.call(self.shard_of(key), lambda shard: shard.get(key))
+
+    async def get_entry(self, key: str) -> CacheEntry | None:
+        """Retrieve a cache entry by key from its shard, with its expiry.
+
+        Args:
+            key: The key to retrieve.
+
+        Returns:
+            The entry, or None if not found or expired.
+        """
+        return await self.call(
+            self.shard_of(key),
+            lambda shard: shard.get_entry(key),
+        )
+
+    async def set(self, key: str, value: dict, ttl: int) -> None:
+        """Set or update a cache entry on its shard.
+
+        Args:
+            key: The key to set.
+            value: The value to associate with the key.
+            ttl: Time-to-live in seconds for the entry.
+        """
+        await self.call(
+            self.shard_of(key),
+            lambda shard: shard.set(key, value, ttl),
+        )
+
+    async def delete(self, key: str) -> None:
+        """Delete a cache entry by key from its shard.
+
+        Args:
+            key: The key to delete.
+        """
+        await self.call(self.shard_of(key), lambda shard: shard.delete(key))
+
+    async def clear(self) -> None:
+        """Clear all cache entries of every shard."""
+        await self.fan_out(lambda shard: shard.clear())
+
+    async def cleanup(self) -> None:
+        """Delete all expired cache entries of every shard."""
+        await self.fan_out(lambda shard: shard.cleanup())
+
+    async def has(self, key: str) -> bool:
+        """Check if a cache entry exists on its shard and is not expired.
+
+        Args:
+            key: The key to check.
+
+        Returns:
+            True if the key exists and is not expired, otherwise False.
+        """
+        return await self.call(self.shard_of(key), lambda shard: shard.has(key))
+
+    async def get_many(self, keys: list[str]) -> dict[str, Any]:
+        """Retrieve many cache entries, with one batch per shard.
+
+        Args:
+            keys: The keys to retrieve.
+
+        Returns:
+            The values of the keys that exist and are not expired.
+        """
+        found: dict[str, Any] = {}
+        for result in await self.map_groups(
+            keys,
+            lambda shard, group: shard.get_many(group),
+        ):
+            found.update(result)
+        return found
+
+    async def get_entries(self, keys: list[str]) -> dict[str, CacheEntry]:
+        """Retrieve many cache entries with their expiry, one batch per shard.
+
+        Args:
+            keys: The keys to retrieve.
+
+        Returns:
+            The entries of the keys that exist and are not expired.
+        """
+        found: dict[str, CacheEntry] = {}
+        for result in await self.map_groups(
+            keys,
+            lambda shard, group: shard.get_entries(group),
+        ):
+            found.update(result)
+        return found
+
+    async def set_many(self, mapping: Mapping[str, dict], ttl: int) -> None:
+        """Set or update many cache entries, with one batch per shard.
+
+        Args:
+            mapping: The values to set, keyed by key.
+            ttl: Time-to-live in seconds for the entries.
+        """
+        await self.map_groups(
+            list(mapping),
+            lambda shard, group: shard.set_many(
+                {key: mapping[key] for key in group},
+                ttl,
+            ),
+        )
+
+    async def import_entries(self, mapping: Mapping[str, Any], ttl: int) -> int:
+        """Set many cache entries in bulk, with one batch per shard.
+
+        Args:
+            mapping: The values to set, keyed by key.
+            ttl: Time-to-live in seconds for the entries.
+
+        Returns:
+            The number of entries written.
+        """
+        imported = await self.map_groups(
+            list(mapping),
+            lambda shard, group: shard.import_entries(
+                {key: mapping[key] for key in group},
+                ttl,
+            ),
+        )
+        return sum(imported)
+
+    async def delete_many(self, keys: list[str]) -> None:
+        """Delete many cache entries, with one batch per shard.
+
+        Args:
+            keys: The keys to delete.
+        """
+        await self.map_groups(keys, lambda shard, group: shard.delete_many(group))
+
+    async def has_many(self, keys: list[str]) -> dict[str, bool]:
+        """Check which cache entries exist, with one batch per shard.
+
+        Args:
+            keys: The keys to check.
+
+        Returns:
+            True for the keys that exist and are not expired, otherwise False.
+        """
+        found: dict[str, bool] = {}
+        for result in await self.map_groups(
+            keys,
+            lambda shard, group: shard.has_many(group),
+        ):
+            found.update(result)
+        return {key: found[key] for key in keys}
+
+    async def touch(self, key: str, ttl: int) -> bool:
+        """Reset the time-to-live of a cache entry on its shard.
+
+        Args:
+            key: The key to touch.
+            ttl: Time-to-live in seconds for the entry, from now.
+
+        Returns:
+            True if the entry exists and is not expired, otherwise False.
+        """
+        return await self.call(
+            self.shard_of(key),
+            lambda shard: shard.touch(key, ttl),
+        )
+
+    async def touch_many(self, keys: list[str], ttl: int) -> dict[str, bool]:
+        """Reset the time-to-live of many cache entries, one batch per shard.
+
+        Args:
+            keys: The keys to touch.
+            ttl: Time-to-live in seconds for the entries, from now.
+
+        Returns:
+            True for the keys that exist and are not expired, otherwise False.
+        """
+        touched: dict[str, bool] = {}
+        for result in await self.map_groups(
+            keys,
+            lambda shard, group: shard.touch_many(group, ttl),
+        ):
+            touched.update(result)
+        return {key: touched[key] for key in keys}
+
+    async def incr(self, key: str, delta: int, ttl: int, initial: int) -> int:
+        """Increment a counter on its shard.
+
+        Args:
+            key: The key of the counter.
+            delta: The amount to add, negative to decrement.
+            ttl: Time-to-live in seconds of the counter if it is created.
+            initial: The value of the counter if it is created.
+
+        Returns:
+            The new value of the counter.
+        """
+        return await self.call(
+            self.shard_of(key),
+            lambda shard: shard.incr(key, delta, ttl, initial),
+        )
+
+    async def incr_many(
+        self,
+        deltas: Mapping[str, int],
+        ttl: int,
+        initial: int,
+    ) -> dict[str, int]:
+        """Increment many counters, with one batch per shard.
+
+        Args:
+            deltas: The amounts to add, keyed by key.
+            ttl: Time-to-live in seconds of the counters that are created.
+            initial: The value of the counters that are created.
+
+        Returns:
+            The new values of the counters, keyed by key.
+        """
+        values: dict[str, int] = {}
+        for result in await self.map_groups(
+            list(deltas),
+            lambda shard, group: shard.incr_many(
+                {key: deltas[key] for key in group},
+                ttl,
+                initial,
+            ),
+        ):
+            values.update(result)
+        return values
+
+    async def get_counter(self, key: str) -> int | None:
+        """Get the value of a counter from its shard.
+
+        Args:
+            key: The key of the counter.
+
+        Returns:
+            The value of the counter, or None if it does not exist or has
+            expired.
+        """
+        return await self.call(
+            self.shard_of(key),
+            lambda shard: shard.get_counter(key),
+        )
+
+    async def delete_counter(self, key: str) -> None:
+        """Delete a counter from its shard.
+
+        Args:
+            key: The key of the counter.
+        """
+        await self.call(self.shard_of(key), lambda shard: shard.delete_counter(key))
+
+    async def iter_keys(
+        self,
+        prefix: str | None,
+        chunk_size: int,
+    ) -> AsyncGenerator[list[str], None]:
+        """Iterate over the keys of the entries that are not expired.
+
+        The shards are iterated over one after the other.
+
+        Args:
+            prefix: The prefix of the keys to iterate over, None for all keys.
+            chunk_size: The maximum number of keys per chunk.
+
+        Yields:
+            The chunks of keys, in key order within each shard.
+        """
+        for shard in self.shards:
+            async for chunk in shard.iter_keys(prefix, chunk_size):
+                yield chunk
+
+    async def iter_items(
+        self,
+        prefix: str | None,
+        chunk_size: int,
+    ) -> AsyncGenerator[dict[str, Any], None]:
+        """Iterate over the entries that are not expired.
+
+        The shards are iterated over one after the other.
+
+        Args:
+            prefix: The prefix of the keys to iterate over, None for all keys.
+            chunk_size: The maximum number of entries per chunk.
+
+        Yields:
+            The chunks of values keyed by key, in key order within each shard.
+        """
+        for shard in self.shards:
+            async for chunk in shard.iter_items(prefix, chunk_size):
+                yield chunk
+
+    @asynccontextmanager
+    async def lock(self, key: str) -> AsyncIterator[bool]:
+        """Try to take the lock used to load the value for a key, on its shard.
+
+        Args:
+            key: The key to lock.
+
+        Yields:
+            True if the lock was taken, otherwise False.
+        """
+        async with self.shards[self.shard_of(key)].lock(key) as locked:
+            yield locked
+
+    async def close(self) -> None:
+        """Release the resources of every shard."""
+        await self.fan_out(lambda shard: shard.close())
+
+    async def map_groups(
+        self,
+        keys: list[str],
+        operation: Callable[[ICacheBackend, list[str]], Awaitable[T]],
+    ) -> list[T]:
+        """Run a batch operation on the keys of each shard concurrently.
+
+        Args:
+            keys (list[str]): The keys of the batch.
+            operation (Callable): The operation, given the shard backend and
+                the keys of the shard.
+
+        Returns:
+            list[Any]: The results of the operation on each shard.
+        """
+        return await asyncio.gather(
+            *(
+                self.call(index, operation, group)
+                for index, group in self.group(keys).items()
+            ),
+        )
@@ -0,0 +1,447 @@
+"""This module contains the two-tier cache backend.
+
+Even an indexed lookup on the cache table costs a network round trip and a
+deserialization. For read-heavy keys this dominates the latency of a hit. The
+tiered backend keeps a bounded in-process copy of recently used entries (L1)
+in front of any backend (L2), so repeated reads are served from memory.
+"""
+
+import os
+import sys
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from collections.abc import Mapping
+from typing import Any
+from typing import BinaryIO
+from typing import NamedTuple
+
+from psqache.abcs import CacheEntry
+from psqache.abcs import ICacheBackend
+from psqache.backends import BackendWrapper
+
+MISSING = object()
+"""Sentinel returned by the local cache for keys it does not hold."""
+
+
+def approximate_size(value: Any) -> int:
+    """Approximate the memory used by a value, in bytes.
+
+    Containers are walked recursively so nested payloads are accounted for.
+    Shared references are counted once per occurrence, which over-estimates
+    rather than under-estimates the footprint.
+
+    Args:
+        value (Any): The value to measure.
+
+    Returns:
+        int: The approximate size of the value in bytes.
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(
+            approximate_size(key) + approximate_size(item)
+            for key, item in value.items()
+        )
+    elif isinstance(value, list | tuple | set | frozenset):
+        size += sum(approximate_size(item) for item in value)
+    return size
+
+
+class LocalEntry(NamedTuple):
+    """An entry held by the local cache."""
+
+    value: Any
+    expires_at: float
+    size: int
+
+
+class LocalCache:
+    """Bounded in-memory LRU cache with per-entry expiry.
+
+    The cache is bounded both by the number of entries and by the approximate
+    number of bytes they use. When either bound is exceeded the least recently
+    used entries are evicted. Expired entries are dropped lazily on access.
+
+    Every set, delete and clear advances an invalidation epoch. A value read
+    from the shared tier is only filled in if the epoch has not changed since
+    the read started, so a value changed or invalidated in the meantime is not
+    put back.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10_000,
+        max_bytes: int = 64 * 1024 * 1024,
+        sizeof: Callable[[Any], int] = approximate_size,
+    ) -> None:
+        """Initialize the LocalCache.
+
+        Args:
+            max_entries (int): The maximum number of entries to hold.
+            max_bytes (int): The maximum approximate size of the entries.
+            sizeof (Callable[[Any], int]): Function measuring a value in bytes.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.size = 0
+        self.epoch = 0
+        self.entries: OrderedDict[str, LocalEntry] = OrderedDict()
+
+    def __len__(self) -> int:
+        """Return the number of entries held, including expired ones."""
+        return len(self.entries)
+
+    def get(self, key: str) -> Any:
+        """Get the value for the given key.
+
+        Args:
+            key (str): The key to get the value for.
+
+        Returns:
+            Any: The value for the given key, or MISSING if it is not held or
+                has expired.
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            return MISSING
+        if entry.expires_at <= time.monotonic():
+            self.discard(key)
+            return MISSING
+        self.entries.move_to_end(key)
+        return entry.value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        """Set the value for the given key.
+
+        Values larger than the whole byte budget are not held.
+
+        Args:
+            key (str): The key to set the value for.
+            value (Any): The value to set for the given key.
+            ttl (float): Time to live in seconds.
+        """
+        self.epoch += 1
+        self.store(key, value, ttl)
+
+    def fill(self, key: str, value: Any, ttl: float, epoch: int) -> None:
+        """Set a value read from the shared tier, unless it may be stale.
+
+        Args:
+            key (str): The key to set the value for.
+            value (Any): The value read.
+            ttl (float): Time to live in seconds.
+            epoch (int): The epoch taken before the value was read.
+        """
+        if epoch == self.epoch:
+            self.store(key, value, ttl)
+
+    def store(self, key: str, value: Any, ttl: float) -> None:
+        """Store a value, evicting entries past the bounds.
+
+        Args:
+            key (str): The key to set the value for.
+            value (Any): The value to set for the given key.
+            ttl (float): Time to live in seconds.
+        """
+        self.discard(key)
+        size = self.sizeof(value)
+        if ttl <= 0 or size > self.max_bytes:
+            return
+        self.entries[key] = LocalEntry(value, time.monotonic() + ttl, size)
+        self.size += size
+        while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= evicted.size
+
+    def delete(self, key: str) -> None:
+        """Delete the value for the given key.
+
+        Args:
+            key (str): The key to delete the value for.
+        """
+        self.epoch += 1
+        self.discard(key)
+
+    def discard(self, key: str) -> None:
+        """Drop the entry of the given key, without advancing the epoch.
+
+        Args:
+            key (str): The key to drop the entry of.
+        """
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry.size
+
+    def clear(self) -> None:
+        """Remove all the entries."""
+        self.epoch += 1
+        self.entries.clear()
+        self.size = 0
+
+    def cleanup(self) -> None:
+        """Remove the expired entries."""
+        now = time.monotonic()
+        expired = [
+            key for key, entry in self.entries.items() if entry.expires_at <= now
+        ]
+        for key in expired:
+            self.discard(key)
+
+
+class TieredBackend(BackendWrapper):
+    """Backend with an in-process L1 tier in front of another backend.
+
+    Reads are served from the local cache when possible and filled from the
+    wrapped backend on a miss. Writes go through to the wrapped backend first
+    and then update the local cache, so a failed write never leaves a value
+    behind locally. Local entries live for at most `local_ttl` seconds and
+    never longer than the shared entries they were copied from.
+
+    Values are returned by reference: callers must not mutate them.
+    Implements the ICacheBackend interface.
+    """
+
+    def __init__(
+        self,
+        backend: ICacheBackend,
+        local: LocalCache | None = None,
+        local_ttl: float = 60,
+    ) -> None:
+        """Initialize the TieredBackend.
+
+        Args:
+            backend (ICacheBackend): The backend holding the shared entries.
+            local (Optional[LocalCache]): The local cache. Defaults to a
+                LocalCache with the default bounds.
+            local_ttl (float): The maximum time to live of local entries.
+        """
+        super().__init__(backend)
+        self.local = local if local is not None else LocalCache()
+        self.local_ttl = local_ttl
+
+    async def get(self, key: str) -> Any | None:
+        """Retrieve a cache entry by key, from the local tier when possible.
+
+        Args:
+            key: The key to retrieve.
+
+        Returns:
+            The value associated with the key, or None if not found or expired.
+        """
+        value = self.local.get(key)
+        if value is not MISSING:
+            return value
+        entry = await self.get_entry(key)
+        return None if entry is None else entry.value
+
+    async def get_entry(self, key: str) -> CacheEntry | None:
+        """Retrieve a cache entry by key, with its expiry.
+
+        The local tier does not hold the expiry of the shared entries, so the
+        entry is always read from the wrapped backend. It is then copied to
+        the local tier, for no longer than it has left to live, unless the
+        local tier was changed or invalidated while it was read.
+
+        Args:
+            key: The key to retrieve.
+
+        Returns:
+            The entry, or None if not found or expired.
+        """
+        epoch = self.local.epoch
+        entry = await self.backend.get_entry(key)
+        if entry is not None and entry.value is not None:
+            self.local.fill(
+                key,
+                entry.value,
+                min(entry.expires_in, self.local_ttl),
+                epoch,
+            )
+        return entry
+
+    async def set(self, key: str, value: dict, ttl: int) -> None:
+        """Set or update a cache entry in both tiers.
+
+        Args:
+            key: The key to set.
+            value: The value to associate with the key.
+            ttl: Time-to-live in seconds for the entry.
+        """
+        await self.backend.set(key, value, ttl)
+        self.local.set(key, value, min(ttl, self.local_ttl))
+
+    async def delete(self, key: str) -> None:
+        """Delete a cache entry by key from both tiers.
+
+        Args:
+            key: The key to delete.
+        """
+        await self.backend.delete(key)
+        self.local.delete(key)
+
+    async def clear(self) -> None:
+        """Clear all cache entries from both tiers."""
+        await self.backend.clear()
+        self.local.clear()
+
+    async def cleanup(self) -> None:
+        """Delete all expired cache entries from both tiers."""
+        await self.backend.cleanup()
+        self.local.cleanup()
+
+    async def has(self, key: str) -> bool:
+        """Check if a cache entry exists, in the local tier when possible.
+
+        Args:
+            key: The key to check.
+
+        Returns:
+            True if the entry exists and is not expired, otherwise False.
+        """
+        if self.local.get(key) is not MISSING:
+            return True
+        return await self.backend.has(key)
+
+    async def get_many(self, keys: list[str]) -> dict[str, Any]:
+        """Retrieve many cache entries, querying only the local misses.
+
+        Args:
+            keys: The keys to retrieve.
+
+        Returns:
+            The values found, keyed by key. Missing and expired keys are left out.
+        """
+        found: dict[str, Any] = {}
+        missing: list[str] = []
+        for key in keys:
+            value = self.local.get(key)
+            if value is MISSING:
+                missing.append(key)
+            else:
+                found[key] = value
+        if missing:
+            epoch = self.local.epoch
+            for key, entry in (await self.backend.get_entries(missing)).items():
+                if entry.value is not None:
+                    self.local.fill(
+                        key,
+                        entry.value,
+                        min(entry.expires_in, self.local_ttl),
+                        epoch,
+                    )
+                found[key] = entry.value
+        return found
+
+    async def set_many(self, mapping: Mapping[str, dict], ttl: int) -> None:
+        """Set or update many cache entries in both tiers.
+
+        Args:
+            mapping: The values to set, keyed by key.
+            ttl: Time-to-live in seconds for the entries.
+        """
+        await self.backend.set_many(mapping, ttl)
+        local_ttl = min(ttl, self.local_ttl)
+        for key, value in mapping.items():
+            self.local.set(key, value, local_ttl)
+
+    async def import_entries(self, mapping: Mapping[str, Any], ttl: int) -> int:
+        """Set many cache entries in bulk, dropping their local copies.
+
+        Imports may keep fresher shared entries, so the local tier is not
+        filled with the imported values.
+
+        Args:
+            mapping: The values to set, keyed by key.
+            ttl: Time-to-live in seconds for the entries.
+
+        Returns:
+            The number of entries written.
+        """
+        imported = await self.backend.import_entries(mapping, ttl)
+        for key in mapping:
+            self.local.delete(key)
+        return imported
+
+    async def import_snapshot(self, source: str | os.PathLike[str] | BinaryIO) -> int:
+        """Import the entries of a snapshot, then clear the local tier.
+
+        Args:
+            source: The path of the snapshot file, or a binary file to read it
+                from.
+
+        Returns:
+            The number of entries written.
+        """
+        imported = await super().import_snapshot(source)
+        self.local.clear()
+        return imported
+
+    async def delete_many(self, keys: list[str]) -> None:
+        """Delete many cache entries from both tiers.
+
+        Args:
+            keys: The keys to delete.
+        """
+        await self.backend.delete_many(keys)
+        for key in keys:
+            self.local.delete(key)
+
+    async def has_many(self, keys: list[str]) -> dict[str, bool]:
+        """Check which of the given keys exist, querying only the local misses.
+
+        Args:
+            keys: The keys to check.
+
+        Returns:
+            True for the keys that exist and are not expired, otherwise False.
+        """
+        result = {key: self.local.get(key) is not MISSING for key in keys}
+        missing = [key for key, present in result.items() if not present]
+        if missing:
+            result.update(await self.backend.has_many(missing))
+        return result
+
+    async def touch(self, key: str, ttl: int) -> bool:
+        """Reset the time-to-live of a cache entry in both tiers.
+
+        Args:
+            key: The key to touch.
+            ttl: Time-to-live in seconds for the entry, from now.
+
+        Returns:
+            True if the entry exists and is not expired, otherwise False.
+        """
+        touched = await self.backend.touch(key, ttl)
+        self.touch_local(key, ttl, touched=touched)
+        return touched
+
+    async def touch_many(self, keys: list[str], ttl: int) -> dict[str, bool]:
+        """Reset the time-to-live of many cache entries in both tiers.
+
+        Args:
+            keys: The keys to touch.
+            ttl: Time-to-live in seconds for the entries, from now.
+
+        Returns:
+            True for the keys that exist and are not expired, otherwise False.
+        """
+        result = await self.backend.touch_many(keys, ttl)
+        for key, touched in result.items():
+            self.touch_local(key, ttl, touched=touched)
+        return result
+
+    def touch_local(self, key: str, ttl: int, *, touched: bool) -> None:
+        """Apply a touch of the wrapped backend to the local tier.
+
+        Args:
+            key: The touched key.
+            ttl: The new time-to-live of the entry.
+            touched: Whether the entry existed in the wrapped backend.
+        """
+        value = self.local.get(key)
+        if not touched:
+            self.local.delete(key)
+        elif value is not MISSING:
+            self.local.set(key, value, min(ttl, self.local_ttl))
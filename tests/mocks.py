@@ -1,5 +1,11 @@
 """This module contains mock implementations for testing purposes."""
 
+import inspect
+from collections.abc import AsyncIterator
+from collections.abc import Callable
+from collections.abc import Iterable
+from collections.abc import Mapping
+from contextlib import asynccontextmanager
 from typing import Any
 
 from asgiref import sync as asgiref_sync
@@ -67,6 +73,151 @@ class MockCache(abcs.ICache):
         """Mock implementation of the sync has method."""
         return asgiref_sync.async_to_sync(self.ahas)(key)
 
+    async def aget_many(self, keys: Iterable[str]) -> dict[str, Any]:
+        """Mock implementation of the async get_many method."""
+        return await self.backend.get_many(list(keys))
+
+    def get_many(self, keys: Iterable[str]) -> dict[str, Any]:
+        """Mock implementation of the sync get_many method."""
+        return asgiref_sync.async_to_sync(self.aget_many)(keys)
+
+    async def aset_many(self, mapping: Mapping[str, Any], ttl: int | None = None) -> None:
+        """Mock implementation of the async set_many method."""
+        _ttl = ttl if ttl is not None else 3600
+        await self.backend.set_many(mapping, _ttl)
+
+    def set_many(self, mapping: Mapping[str, Any], ttl: int | None = None) -> None:
+        """Mock implementation of the sync set_many method."""
+        asgiref_sync.async_to_sync(self.aset_many)(mapping, ttl)
+
+    async def adelete_many(self, keys: Iterable[str]) -> None:
+        """Mock implementation of the async delete_many method."""
+        await self.backend.delete_many(list(keys))
+
+    def delete_many(self, keys: Iterable[str]) -> None:
+        """Mock implementation of the sync delete_many method."""
+        asgiref_sync.async_to_sync(self.adelete_many)(keys)
+
+    async def ahas_many(self, keys: Iterable[str]) -> dict[str, bool]:
+        """Mock implementation of the async has_many method."""
+        return await self.backend.has_many(list(keys))
+
+    def has_many(self, keys: Iterable[str]) -> dict[str, bool]:
+        """Mock implementation of the sync has_many method."""
+        return asgiref_sync.async_to_sync(self.ahas_many)(keys)
+
+    async def atouch(self, key: str, ttl: int | None = None) -> bool:
+        """Mock implementation of the async touch method."""
+        _ttl = ttl if ttl is not None else 3600
+        return await self.backend.touch(key, _ttl)
+
+    def touch(self, key: str, ttl: int | None = None) -> bool:
+        """Mock implementation of the sync touch method."""
+        return asgiref_sync.async_to_sync(self.atouch)(key, ttl)
+
+    async def atouch_many(
+        self, keys: Iterable[str], ttl: int | None = None
+    ) -> dict[str, bool]:
+        """Mock implementation of the async touch_many method."""
+        _ttl = ttl if ttl is not None else 3600
+        return await self.backend.touch_many(list(keys), _ttl)
+
+    def touch_many(self, keys: Iterable[str], ttl: int | None = None) -> dict[str, bool]:
+        """Mock implementation of the sync touch_many method."""
+        return asgiref_sync.async_to_sync(self.atouch_many)(keys, ttl)
+
+    async def aincr(
+        self, key: str, delta: int = 1, ttl: int | None = None, initial: int = 0
+    ) -> int:
+        """Mock implementation of the async incr method."""
+        _ttl = ttl if ttl is not None else 3600
+        return await self.backend.incr(key, delta, _ttl, initial)
+
+    def incr(
+        self, key: str, delta: int = 1, ttl: int | None = None, initial: int = 0
+    ) -> int:
+        """Mock implementation of the sync incr method."""
+        return asgiref_sync.async_to_sync(self.aincr)(key, delta, ttl, initial)
+
+    async def adecr(
+        self, key: str, delta: int = 1, ttl: int | None = None, initial: int = 0
+    ) -> int:
+        """Mock implementation of the async decr method."""
+        return await self.aincr(key, -delta, ttl, initial)
+
+    def decr(
+        self, key: str, delta: int = 1, ttl: int | None = None, initial: int = 0
+    ) -> int:
+        """Mock implementation of the sync decr method."""
+        return asgiref_sync.async_to_sync(self.adecr)(key, delta, ttl, initial)
+
+    async def aincr_many(
+        self, deltas: Mapping[str, int], ttl: int | None = None, initial: int = 0
+    ) -> dict[str, int]:
+        """Mock implementation of the async incr_many method."""
+        _ttl = ttl if ttl is not None else 3600
+        return await self.backend.incr_many(deltas, _ttl, initial)
+
+    def incr_many(
+        self, deltas: Mapping[str, int], ttl: int | None = None, initial: int = 0
+    ) -> dict[str, int]:
+        """Mock implementation of the sync incr_many method."""
+        return asgiref_sync.async_to_sync(self.aincr_many)(deltas, ttl, initial)
+
+    async def aget_counter(self, key: str) -> int | None:
+        """Mock implementation of the async get_counter method."""
+        return await self.backend.get_counter(key)
+
+    def get_counter(self, key: str) -> int | None:
+        """Mock implementation of the sync get_counter method."""
+        return asgiref_sync.async_to_sync(self.aget_counter)(key)
+
+    async def adelete_counter(self, key: str) -> None:
+        """Mock implementation of the async delete_counter method."""
+        await self.backend.delete_counter(key)
+
+    def delete_counter(self, key: str) -> None:
+        """Mock implementation of the sync delete_counter method."""
+        asgiref_sync.async_to_sync(self.adelete_counter)(key)
+
+    async def aget_or_set(
+        self,
+        key: str,
+        loader: Callable[[], Any],
+        ttl: int | None = None,
+        *,
+        distributed: bool = False,
+    ) -> Any:
+        """Mock implementation of the async get_or_set method."""
+        value = await self.aget(key)
+        if value is None:
+            value = loader()
+            if inspect.isawaitable(value):
+                value = await value
+            await self.aset(key, value, ttl)
+        return value
+
+    def get_or_set(
+        self,
+        key: str,
+        loader: Callable[[], Any],
+        ttl: int | None = None,
+        *,
+        distributed: bool = False,
+    ) -> Any:
+        """Mock implementation of the sync get_or_set method."""
+        return asgiref_sync.async_to_sync(self.aget_or_set)(
+            key, loader, ttl, distributed=distributed
+        )
+
+    async def aclose(self) -> None:
+        """Mock implementation of the async close method."""
+        await self.backend.close()
+
+    def close(self) -> None:
+        """Mock implementation of the sync close method."""
+        asgiref_sync.async_to_sync(self.aclose)()
+
 
 class MockBackend(abcs.ICacheBackend):
     """Mock implementation of the CacheBackendProtocol for testing purposes."""
@@ -83,6 +234,12 @@ class MockBackend(abcs.ICacheBackend):
         """Mock implementation of the sync get method."""
         return self.store.get(key)
 
+    async def get_entry(self, key: str) -> abcs.CacheEntry | None:
+        """Mock implementation of the async get_entry method."""
+        if key not in self.store:
+            return None
+        return abcs.CacheEntry(self.store[key], 60, 60.0)
+
     async def set(self, key: str, value: Any, ttl: int | None = None) -> None:
         """Mock implementation of the async set method."""
         self.store[key] = value
@@ -103,3 +260,74 @@ class MockBackend(abcs.ICacheBackend):
     async def has(self, key: str) -> bool:
         """Mock implementation of the async has method."""
         return key in self.store
+
+    async def get_many(self, keys: list[str]) -> dict[str, Any]:
+        """Mock implementation of the async get_many method."""
+        return {key: self.store[key] for key in keys if key in self.store}
+
+    async def get_entries(self, keys: list[str]) -> dict[str, abcs.CacheEntry]:
+        """Mock implementation of the async get_entries method."""
+        return {
+            key: abcs.CacheEntry(self.store[key], 60, 60.0)
+            for key in keys
+            if key in self.store
+        }
+
+    async def set_many(self, mapping: Mapping[str, Any], ttl: int | None = None) -> None:
+        """Mock implementation of the async set_many method."""
+        self.store.update(mapping)
+
+    async def import_entries(self, mapping: Mapping[str, Any], ttl: int) -> int:
+        """Mock implementation of the async import_entries method."""
+        self.store.update(mapping)
+        return len(mapping)
+
+    async def delete_many(self, keys: list[str]) -> None:
+        """Mock implementation of the async delete_many method."""
+        for key in keys:
+            self.store.pop(key, None)
+
+    async def has_many(self, keys: list[str]) -> dict[str, bool]:
+        """Mock implementation of the async has_many method."""
+        return {key: key in self.store for key in keys}
+
+    async def touch(self, key: str, ttl: int | None = None) -> bool:
+        """Mock implementation of the async touch method."""
+        return key in self.store
+
+    async def touch_many(
+        self, keys: list[str], ttl: int | None = None
+    ) -> dict[str, bool]:
+        """Mock implementation of the async touch_many method."""
+        return {key: key in self.store for key in keys}
+
+    async def incr(self, key: str, delta: int, ttl: int, initial: int) -> int:
+        """Mock implementation of the async incr method."""
+        self.store[key] = self.store.get(key, initial) + delta
+        return self.store[key]
+
+    async def incr_many(
+        self, deltas: Mapping[str, int], ttl: int, initial: int
+    ) -> dict[str, int]:
+        """Mock implementation of the async incr_many method."""
+        return {
+            key: await self.incr(key, delta, ttl, initial)
+            for key, delta in deltas.items()
+        }
+
+    async def get_counter(self, key: str) -> int | None:
+        """Mock implementation of the async get_counter method."""
+        return self.store.get(key)
+
+    async def delete_counter(self, key: str) -> None:
+        """Mock implementation of the async delete_counter method."""
+        self.store.pop(key, None)
+
+    @asynccontextmanager
+    async def lock(self, key: str) -> AsyncIterator[bool]:
+        """Mock implementation of the lock method."""
+        yield True
+
+    async def close(self) -> None:
+        """Mock implementation of the async close method."""
+        self.closed = True
@@ -0,0 +1,155 @@
+from unittest.mock import AsyncMock
+
+import pytest
+
+from psqache.abcs import ICacheBackend
+from psqache.analytics import OVERFLOW_NAMESPACE
+from psqache.analytics import AnalyticsBackend
+from psqache.analytics import CountMinSketch
+from psqache.analytics import HitRatio
+from psqache.analytics import HyperLogLog
+from psqache.analytics import KeyAnalytics
+from psqache.analytics import TopK
+from psqache.backends import MemoryBackend
+
+
+@pytest.fixture
+def analytics():
+    """Fixture for the KeyAnalytics object, tracking three hot keys."""
+    return KeyAnalytics(top_k=3, max_namespaces=2)
+
+
+@pytest.fixture
+def backend(analytics):
+    """Fixture for an AnalyticsBackend wrapping a MemoryBackend."""
+    return AnalyticsBackend(MemoryBackend(), analytics)
+
+
+def test_count_min_sketch():
+    """Test estimates are never below the true frequency, and close to it."""
+    sketch = CountMinSketch(width=256, depth=4)
+    for number in range(1000):
+        sketch.add(f"key_{number}")
+    assert sketch.add("hot", 500) >= 500
+
+    assert 500 <= sketch.estimate("hot") < 520
+    assert all(sketch.estimate(f"key_{number}") >= 1 for number in range(1000))
+    assert sketch.estimate("never") < 20
+
+
+def test_top_k():
+    """Test the most frequent keys are kept, replacing the least frequent."""
+    top = TopK(size=2)
+    top.offer("a", 1)
+    top.offer("b", 2)
+    top.offer("c", 1)
+    assert top.items() == [("b", 2), ("a", 1)]
+
+    top.offer("a", 3)
+    top.offer("c", 2)
+    assert top.items() == [("a", 3), ("b", 2)]
+
+    top.offer("c", 4)
+    assert top.items() == [("c", 4), ("a", 3)]
+
+
+def test_top_k_compacts_heap():
+    """Test outdated heap items are dropped when the heap grows too large."""
+    top = TopK(size=2)
+    for count in range(1, 20):
+        top.offer("a", count)
+
+    assert len(top.heap) <= 8
+    assert top.items() == [("a", 19)]
+
+
+@pytest.mark.parametrize("cardinality", [10, 1000, 100_000])
+def test_hyper_log_log(cardinality):
+    """Test the distinct keys are counted within a few standard errors.
+
+    Args:
+        cardinality (int): The number of distinct keys.
+    """
+    distinct = HyperLogLog(precision=12)
+    for number in range(cardinality):
+        distinct.add(f"key_{number}")
+        distinct.add(f"key_{number}")
+
+    assert distinct.count() == pytest.approx(cardinality, rel=0.05, abs=1)
+    assert HyperLogLog().count() == 0
+
+
+def test_hit_ratio():
+    """Test the hit ratio is unknown before any read."""
+    assert HitRatio(0, 0).ratio is None
+    assert HitRatio(3, 1).ratio == 0.75
+
+
+def test_namespaces(analytics):
+    """Test keys count in their namespace, up to the number tracked.
+
+    Args:
+        analytics (KeyAnalytics): The analytics object.
+    """
+    assert analytics.namespace("user:1") == "user"
+    assert analytics.namespace("plain") == ""
+
+    analytics.record_write("user:1")
+    analytics.record_write("plain")
+    analytics.record_read("post:1", hit=True)
+    analytics.record_read("tag:1", hit=False)
+
+    report = analytics.report()
+    assert report.distinct_keys == {"user": 1, "": 1, OVERFLOW_NAMESPACE: 2}
+    assert report.hit_ratios == {OVERFLOW_NAMESPACE: HitRatio(1, 1)}
+
+    analytics.reset()
+    assert analytics.report() == ([], {}, {})
+
+
+@pytest.mark.asyncio
+async def test_backend_records_reads_and_writes(backend, analytics):
+    """Test reads and writes through the backend feed the analytics.
+
+    Args:
+        backend (AnalyticsBackend): The backend object.
+        analytics (KeyAnalytics): The analytics object.
+    """
+    assert isinstance(backend, ICacheBackend)
+    await backend.set("user:1", {"data": 1}, 60)
+    await backend.set_many({"user:2": {}, "post:1": {}}, 60)
+
+    for _ in range(3):
+        assert await backend.get("user:1") == {"data": 1}
+    assert await backend.get("user:3") is None
+    assert (await backend.get_entry("post:1")).value == {}
+    assert await backend.get_entry("post:2") is None
+    assert await backend.get_many(["user:1", "user:2", "user:4"]) == {
+        "user:1": {"data": 1},
+        "user:2": {},
+    }
+    assert list(await backend.get_entries(["user:1", "user:3"])) == ["user:1"]
+    assert await backend.import_entries({"user:3": {}}, 60) == 1
+    assert await backend.has("user:1")
+
+    report = analytics.report()
+    assert report.hot_keys[0] == ("user:1", 5)
+    assert len(report.hot_keys) == 3
+    assert report.distinct_keys == {"user": 4, "post": 2}
+    assert report.hit_ratios == {"post": HitRatio(1, 1), "user": HitRatio(6, 3)}
+
+
+@pytest.mark.asyncio
+async def test_backend_forwards_other_operations(analytics):
+    """Test operations that are not reads or writes are forwarded as is.
+
+    Args:
+        analytics (KeyAnalytics): The analytics object.
+    """
+    wrapped = AsyncMock(spec=ICacheBackend)
+    backend = AnalyticsBackend(wrapped, analytics)
+
+    await backend.delete("key")
+
+    wrapped.delete.assert_awaited_once_with("key")
+    assert analytics.report() == ([], {}, {})
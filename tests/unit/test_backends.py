@@ -1,10 +1,37 @@
+import asyncio
+import datetime
 import json
+import random
+import threading
+import time
+import zlib
 from unittest.mock import AsyncMock
+from unittest.mock import MagicMock
+from unittest.mock import call
+from unittest.mock import patch
 
 import asyncpg
 import pytest
 
+from psqache.abcs import CacheEntry
+from psqache.abcs import ICacheBackend
+from psqache.abcs import ISnapshotBackend
+from psqache.backends import BackendWrapper
+from psqache.backends import EvictionStats
+from psqache.backends import MemoryBackend
+from psqache.backends import UNCOMPRESSED
 from psqache.backends import PostgresBackend
+from psqache.backends import TableReport
+from psqache.compressors import ZlibCompressor
+from psqache.compressors import ZstdCompressor
+from psqache.metrics import BYTES_IN
+from psqache.metrics import BYTES_OUT
+from psqache.metrics import DESERIALIZE_SECONDS
+from psqache.metrics import POOL_ACQUIRE_SECONDS
+from psqache.metrics import POOL_SATURATION
+from psqache.metrics import QUERY_SECONDS
+from psqache.metrics import SERIALIZE_SECONDS
+from psqache.metrics import Metrics
 
 
 @pytest.fixture
@@ -29,19 +56,61 @@ async def test_get(postgres_backend, asyncpg_pool, queries):
         queries (Queries): The queries object.
     """
     key = "test_key"
-    asyncpg_pool.acquire.return_value.__aenter__.return_value.fetchval.return_value = (
-        json.dumps({"data": "test_value"})
-    )
+    asyncpg_pool.acquire.return_value.__aenter__.return_value.fetchrow.return_value = {
+        "value": {"data": "test_value"},
+        "payload": None,
+    }
 
     result = await postgres_backend.get(key)
 
-    asyncpg_pool.acquire.return_value.__aenter__.return_value.fetchval.assert_called_once_with(
+    asyncpg_pool.acquire.return_value.__aenter__.return_value.fetchrow.assert_called_once_with(
         queries.get_cache_entry.sql,
         key,
     )
     assert result == {"data": "test_value"}
 
 
+@pytest.mark.asyncio
+async def test_get_entry(postgres_backend, asyncpg_pool, queries):
+    """Test the get_entry method returns the value with its expiry.
+
+    Args:
+        postgres_backend (PostgresBackend): The PostgresBackend object.
+        asyncpg_pool (AsyncMock): The pool object.
+        queries (Queries): The queries object.
+    """
+    connection = asyncpg_pool.acquire.return_value.__aenter__.return_value
+    connection.fetchrow.side_effect = [
+        {"value": {"data": 1}, "payload": None, "ttl": 60, "expires_in": 45.0},
+        None,
+    ]
+
+    entry = await postgres_backend.get_entry("test_key")
+
+    assert entry == CacheEntry({"data": 1}, 60, 45.0)
+    assert entry.age == 15.0
+    connection.fetchrow.assert_awaited_once_with(
+        queries.get_cache_entry.sql,
+        "test_key",
+    )
+    assert await postgres_backend.get_entry("test_key") is None
+
+
+@pytest.mark.asyncio
+async def test_get_missing(postgres_backend, asyncpg_pool):
+    """Test the get method returns None for missing entries.
+
+    Args:
+        postgres_backend (PostgresBackend): The PostgresBackend object.
+        asyncpg_pool (AsyncMock): The pool object.
+    """
+    asyncpg_pool.acquire.return_value.__aenter__.return_value.fetchrow.return_value = (
+        None
+    )
+
+    assert await postgres_backend.get("test_key") is None
+
+
 @pytest.mark.asyncio
 async def test_set(postgres_backend, asyncpg_pool, queries):
     """Test the set method for the PostgresBackend.
@@ -60,7 +129,8 @@ async def test_set(postgres_backend, asyncpg_pool, queries):
     asyncpg_pool.acquire.return_value.__aenter__.return_value.execute.assert_called_once_with(
         queries.set_cache_entry.sql,
         key,
-        json.dumps(value),
+        b'{"data":"test_value"}',
+        None,
         ttl,
     )
 
@@ -110,12 +180,20 @@ async def test_cleanup(postgres_backend, asyncpg_pool, queries):
         asyncpg_pool (AsyncMock): The pool object.
         queries (Queries): The queries object.
     """
-    asyncpg_pool.acquire.return_value.__aenter__.return_value.execute = AsyncMock()
+    connection = asyncpg_pool.acquire.return_value.__aenter__.return_value
+    batch_size = postgres_backend.CLEANUP_BATCH_SIZE
+    connection.fetchval.side_effect = [batch_size, batch_size, 10, batch_size, 0]
 
     await postgres_backend.cleanup()
-    asyncpg_pool.acquire.return_value.__aenter__.return_value.execute.assert_called_once_with(
-        queries.cleanup_expired_cache_entries.sql,
-    )
+    batch = call(queries.cleanup_expired_cache_entries.sql, batch_size)
+    counters = call(queries.cleanup_expired_counters.sql, batch_size)
+    assert connection.fetchval.await_args_list == [
+        batch,
+        batch,
+        batch,
+        counters,
+        counters,
+    ]
 
 
 @pytest.mark.asyncio
@@ -128,13 +206,1457 @@ async def test_has(postgres_backend, asyncpg_pool, queries):
         queries (Queries): The queries object.
     """
     key = "test_key"
-    asyncpg_pool.acquire.return_value.__aenter__.return_value.execute = AsyncMock(
-        return_value=True,
+    connection = asyncpg_pool.acquire.return_value.__aenter__.return_value
+    connection.fetchval.side_effect = [True, False]
+
+    assert await postgres_backend.has(key) is True
+    assert await postgres_backend.has(key) is False
+    connection.fetchval.assert_awaited_with(queries.has_cache_entry.sql, key)
+
+
+@pytest.mark.asyncio
+async def test_get_many(postgres_backend, asyncpg_pool, queries):
+    """Test the get_many method for the PostgresBackend.
+
+    Args:
+        postgres_backend (PostgresBackend): The PostgresBackend object.
+        asyncpg_pool (AsyncMock): The pool object.
+        queries (Queries): The queries object.
+    """
+    keys = ["key_1", "key_2", "key_3"]
+    asyncpg_pool.acquire.return_value.__aenter__.return_value.fetch.return_value = [
+        {"key": "key_1", "value": {"data": 1}, "payload": None},
+        {"key": "key_3", "value": None, "payload": b'\x00{"data":3}'},
+    ]
+
+    result = await postgres_backend.get_many(keys)
+
+    asyncpg_pool.acquire.return_value.__aenter__.return_value.fetch.assert_called_once_with(
+        queries.get_cache_entries.sql,
+        keys,
+    )
+    assert result == {"key_1": {"data": 1}, "key_3": {"data": 3}}
+
+
+@pytest.mark.asyncio
+async def test_get_entries(postgres_backend, asyncpg_pool, queries):
+    """Test the get_entries method returns the values with their expiry.
+
+    Args:
+        postgres_backend (PostgresBackend): The PostgresBackend object.
+        asyncpg_pool (AsyncMock): The pool object.
+        queries (Queries): The queries object.
+    """
+    connection = asyncpg_pool.acquire.return_value.__aenter__.return_value
+    connection.fetch.return_value = [
+        {
+            "key": "key_1",
+            "value": {"data": 1},
+            "payload": None,
+            "ttl": 60,
+            "expires_in": 42.5,
+        },
+    ]
+
+    result = await postgres_backend.get_entries(["key_1", "key_2"])
+
+    connection.fetch.assert_awaited_once_with(
+        queries.get_cache_entries.sql,
+        ["key_1", "key_2"],
     )
+    assert result == {"key_1": CacheEntry({"data": 1}, 60, 42.5)}
+
+
+@pytest.mark.asyncio
+async def test_set_many(postgres_backend, asyncpg_pool, queries):
+    """Test the set_many method for the PostgresBackend.
+
+    Args:
+        postgres_backend (PostgresBackend): The PostgresBackend object.
+        asyncpg_pool (AsyncMock): The pool object.
+        queries (Queries): The queries object.
+    """
+    mapping = {"key_1": {"data": 1}, "key_2": {"data": 2}}
+    asyncpg_pool.acquire.return_value.__aenter__.return_value.execute = AsyncMock()
 
-    result = await postgres_backend.has(key)
-    assert result is True
+    await postgres_backend.set_many(mapping, 60)
     asyncpg_pool.acquire.return_value.__aenter__.return_value.execute.assert_called_once_with(
-        queries.has_cache_entry.sql,
-        key,
+        queries.set_cache_entries.sql,
+        ["key_1", "key_2"],
+        [b'{"data":1}', b'{"data":2}'],
+        [None, None],
+        [60, 60],
+    )
+
+
+@pytest.mark.asyncio
+async def test_set_many_empty(postgres_backend, asyncpg_pool):
+    """Test set_many does nothing for an empty mapping.
+
+    Args:
+        postgres_backend (PostgresBackend): The PostgresBackend object.
+        asyncpg_pool (AsyncMock): The pool object.
+    """
+    await postgres_backend.set_many({}, 60)
+    asyncpg_pool.acquire.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_delete_many(postgres_backend, asyncpg_pool, queries):
+    """Test the delete_many method for the PostgresBackend.
+
+    Args:
+        postgres_backend (PostgresBackend): The PostgresBackend object.
+        asyncpg_pool (AsyncMock): The pool object.
+        queries (Queries): The queries object.
+    """
+    keys = ["key_1", "key_2"]
+    asyncpg_pool.acquire.return_value.__aenter__.return_value.execute = AsyncMock()
+
+    await postgres_backend.delete_many(keys)
+    asyncpg_pool.acquire.return_value.__aenter__.return_value.execute.assert_called_once_with(
+        queries.delete_cache_entries.sql,
+        keys,
+    )
+
+
+@pytest.mark.asyncio
+async def test_has_many(postgres_backend, asyncpg_pool, queries):
+    """Test the has_many method for the PostgresBackend.
+
+    Args:
+        postgres_backend (PostgresBackend): The PostgresBackend object.
+        asyncpg_pool (AsyncMock): The pool object.
+        queries (Queries): The queries object.
+    """
+    keys = ["key_1", "key_2"]
+    asyncpg_pool.acquire.return_value.__aenter__.return_value.fetch.return_value = [
+        {"key": "key_2"},
+    ]
+
+    result = await postgres_backend.has_many(keys)
+
+    asyncpg_pool.acquire.return_value.__aenter__.return_value.fetch.assert_called_once_with(
+        queries.has_cache_entries.sql,
+        keys,
+    )
+    assert result == {"key_1": False, "key_2": True}
+
+
+@pytest.fixture
+def wrapped_backend():
+    """Fixture for the backend wrapped by the BackendWrapper."""
+    return AsyncMock(spec=ICacheBackend)
+
+
+@pytest.fixture
+def backend_wrapper(wrapped_backend):
+    """Fixture for the BackendWrapper object."""
+    return BackendWrapper(wrapped_backend)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("method", "args"),
+    [
+        ("get", ("key",)),
+        ("get_entry", ("key",)),
+        ("set", ("key", {"data": 1}, 60)),
+        ("delete", ("key",)),
+        ("clear", ()),
+        ("cleanup", ()),
+        ("has", ("key",)),
+        ("get_many", (["key"],)),
+        ("get_entries", (["key"],)),
+        ("set_many", ({"key": {"data": 1}}, 60)),
+        ("import_entries", ({"key": {"data": 1}}, 60)),
+        ("delete_many", (["key"],)),
+        ("has_many", (["key"],)),
+        ("touch", ("key", 60)),
+        ("touch_many", (["key"], 60)),
+        ("incr", ("key", 1, 60, 0)),
+        ("incr_many", ({"key": 1}, 60, 0)),
+        ("get_counter", ("key",)),
+        ("delete_counter", ("key",)),
+        ("close", ()),
+    ],
+)
+async def test_backend_wrapper_forwards(backend_wrapper, wrapped_backend, method, args):
+    """Test the BackendWrapper forwards every operation to the wrapped backend.
+
+    Args:
+        backend_wrapper (BackendWrapper): The BackendWrapper object.
+        wrapped_backend (AsyncMock): The wrapped backend object.
+        method (str): The name of the operation.
+        args (tuple): The arguments of the operation.
+    """
+    getattr(wrapped_backend, method).return_value = "result"
+
+    result = await getattr(backend_wrapper, method)(*args)
+
+    getattr(wrapped_backend, method).assert_awaited_once_with(*args)
+    assert isinstance(backend_wrapper, ICacheBackend)
+    if method not in {
+        "set",
+        "delete",
+        "clear",
+        "cleanup",
+        "set_many",
+        "delete_many",
+        "delete_counter",
+        "close",
+    }:
+        assert result == "result"
+
+
+@pytest.mark.asyncio
+async def test_backend_wrapper_forwards_snapshots():
+    """Test the BackendWrapper forwards snapshots to backends supporting them."""
+    wrapped = AsyncMock(spec=PostgresBackend)
+    wrapped.export_snapshot.return_value = 2
+    wrapped.import_snapshot.return_value = 1
+    backend_wrapper = BackendWrapper(BackendWrapper(wrapped))
+
+    assert isinstance(backend_wrapper, ISnapshotBackend)
+    assert await backend_wrapper.export_snapshot("cache.snapshot") == 2
+    assert await backend_wrapper.import_snapshot("cache.snapshot") == 1
+    wrapped.export_snapshot.assert_awaited_once_with("cache.snapshot")
+    wrapped.import_snapshot.assert_awaited_once_with("cache.snapshot")
+
+    with pytest.raises(TypeError, match="MemoryBackend does not support snapshots"):
+        await BackendWrapper(MemoryBackend()).export_snapshot("cache.snapshot")
+    with pytest.raises(TypeError, match="MemoryBackend does not support snapshots"):
+        await BackendWrapper(MemoryBackend()).import_snapshot("cache.snapshot")
+
+
+@pytest.fixture
+def notifying_backend(asyncpg_pool):
+    """Fixture for a PostgresBackend sending invalidation messages."""
+    connection = asyncpg_pool.acquire.return_value.__aenter__.return_value
+    connection.execute = AsyncMock()
+    connection.transaction = MagicMock()
+    return PostgresBackend(pool=asyncpg_pool, notify_channel="psqache")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("method", "args", "keys"),
+    [
+        ("set", ("key", {"data": 1}, 60), ["key"]),
+        ("delete", ("key",), ["key"]),
+        ("clear", (), None),
+        ("set_many", ({"key_1": 1, "key_2": 2}, 60), ["key_1", "key_2"]),
+        ("delete_many", (["key_1", "key_2"],), ["key_1", "key_2"]),
+    ],
+)
+async def test_writes_send_invalidations(
+    notifying_backend,
+    asyncpg_pool,
+    queries,
+    method,
+    args,
+    keys,
+):
+    """Test writes notify the changed keys in the same transaction.
+
+    Args:
+        notifying_backend (PostgresBackend): The notifying PostgresBackend object.
+        asyncpg_pool (AsyncMock): The pool object.
+        queries (Queries): The queries object.
+        method (str): The name of the write operation.
+        args (tuple): The arguments of the write operation.
+        keys (Optional[list[str]]): The keys expected in the message.
+    """
+    connection = asyncpg_pool.acquire.return_value.__aenter__.return_value
+
+    await getattr(notifying_backend, method)(*args)
+
+    connection.transaction.return_value.__aenter__.assert_awaited_once()
+    connection.transaction.return_value.__aexit__.assert_awaited_once()
+    assert connection.execute.await_count == 2
+    connection.execute.assert_awaited_with(
+        queries.notify_cache_invalidation.sql,
+        "psqache",
+        [json.dumps({"origin": notifying_backend.origin, "keys": keys})],
     )
+
+
+def test_invalidation_payloads_are_split(postgres_backend):
+    """Test large invalidations are split across several messages.
+
+    Args:
+        postgres_backend (PostgresBackend): The PostgresBackend object.
+    """
+    keys = [f"key_{index:04d}" for index in range(2000)]
+
+    payloads = postgres_backend.invalidation_payloads(keys)
+
+    assert len(payloads) > 1
+    assert all(len(payload) < 8000 for payload in payloads)
+    assert [key for payload in payloads for key in json.loads(payload)["keys"]] == keys
+    assert postgres_backend.invalidation_payloads([]) == []
+
+
+@pytest.mark.asyncio
+async def test_lock(postgres_backend, asyncpg_pool, queries):
+    """Test the lock method for the PostgresBackend.
+
+    Args:
+        postgres_backend (PostgresBackend): The PostgresBackend object.
+        asyncpg_pool (AsyncMock): The pool object.
+        queries (Queries): The queries object.
+    """
+    connection = asyncpg_pool.acquire.return_value.__aenter__.return_value
+    connection.transaction = MagicMock()
+    connection.fetchval.return_value = True
+
+    async with postgres_backend.lock("test_key") as locked:
+        assert locked is True
+        connection.transaction.return_value.__aexit__.assert_not_awaited()
+
+    connection.fetchval.assert_awaited_once_with(
+        queries.lock_cache_entry.sql,
+        "test_key",
+    )
+    connection.transaction.return_value.__aexit__.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_lock_holder_reuses_connection(postgres_backend, asyncpg_pool):
+    """Test the task holding a lock runs its operations on the lock's connection.
+
+    Args:
+        postgres_backend (PostgresBackend): The PostgresBackend object.
+        asyncpg_pool (AsyncMock): The pool object.
+    """
+    connection = asyncpg_pool.acquire.return_value.__aenter__.return_value
+    connection.transaction = MagicMock()
+    connection.fetchval.return_value = True
+
+    async def acquired():
+        async with postgres_backend.acquire() as other:
+            return other
+
+    async with postgres_backend.lock("test_key"):
+        async with postgres_backend.acquire() as held:
+            assert held is connection
+        assert asyncpg_pool.acquire.call_count == 1
+        await asyncio.create_task(acquired())
+        assert asyncpg_pool.acquire.call_count == 2
+
+    async with postgres_backend.acquire():
+        assert asyncpg_pool.acquire.call_count == 3
+
+
+@pytest.mark.asyncio
+async def test_create_table(postgres_backend, asyncpg_pool, queries):
+    """Test the tables are created under the schema lock, in a transaction.
+
+    Args:
+        postgres_backend (PostgresBackend): The PostgresBackend object.
+        asyncpg_pool (AsyncMock): The pool object.
+        queries (Queries): The queries object.
+    """
+    connection = asyncpg_pool.acquire.return_value.__aenter__.return_value
+    connection.transaction = MagicMock()
+
+    await postgres_backend.create_table()
+
+    assert connection.execute.await_args_list == [
+        call(queries.lock_schema_changes.sql),
+        call(queries.create_psqache_table.sql),
+    ]
+    connection.transaction.return_value.__aexit__.assert_awaited_once()
+    assert connection._prepare.await_count == len(PostgresBackend.PREPARED_QUERIES)
+
+
+@pytest.mark.asyncio
+async def test_create_logged_table(asyncpg_pool, queries):
+    """Test the logged mode makes the tables logged once created.
+
+    Args:
+        asyncpg_pool (AsyncMock): The pool object.
+        queries (Queries): The queries object.
+    """
+    backend = PostgresBackend(pool=asyncpg_pool, logged=True)
+    connection = asyncpg_pool.acquire.return_value.__aenter__.return_value
+    connection.transaction = MagicMock()
+
+    await backend.create_table()
+
+    assert connection.execute.await_args_list[1:] == [
+        call(queries.create_psqache_table.sql),
+        call(queries.set_cache_tables_logged.sql),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_replication_lag(postgres_backend, asyncpg_pool, queries):
+    """Test the replication lag is measured on a pool connection.
+
+    Args:
+        postgres_backend (PostgresBackend): The PostgresBackend object.
+        asyncpg_pool (AsyncMock): The pool object.
+        queries (Queries): The queries object.
+    """
+    connection = asyncpg_pool.acquire.return_value.__aenter__.return_value
+    connection.fetchval.return_value = 0.5
+
+    assert await postgres_backend.replication_lag() == 0.5
+    connection.fetchval.assert_awaited_once_with(queries.get_replication_lag.sql)
+
+
+@pytest.mark.asyncio
+async def test_close(postgres_backend, asyncpg_pool):
+    """Test closing the backend closes its pool.
+
+    Args:
+        postgres_backend (PostgresBackend): The PostgresBackend object.
+        asyncpg_pool (AsyncMock): The pool object.
+    """
+    await postgres_backend.close()
+
+    asyncpg_pool.close.assert_awaited_once_with()
+
+
+@pytest.mark.asyncio
+async def test_backend_wrapper_lock(backend_wrapper, wrapped_backend):
+    """Test the BackendWrapper takes the lock of the wrapped backend.
+
+    Args:
+        backend_wrapper (BackendWrapper): The BackendWrapper object.
+        wrapped_backend (AsyncMock): The wrapped backend object.
+    """
+    wrapped_backend.lock.return_value.__aenter__.return_value = False
+
+    async with backend_wrapper.lock("test_key") as locked:
+        assert locked is False
+
+    wrapped_backend.lock.assert_called_once_with("test_key")
+
+
+@pytest.mark.asyncio
+async def test_bytea_storage(asyncpg_pool, queries):
+    """Test values are stored as payloads in the BYTEA storage layout.
+
+    Args:
+        asyncpg_pool (AsyncMock): The pool object.
+        queries (Queries): The queries object.
+    """
+    backend = PostgresBackend(pool=asyncpg_pool, serializer="pickle", storage="bytea")
+    connection = asyncpg_pool.acquire.return_value.__aenter__.return_value
+    connection.execute = AsyncMock()
+    value = {"data": {1, 2}}
+
+    await backend.set("test_key", value, 60)
+    payload = connection.execute.call_args.args[3]
+    assert payload[0] == UNCOMPRESSED
+    connection.execute.assert_called_once_with(
+        queries.set_cache_entry.sql,
+        "test_key",
+        None,
+        payload,
+        60,
+    )
+
+    connection.fetchrow.return_value = {"value": None, "payload": payload}
+    assert await backend.get("test_key") == value
+
+
+def test_jsonb_storage_requires_json_serializer(asyncpg_pool):
+    """Test binary serializers are rejected in the JSONB storage layout.
+
+    Args:
+        asyncpg_pool (AsyncMock): The pool object.
+    """
+    with pytest.raises(ValueError, match="requires bytea storage"):
+        PostgresBackend(pool=asyncpg_pool, serializer="pickle")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("serializer", "storage", "json_serializer"),
+    [("orjson", "jsonb", "orjson"), ("pickle", "bytea", "json")],
+)
+async def test_init_connection(asyncpg_pool, serializer, storage, json_serializer):
+    """Test connections get a binary JSONB codec running a JSON serializer.
+
+    Args:
+        asyncpg_pool (AsyncMock): The pool object.
+        serializer (str): The name of the serializer of the backend.
+        storage (str): The storage layout of the backend.
+        json_serializer (str): The name of the serializer used for JSONB.
+    """
+    backend = PostgresBackend(
+        pool=asyncpg_pool,
+        serializer=serializer,
+        storage=storage,
+    )
+    connection = AsyncMock(asyncpg.Connection)
+
+    await backend.init_connection(connection)
+
+    codec = connection.set_type_codec.call_args
+    assert codec.args == ("jsonb",)
+    assert codec.kwargs["schema"] == "pg_catalog"
+    assert codec.kwargs["format"] == "binary"
+    assert codec.kwargs["encoder"](b'{"data":1}') == b'\x01{"data":1}'
+    assert codec.kwargs["decoder"](b'\x01{"data":1}') == {"data": 1}
+    assert backend.json_serializer.name == json_serializer
+
+
+@pytest.mark.asyncio
+async def test_init_connection_prepares_statements(queries):
+    """Test new connections prepare every cache statement into their cache.
+
+    Args:
+        queries (Queries): The queries object.
+    """
+    connection = AsyncMock(asyncpg.Connection)
+
+    await PostgresBackend().init_connection(connection)
+
+    assert connection._prepare.await_args_list == [
+        call(getattr(queries, name).sql, use_cache=True)
+        for name in PostgresBackend.PREPARED_QUERIES
+    ]
+
+
+@pytest.mark.asyncio
+async def test_init_connection_before_tables():
+    """Test new connections stop preparing while the tables do not exist."""
+    connection = AsyncMock(asyncpg.Connection)
+    connection._prepare.side_effect = asyncpg.UndefinedTableError
+
+    await PostgresBackend().init_connection(connection)
+
+    connection.set_type_codec.assert_awaited_once()
+    connection._prepare.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_prepare_pool(asyncpg_pool):
+    """Test the statements are prepared on the min_size connections at once.
+
+    Args:
+        asyncpg_pool (AsyncMock): The pool object.
+    """
+    connections = [AsyncMock(asyncpg.Connection) for _ in range(3)]
+    asyncpg_pool.get_min_size = MagicMock(return_value=3)
+    asyncpg_pool.acquire = MagicMock(
+        side_effect=[
+            AsyncMock(__aenter__=AsyncMock(return_value=connection))
+            for connection in connections
+        ],
+    )
+    backend = PostgresBackend(pool=asyncpg_pool)
+
+    await backend.prepare_pool()
+
+    for connection in connections:
+        assert connection._prepare.await_count == len(PostgresBackend.PREPARED_QUERIES)
+
+
+@pytest.mark.asyncio
+async def test_pgbouncer_disables_prepared_statements():
+    """Test the PgBouncer mode prepares nothing and disables the cache."""
+    backend = PostgresBackend(pgbouncer=True)
+    connection = AsyncMock(asyncpg.Connection)
+
+    await backend.init_connection(connection)
+
+    connection.set_type_codec.assert_awaited_once()
+    connection._prepare.assert_not_awaited()
+    with patch("psqache.backends.asyncpg.create_pool") as create_pool:
+        backend.create_pool("test_dsn")
+    assert create_pool.call_args.kwargs["statement_cache_size"] == 0
+
+
+def test_create_pool():
+    """Test the backend creates its pool with initialized connections."""
+    backend = PostgresBackend(statement_cache_size=50)
+    with patch("psqache.backends.asyncpg.create_pool") as create_pool:
+        pool = backend.create_pool("test_dsn", min_size=1)
+
+    create_pool.assert_called_once_with(
+        dsn="test_dsn",
+        init=backend.init_connection,
+        statement_cache_size=50,
+        min_size=1,
+    )
+    assert backend.pool is pool
+
+
+@pytest.fixture
+def compressing_backend(asyncpg_pool):
+    """Fixture for a PostgresBackend compressing values of 100 bytes or more."""
+    return PostgresBackend(
+        pool=asyncpg_pool,
+        compressor="zlib",
+        compression_threshold=100,
+    )
+
+
+@pytest.mark.asyncio
+async def test_compression(compressing_backend, asyncpg_pool):
+    """Test large values are compressed into the payload column.
+
+    Args:
+        compressing_backend (PostgresBackend): The compressing backend.
+        asyncpg_pool (AsyncMock): The pool object.
+    """
+    connection = asyncpg_pool.acquire.return_value.__aenter__.return_value
+    connection.execute = AsyncMock()
+    value = {"data": "x" * 1000}
+
+    await compressing_backend.set("test_key", value, 60)
+    _, _, jsonb, payload, _ = connection.execute.call_args.args
+    assert jsonb is None
+    assert payload[0] == ZlibCompressor.id
+    assert len(payload) < 100
+
+    connection.fetchrow.return_value = {"value": None, "payload": payload}
+    assert await compressing_backend.get("test_key") == value
+
+
+@pytest.mark.asyncio
+async def test_metrics(asyncpg_pool):
+    """Test the pool, query and serialization measures are reported.
+
+    Args:
+        asyncpg_pool (AsyncMock): The pool object.
+    """
+    metrics = Metrics()
+    backend = PostgresBackend(
+        pool=asyncpg_pool,
+        storage="bytea",
+        compressor="zlib",
+        compression_threshold=100,
+        metrics=metrics,
+    )
+    asyncpg_pool.get_size.return_value = 4
+    asyncpg_pool.get_idle_size.return_value = 1
+    asyncpg_pool.get_max_size.return_value = 10
+    connection = asyncpg_pool.acquire.return_value.__aenter__.return_value
+    connection.execute = AsyncMock()
+
+    await backend.set("small", {"data": 1}, 60)
+    await backend.set("large", {"data": "x" * 1000}, 60)
+    payload = connection.execute.call_args.args[3]
+    connection.fetchrow.return_value = {"value": None, "payload": payload}
+    assert await backend.get("large") == {"data": "x" * 1000}
+
+    snapshot = metrics.snapshot()
+    assert snapshot.counters[BYTES_OUT] == {"": 11 + len(payload)}
+    assert snapshot.counters[BYTES_IN] == {"": len(payload)}
+    assert snapshot.histograms[SERIALIZE_SECONDS][""].observations == 2
+    assert snapshot.histograms[DESERIALIZE_SECONDS][""].observations == 1
+    assert snapshot.histograms[POOL_ACQUIRE_SECONDS][""].observations == 3
+    assert snapshot.histograms[QUERY_SECONDS][""].observations == 3
+    assert snapshot.gauges[POOL_SATURATION] == 0.3
+
+
+@pytest.mark.asyncio
+async def test_metrics_jsonb(asyncpg_pool):
+    """Test JSONB values are measured by their codec.
+
+    Args:
+        asyncpg_pool (AsyncMock): The pool object.
+    """
+    metrics = Metrics()
+    backend = PostgresBackend(pool=asyncpg_pool, metrics=metrics)
+
+    assert await backend.encode({"data": 1}) == (b'{"data":1}', None)
+    assert backend.decode_jsonb(b'\x01{"data":1}') == {"data": 1}
+
+    snapshot = metrics.snapshot()
+    assert snapshot.counters == {BYTES_OUT: {"": 10}, BYTES_IN: {"": 11}}
+    assert snapshot.histograms[DESERIALIZE_SECONDS][""].observations == 1
+
+
+@pytest.mark.asyncio
+async def test_compression_threshold(compressing_backend, asyncpg_pool):
+    """Test values below the threshold are stored uncompressed.
+
+    Args:
+        compressing_backend (PostgresBackend): The compressing backend.
+        asyncpg_pool (AsyncMock): The pool object.
+    """
+    connection = asyncpg_pool.acquire.return_value.__aenter__.return_value
+    connection.execute = AsyncMock()
+
+    await compressing_backend.set_many({"small": {"data": 1}}, 60)
+
+    assert connection.execute.call_args.args[2:4] == ([b'{"data":1}'], [None])
+
+
+@pytest.mark.asyncio
+async def test_incompressible_values(asyncpg_pool):
+    """Test values that do not shrink are stored uncompressed.
+
+    Args:
+        asyncpg_pool (AsyncMock): The pool object.
+    """
+    backend = PostgresBackend(
+        pool=asyncpg_pool,
+        serializer="pickle",
+        storage="bytea",
+        compressor="zlib",
+    )
+    value = random.Random(0).randbytes(500)
+
+    payload = backend.compress(backend.compressor, backend.serializer.dumps(value))
+
+    assert payload[0] == UNCOMPRESSED
+    assert backend.load(payload) == value
+
+
+@pytest.mark.asyncio
+async def test_compression_offload(asyncpg_pool):
+    """Test large values are compressed and decompressed in a worker thread.
+
+    Args:
+        asyncpg_pool (AsyncMock): The pool object.
+    """
+    backend = PostgresBackend(
+        pool=asyncpg_pool,
+        storage="bytea",
+        compressor="zlib",
+        compression_threshold=10,
+        offload_threshold=100,
+    )
+    value = {"data": "x" * 1000}
+
+    with patch(
+        "psqache.backends.asyncio.to_thread",
+        side_effect=asyncio.to_thread,
+    ) as to_thread:
+        _, payload = await backend.encode(value)
+        assert to_thread.call_count == 1
+        assert await backend.decode({"value": None, "payload": payload}) == value
+        assert to_thread.call_count == 1
+        _, small = await backend.encode({"data": 1})
+        assert await backend.decode({"value": None, "payload": small}) == {"data": 1}
+        assert to_thread.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_compression_offload(asyncpg_pool):
+    """Test concurrent offloaded values never share a zstd context.
+
+    Args:
+        asyncpg_pool (AsyncMock): The pool object.
+    """
+    contexts = []
+
+    class Context:
+        """A zstd context recording the threads using it."""
+
+        def __init__(self, **_options):
+            self.threads = set()
+            contexts.append(self)
+
+        def compress(self, data):
+            self.threads.add(threading.get_ident())
+            time.sleep(0.001)
+            return zlib.compress(data)
+
+        def decompress(self, data):
+            self.threads.add(threading.get_ident())
+            time.sleep(0.001)
+            return zlib.decompress(data)
+
+    zstandard = MagicMock(ZstdCompressor=Context, ZstdDecompressor=Context)
+    with patch("psqache.serializers.importlib.import_module", return_value=zstandard):
+        compressor = ZstdCompressor()
+    backend = PostgresBackend(
+        pool=asyncpg_pool,
+        storage="bytea",
+        compressor=compressor,
+        compression_threshold=10,
+        offload_threshold=100,
+    )
+    values = [{"data": str(index) * 1000} for index in range(16)]
+
+    encoded = await asyncio.gather(*(backend.encode(value) for value in values))
+    decoded = await asyncio.gather(
+        *(
+            backend.decode({"value": None, "payload": payload})
+            for _, payload in encoded
+        ),
+    )
+
+    assert decoded == values
+    assert all(len(context.threads) <= 1 for context in contexts)
+
+
+@pytest.mark.asyncio
+async def test_decode_other_codec(asyncpg_pool):
+    """Test payloads written with another compressor are still read.
+
+    Args:
+        asyncpg_pool (AsyncMock): The pool object.
+    """
+    backend = PostgresBackend(pool=asyncpg_pool)
+    payload = bytes((ZlibCompressor.id,)) + zlib.compress(b'{"data":1}')
+
+    assert await backend.decode({"value": None, "payload": payload}) == {"data": 1}
+    assert await backend.decode({"value": None, "payload": payload}) == {"data": 1}
+    assert list(backend.codecs) == [ZlibCompressor.id]
+
+    with pytest.raises(ValueError, match="Unknown compression codec"):
+        await backend.decode({"value": None, "payload": b"\xff{}"})
+
+
+@pytest.mark.asyncio
+async def test_touch(postgres_backend, asyncpg_pool, queries):
+    """Test touch only updates the expiry of an existing entry.
+
+    Args:
+        postgres_backend (PostgresBackend): The PostgresBackend object.
+        asyncpg_pool (AsyncMock): The pool object.
+        queries (Queries): The queries object.
+    """
+    connection = asyncpg_pool.acquire.return_value.__aenter__.return_value
+    connection.fetchval.side_effect = [True, None]
+
+    assert await postgres_backend.touch("key", 60) is True
+    assert await postgres_backend.touch("missing", 60) is False
+    connection.fetchval.assert_awaited_with(
+        queries.touch_cache_entry.sql,
+        "missing",
+        60,
+    )
+
+
+@pytest.mark.asyncio
+async def test_touch_many(postgres_backend, asyncpg_pool, queries):
+    """Test touch_many reports which entries were touched.
+
+    Args:
+        postgres_backend (PostgresBackend): The PostgresBackend object.
+        asyncpg_pool (AsyncMock): The pool object.
+        queries (Queries): The queries object.
+    """
+    connection = asyncpg_pool.acquire.return_value.__aenter__.return_value
+    connection.fetch.return_value = [{"key": "key_1"}]
+
+    result = await postgres_backend.touch_many(["key_1", "key_2"], 60)
+
+    connection.fetch.assert_awaited_once_with(
+        queries.touch_cache_entries.sql,
+        ["key_1", "key_2"],
+        60,
+    )
+    assert result == {"key_1": True, "key_2": False}
+
+
+@pytest.mark.asyncio
+async def test_incr(postgres_backend, asyncpg_pool, queries):
+    """Test incr upserts the counter in a single statement.
+
+    Args:
+        postgres_backend (PostgresBackend): The PostgresBackend object.
+        asyncpg_pool (AsyncMock): The pool object.
+        queries (Queries): The queries object.
+    """
+    connection = asyncpg_pool.acquire.return_value.__aenter__.return_value
+    connection.fetchval.return_value = 11
+
+    assert await postgres_backend.incr("hits", 1, 60, 10) == 11
+    connection.fetchval.assert_awaited_once_with(
+        queries.increment_counter.sql,
+        "hits",
+        1,
+        60,
+        10,
+    )
+
+
+@pytest.mark.asyncio
+async def test_incr_many(postgres_backend, asyncpg_pool, queries):
+    """Test incr_many upserts every counter in a single statement.
+
+    Args:
+        postgres_backend (PostgresBackend): The PostgresBackend object.
+        asyncpg_pool (AsyncMock): The pool object.
+        queries (Queries): The queries object.
+    """
+    connection = asyncpg_pool.acquire.return_value.__aenter__.return_value
+    connection.fetch.return_value = [
+        {"key": "a", "value": 1},
+        {"key": "b", "value": -2},
+    ]
+
+    result = await postgres_backend.incr_many({"a": 1, "b": -2}, 60, 0)
+
+    connection.fetch.assert_awaited_once_with(
+        queries.increment_counters.sql,
+        ["a", "b"],
+        [1, -2],
+        60,
+        0,
+    )
+    assert result == {"a": 1, "b": -2}
+
+
+@pytest.mark.asyncio
+async def test_get_counter(postgres_backend, asyncpg_pool, queries):
+    """Test get_counter reads the value of a counter without changing it.
+
+    Args:
+        postgres_backend (PostgresBackend): The PostgresBackend object.
+        asyncpg_pool (AsyncMock): The pool object.
+        queries (Queries): The queries object.
+    """
+    connection = asyncpg_pool.acquire.return_value.__aenter__.return_value
+    connection.fetchval.return_value = 3
+
+    assert await postgres_backend.get_counter("hits") == 3
+    connection.fetchval.assert_awaited_once_with(queries.get_counter.sql, "hits")
+
+
+@pytest.mark.asyncio
+async def test_delete_counter(postgres_backend, asyncpg_pool, queries):
+    """Test delete_counter deletes the counter from the counter table.
+
+    Args:
+        postgres_backend (PostgresBackend): The PostgresBackend object.
+        asyncpg_pool (AsyncMock): The pool object.
+        queries (Queries): The queries object.
+    """
+    connection = asyncpg_pool.acquire.return_value.__aenter__.return_value
+
+    await postgres_backend.delete_counter("hits")
+
+    connection.execute.assert_awaited_once_with(queries.delete_counter.sql, "hits")
+
+
+@pytest.fixture
+def bounded_backend(asyncpg_pool):
+    """Fixture for a PostgresBackend with a capacity of 100 entries."""
+    return PostgresBackend(
+        pool=asyncpg_pool,
+        max_entries=100,
+        access_granularity=datetime.timedelta(seconds=30),
+        eviction_sample_size=40,
+    )
+
+
+@pytest.mark.asyncio
+async def test_bounded_reads_track_access(bounded_backend, asyncpg_pool, queries):
+    """Test reads of a bounded cache record the access of the entries.
+
+    Args:
+        bounded_backend (PostgresBackend): The bounded backend.
+        asyncpg_pool (AsyncMock): The pool object.
+        queries (Queries): The queries object.
+    """
+    connection = asyncpg_pool.acquire.return_value.__aenter__.return_value
+    connection.fetchrow.return_value = None
+    connection.fetch.return_value = []
+    granularity = datetime.timedelta(seconds=30)
+
+    assert await bounded_backend.get("key") is None
+    assert await bounded_backend.get_many(["key"]) == {}
+
+    connection.fetchrow.assert_awaited_once_with(
+        queries.get_tracked_cache_entry.sql,
+        "key",
+        granularity,
+    )
+    connection.fetch.assert_awaited_once_with(
+        queries.get_tracked_cache_entries.sql,
+        ["key"],
+        granularity,
+    )
+
+
+@pytest.mark.asyncio
+async def test_table_report(postgres_backend, asyncpg_pool, queries):
+    """Test the table report reads the sizes and the TTL histogram.
+
+    Args:
+        postgres_backend (PostgresBackend): The PostgresBackend object.
+        asyncpg_pool (AsyncMock): The pool object.
+        queries (Queries): The queries object.
+    """
+    connection = asyncpg_pool.acquire.return_value.__aenter__.return_value
+    connection.fetchrow.side_effect = [
+        {
+            "entries": 10,
+            "table_bytes": 8192,
+            "value_sizes": [20, 100, 900, 1000],
+            "ttl_counts": [1, 9, 0],
+        },
+        {"entries": 0, "table_bytes": 0, "value_sizes": None, "ttl_counts": [0]},
+    ]
+
+    report = await postgres_backend.table_report((60, 3600))
+
+    assert report == TableReport(10, 8192, (20, 100, 900, 1000), (60, 3600), (1, 9, 0))
+    connection.fetchrow.assert_awaited_once_with(
+        queries.get_cache_report.sql,
+        [60, 3600],
+    )
+    assert await postgres_backend.table_report(()) == TableReport(
+        0,
+        0,
+        (0, 0, 0, 0),
+        (),
+        (0,),
+    )
+
+
+@pytest.mark.asyncio
+async def test_evict_under_capacity(bounded_backend, asyncpg_pool, queries):
+    """Test nothing is evicted while the cache is under its capacity.
+
+    Args:
+        bounded_backend (PostgresBackend): The bounded backend.
+        asyncpg_pool (AsyncMock): The pool object.
+        queries (Queries): The queries object.
+    """
+    connection = asyncpg_pool.acquire.return_value.__aenter__.return_value
+    connection.fetchrow.return_value = {"entries": 100, "bytes": 5000}
+
+    assert await bounded_backend.evict() == 0
+    connection.fetchrow.assert_awaited_once_with(queries.get_cache_usage.sql)
+    assert bounded_backend.eviction_stats == EvictionStats(
+        sweeps=0,
+        evicted=0,
+        evicted_bytes=0,
+        entries=100,
+        bytes=5000,
+    )
+
+
+@pytest.mark.asyncio
+async def test_evict_entries(bounded_backend, asyncpg_pool, queries):
+    """Test sampled batches evict entries down to the eviction target.
+
+    Args:
+        bounded_backend (PostgresBackend): The bounded backend.
+        asyncpg_pool (AsyncMock): The pool object.
+        queries (Queries): The queries object.
+    """
+    connection = asyncpg_pool.acquire.return_value.__aenter__.return_value
+    batch = {"evicted": 10, "bytes": 1000}
+    connection.fetchrow.side_effect = [
+        {"entries": 120, "bytes": 12000},
+        batch,
+        {"evicted": 0, "bytes": 0},
+        batch,
+        {"evicted": 10, "bytes": 1000},
+        {"evicted": 0, "bytes": 0},
+    ]
+
+    assert await bounded_backend.evict() == 30
+    # 30 entries over the target of 90: batches of a quarter of the sample,
+    # sampling twice as many pages after a sample came back empty.
+    assert connection.fetchrow.await_args_list[1:] == [
+        call(queries.evict_cache_entries.sql, 10, pytest.approx(100 * 40 / 120)),
+        call(queries.evict_cache_entries.sql, 10, pytest.approx(100 * 40 / 120)),
+        call(queries.evict_cache_entries.sql, 10, pytest.approx(200 * 40 / 120)),
+        call(queries.evict_cache_entries.sql, 10, pytest.approx(200 * 40 / 120)),
+    ]
+    assert bounded_backend.eviction_stats == EvictionStats(
+        sweeps=1,
+        evicted=30,
+        evicted_bytes=3000,
+        entries=90,
+        bytes=9000,
+    )
+
+
+@pytest.mark.asyncio
+async def test_evict_bytes(asyncpg_pool, queries):
+    """Test a size capacity evicts as many entries as the average size needs.
+
+    Args:
+        asyncpg_pool (AsyncMock): The pool object.
+        queries (Queries): The queries object.
+    """
+    backend = PostgresBackend(pool=asyncpg_pool, max_bytes=1000)
+    connection = asyncpg_pool.acquire.return_value.__aenter__.return_value
+    connection.fetchrow.side_effect = [
+        {"entries": 10, "bytes": 2000},
+        {"evicted": 0, "bytes": 0},
+    ]
+
+    # The sample covers the whole table, so an empty one ends the sweep.
+    assert await backend.evict() == 0
+    connection.fetchrow.assert_awaited_with(queries.evict_cache_entries.sql, 6, 100)
+    assert backend.eviction_stats.sweeps == 1
+
+
+def test_excess():
+    """Test the excess is the larger of the entries and size excesses."""
+    backend = PostgresBackend(max_entries=100, max_bytes=10_000)
+
+    assert backend.excess(50, 5000) < 0
+    assert backend.excess(100, 5000) == 10
+    assert backend.excess(100, 12_000) == 25
+    assert backend.excess(0, 0) == -90
+    assert not PostgresBackend().bounded
+
+
+@pytest.mark.asyncio
+async def test_cleanup_evicts(bounded_backend, asyncpg_pool):
+    """Test the cleanup of a bounded cache runs an eviction sweep.
+
+    Args:
+        bounded_backend (PostgresBackend): The bounded backend.
+        asyncpg_pool (AsyncMock): The pool object.
+    """
+    connection = asyncpg_pool.acquire.return_value.__aenter__.return_value
+    connection.fetchval.return_value = 0
+
+    with patch.object(bounded_backend, "evict") as evict:
+        await bounded_backend.cleanup()
+    evict.assert_awaited_once_with()
+
+
+@pytest.fixture
+def memory_backend():
+    """Fixture for the MemoryBackend object."""
+    return MemoryBackend()
+
+
+@pytest.mark.asyncio
+async def test_memory_backend(memory_backend):
+    """Test the MemoryBackend stores, reads and deletes entries.
+
+    Args:
+        memory_backend (MemoryBackend): The MemoryBackend object.
+    """
+    assert isinstance(memory_backend, ICacheBackend)
+    await memory_backend.set("key_1", {"data": 1}, 60)
+    await memory_backend.set_many({"key_2": {"data": 2}, "key_3": {"data": 3}}, 60)
+
+    assert await memory_backend.get("key_1") == {"data": 1}
+    assert await memory_backend.has("key_2")
+    assert await memory_backend.get_many(["key_1", "key_3", "key_4"]) == {
+        "key_1": {"data": 1},
+        "key_3": {"data": 3},
+    }
+    assert await memory_backend.import_entries({"key_4": {"data": 4}}, 5) == 1
+    assert memory_backend.lookup_entry("key_4").ttl == 5
+
+    await memory_backend.delete("key_1")
+    await memory_backend.delete_many(["key_2", "key_4"])
+    assert await memory_backend.has_many(["key_1", "key_2", "key_3"]) == {
+        "key_1": False,
+        "key_2": False,
+        "key_3": True,
+    }
+
+    await memory_backend.clear()
+    assert await memory_backend.get("key_3") is None
+    await memory_backend.close()
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_expiry(memory_backend):
+    """Test the MemoryBackend drops expired entries.
+
+    Args:
+        memory_backend (MemoryBackend): The MemoryBackend object.
+    """
+    with patch("psqache.backends.time.monotonic", return_value=1000.0) as monotonic:
+        await memory_backend.set("short", {"data": 1}, 10)
+        await memory_backend.set_many({"long": {"data": 2}, "other": {"data": 3}}, 60)
+        monotonic.return_value = 1010.0
+
+        assert await memory_backend.get_entry("long") == CacheEntry(
+            {"data": 2},
+            60,
+            50.0,
+        )
+        assert await memory_backend.get_entry("short") is None
+        assert "short" not in memory_backend.entries
+        assert await memory_backend.get_entries(["long", "short"]) == {
+            "long": CacheEntry({"data": 2}, 60, 50.0),
+        }
+        await memory_backend.cleanup()
+        assert list(memory_backend.entries) == ["long", "other"]
+        monotonic.return_value = 1060.0
+        await memory_backend.cleanup()
+        assert memory_backend.entries == {}
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_touch(memory_backend):
+    """Test the MemoryBackend extends the expiry of touched entries.
+
+    Args:
+        memory_backend (MemoryBackend): The MemoryBackend object.
+    """
+    with patch("psqache.backends.time.monotonic", return_value=1000.0) as monotonic:
+        await memory_backend.set_many({"key_1": {"data": 1}, "key_2": {"data": 2}}, 10)
+        monotonic.return_value = 1005.0
+
+        assert await memory_backend.touch("key_1", 60) is True
+        assert await memory_backend.touch_many(["key_2", "missing"], 60) == {
+            "key_2": True,
+            "missing": False,
+        }
+        monotonic.return_value = 1050.0
+        assert await memory_backend.get_many(["key_1", "key_2"]) == {
+            "key_1": {"data": 1},
+            "key_2": {"data": 2},
+        }
+        monotonic.return_value = 1065.0
+        assert await memory_backend.touch("key_1", 60) is False
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_counters(memory_backend):
+    """Test the MemoryBackend counters start over once expired.
+
+    Args:
+        memory_backend (MemoryBackend): The MemoryBackend object.
+    """
+    with patch("psqache.backends.time.monotonic", return_value=1000.0) as monotonic:
+        assert await memory_backend.incr("hits", 1, 10, 0) == 1
+        assert await memory_backend.incr_many({"hits": 2, "misses": -1}, 60, 5) == {
+            "hits": 3,
+            "misses": 4,
+        }
+        monotonic.return_value = 1010.0
+        await memory_backend.cleanup()
+        assert list(memory_backend.counters) == ["misses"]
+        assert await memory_backend.incr("hits", 1, 10, 0) == 1
+        monotonic.return_value = 1060.0
+        assert await memory_backend.incr("misses", 1, 10, 0) == 1
+        await memory_backend.clear()
+        assert memory_backend.counters == {}
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_get_and_delete_counter(memory_backend):
+    """Test the MemoryBackend reads and deletes counters, skipping expired ones.
+
+    Args:
+        memory_backend (MemoryBackend): The MemoryBackend object.
+    """
+    with patch("psqache.backends.time.monotonic", return_value=1000.0) as monotonic:
+        assert await memory_backend.get_counter("hits") is None
+        await memory_backend.incr_many({"hits": 2, "misses": 1}, 10, 0)
+        assert await memory_backend.get_counter("hits") == 2
+        await memory_backend.delete_counter("hits")
+        await memory_backend.delete_counter("hits")
+        assert await memory_backend.get_counter("hits") is None
+        assert await memory_backend.incr("hits", 1, 10, 0) == 1
+        monotonic.return_value = 1010.0
+        assert await memory_backend.get_counter("misses") is None
+        assert "misses" not in memory_backend.counters
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_lock(memory_backend):
+    """Test the MemoryBackend lock is only taken by one caller at a time.
+
+    Args:
+        memory_backend (MemoryBackend): The MemoryBackend object.
+    """
+    async with memory_backend.lock("test_key") as locked:
+        assert locked
+        async with memory_backend.lock("test_key") as contended:
+            assert not contended
+        async with memory_backend.lock("other_key") as other:
+            assert other
+    async with memory_backend.lock("test_key") as locked:
+        assert locked
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_iteration(memory_backend):
+    """Test the MemoryBackend iterates over the live entries in key order.
+
+    Args:
+        memory_backend (MemoryBackend): The MemoryBackend object.
+    """
+    with patch("psqache.backends.time.monotonic", return_value=1000.0) as monotonic:
+        await memory_backend.set_many({"user:2": 2, "user:1": 1, "post:1": 3}, 60)
+        await memory_backend.set("user:3", 4, 10)
+        monotonic.return_value = 1010.0
+
+        chunks = [chunk async for chunk in memory_backend.iter_keys(None, 2)]
+        assert chunks == [["post:1", "user:1"], ["user:2"]]
+        chunks = [chunk async for chunk in memory_backend.iter_items("user:", 1)]
+        assert chunks == [{"user:1": 1}, {"user:2": 2}]
+        assert [chunk async for chunk in memory_backend.iter_keys("other:", 2)] == []
+
+
+@pytest.fixture
+def cursor(asyncpg_pool):
+    """Fixture for the server-side cursor of the pool connection."""
+    connection = asyncpg_pool.acquire.return_value.__aenter__.return_value
+    connection.transaction = MagicMock()
+    return connection.cursor.return_value
+
+
+@pytest.mark.asyncio
+async def test_iter_keys(postgres_backend, asyncpg_pool, cursor, queries):
+    """Test keys are read in chunks through a cursor, in a transaction.
+
+    Args:
+        postgres_backend (PostgresBackend): The PostgresBackend object.
+        asyncpg_pool (AsyncMock): The pool object.
+        cursor (AsyncMock): The cursor object.
+        queries (Queries): The queries object.
+    """
+    connection = asyncpg_pool.acquire.return_value.__aenter__.return_value
+    cursor.fetch.side_effect = [[{"key": "a"}, {"key": "b"}], [{"key": "c"}], []]
+
+    chunks = [chunk async for chunk in postgres_backend.iter_keys("prefix:", 2)]
+
+    assert chunks == [["a", "b"], ["c"]]
+    connection.cursor.assert_awaited_once_with(queries.iter_cache_keys.sql, "prefix:")
+    assert cursor.fetch.await_args_list == [call(2)] * 3
+    connection.transaction.return_value.__aexit__.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_iter_items(postgres_backend, asyncpg_pool, cursor, queries):
+    """Test entries are read in chunks through a cursor and decoded.
+
+    Args:
+        postgres_backend (PostgresBackend): The PostgresBackend object.
+        asyncpg_pool (AsyncMock): The pool object.
+        cursor (AsyncMock): The cursor object.
+        queries (Queries): The queries object.
+    """
+    connection = asyncpg_pool.acquire.return_value.__aenter__.return_value
+    payload = bytes((UNCOMPRESSED,)) + b'{"data": 2}'
+    cursor.fetch.side_effect = [
+        [
+            {"key": "a", "value": {"data": 1}, "payload": None},
+            {"key": "b", "value": None, "payload": payload},
+        ],
+        [],
+    ]
+
+    chunks = [chunk async for chunk in postgres_backend.iter_items(None, 100)]
+
+    assert chunks == [{"a": {"data": 1}, "b": {"data": 2}}]
+    connection.cursor.assert_awaited_once_with(queries.iter_cache_entries.sql, None)
+
+
+@pytest.mark.asyncio
+async def test_export_snapshot(postgres_backend, asyncpg_pool, queries):
+    """Test snapshots are exported with binary COPY.
+
+    Args:
+        postgres_backend (PostgresBackend): The PostgresBackend object.
+        asyncpg_pool (AsyncMock): The pool object.
+        queries (Queries): The queries object.
+    """
+    connection = asyncpg_pool.acquire.return_value.__aenter__.return_value
+    connection.copy_from_query.return_value = "COPY 42"
+
+    assert await postgres_backend.export_snapshot("cache.snapshot") == 42
+    connection.copy_from_query.assert_awaited_once_with(
+        queries.export_cache_entries.sql,
+        output="cache.snapshot",
+        format="binary",
+    )
+
+
+@pytest.fixture
+def importing_backend(asyncpg_pool):
+    """Fixture for a PostgresBackend merging imports in batches of two keys."""
+    connection = asyncpg_pool.acquire.return_value.__aenter__.return_value
+    connection.transaction = MagicMock()
+    connection.fetchval.side_effect = [["a", "b"], 2, ["c"], 1, []]
+    backend = PostgresBackend(pool=asyncpg_pool)
+    backend.IMPORT_BATCH_SIZE = 2
+    return backend
+
+
+@pytest.mark.asyncio
+async def test_import_snapshot(importing_backend, asyncpg_pool, queries):
+    """Test snapshots are copied to a staging table, then merged in batches.
+
+    Args:
+        importing_backend (PostgresBackend): The importing PostgresBackend object.
+        asyncpg_pool (AsyncMock): The pool object.
+        queries (Queries): The queries object.
+    """
+    connection = asyncpg_pool.acquire.return_value.__aenter__.return_value
+
+    assert await importing_backend.import_snapshot("cache.snapshot") == 3
+
+    connection.copy_to_table.assert_awaited_once_with(
+        "psqache_import",
+        source="cache.snapshot",
+        format="binary",
+    )
+    assert connection.fetchval.await_args_list == [
+        call(queries.next_import_keys.sql, None, 2),
+        call(queries.merge_imported_entries.sql, ["a", "b"]),
+        call(queries.next_import_keys.sql, "b", 2),
+        call(queries.merge_imported_entries.sql, ["c"]),
+        call(queries.next_import_keys.sql, "c", 2),
+    ]
+    assert connection.transaction.return_value.__aexit__.await_count == 2
+    assert connection.execute.await_args_list == [
+        call(queries.create_import_table.sql),
+        call(queries.drop_import_table.sql),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_import_entries(importing_backend, asyncpg_pool):
+    """Test entries are encoded and copied to the staging table as records.
+
+    Args:
+        importing_backend (PostgresBackend): The importing PostgresBackend object.
+        asyncpg_pool (AsyncMock): The pool object.
+    """
+    connection = asyncpg_pool.acquire.return_value.__aenter__.return_value
+
+    assert await importing_backend.import_entries({"a": {"data": 1}, "c": 2}, 60) == 3
+
+    connection.copy_records_to_table.assert_awaited_once_with(
+        "psqache_import",
+        records=[
+            ("a", b'{"data":1}', None, 60, None),
+            ("c", b"2", None, 60, None),
+        ],
+    )
+
+
+@pytest.mark.asyncio
+async def test_import_drops_staging_table(postgres_backend, asyncpg_pool, queries):
+    """Test the staging table is dropped when the copy fails.
+
+    Args:
+        postgres_backend (PostgresBackend): The PostgresBackend object.
+        asyncpg_pool (AsyncMock): The pool object.
+        queries (Queries): The queries object.
+    """
+    connection = asyncpg_pool.acquire.return_value.__aenter__.return_value
+    connection.copy_to_table.side_effect = asyncpg.DataError("bad snapshot")
+
+    with pytest.raises(asyncpg.DataError):
+        await postgres_backend.import_snapshot("cache.snapshot")
+
+    connection.execute.assert_awaited_with(queries.drop_import_table.sql)
+
+
+def test_backend_wrapper_iteration(backend_wrapper, wrapped_backend):
+    """Test the BackendWrapper iterates over the wrapped backend.
+
+    Args:
+        backend_wrapper (BackendWrapper): The BackendWrapper object.
+        wrapped_backend (AsyncMock): The wrapped backend object.
+    """
+    wrapped_backend.iter_keys = MagicMock(return_value="keys")
+    wrapped_backend.iter_items = MagicMock(return_value="items")
+
+    assert backend_wrapper.iter_keys("prefix:", 10) == "keys"
+    assert backend_wrapper.iter_items(None, 10) == "items"
+    wrapped_backend.iter_keys.assert_called_once_with("prefix:", 10)
+    wrapped_backend.iter_items.assert_called_once_with(None, 10)
@@ -0,0 +1,161 @@
+import argparse
+import json
+from collections import Counter
+from unittest.mock import AsyncMock
+from unittest.mock import MagicMock
+from unittest.mock import call
+from unittest.mock import patch
+
+import pytest
+
+from benchmarks.cli import distribution
+from benchmarks.cli import main
+from benchmarks.runner import TimedPool
+from benchmarks.runner import open_postgres
+from benchmarks.runner import summarize
+from benchmarks.workload import Workload
+from benchmarks.workload import WorkloadGenerator
+
+
+def test_summarize():
+    """Test durations are summarized in microseconds with nearest-rank percentiles."""
+    summary = summarize([1000 * value for value in range(1, 1001)])
+
+    assert summary["count"] == 1000
+    assert summary["mean"] == 500.5
+    assert summary["p50"] == 500
+    assert summary["p99"] == 990
+    assert summary["p999"] == 999
+    assert summary["max"] == 1000
+    assert summarize([]) == {}
+
+
+def test_distribution():
+    """Test weighted distributions are parsed from the command line."""
+    assert distribution("128:0.7,4096") == ((128, 0.7), (4096, 1.0))
+    with pytest.raises(argparse.ArgumentTypeError):
+        distribution("large:1")
+
+
+def test_workload_generator():
+    """Test workloads are reproducible, skewed and sized as configured."""
+    workload = Workload(operations=5000, keys=100, value_sizes=((256, 1),), zipf=1.2)
+
+    operations = WorkloadGenerator(workload).operations()
+
+    assert operations == WorkloadGenerator(workload).operations()
+    counts = Counter(operation.key for operation in operations)
+    assert counts.most_common(1)[0][0] == "bench:0"
+    writes = [operation for operation in operations if operation.kind == "set"]
+    assert 0 < len(writes) < len(operations) / 5
+    assert len(json.dumps(writes[0].value)) == 256
+
+
+@pytest.mark.asyncio
+async def test_timed_pool():
+    """Test the timed pool records connection waits and forwards the rest."""
+    pool = MagicMock()
+    pool.acquire.return_value.__aenter__ = AsyncMock(return_value="connection")
+    pool.acquire.return_value.__aexit__ = AsyncMock(return_value=None)
+    timed = TimedPool(pool)
+
+    async with timed.acquire() as connection:
+        assert connection == "connection"
+
+    assert len(timed.waits) == 1
+    assert timed.get_size is pool.get_size
+
+
+def test_main_memory_backend(tmp_path):
+    """Test a benchmark run against the in-memory backend.
+
+    Args:
+        tmp_path (Path): A temporary directory.
+    """
+    output = tmp_path / "results.json"
+
+    assert (
+        main([
+            "--backend",
+            "memory",
+            "--operations",
+            "500",
+            "--keys",
+            "50",
+            "--output",
+            str(output),
+        ])
+        == 0
+    )
+
+    results = json.loads(output.read_text())
+    assert results["backend"] == {"name": "memory"}
+    assert results["latency_us"]["all"]["count"] == 500
+    assert results["hit_ratio"] == 1.0
+    assert results["pool_wait_us"] is None
+    assert results["peak_rss_bytes"] > 0
+
+
+def test_main_postgres_backend(capsys):
+    """Test a benchmark run against Postgres reports pool waits and closes the pool.
+
+    Args:
+        capsys (CaptureFixture): The captured output.
+    """
+    pool = TimedPool(AsyncMock())
+    pool.waits.append(1000)
+    cache = MagicMock()
+    cache.aget = AsyncMock(return_value=None)
+    cache.aset = AsyncMock()
+    cache.aset_many = AsyncMock()
+
+    with patch(
+        "benchmarks.cli.open_postgres",
+        AsyncMock(return_value=(cache, pool)),
+    ) as open_postgres:
+        assert main(["--operations", "10", "--keys", "5", "--no-preload"]) == 0
+
+    results = json.loads(capsys.readouterr().out)
+    assert results["backend"]["name"] == "postgres"
+    assert results["backend"]["schema"] == "psqache_benchmark"
+    assert open_postgres.await_args.kwargs["schema"] == "psqache_benchmark"
+    assert results["hit_ratio"] in {0.0, None}
+    assert results["pool_wait_us"] == {}
+    cache.aset_many.assert_not_awaited()
+    pool.pool.close.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_open_postgres_uses_own_schema(queries):
+    """Test the benchmark tables are created and emptied in their own schema.
+
+    Args:
+        queries (Queries): The queries object.
+    """
+    pool = MagicMock()
+    connection = pool.acquire.return_value.__aenter__.return_value
+    connection.execute = AsyncMock()
+
+    with patch(
+        "benchmarks.runner.PostgresBackend.open_pool",
+        AsyncMock(return_value=pool),
+    ) as open_pool:
+        _, timed = await open_postgres(
+            "postgresql://localhost/postgres",
+            schema='bench"mark',
+            min_size=1,
+            max_size=2,
+            serializer="json",
+            storage="jsonb",
+            compressor=None,
+        )
+
+    assert open_pool.await_args.kwargs["server_settings"] == {
+        "search_path": '"bench""mark"',
+    }
+    assert connection.execute.await_args_list == [
+        call('CREATE SCHEMA IF NOT EXISTS "bench""mark"'),
+        call(queries.create_psqache_table.sql),
+        call(queries.clear_cache_entries.sql),
+    ]
+    assert timed.pool is pool
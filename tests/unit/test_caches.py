@@ -1,17 +1,35 @@
+import asyncio
+import contextlib
+import threading
 from unittest.mock import AsyncMock
+from unittest.mock import MagicMock
+from contextlib import asynccontextmanager
 from unittest.mock import patch
 
+import asyncpg
 import pytest
 
 from psqache.caches import PsQache
+from psqache.abcs import CacheEntry
 from psqache.abcs import ICache
 from psqache.abcs import ICacheBackend
+from psqache.analytics import AnalyticsBackend
+from psqache.analytics import KeyAnalytics
+from psqache.backends import MemoryBackend
+from psqache.backends import PostgresBackend
+from psqache.instrumentation import InstrumentedBackend
+from psqache.metrics import Metrics
+from psqache.negative import ABSENT
+from psqache.negative import BloomFilter
+from psqache.replicas import ReplicatedBackend
+from psqache.runners import LoopThread
 
 
 @pytest.fixture
 def backend():
     """Fixture for the cache backend."""
     backend = AsyncMock(spec=ICacheBackend)
+    backend.incr_many.return_value = {}
     return backend
 
 
@@ -21,6 +39,20 @@ def cache(backend):
     return PsQache(backend=backend)
 
 
+@pytest.fixture
+def runner():
+    """Fixture for the loop thread, stopped after the test."""
+    runner = LoopThread()
+    yield runner
+    runner.stop()
+
+
+@pytest.fixture
+def threaded_cache(backend, runner):
+    """Fixture for a cache running its synchronous calls on a loop thread."""
+    return PsQache(backend=backend, runner=runner)
+
+
 @pytest.mark.asyncio
 async def test_aget(cache, backend):
     """Test the aget method for the PsQache cache.
@@ -167,10 +199,1786 @@ def test_cleanup(cache, backend):
     backend.cleanup.assert_called_once()
 
 
+@pytest.mark.asyncio
+async def test_aclose(cache, backend):
+    """Test the aclose method closes the backend.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+        backend (AsyncMock): The backend object.
+    """
+    await cache.aclose()
+    backend.close.assert_awaited_once()
+
+
+def test_close(cache, backend):
+    """Test the close method closes the backend.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+        backend (AsyncMock): The backend object.
+    """
+    cache.close()
+    backend.close.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_context_manager(cache, backend):
+    """Test the cache closes its backend when leaving its context.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+        backend (AsyncMock): The backend object.
+    """
+    async with cache as entered:
+        assert entered is cache
+        backend.close.assert_not_awaited()
+    backend.close.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_open_postgres_backend():
+    """Test the pool is connected and the tables created before returning."""
+    with (
+        patch(
+            "psqache.backends.asyncpg.create_pool",
+            new_callable=AsyncMock,
+        ) as create_pool,
+        patch(
+            "psqache.backends.PostgresBackend.create_table",
+            new_callable=AsyncMock,
+        ) as create_table,
+        patch(
+            "psqache.backends.PostgresBackend.prepare_pool",
+            new_callable=AsyncMock,
+        ) as prepare_pool,
+    ):
+        cache = await PsQache.open_postgres_backend(
+            "test_dsn",
+            min_size=2,
+            create_table=True,
+            storage="bytea",
+        )
+
+    create_pool.assert_awaited_once_with(
+        dsn="test_dsn",
+        init=cache.backend.init_connection,
+        statement_cache_size=100,
+        min_size=2,
+        max_size=25,
+    )
+    create_table.assert_awaited_once_with()
+    prepare_pool.assert_awaited_once_with()
+    assert cache.backend.storage == "bytea"
+    assert cache.runner is None
+
+
+@pytest.mark.asyncio
+async def test_open_postgres_backend_closes_on_failure():
+    """Test the pool is closed when the tables cannot be created."""
+    with (
+        patch("psqache.backends.asyncpg.create_pool", new_callable=AsyncMock),
+        patch(
+            "psqache.backends.PostgresBackend.create_table",
+            new_callable=AsyncMock,
+            side_effect=OSError,
+        ),
+        patch(
+            "psqache.backends.PostgresBackend.close",
+            new_callable=AsyncMock,
+        ) as close,
+        pytest.raises(OSError),
+    ):
+        await PsQache.open_postgres_backend("test_dsn", create_table=True)
+    close.assert_awaited_once_with()
+
+
+@pytest.mark.asyncio
+async def test_open_postgres_backend_with_replicas():
+    """Test the reads are routed to replicas opened without a capacity."""
+    with patch(
+        "psqache.backends.asyncpg.create_pool",
+        new_callable=AsyncMock,
+    ) as create_pool:
+        cache = await PsQache.open_postgres_backend(
+            "primary_dsn",
+            replicas=["replica_dsn"],
+            max_entries=1000,
+            logged=True,
+        )
+
+    assert isinstance(cache.backend, ReplicatedBackend)
+    assert cache.backend.backend.max_entries == 1000
+    (replica,) = cache.backend.replicas
+    assert replica.max_entries is None
+    assert replica.logged is True
+    assert [c.kwargs["dsn"] for c in create_pool.await_args_list] == [
+        "primary_dsn",
+        "replica_dsn",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_open_postgres_backend_replica_failure():
+    """Test the primary pool is closed when a replica cannot be reached."""
+    with (
+        patch(
+            "psqache.backends.asyncpg.create_pool",
+            new_callable=AsyncMock,
+            side_effect=[None, OSError],
+        ),
+        patch(
+            "psqache.backends.PostgresBackend.close",
+            new_callable=AsyncMock,
+        ) as close,
+        pytest.raises(OSError),
+    ):
+        await PsQache.open_postgres_backend("primary_dsn", replicas=["replica_dsn"])
+    close.assert_awaited_once_with()
+
+
+@pytest.mark.asyncio
+async def test_open_postgres_backend_without_table():
+    """Test the tables are only created when asked to."""
+    with (
+        patch("psqache.backends.asyncpg.create_pool", new_callable=AsyncMock),
+        patch(
+            "psqache.backends.PostgresBackend.create_table",
+            new_callable=AsyncMock,
+        ) as create_table,
+    ):
+        await PsQache.open_postgres_backend("test_dsn")
+    create_table.assert_not_awaited()
+
+
 def test_use_postgres_backend():
-    """Test the use_postgres_backend method for the PsQache class."""
-    with patch("psqache.caches.asyncpg.create_pool") as create_pool:
+    """Test the pool is connected on a loop thread created for the cache."""
+    with patch(
+        "psqache.backends.asyncpg.create_pool",
+        new_callable=AsyncMock,
+    ) as create_pool:
+        cache = PsQache.use_postgres_backend(dsn="test_dsn")
+    cache.runner.stop()
+
+    assert isinstance(cache.backend, ICacheBackend)
+    assert isinstance(cache, ICache)
+    assert isinstance(cache.runner, LoopThread)
+    create_pool.assert_awaited_once_with(
+        dsn="test_dsn",
+        init=cache.backend.init_connection,
+        statement_cache_size=100,
+        min_size=15,
+        max_size=25,
+    )
+    assert cache.backend.serializer.name == "json"
+    assert cache.backend.storage == "jsonb"
+
+
+def test_use_postgres_backend_close_stops_runner():
+    """Test closing the cache stops the loop thread created for it."""
+    with patch("psqache.backends.asyncpg.create_pool", new_callable=AsyncMock):
         cache = PsQache.use_postgres_backend(dsn="test_dsn")
-        assert isinstance(cache.backend, ICacheBackend)
-        assert isinstance(cache, ICache)
-        create_pool.assert_called_once_with(dsn="test_dsn", min_size=15, max_size=25)
+    runner = cache.runner
+    cache.backend.pool = AsyncMock(asyncpg.pool.Pool)
+
+    cache.close()
+
+    cache.backend.pool.close.assert_awaited_once_with()
+    assert runner.thread is None
+    assert runner.loop is None
+
+
+def test_close_keeps_given_runner(threaded_cache, backend, runner):
+    """Test closing the cache leaves a loop thread it was given running.
+
+    Args:
+        threaded_cache (PsQache): The cache running on a loop thread.
+        backend (AsyncMock): The backend object.
+        runner (LoopThread): The loop thread.
+    """
+    threaded_cache.close()
+
+    backend.close.assert_awaited_once_with()
+    assert runner.thread is not None
+
+
+def test_use_postgres_backend_with_metrics():
+    """Test the cache operations and the backend report to the same sink."""
+    metrics = Metrics()
+    with patch("psqache.backends.asyncpg.create_pool", new_callable=AsyncMock):
+        cache = PsQache.use_postgres_backend(dsn="test_dsn", metrics=metrics)
+    cache.runner.stop()
+
+    assert isinstance(cache.backend, InstrumentedBackend)
+    assert cache.backend.sink is metrics
+    assert cache.backend.backend.metrics is metrics
+    assert cache.metrics is metrics
+
+
+@pytest.mark.asyncio
+async def test_open_postgres_backend_with_metrics():
+    """Test the metrics sink measures the cache and the replicated backend."""
+    metrics = Metrics()
+    with patch("psqache.backends.asyncpg.create_pool", new_callable=AsyncMock):
+        cache = await PsQache.open_postgres_backend(
+            "primary_dsn",
+            replicas=["replica_dsn"],
+            metrics=metrics,
+        )
+
+    assert isinstance(cache.backend, InstrumentedBackend)
+    assert isinstance(cache.backend.backend, ReplicatedBackend)
+    assert cache.backend.backend.replicas[0].metrics is metrics
+
+
+@pytest.mark.asyncio
+async def test_metrics():
+    """Test a cache with metrics counts the hits and misses of its reads."""
+    metrics = Metrics()
+    cache = PsQache(backend=MemoryBackend(), metrics=metrics)
+
+    await cache.aset("key", {"data": 1})
+    await cache.aget("key")
+    await cache.aget("missing")
+
+    assert metrics.snapshot().hit_ratio == 0.5
+
+
+@pytest.mark.asyncio
+async def test_analytics():
+    """Test a cache with analytics records the keys it reads and writes."""
+    analytics = KeyAnalytics()
+    cache = PsQache(backend=MemoryBackend(), analytics=analytics, metrics=Metrics())
+
+    await cache.aset("user:1", {"data": 1})
+    await cache.aget("user:1")
+
+    assert isinstance(cache.backend.backend, AnalyticsBackend)
+    assert cache.analytics.report().hot_keys == [("user:1", 1)]
+
+
+def test_use_memory_backend():
+    """Test the use_memory_backend method for the PsQache class."""
+    cache = PsQache.use_memory_backend()
+    assert isinstance(cache.backend, MemoryBackend)
+    cache.set("test_key", {"data": 1})
+    assert cache.get("test_key") == {"data": 1}
+
+
+def test_use_postgres_backend_with_serializer():
+    """Test the use_postgres_backend method with a serializer and compressor."""
+    with patch("psqache.backends.asyncpg.create_pool", new_callable=AsyncMock):
+        cache = PsQache.use_postgres_backend(
+            dsn="test_dsn",
+            serializer="pickle",
+            storage="bytea",
+            compressor="zlib",
+            compression_threshold=512,
+        )
+        cache.runner.stop()
+        assert cache.backend.serializer.name == "pickle"
+        assert cache.backend.storage == "bytea"
+        assert cache.backend.compressor.name == "zlib"
+        assert cache.backend.compression_threshold == 512
+
+
+def test_use_postgres_backend_with_capacity():
+    """Test the use_postgres_backend method passes the capacity on."""
+    with patch("psqache.backends.asyncpg.create_pool", new_callable=AsyncMock):
+        cache = PsQache.use_postgres_backend(
+            dsn="test_dsn",
+            max_entries=1000,
+            max_bytes=2**20,
+        )
+        cache.runner.stop()
+        assert cache.backend.max_entries == 1000
+        assert cache.backend.max_bytes == 2**20
+        assert cache.backend.bounded
+
+
+def test_use_postgres_backend_with_pgbouncer():
+    """Test the use_postgres_backend method disables prepared statements."""
+    with patch(
+        "psqache.backends.asyncpg.create_pool",
+        new_callable=AsyncMock,
+    ) as create_pool:
+        cache = PsQache.use_postgres_backend(dsn="test_dsn", pgbouncer=True)
+    cache.runner.stop()
+    assert cache.backend.statement_cache_size == 0
+    assert create_pool.call_args.kwargs["statement_cache_size"] == 0
+
+
+@pytest.mark.asyncio
+async def test_aget_many(cache, backend):
+    """Test the aget_many method for the PsQache cache.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+        backend (AsyncMock): The backend object.
+    """
+    backend.get_many.return_value = {"key_1": "value_1"}
+    result = await cache.aget_many(iter(["key_1", "key_2"]))
+    backend.get_many.assert_awaited_once_with(["key_1", "key_2"])
+    assert result == {"key_1": "value_1"}
+
+
+@pytest.mark.asyncio
+async def test_aget_many_empty(cache, backend):
+    """Test the aget_many method skips the backend when no keys are given.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+        backend (AsyncMock): The backend object.
+    """
+    assert await cache.aget_many([]) == {}
+    backend.get_many.assert_not_awaited()
+
+
+def test_get_many(cache, backend):
+    """Test the get_many method for the PsQache cache.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+        backend (AsyncMock): The backend object.
+    """
+    backend.get_many.return_value = {"key_1": "value_1"}
+    result = cache.get_many(["key_1", "key_2"])
+    backend.get_many.assert_called_once_with(["key_1", "key_2"])
+    assert result == {"key_1": "value_1"}
+
+
+@pytest.mark.asyncio
+async def test_aset_many(cache, backend):
+    """Test the aset_many method for the PsQache cache.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+        backend (AsyncMock): The backend object.
+    """
+    await cache.aset_many({"key_1": "value_1"}, 100)
+    backend.set_many.assert_awaited_once_with({"key_1": "value_1"}, 100)
+
+
+@pytest.mark.asyncio
+async def test_aset_many_empty(cache, backend):
+    """Test the aset_many method skips the backend when no entries are given.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+        backend (AsyncMock): The backend object.
+    """
+    await cache.aset_many({})
+    backend.set_many.assert_not_awaited()
+
+
+def test_set_many(cache, backend):
+    """Test the set_many method for the PsQache cache.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+        backend (AsyncMock): The backend object.
+    """
+    cache.set_many({"key_1": "value_1"})
+    backend.set_many.assert_called_once_with({"key_1": "value_1"}, cache.DEFAULT_TTL)
+
+
+@pytest.mark.asyncio
+async def test_adelete_many(cache, backend):
+    """Test the adelete_many method for the PsQache cache.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+        backend (AsyncMock): The backend object.
+    """
+    await cache.adelete_many(("key_1", "key_2"))
+    backend.delete_many.assert_awaited_once_with(["key_1", "key_2"])
+
+
+@pytest.mark.asyncio
+async def test_adelete_many_empty(cache, backend):
+    """Test the adelete_many method skips the backend when no keys are given.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+        backend (AsyncMock): The backend object.
+    """
+    await cache.adelete_many([])
+    backend.delete_many.assert_not_awaited()
+
+
+def test_delete_many(cache, backend):
+    """Test the delete_many method for the PsQache cache.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+        backend (AsyncMock): The backend object.
+    """
+    cache.delete_many(["key_1"])
+    backend.delete_many.assert_called_once_with(["key_1"])
+
+
+@pytest.mark.asyncio
+async def test_ahas_many(cache, backend):
+    """Test the ahas_many method for the PsQache cache.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+        backend (AsyncMock): The backend object.
+    """
+    backend.has_many.return_value = {"key_1": True, "key_2": False}
+    result = await cache.ahas_many(["key_1", "key_2"])
+    backend.has_many.assert_awaited_once_with(["key_1", "key_2"])
+    assert result == {"key_1": True, "key_2": False}
+
+
+@pytest.mark.asyncio
+async def test_ahas_many_empty(cache, backend):
+    """Test the ahas_many method skips the backend when no keys are given.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+        backend (AsyncMock): The backend object.
+    """
+    assert await cache.ahas_many([]) == {}
+    backend.has_many.assert_not_awaited()
+
+
+def test_has_many(cache, backend):
+    """Test the has_many method for the PsQache cache.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+        backend (AsyncMock): The backend object.
+    """
+    backend.has_many.return_value = {"key_1": True}
+    result = cache.has_many(["key_1"])
+    backend.has_many.assert_called_once_with(["key_1"])
+    assert result == {"key_1": True}
+
+
+@pytest.mark.asyncio
+async def test_aincr_adecr(cache, backend):
+    """Test the aincr and adecr methods for the PsQache cache.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+        backend (AsyncMock): The backend object.
+    """
+    backend.incr.return_value = 5
+    assert await cache.aincr("hits") == 5
+    backend.incr.assert_awaited_once_with("hits", 1, cache.DEFAULT_TTL, 0)
+    assert await cache.adecr("hits", 2, 60, 10) == 5
+    backend.incr.assert_awaited_with("hits", -2, 60, 10)
+
+
+def test_incr_decr(cache, backend):
+    """Test the incr and decr methods for the PsQache cache.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+        backend (AsyncMock): The backend object.
+    """
+    backend.incr.return_value = 1
+    assert cache.incr("hits", ttl=60) == 1
+    backend.incr.assert_called_once_with("hits", 1, 60, 0)
+    assert cache.decr("hits", ttl=60) == 1
+    backend.incr.assert_called_with("hits", -1, 60, 0)
+
+
+@pytest.mark.asyncio
+async def test_aincr_many(cache, backend):
+    """Test the aincr_many method increments the counters in key order.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+        backend (AsyncMock): The backend object.
+    """
+    backend.incr_many.return_value = {"a": 2, "b": 1}
+    assert await cache.aincr_many({"b": 1, "a": 2}, 60) == {"a": 2, "b": 1}
+    backend.incr_many.assert_awaited_once_with({"a": 2, "b": 1}, 60, 0)
+    assert list(backend.incr_many.await_args.args[0]) == ["a", "b"]
+    assert await cache.aincr_many({}) == {}
+    backend.incr_many.assert_awaited_once()
+
+
+def test_incr_many(cache, backend):
+    """Test the incr_many method for the PsQache cache.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+        backend (AsyncMock): The backend object.
+    """
+    backend.incr_many.return_value = {"a": 1}
+    assert cache.incr_many({"a": 1}) == {"a": 1}
+    backend.incr_many.assert_called_once_with({"a": 1}, cache.DEFAULT_TTL, 0)
+
+
+@pytest.mark.asyncio
+async def test_aget_counter_adelete_counter(cache, backend):
+    """Test the aget_counter and adelete_counter methods for the PsQache cache.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+        backend (AsyncMock): The backend object.
+    """
+    backend.get_counter.return_value = 5
+    assert await cache.aget_counter("hits") == 5
+    backend.get_counter.assert_awaited_once_with("hits")
+    await cache.adelete_counter("hits")
+    backend.delete_counter.assert_awaited_once_with("hits")
+    backend.delete.assert_not_awaited()
+
+
+def test_get_counter_delete_counter(cache, backend):
+    """Test the get_counter and delete_counter methods for the PsQache cache.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+        backend (AsyncMock): The backend object.
+    """
+    backend.get_counter.return_value = None
+    assert cache.get_counter("hits") is None
+    backend.get_counter.assert_called_once_with("hits")
+    cache.delete_counter("hits")
+    backend.delete_counter.assert_called_once_with("hits")
+
+
+@pytest.mark.asyncio
+async def test_atouch(cache, backend):
+    """Test the atouch method for the PsQache cache.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+        backend (AsyncMock): The backend object.
+    """
+    backend.touch.return_value = True
+    assert await cache.atouch("key_1", 60) is True
+    backend.touch.assert_awaited_once_with("key_1", 60)
+    assert await cache.atouch("key_1") is True
+    backend.touch.assert_awaited_with("key_1", cache.DEFAULT_TTL)
+
+
+def test_touch(cache, backend):
+    """Test the touch method for the PsQache cache.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+        backend (AsyncMock): The backend object.
+    """
+    backend.touch.return_value = False
+    assert cache.touch("key_1", 60) is False
+    backend.touch.assert_called_once_with("key_1", 60)
+
+
+@pytest.mark.asyncio
+async def test_atouch_many(cache, backend):
+    """Test the atouch_many method for the PsQache cache.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+        backend (AsyncMock): The backend object.
+    """
+    backend.touch_many.return_value = {"key_1": True, "key_2": False}
+    result = await cache.atouch_many(iter(["key_1", "key_2"]))
+    backend.touch_many.assert_awaited_once_with(
+        ["key_1", "key_2"],
+        cache.DEFAULT_TTL,
+    )
+    assert result == {"key_1": True, "key_2": False}
+    assert await cache.atouch_many([]) == {}
+    backend.touch_many.assert_awaited_once()
+
+
+def test_touch_many(cache, backend):
+    """Test the touch_many method for the PsQache cache.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+        backend (AsyncMock): The backend object.
+    """
+    backend.touch_many.return_value = {"key_1": True}
+    assert cache.touch_many(["key_1"], 60) == {"key_1": True}
+    backend.touch_many.assert_called_once_with(["key_1"], 60)
+
+
+@pytest.mark.asyncio
+async def test_aget_or_set_hit(cache, backend):
+    """Test the aget_or_set method returns a cached value without loading.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+        backend (AsyncMock): The backend object.
+    """
+    backend.get.return_value = "cached"
+    loader = MagicMock()
+
+    assert await cache.aget_or_set("test_key", loader) == "cached"
+    loader.assert_not_called()
+    backend.set.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_aget_or_set_miss(cache, backend):
+    """Test the aget_or_set method loads and sets a missing value.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+        backend (AsyncMock): The backend object.
+    """
+    backend.get.return_value = None
+
+    assert await cache.aget_or_set("test_key", lambda: "loaded") == "loaded"
+    backend.set.assert_awaited_once_with("test_key", "loaded", cache.DEFAULT_TTL)
+    assert cache._loading == {}
+
+
+@pytest.mark.asyncio
+async def test_aget_or_set_does_not_cache_none(cache, backend):
+    """Test the aget_or_set method does not set None values.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+        backend (AsyncMock): The backend object.
+    """
+    backend.get.return_value = None
+
+    assert await cache.aget_or_set("test_key", lambda: None, 100) is None
+    backend.set.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_aget_or_set_deduplicates_concurrent_loads(cache, backend):
+    """Test concurrent misses for the same key only call the loader once.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+        backend (AsyncMock): The backend object.
+    """
+    backend.get.return_value = None
+    release = asyncio.Event()
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await release.wait()
+        return "loaded"
+
+    callers = [
+        asyncio.ensure_future(cache.aget_or_set("test_key", loader, 100))
+        for _ in range(3)
+    ]
+    await asyncio.sleep(0.01)
+    callers[0].cancel()
+    release.set()
+
+    assert await asyncio.gather(*callers[1:]) == ["loaded", "loaded"]
+    assert callers[0].cancelled()
+    assert calls == [1]
+    backend.set.assert_awaited_once_with("test_key", "loaded", 100)
+
+
+@pytest.mark.asyncio
+async def test_aget_or_set_loader_error(cache, backend):
+    """Test loader errors are raised and the failed load is forgotten.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+        backend (AsyncMock): The backend object.
+    """
+    backend.get.return_value = None
+
+    def loader():
+        raise ValueError
+
+    with pytest.raises(ValueError):
+        await cache.aget_or_set("test_key", loader)
+    assert cache._loading == {}
+
+
+@pytest.mark.asyncio
+async def test_aget_or_set_ignores_loads_from_other_loops(cache, backend):
+    """Test a load running on another event loop is not awaited.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+        backend (AsyncMock): The backend object.
+    """
+    backend.get.return_value = None
+    cache._loading["test_key"] = MagicMock()
+
+    assert await cache.aget_or_set("test_key", lambda: "loaded") == "loaded"
+
+
+@pytest.mark.asyncio
+async def test_loaded_ignores_cancelled_loads(cache):
+    """Test forgetting a cancelled load does not raise.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+    """
+    task = asyncio.ensure_future(asyncio.sleep(1))
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    cache._loaded("test_key", task)
+    assert cache._loading == {}
+
+
+@pytest.mark.asyncio
+async def test_aget_or_set_distributed_lock_holder(cache, backend):
+    """Test the lock holder loads and sets the value.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+        backend (AsyncMock): The backend object.
+    """
+    backend.get.return_value = None
+    backend.lock.return_value.__aenter__.return_value = True
+
+    result = await cache.aget_or_set("test_key", lambda: "loaded", distributed=True)
+
+    assert result == "loaded"
+    backend.lock.assert_called_once_with("test_key")
+    assert backend.get.await_count == 2
+    backend.set.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_aget_or_set_distributed_set_before_lock(cache, backend):
+    """Test the lock holder reuses a value set before it took the lock.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+        backend (AsyncMock): The backend object.
+    """
+    backend.get.side_effect = [None, "cached"]
+    backend.lock.return_value.__aenter__.return_value = True
+    loader = MagicMock()
+
+    result = await cache.aget_or_set("test_key", loader, distributed=True)
+
+    assert result == "cached"
+    loader.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_aget_or_set_distributed_waits_for_holder(cache, backend):
+    """Test processes without the lock poll for the value set by the holder.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+        backend (AsyncMock): The backend object.
+    """
+    backend.get.side_effect = [None, None, "loaded elsewhere"]
+    backend.lock.return_value.__aenter__.return_value = False
+    cache.LOCK_POLL_INTERVAL = 0
+    loader = MagicMock()
+
+    result = await cache.aget_or_set("test_key", loader, distributed=True)
+
+    assert result == "loaded elsewhere"
+    loader.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_aget_or_set_distributed_wait_timeout(cache, backend):
+    """Test processes without the lock load the value after the wait timeout.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+        backend (AsyncMock): The backend object.
+    """
+    backend.get.return_value = None
+    backend.lock.return_value.__aenter__.return_value = False
+    cache.LOCK_WAIT_TIMEOUT = 0
+
+    result = await cache.aget_or_set("test_key", lambda: "loaded", distributed=True)
+
+    assert result == "loaded"
+    backend.set.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_aget_refreshes_stale_entry(cache, backend):
+    """Test a stale entry is returned and refreshed in the background.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+        backend (AsyncMock): The backend object.
+    """
+    backend.get_entry.return_value = CacheEntry("stale", 100, 40.0)
+    backend.lock.return_value.__aenter__.return_value = True
+    loader = AsyncMock(return_value="fresh")
+    cache.register_loader("user:", loader, 100, soft_ttl=60)
+
+    assert await cache.aget("user:1") == "stale"
+    assert await cache.aget("user:1") == "stale"
+    await cache._loading["user:1"]
+
+    loader.assert_awaited_once_with("user:1")
+    backend.set.assert_awaited_once_with("user:1", "fresh", 100)
+    backend.get.assert_not_awaited()
+    assert "user:1" in cache._compute_times
+    assert cache._loading == {}
+
+
+@pytest.mark.asyncio
+async def test_aget_fresh_entry(cache, backend):
+    """Test a fresh entry is not refreshed, and a missing one is not loaded.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+        backend (AsyncMock): The backend object.
+    """
+    backend.get_entry.side_effect = [CacheEntry("fresh", 100, 90.0), None, None]
+    loader = MagicMock()
+    cache.register_loader("user:", loader, soft_ttl=60)
+
+    assert await cache.aget("user:1") == "fresh"
+    assert await cache.aget("user:1") is None
+    assert await cache.aget_or_set("user:1", lambda: "loaded") == "loaded"
+
+    loader.assert_not_called()
+    assert cache._loading == {}
+
+
+@pytest.mark.asyncio
+async def test_aget_refreshes_early(cache, backend):
+    """Test an entry is refreshed early when its last load was slow.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+        backend (AsyncMock): The backend object.
+    """
+    backend.get_entry.return_value = CacheEntry("cached", 100, 5.0)
+    backend.lock.return_value.__aenter__.return_value = True
+    cache.register_loader("user:", lambda key: "fresh")
+
+    with patch("psqache.caches.random.random", return_value=0.5):
+        await cache.aget("user:1")
+        assert cache._loading == {}
+
+        cache._compute_times["user:1"] = 10.0
+        await cache.aget("user:1")
+        await cache._loading["user:1"]
+
+        cache._compute_times["user:1"] = 1.0
+        await cache.aget("user:1")
+        assert cache._loading == {}
+
+    backend.set.assert_awaited_once_with("user:1", "fresh", cache.DEFAULT_TTL)
+
+
+@pytest.mark.asyncio
+async def test_aget_refresh_locked_elsewhere(cache, backend):
+    """Test an entry another process is refreshing is only read again.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+        backend (AsyncMock): The backend object.
+    """
+    backend.get_entry.return_value = CacheEntry("stale", 100, 0.0)
+    backend.lock.return_value.__aenter__.return_value = False
+    backend.get.return_value = "fresh"
+    loader = MagicMock()
+    cache.register_loader("", loader, soft_ttl=60)
+
+    await cache.aget("user:1")
+
+    assert await cache._loading["user:1"] == "fresh"
+    loader.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_aget_refresh_failure(cache, backend, caplog):
+    """Test a failed refresh is logged and keeps the cached value.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+        backend (AsyncMock): The backend object.
+        caplog (pytest.LogCaptureFixture): The log capture fixture.
+    """
+    backend.get_entry.return_value = CacheEntry("stale", 100, 0.0)
+    backend.lock.return_value.__aenter__.return_value = True
+
+    def loader(key):
+        raise ValueError
+
+    cache.register_loader("", loader, soft_ttl=60)
+
+    assert await cache.aget("user:1") == "stale"
+    assert await cache._loading["user:1"] is None
+    assert "Refreshing 'user:1' failed" in caplog.text
+    backend.set.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_aget_refresh_ignores_loads_from_other_loops(cache, backend):
+    """Test a load running on another event loop does not block a refresh.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+        backend (AsyncMock): The backend object.
+    """
+    backend.get_entry.return_value = CacheEntry("stale", 100, 0.0)
+    backend.lock.return_value.__aenter__.return_value = True
+    cache.register_loader("", lambda key: "fresh", soft_ttl=60)
+    cache._loading["user:1"] = MagicMock()
+
+    await cache.aget("user:1")
+    await cache._loading["user:1"]
+
+    backend.set.assert_awaited_once()
+
+
+def test_loader_for(cache):
+    """Test the loader of the longest matching prefix applies.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+    """
+    cache.register_loader("", str)
+    cache.register_loader("user:", repr, soft_ttl=10)
+
+    assert cache._loader_for("user:1").loader is repr
+    assert cache._loader_for("post:1").loader is str
+    assert PsQache(backend=MemoryBackend())._loader_for("user:1") is None
+
+
+@pytest.mark.asyncio
+async def test_compute_times_are_bounded(cache):
+    """Test the compute times of the least recently loaded keys are dropped.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+    """
+    cache.COMPUTE_TIMES_SIZE = 2
+
+    for key in ("a", "b", "a", "c"):
+        await cache._load(key, lambda: None, 60)
+
+    assert list(cache._compute_times) == ["a", "c"]
+
+
+def test_get_or_set(cache, backend):
+    """Test the get_or_set method for the PsQache cache.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+        backend (AsyncMock): The backend object.
+    """
+    backend.get.return_value = None
+
+    assert cache.get_or_set("test_key", lambda: "loaded", 100) == "loaded"
+    backend.set.assert_called_once_with("test_key", "loaded", 100)
+
+
+@pytest.mark.asyncio
+async def test_aset_absent(cache, backend):
+    """Test absent markers are set with the negative TTL and read as None.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+        backend (AsyncMock): The backend object.
+    """
+    await cache.aset_absent("test_key")
+    await cache.aset_absent("other_key", 5)
+    backend.set.assert_any_await("test_key", ABSENT, cache.NEGATIVE_TTL)
+    backend.set.assert_any_await("other_key", ABSENT, 5)
+
+    backend.get.return_value = ABSENT
+    assert await cache.aget("test_key") is None
+    assert await cache.ais_absent("test_key")
+    backend.get.return_value = {"key": "value"}
+    assert not await cache.ais_absent("test_key")
+    backend.get.return_value = None
+    assert not await cache.ais_absent("test_key")
+
+
+def test_set_absent(cache, backend):
+    """Test the synchronous absent marker methods.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+        backend (AsyncMock): The backend object.
+    """
+    cache.negative_ttl = 30
+    cache.set_absent("test_key")
+    backend.set.assert_called_once_with("test_key", ABSENT, 30)
+
+    backend.get.return_value = ABSENT
+    assert cache.is_absent("test_key")
+
+
+@pytest.mark.asyncio
+async def test_aget_or_set_absent(cache, backend):
+    """Test an absent marker is returned as None without calling the loader.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+        backend (AsyncMock): The backend object.
+    """
+    backend.get.return_value = ABSENT
+    loader = MagicMock()
+
+    assert await cache.aget_or_set("test_key", loader) is None
+    loader.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_aget_or_set_caches_absent(backend):
+    """Test None values are cached as absent markers with a negative TTL.
+
+    Args:
+        backend (AsyncMock): The backend object.
+    """
+    cache = PsQache(backend=backend, negative_ttl=30)
+    backend.get.return_value = None
+
+    assert await cache.aget_or_set("test_key", lambda: None) is None
+    backend.set.assert_awaited_once_with("test_key", ABSENT, 30)
+
+
+@pytest.mark.asyncio
+async def test_aget_or_set_distributed_absent(cache, backend):
+    """Test an absent marker set by the lock holder is returned as None.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+        backend (AsyncMock): The backend object.
+    """
+    backend.get.side_effect = [None, ABSENT]
+    backend.lock.return_value.__aenter__.return_value = True
+    loader = MagicMock()
+
+    result = await cache.aget_or_set("test_key", loader, distributed=True)
+
+    assert result is None
+    loader.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_aget_absent_entry_is_not_refreshed(cache, backend):
+    """Test absent markers of keys with a loader are not refreshed.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+        backend (AsyncMock): The backend object.
+    """
+    backend.get_entry.return_value = CacheEntry(ABSENT, 60, 1.0)
+    loader = MagicMock()
+    cache.register_loader("user:", loader, soft_ttl=10)
+
+    assert await cache.aget("user:1") is None
+    assert cache._loading == {}
+
+
+@pytest.mark.asyncio
+async def test_aget_many_leaves_out_absent(cache, backend):
+    """Test absent markers are left out of the values found.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+        backend (AsyncMock): The backend object.
+    """
+    backend.get_many.return_value = {"a": {"value": 1}, "b": ABSENT}
+
+    assert await cache.aget_many(["a", "b", "c"]) == {"a": {"value": 1}}
+
+
+@pytest.mark.asyncio
+async def test_absent_filter_skips_backend(backend):
+    """Test keys confirmed absent are then read from the filter.
+
+    Args:
+        backend (AsyncMock): The backend object.
+    """
+    absent_filter = BloomFilter(capacity=100)
+    cache = PsQache(backend=backend, absent_filter=absent_filter)
+    backend.get.return_value = ABSENT
+
+    assert await cache.aget("test_key") is None
+    assert "test_key" in absent_filter
+    assert await cache.aget("test_key") is None
+    assert await cache.aget_or_set("test_key", MagicMock()) is None
+
+    backend.get.assert_awaited_once_with("test_key")
+
+
+@pytest.mark.asyncio
+async def test_absent_filter_holds_absent_markers(backend):
+    """Test absent markers set by the cache are added to the filter.
+
+    Args:
+        backend (AsyncMock): The backend object.
+    """
+    absent_filter = BloomFilter(capacity=100)
+    cache = PsQache(backend=backend, negative_ttl=30, absent_filter=absent_filter)
+    backend.get.return_value = None
+
+    await cache.aget_or_set("loaded", lambda: None)
+    await cache.aset_absent("marked")
+    await cache.aget("missing")
+
+    assert "loaded" in absent_filter
+    assert "marked" in absent_filter
+    assert "missing" not in absent_filter
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "write",
+    [
+        lambda cache: cache.aset("a", {"value": 1}),
+        lambda cache: cache.adelete("a"),
+        lambda cache: cache.aset_many({"z": {"value": 1}, "a": {"value": 2}}),
+        lambda cache: cache.adelete_many(["z", "a"]),
+        lambda cache: cache.aclear(),
+    ],
+)
+async def test_absent_filter_cleared_on_write(backend, write):
+    """Test writes and deletes of a key in the filter clear it.
+
+    Args:
+        backend (AsyncMock): The backend object.
+        write (Callable): The write of key "a".
+    """
+    absent_filter = BloomFilter(capacity=100)
+    absent_filter.add("a")
+    absent_filter.add("b")
+    cache = PsQache(backend=backend, absent_filter=absent_filter)
+
+    await write(cache)
+
+    assert len(absent_filter) == 0
+
+
+@pytest.mark.asyncio
+async def test_absent_filter_kept_on_other_writes(backend):
+    """Test writes and deletes of keys not in the filter keep it.
+
+    Args:
+        backend (AsyncMock): The backend object.
+    """
+    absent_filter = BloomFilter(capacity=100)
+    absent_filter.add("a")
+    cache = PsQache(backend=backend, absent_filter=absent_filter)
+
+    await cache.aset("b", {"value": 1})
+    await cache.adelete_many(["c", "d"])
+
+    assert "a" in absent_filter
+
+
+def test_sync_calls_run_on_loop_thread(threaded_cache, backend, runner):
+    """Test synchronous calls run on the loop thread of the runner.
+
+    Args:
+        threaded_cache (PsQache): The cache running on a loop thread.
+        backend (AsyncMock): The backend object.
+        runner (LoopThread): The loop thread.
+    """
+    threads = []
+    backend.get.side_effect = lambda key: threads.append(threading.current_thread())
+    backend.has_many.return_value = {"key_1": True}
+    backend.get_many.return_value = {}
+
+    threaded_cache.get("test_key")
+    threaded_cache.set("test_key", "value", 10)
+    threaded_cache.delete("test_key")
+    threaded_cache.clear()
+    threaded_cache.cleanup()
+    threaded_cache.has("test_key")
+    threaded_cache.set_many({"key_1": 1}, 10)
+    threaded_cache.delete_many(["key_1"])
+    threaded_cache.get_many(["key_1"])
+
+    assert threaded_cache.has_many(["key_1"]) == {"key_1": True}
+    assert threads == [runner.thread]
+    backend.set.assert_awaited_once_with("test_key", "value", 10)
+    backend.set_many.assert_awaited_once_with({"key_1": 1}, 10)
+
+
+def test_get_or_set_offloads_sync_loader(threaded_cache, backend, runner):
+    """Test synchronous loaders do not run on the shared loop thread.
+
+    Args:
+        threaded_cache (PsQache): The cache running on a loop thread.
+        backend (AsyncMock): The backend object.
+        runner (LoopThread): The loop thread.
+    """
+    backend.get.return_value = None
+
+    def loader():
+        return threading.current_thread().name
+
+    async def async_loader():
+        return threading.current_thread().name
+
+    assert threaded_cache.get_or_set("sync", loader) != runner.name
+    assert threaded_cache.get_or_set("async", async_loader) == runner.name
+
+
+def test_use_postgres_backend_with_runner():
+    """Test the pool is created and connected on the loop of the runner."""
+    runner = LoopThread()
+    with patch(
+        "psqache.backends.asyncpg.create_pool",
+        new_callable=AsyncMock,
+    ) as create_pool:
+        cache = PsQache.use_postgres_backend(dsn="test_dsn", runner=runner)
+    runner.stop()
+
+    assert cache.runner is runner
+    create_pool.assert_awaited_once_with(
+        dsn="test_dsn",
+        init=cache.backend.init_connection,
+        statement_cache_size=100,
+        min_size=15,
+        max_size=25,
+    )
+
+
+@pytest.fixture
+def memory_cache():
+    """Fixture for a cache with the in-memory backend."""
+    return PsQache(backend=MemoryBackend())
+
+
+@pytest.mark.asyncio
+async def test_ainvalidate_tag(memory_cache):
+    """Test invalidating a tag makes the entries with the tag miss.
+
+    Args:
+        memory_cache (PsQache): The cache with the in-memory backend.
+    """
+    await memory_cache.aset("user:1", {"id": 1}, tags=["tenant:42", "users"])
+    await memory_cache.aset("user:2", {"id": 2}, tags=["tenant:43"])
+    await memory_cache.aset("user:3", {"id": 3})
+    assert await memory_cache.aget("user:1") == {"id": 1}
+
+    await memory_cache.ainvalidate_tag("users")
+
+    assert await memory_cache.aget("user:1") is None
+    assert await memory_cache.aget("user:2") == {"id": 2}
+    assert await memory_cache.aget("user:3") == {"id": 3}
+    await memory_cache.aset("user:1", {"id": 1}, tags=["tenant:42", "users"])
+    assert await memory_cache.aget("user:1") == {"id": 1}
+
+
+@pytest.mark.asyncio
+async def test_ahas_invalidated_tag(memory_cache):
+    """Test entries invalidated through a tag are no longer in the cache.
+
+    Args:
+        memory_cache (PsQache): The cache with the in-memory backend.
+    """
+    await memory_cache.aset("user:1", {"id": 1}, tags=["users"])
+    await memory_cache.aset("user:2", {"id": 2})
+    assert await memory_cache.ahas("user:1")
+
+    await memory_cache.ainvalidate_tag("users")
+
+    assert not await memory_cache.ahas("user:1")
+    assert await memory_cache.ahas_many(["user:1", "user:2"]) == {
+        "user:1": False,
+        "user:2": True,
+    }
+
+
+@pytest.mark.asyncio
+async def test_ahas_reads_values_once_a_tag_is_invalidated(memory_cache):
+    """Test existence checks only read values once a tag was invalidated.
+
+    Args:
+        memory_cache (PsQache): The cache with the in-memory backend.
+    """
+    await memory_cache.aset("user:1", {"id": 1}, tags=["users"])
+    with patch.object(
+        memory_cache.backend,
+        "get_many",
+        wraps=memory_cache.backend.get_many,
+    ) as get_many:
+        assert await memory_cache.ahas("user:1")
+        assert await memory_cache.ahas_many(["user:1", "user:2"]) == {
+            "user:1": True,
+            "user:2": False,
+        }
+        get_many.assert_not_called()
+
+        await memory_cache.ainvalidate_tag("other")
+        assert await memory_cache.ahas("user:1")
+        assert not await memory_cache.ahas("user:2")
+        assert await memory_cache.ahas_many(["user:2"]) == {"user:2": False}
+        get_many.assert_called_once_with(["user:1"])
+
+
+@pytest.mark.asyncio
+async def test_aset_many_with_tags(memory_cache):
+    """Test entries set together with tags are invalidated together.
+
+    Args:
+        memory_cache (PsQache): The cache with the in-memory backend.
+    """
+    await memory_cache.aset_many({"a": {"v": 1}, "b": {"v": 2}}, tags=["t"])
+    await memory_cache.aset_many({"c": {"v": 3}})
+    assert await memory_cache.aget_many(["a", "b", "c"]) == {
+        "a": {"v": 1},
+        "b": {"v": 2},
+        "c": {"v": 3},
+    }
+
+    await memory_cache.ainvalidate_tag("t")
+
+    assert await memory_cache.aget_many(["a", "b", "c"]) == {"c": {"v": 3}}
+    await memory_cache.aset_many({})
+
+
+@pytest.mark.asyncio
+async def test_aget_or_set_with_tags(memory_cache):
+    """Test loaded entries get their tags, and are loaded again once invalid.
+
+    Args:
+        memory_cache (PsQache): The cache with the in-memory backend.
+    """
+    loader = MagicMock(side_effect=[{"v": 1}, {"v": 2}])
+
+    assert await memory_cache.aget_or_set("a", loader, tags=["t"]) == {"v": 1}
+    assert await memory_cache.aget_or_set("a", loader, tags=["t"]) == {"v": 1}
+    await memory_cache.ainvalidate_tag("t")
+    assert await memory_cache.aget_or_set("a", loader, tags=["t"]) == {"v": 2}
+    assert loader.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_aget_or_set_distributed_with_tags(memory_cache):
+    """Test the lock holder does not return an entry with an invalid tag.
+
+    Args:
+        memory_cache (PsQache): The cache with the in-memory backend.
+    """
+    await memory_cache.aset("a", {"v": 1}, tags=["t"])
+    await memory_cache.ainvalidate_tag("t")
+
+    result = await memory_cache.aget_or_set(
+        "a",
+        lambda: {"v": 2},
+        distributed=True,
+        tags=["t"],
+    )
+
+    assert result == {"v": 2}
+    assert await memory_cache.aget("a") == {"v": 2}
+
+
+@pytest.mark.asyncio
+async def test_refresh_keeps_tags(memory_cache):
+    """Test entries refreshed by a registered loader keep their tags.
+
+    Args:
+        memory_cache (PsQache): The cache with the in-memory backend.
+    """
+    memory_cache.register_loader("user:", lambda key: {"v": 2}, soft_ttl=0)
+    await memory_cache.aset("user:1", {"v": 1}, tags=["t"])
+
+    assert await memory_cache.aget("user:1") == {"v": 1}
+    await memory_cache._loading["user:1"]
+    assert await memory_cache.aget("user:1") == {"v": 2}
+    await memory_cache._loading["user:1"]
+
+    await memory_cache.ainvalidate_tag("t")
+    assert await memory_cache.aget("user:1") is None
+    assert memory_cache._loading == {}
+
+
+def test_sync_tags(memory_cache):
+    """Test the synchronous methods with tags.
+
+    Args:
+        memory_cache (PsQache): The cache with the in-memory backend.
+    """
+    memory_cache.set("a", {"v": 1}, tags=["t"])
+    memory_cache.set_many({"b": {"v": 2}}, tags=["t"])
+    assert memory_cache.get_or_set("c", lambda: {"v": 3}, tags=["t"]) == {"v": 3}
+
+    memory_cache.invalidate_tag("t")
+
+    assert memory_cache.get_many(["a", "b", "c"]) == {}
+
+
+@pytest.mark.asyncio
+async def test_namespace(memory_cache):
+    """Test the keys of a namespace embed its name and generation.
+
+    Args:
+        memory_cache (PsQache): The cache with the in-memory backend.
+    """
+    tenant = memory_cache.namespace("tenant:42")
+    other = memory_cache.namespace("tenant:43")
+
+    await tenant.aset("user:1", {"v": 1})
+    await other.aset("user:1", {"v": 2})
+    key = await tenant.key("user:1")
+
+    assert key.startswith("tenant:42:")
+    assert key.endswith(":user:1")
+    assert await memory_cache.aget(key) == {"v": 1}
+    assert await tenant.aget("user:1") == {"v": 1}
+    assert await other.aget("user:1") == {"v": 2}
+    assert await tenant.ahas("user:1")
+    await tenant.adelete("user:1")
+    assert not await tenant.ahas("user:1")
+
+
+@pytest.mark.asyncio
+async def test_aclear_namespace(memory_cache):
+    """Test clearing a namespace leaves the other namespaces as they are.
+
+    Args:
+        memory_cache (PsQache): The cache with the in-memory backend.
+    """
+    tenant = memory_cache.namespace("tenant:42")
+    other = memory_cache.namespace("tenant:43")
+    await tenant.aset_many({"a": {"v": 1}, "b": {"v": 2}})
+    await other.aset("a", {"v": 3})
+    assert await tenant.aget_many(["a", "b", "c"]) == {"a": {"v": 1}, "b": {"v": 2}}
+
+    await tenant.aclear()
+
+    assert await tenant.aget_many(["a", "b"]) == {}
+    assert await other.aget("a") == {"v": 3}
+    await tenant.aset("a", {"v": 4})
+    assert await tenant.aget("a") == {"v": 4}
+    await memory_cache.aclear_namespace("tenant:42")
+    assert await tenant.aget("a") is None
+
+
+@pytest.mark.asyncio
+async def test_namespace_with_tags(memory_cache):
+    """Test entries of a namespace can have tags.
+
+    Args:
+        memory_cache (PsQache): The cache with the in-memory backend.
+    """
+    tenant = memory_cache.namespace("tenant:42")
+    await tenant.aset("a", {"v": 1}, tags=["t"])
+    await tenant.aset_many({"b": {"v": 2}}, tags=["t"])
+    assert await tenant.aget_or_set("c", lambda: {"v": 3}, tags=["t"]) == {"v": 3}
+    await tenant.adelete_many(["b"])
+
+    assert await tenant.aget_many(["a", "b", "c"]) == {"a": {"v": 1}, "c": {"v": 3}}
+    await memory_cache.ainvalidate_tag("t")
+    assert await tenant.aget_many(["a", "c"]) == {}
+
+
+def test_sync_namespace(memory_cache):
+    """Test the synchronous methods of a namespace.
+
+    Args:
+        memory_cache (PsQache): The cache with the in-memory backend.
+    """
+    tenant = memory_cache.namespace("tenant:42")
+    tenant.set("a", {"v": 1})
+    tenant.set_many({"b": {"v": 2}, "c": {"v": 3}})
+    assert tenant.get_or_set("d", lambda: {"v": 4}) == {"v": 4}
+    tenant.delete("b")
+    tenant.delete_many(["c"])
+
+    assert tenant.get("a") == {"v": 1}
+    assert tenant.has("d")
+    assert tenant.get_many(["a", "b", "c", "d"]) == {"a": {"v": 1}, "d": {"v": 4}}
+
+    tenant.clear()
+    assert tenant.get_many(["a", "d"]) == {}
+    tenant.set("a", {"v": 1})
+    memory_cache.clear_namespace("tenant:42")
+    assert tenant.get("a") is None
+
+
+@pytest.mark.asyncio
+async def test_aiter_keys(memory_cache):
+    """Test iterating over the keys, fetched in chunks.
+
+    Args:
+        memory_cache (PsQache): The cache with the in-memory backend.
+    """
+    memory_cache.ITERATION_CHUNK_SIZE = 2
+    await memory_cache.aset_many({"user:2": 2, "user:1": 1, "post:1": 3})
+    await memory_cache.aset_absent("user:3")
+
+    assert [key async for key in memory_cache.aiter_keys()] == [
+        "post:1",
+        "user:1",
+        "user:2",
+        "user:3",
+    ]
+    assert [key async for key in memory_cache.aiter_keys("post:")] == ["post:1"]
+
+
+@pytest.mark.asyncio
+async def test_aiter_items(memory_cache):
+    """Test iterating over the entries leaves out absent and invalid ones.
+
+    Args:
+        memory_cache (PsQache): The cache with the in-memory backend.
+    """
+    memory_cache.ITERATION_CHUNK_SIZE = 2
+    await memory_cache.aset_many({"user:1": {"v": 1}, "post:1": {"v": 3}})
+    await memory_cache.aset("user:2", {"v": 2}, tags=["t"])
+    await memory_cache.aset("user:3", {"v": 4}, tags=["other"])
+    await memory_cache.aset_absent("user:4")
+    await memory_cache.ainvalidate_tag("other")
+
+    assert [item async for item in memory_cache.aiter_items("user:")] == [
+        ("user:1", {"v": 1}),
+        ("user:2", {"v": 2}),
+    ]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("method", ["aiter_keys", "aiter_items"])
+async def test_aiter_closes_chunks_on_early_exit(cache, backend, method):
+    """Test stopping an iteration early closes the chunks of the backend.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+        backend (AsyncMock): The backend object.
+        method (str): The name of the iteration method.
+    """
+    closed = []
+
+    async def chunks(_prefix, _chunk_size):
+        try:
+            yield {"a": 1, "b": 2}
+            yield {"c": 3}
+        finally:
+            closed.append(True)
+
+    backend.iter_keys = backend.iter_items = chunks
+
+    async with contextlib.aclosing(getattr(cache, method)()) as iterator:
+        async for _ in iterator:
+            break
+
+    assert closed == [True]
+
+
+@pytest.mark.asyncio
+async def test_awarm_clears_absent_filter():
+    """Test warmed keys are no longer held as absent by the filter."""
+    absent_filter = BloomFilter(capacity=100)
+    absent_filter.add("a")
+    cache = PsQache(backend=MemoryBackend(), absent_filter=absent_filter)
+
+    assert await cache.awarm(["a"], str.upper) == 1
+
+    assert "a" not in absent_filter
+    assert await cache.aget("a") == "A"
+
+
+@pytest.mark.asyncio
+async def test_awarm(memory_cache, caplog):
+    """Test warming loads the missing keys and reads the cached ones.
+
+    Args:
+        memory_cache (PsQache): The cache with the in-memory backend.
+        caplog (pytest.LogCaptureFixture): The captured logs.
+    """
+    await memory_cache.aset("cached", {"v": 0})
+    await memory_cache.aset_absent("absent")
+
+    async def loader(key):
+        if key == "failing":
+            raise RuntimeError(key)
+        return None if key == "none" else {"v": key}
+
+    with patch.object(
+        memory_cache.backend,
+        "import_entries",
+        wraps=memory_cache.backend.import_entries,
+    ) as import_entries:
+        warmed = await memory_cache.awarm(
+            ["cached", "absent", "a", "b", "a", "none", "failing"],
+            loader,
+            ttl=60,
+        )
+
+    assert warmed == 3
+    import_entries.assert_called_once_with({"a": {"v": "a"}, "b": {"v": "b"}}, 60)
+    assert await memory_cache.aget_many(["cached", "a", "b", "none"]) == {
+        "cached": {"v": 0},
+        "a": {"v": "a"},
+        "b": {"v": "b"},
+    }
+    assert memory_cache.backend.lookup_entry("a").ttl == 60
+    assert "Warming 'failing' failed" in caplog.text
+    assert await memory_cache.awarm([], loader) == 0
+
+
+@pytest.mark.asyncio
+async def test_awarm_registered_loaders(memory_cache):
+    """Test warming uses the registered loaders, and only reads other keys.
+
+    Args:
+        memory_cache (PsQache): The cache with the in-memory backend.
+    """
+    memory_cache.register_loader("user:", lambda key: {"id": key}, ttl=30)
+
+    assert await memory_cache.awarm(["user:1", "post:1"]) == 1
+    assert memory_cache.backend.lookup_entry("user:1") is not None
+    assert memory_cache.backend.lookup_entry("user:1").ttl == 30
+    assert await memory_cache.ahas("post:1") is False
+
+
+@pytest.mark.asyncio
+async def test_awarm_saved_hot_keys():
+    """Test warming defaults to the hot keys saved by another process."""
+    backend = MemoryBackend()
+    cache = PsQache(backend=backend, analytics=KeyAnalytics())
+    for key in ("a", "a", "a", "b", "b", "c"):
+        await cache.aget(key)
+    fresh = PsQache(backend=backend, analytics=KeyAnalytics())
+
+    assert await fresh.awarm(loader=str.upper) == 0
+    assert await cache.asave_hot_keys(top=2) == ["a", "b"]
+    assert backend.lookup_entry(PsQache.HOT_KEYS_KEY).ttl == PsQache.DEFAULT_TTL
+    assert await fresh.awarm(loader=str.upper) == 2
+    assert await fresh.aget_many(["a", "b", "c"]) == {"a": "A", "b": "B"}
+
+
+def test_save_hot_keys(memory_cache):
+    """Test only caches with analytics have hot keys to save.
+
+    Args:
+        memory_cache (PsQache): The cache with the in-memory backend.
+    """
+    cache = PsQache(backend=MemoryBackend(), analytics=KeyAnalytics())
+    cache.get("key")
+
+    assert cache.save_hot_keys(ttl=60) == ["key"]
+    assert cache.backend.backend.lookup_entry(PsQache.HOT_KEYS_KEY).ttl == 60
+    assert memory_cache.save_hot_keys() == []
+    assert memory_cache.backend.lookup_entry(PsQache.HOT_KEYS_KEY) is None
+
+
+@pytest.mark.asyncio
+async def test_asnapshots():
+    """Test snapshots save the hot keys and reach a wrapped Postgres backend."""
+    backend = AsyncMock(spec=PostgresBackend)
+    backend.export_snapshot.return_value = 2
+    backend.import_snapshot.return_value = 1
+    cache = PsQache(backend=backend, analytics=KeyAnalytics(), metrics=Metrics())
+    await cache.aget("key")
+
+    assert await cache.aexport_snapshot("cache.snapshot") == 2
+    assert await cache.aimport_snapshot("cache.snapshot") == 1
+
+    backend.set.assert_awaited_once_with(
+        PsQache.HOT_KEYS_KEY,
+        {"keys": ["key"]},
+        PsQache.DEFAULT_TTL,
+    )
+    backend.export_snapshot.assert_awaited_once_with("cache.snapshot")
+    backend.import_snapshot.assert_awaited_once_with("cache.snapshot")
+
+
+def test_snapshots(memory_cache):
+    """Test the synchronous snapshots, and backends without snapshots.
+
+    Args:
+        memory_cache (PsQache): The cache with the in-memory backend.
+    """
+    backend = AsyncMock(spec=PostgresBackend)
+    backend.export_snapshot.return_value = 2
+    backend.import_snapshot.return_value = 1
+    cache = PsQache(backend=backend)
+
+    assert cache.export_snapshot("cache.snapshot") == 2
+    assert cache.import_snapshot("cache.snapshot") == 1
+    backend.set.assert_not_awaited()
+    with pytest.raises(TypeError, match="MemoryBackend does not support snapshots"):
+        memory_cache.export_snapshot("cache.snapshot")
+    with pytest.raises(TypeError, match="MemoryBackend does not support snapshots"):
+        memory_cache.import_snapshot("cache.snapshot")
+
+
+def test_warm(runner):
+    """Test synchronous warm-ups run synchronous loaders off the loop thread.
+
+    Args:
+        runner (LoopThread): The loop thread.
+    """
+    threads = {}
+
+    def loader(key):
+        threads[key] = threading.current_thread().name
+        return {"v": key}
+
+    assert PsQache(backend=MemoryBackend(), runner=runner).warm(["a"], loader) == 1
+    assert PsQache(backend=MemoryBackend()).warm(["b"], loader) == 1
+    assert threads["a"] != runner.name
+
+
+class BoundedPool:
+    """Pool lending at most `max_size` mock connections at a time."""
+
+    def __init__(self, max_size):
+        """Initialize the BoundedPool.
+
+        Args:
+            max_size (int): The number of connections of the pool.
+        """
+        self.slots = asyncio.Semaphore(max_size)
+        self.record = None
+
+    @asynccontextmanager
+    async def acquire(self):
+        """Lend a connection, waiting for one to be released if none is free.
+
+        Yields:
+            AsyncMock: The connection, which holds every lock and misses every
+                key, unless `record` is set.
+        """
+        async with self.slots:
+            # Let the other tasks run, as a round trip would.
+            await asyncio.sleep(0)
+            connection = AsyncMock(asyncpg.Connection)
+            connection.transaction = MagicMock()
+            connection.fetchrow.return_value = self.record
+            connection.fetchval.return_value = True
+            yield connection
+
+
+@pytest.mark.asyncio
+async def test_aget_or_set_distributed_beyond_pool_size():
+    """Test more concurrent distributed loads than connections do not hang."""
+    cache = PsQache(backend=PostgresBackend(pool=BoundedPool(2)))
+
+    results = await asyncio.wait_for(
+        asyncio.gather(
+            *(
+                cache.aget_or_set(f"key_{index}", lambda: {"v": 1}, distributed=True)
+                for index in range(5)
+            ),
+        ),
+        timeout=1,
+    )
+
+    assert results == [{"v": 1}] * 5
+
+
+@pytest.mark.asyncio
+async def test_refresh_beyond_pool_size():
+    """Test more concurrent background refreshes than connections do not hang."""
+    pool = BoundedPool(2)
+    pool.record = {"value": {"v": 1}, "payload": None, "ttl": 60, "expires_in": 1.0}
+    cache = PsQache(backend=PostgresBackend(pool=pool))
+    loader = MagicMock(return_value={"v": 2})
+    cache.register_loader("key_", loader, soft_ttl=0)
+
+    values = await asyncio.gather(*(cache.aget(f"key_{index}") for index in range(5)))
+    await asyncio.wait_for(asyncio.gather(*cache._loading.values()), timeout=1)
+
+    assert values == [{"v": 1}] * 5
+    assert loader.call_count == 5
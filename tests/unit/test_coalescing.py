@@ -0,0 +1,209 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from psqache.abcs import ICacheBackend
+from psqache.coalescing import Coalescer
+from psqache.coalescing import CoalescingBackend
+
+
+@pytest.fixture
+def backend():
+    """Fixture for the wrapped cache backend."""
+    return AsyncMock(spec=ICacheBackend)
+
+
+@pytest.fixture
+def coalescing_backend(backend):
+    """Fixture for the CoalescingBackend object."""
+    return CoalescingBackend(backend, window=0.01, max_batch=3)
+
+
+@pytest.mark.asyncio
+async def test_get_coalesces_concurrent_calls(coalescing_backend, backend):
+    """Test concurrent get calls are resolved with a single get_many call.
+
+    Args:
+        coalescing_backend (CoalescingBackend): The CoalescingBackend object.
+        backend (AsyncMock): The wrapped backend object.
+    """
+    backend.get_many.return_value = {"key_1": {"data": 1}}
+
+    results = await asyncio.gather(
+        coalescing_backend.get("key_1"),
+        coalescing_backend.get("key_2"),
+        coalescing_backend.get("key_1"),
+    )
+
+    backend.get_many.assert_awaited_once_with(["key_1", "key_2"])
+    backend.get.assert_not_awaited()
+    assert results == [{"data": 1}, None, {"data": 1}]
+
+
+@pytest.mark.asyncio
+async def test_has_coalesces_concurrent_calls(coalescing_backend, backend):
+    """Test concurrent has calls are resolved with a single has_many call.
+
+    Args:
+        coalescing_backend (CoalescingBackend): The CoalescingBackend object.
+        backend (AsyncMock): The wrapped backend object.
+    """
+    backend.has_many.return_value = {"key_1": True, "key_2": False}
+
+    results = await asyncio.gather(
+        coalescing_backend.has("key_1"),
+        coalescing_backend.has("key_2"),
+    )
+
+    backend.has_many.assert_awaited_once_with(["key_1", "key_2"])
+    assert results == [True, False]
+
+
+@pytest.mark.asyncio
+async def test_get_flushes_when_batch_is_full(coalescing_backend, backend):
+    """Test reaching max_batch keys flushes without waiting for the window.
+
+    Args:
+        coalescing_backend (CoalescingBackend): The CoalescingBackend object.
+        backend (AsyncMock): The wrapped backend object.
+    """
+    backend.get_many.return_value = {}
+    keys = ["key_1", "key_2", "key_3", "key_4"]
+
+    await asyncio.gather(*(coalescing_backend.get(key) for key in keys))
+
+    assert backend.get_many.await_count == 2
+    backend.get_many.assert_any_await(["key_1", "key_2", "key_3"])
+    backend.get_many.assert_any_await(["key_4"])
+
+
+@pytest.mark.asyncio
+async def test_zero_window_flushes_on_next_iteration(backend):
+    """Test a zero window flushes the keys collected in the current tick.
+
+    Args:
+        backend (AsyncMock): The wrapped backend object.
+    """
+    backend.get_many.return_value = {"key_1": 1, "key_2": 2}
+    coalescing_backend = CoalescingBackend(backend, window=0)
+
+    results = await asyncio.gather(
+        coalescing_backend.get("key_1"),
+        coalescing_backend.get("key_2"),
+    )
+
+    backend.get_many.assert_awaited_once_with(["key_1", "key_2"])
+    assert results == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_loader_error_is_propagated_to_every_caller(coalescing_backend, backend):
+    """Test a failed batch raises the error in every waiting caller.
+
+    Args:
+        coalescing_backend (CoalescingBackend): The CoalescingBackend object.
+        backend (AsyncMock): The wrapped backend object.
+    """
+    backend.get_many.side_effect = ConnectionError("boom")
+
+    results = await asyncio.gather(
+        coalescing_backend.get("key_1"),
+        coalescing_backend.get("key_2"),
+        return_exceptions=True,
+    )
+
+    assert all(isinstance(result, ConnectionError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_shared_lookup():
+    """Test cancelling one caller leaves other callers of the same key alone."""
+    release = asyncio.Event()
+
+    async def loader(keys):
+        await release.wait()
+        return {key: key.upper() for key in keys}
+
+    coalescer = Coalescer(loader, window=0, max_batch=10)
+    first = asyncio.ensure_future(coalescer.load("key"))
+    second = asyncio.ensure_future(coalescer.load("key"))
+    await asyncio.sleep(0)
+    first.cancel()
+    release.set()
+
+    assert await second == "KEY"
+    assert first.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_batch_cancels_every_caller():
+    """Test cancelling a running batch cancels its callers instead of hanging."""
+    started = asyncio.Event()
+
+    async def loader(keys):
+        started.set()
+        await asyncio.Event().wait()
+
+    coalescer = Coalescer(loader, window=0, max_batch=10)
+    callers = [asyncio.ensure_future(coalescer.load(key)) for key in ("a", "b")]
+    await started.wait()
+    for task in coalescer._tasks:
+        task.cancel()
+
+    results = await asyncio.wait_for(
+        asyncio.gather(*callers, return_exceptions=True), timeout=1
+    )
+
+    assert all(isinstance(result, asyncio.CancelledError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_done_futures_are_skipped():
+    """Test futures resolved elsewhere are not resolved again by a batch."""
+    loop = asyncio.get_running_loop()
+    done = loop.create_future()
+    done.set_result("early")
+    failed = loop.create_future()
+    failed.set_result("early")
+
+    async def loader(keys):
+        return {}
+
+    async def failing_loader(keys):
+        raise ValueError
+
+    await Coalescer(loader, window=0, max_batch=10)._resolve({"key": done})
+    await Coalescer(failing_loader, window=0, max_batch=10)._resolve({"key": failed})
+
+    assert done.result() == "early"
+    assert failed.result() == "early"
+
+
+@pytest.mark.asyncio
+async def test_flush_without_pending_keys(backend):
+    """Test flushing with nothing pending does not query the backend.
+
+    Args:
+        backend (AsyncMock): The wrapped backend object.
+    """
+    coalescer = Coalescer(backend.get_many, window=0, max_batch=10)
+
+    coalescer.flush()
+    await asyncio.sleep(0)
+
+    backend.get_many.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_other_operations_are_forwarded(coalescing_backend, backend):
+    """Test operations other than get and has go straight to the backend.
+
+    Args:
+        coalescing_backend (CoalescingBackend): The CoalescingBackend object.
+        backend (AsyncMock): The wrapped backend object.
+    """
+    await coalescing_backend.set("key", {"data": 1}, 60)
+
+    backend.set.assert_awaited_once_with("key", {"data": 1}, 60)
+    assert isinstance(coalescing_backend, ICacheBackend)
@@ -0,0 +1,115 @@
+import threading
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+import pytest
+
+from psqache.abcs import ICompressor
+from psqache.compressors import Lz4Compressor
+from psqache.compressors import ZlibCompressor
+from psqache.compressors import ZstdCompressor
+from psqache.compressors import get_codec
+from psqache.compressors import get_compressor
+
+
+@pytest.fixture
+def module():
+    """Fixture for an optional compression package."""
+    module = MagicMock()
+    module.compress.return_value = b"compressed"
+    module.decompress.return_value = b"data"
+    module.ZstdCompressor.return_value.compress.return_value = b"compressed"
+    module.ZstdDecompressor.return_value.decompress.return_value = b"data"
+    return module
+
+
+def test_zlib_compressor():
+    """Test the ZlibCompressor roundtrips data."""
+    compressor = ZlibCompressor(level=9)
+    assert isinstance(compressor, ICompressor)
+    data = b"x" * 1000
+    compressed = compressor.compress(data)
+    assert len(compressed) < len(data)
+    assert compressor.decompress(compressed) == data
+
+
+def test_lz4_compressor(module):
+    """Test the Lz4Compressor delegates to lz4 frames.
+
+    Args:
+        module (MagicMock): The lz4.frame module.
+    """
+    with patch(
+        "psqache.serializers.importlib.import_module",
+        return_value=module,
+    ) as import_module:
+        compressor = Lz4Compressor(level=3)
+    import_module.assert_called_once_with("lz4.frame")
+    assert isinstance(compressor, ICompressor)
+    assert compressor.compress(b"data") == b"compressed"
+    module.compress.assert_called_once_with(b"data", compression_level=3)
+    assert compressor.decompress(b"compressed") == b"data"
+
+
+def test_zstd_compressor(module):
+    """Test the ZstdCompressor delegates to zstandard.
+
+    Args:
+        module (MagicMock): The zstandard package.
+    """
+    with patch("psqache.serializers.importlib.import_module", return_value=module):
+        compressor = ZstdCompressor()
+    assert isinstance(compressor, ICompressor)
+    module.ZstdCompressor.assert_called_once_with(level=3)
+    assert compressor.compress(b"data") == b"compressed"
+    assert compressor.decompress(b"compressed") == b"data"
+
+
+def test_zstd_compressor_per_thread(module):
+    """Test every thread gets its own zstd contexts.
+
+    Args:
+        module (MagicMock): The zstandard package.
+    """
+    with patch("psqache.serializers.importlib.import_module", return_value=module):
+        compressor = ZstdCompressor()
+    compressor.compress(b"data")
+    compressor.decompress(b"compressed")
+    thread = threading.Thread(target=compressor.compress, args=(b"data",))
+    thread.start()
+    thread.join()
+    assert module.ZstdCompressor.call_count == 2
+    assert module.ZstdDecompressor.call_count == 2
+
+
+@pytest.mark.parametrize("compressor", [Lz4Compressor, ZstdCompressor])
+def test_missing_package(compressor):
+    """Test optional compressors fail clearly when their package is missing.
+
+    Args:
+        compressor (type): The compressor class.
+    """
+    with (
+        patch(
+            "psqache.serializers.importlib.import_module",
+            side_effect=ImportError,
+        ),
+        pytest.raises(ImportError, match=f"The {compressor.name} compressor"),
+    ):
+        compressor()
+
+
+def test_get_compressor():
+    """Test compressors are looked up by name and instances are passed through."""
+    assert isinstance(get_compressor("zlib"), ZlibCompressor)
+    compressor = ZlibCompressor()
+    assert get_compressor(compressor) is compressor
+    with pytest.raises(ValueError, match="Unknown compressor"):
+        get_compressor("brotli")
+
+
+def test_get_codec():
+    """Test compressors are looked up by the codec id of a payload."""
+    assert isinstance(get_codec(ZlibCompressor.id), ZlibCompressor)
+    with pytest.raises(ValueError, match="Unknown compression codec"):
+        get_codec(0)
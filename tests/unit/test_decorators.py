@@ -0,0 +1,129 @@
+import pytest
+
+from psqache.caches import PsQache
+from psqache.decorators import MAX_KEY_LENGTH
+from psqache.decorators import KeyBuilder
+from tests.mocks import MockBackend
+
+
+@pytest.fixture
+def backend():
+    """Fixture for the cache backend."""
+    return MockBackend()
+
+
+@pytest.fixture
+def cache(backend):
+    """Fixture for the cache object."""
+    return PsQache(backend=backend)
+
+
+def test_key_builder_binds_arguments_by_name():
+    """Test positional, keyword and default arguments build the same key."""
+
+    def func(a, b=2, *, c=3):
+        pass
+
+    build_key = KeyBuilder(func)
+
+    assert build_key((1,), {}) == build_key((1, 2), {"c": 3})
+    assert build_key((1,), {}) == build_key((), {"b": 2, "a": 1})
+    assert build_key((1,), {}) == f"{__name__}.{func.__qualname__}:a=1,b=2,c=3"
+    assert build_key((1,), {}) != build_key((2,), {})
+
+
+def test_key_builder_variadic_arguments():
+    """Test extra positional and keyword arguments are part of the key."""
+
+    def func(a, *args, **kwargs):
+        pass
+
+    def func_without_varargs(a):
+        pass
+
+    build_key = KeyBuilder(func, namespace="ns")
+
+    assert build_key((1, 2, 3), {"d": 4}) == "ns:a=1,args=(2, 3),d=4"
+    assert KeyBuilder(func_without_varargs, namespace="ns")((1, 2), {}) == (
+        "ns:*=(2,),a=1"
+    )
+
+
+def test_key_builder_custom_keys():
+    """Test format string and callable keys."""
+
+    def func(user_id, verbose=False):
+        pass
+
+    assert KeyBuilder(func, key="user:{user_id}")((42,), {}) == "user:42"
+    assert KeyBuilder(func, key="user:{user_id}", namespace="ns")((42,), {}) == (
+        "ns:user:42"
+    )
+    assert KeyBuilder(func, key=lambda user_id, **_: f"u{user_id}")((42,), {}) == "u42"
+
+
+def test_key_builder_hashes_long_keys():
+    """Test keys over the maximum length are shortened by hashing."""
+
+    def func(value):
+        pass
+
+    build_key = KeyBuilder(func, namespace="ns")
+    key = build_key(("x" * MAX_KEY_LENGTH,), {})
+
+    assert key.startswith("ns:")
+    assert len(key) == len("ns:") + 32
+    assert key == build_key(("x" * MAX_KEY_LENGTH,), {})
+    assert key != build_key(("y" * MAX_KEY_LENGTH,), {})
+
+
+@pytest.mark.asyncio
+async def test_cached_coroutine_function(cache, backend):
+    """Test results of coroutine functions are cached and can be invalidated.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+        backend (MockBackend): The backend object.
+    """
+    calls = []
+
+    @cache.cached(ttl=60, namespace="users")
+    async def get_user(user_id):
+        calls.append(user_id)
+        return {"id": user_id}
+
+    assert await get_user(1) == {"id": 1}
+    assert await get_user(user_id=1) == {"id": 1}
+    assert calls == [1]
+    assert backend.store == {"users:user_id=1": {"id": 1}}
+    assert get_user.key(1) == "users:user_id=1"
+    assert get_user.__name__ == "get_user"
+
+    assert await get_user.bypass(1) == {"id": 1}
+    assert calls == [1, 1]
+
+    await get_user.invalidate(1)
+    assert backend.store == {}
+
+
+def test_cached_function(cache, backend):
+    """Test results of plain functions are cached and can be invalidated.
+
+    Args:
+        cache (PsQache): The PsQache cache object.
+        backend (MockBackend): The backend object.
+    """
+    calls = []
+
+    @cache.cached(key="square:{value}")
+    def square(value):
+        calls.append(value)
+        return value * value
+
+    assert square(3) == 9
+    assert square(3) == 9
+    assert calls == [3]
+    assert backend.store == {"square:3": 9}
+
+    square.invalidate(3)
+    assert backend.store == {}
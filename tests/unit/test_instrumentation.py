@@ -0,0 +1,136 @@
+from unittest.mock import AsyncMock
+
+import pytest
+
+from psqache.abcs import ICacheBackend
+from psqache.backends import MemoryBackend
+from psqache.instrumentation import InstrumentedBackend
+from psqache.metrics import DELETES
+from psqache.metrics import ERRORS
+from psqache.metrics import HITS
+from psqache.metrics import MISSES
+from psqache.metrics import OPERATION_SECONDS
+from psqache.metrics import SETS
+from psqache.metrics import Metrics
+
+
+@pytest.fixture
+def metrics():
+    """Fixture for the Metrics object."""
+    return Metrics()
+
+
+@pytest.fixture
+def backend(metrics):
+    """Fixture for an InstrumentedBackend wrapping a MemoryBackend."""
+    return InstrumentedBackend(MemoryBackend(), metrics)
+
+
+@pytest.mark.asyncio
+async def test_reads_count_hits_and_misses(backend, metrics):
+    """Test reads count a hit or a miss per key.
+
+    Args:
+        backend (InstrumentedBackend): The backend object.
+        metrics (Metrics): The metrics object.
+    """
+    assert isinstance(backend, ICacheBackend)
+    await backend.set("key", {"data": 1}, 60)
+
+    assert await backend.get("key") == {"data": 1}
+    assert await backend.get("missing") is None
+    assert (await backend.get_entry("key")).value == {"data": 1}
+    assert await backend.get_entry("missing") is None
+    assert await backend.get_many(["key", "missing", "other"]) == {"key": {"data": 1}}
+    assert list(await backend.get_entries(["key", "missing"])) == ["key"]
+
+    snapshot = metrics.snapshot()
+    assert snapshot.counters[HITS] == {
+        "get": 1,
+        "get_entry": 1,
+        "get_many": 1,
+        "get_entries": 1,
+    }
+    assert snapshot.counters[MISSES] == {
+        "get": 1,
+        "get_entry": 1,
+        "get_many": 2,
+        "get_entries": 1,
+    }
+    assert snapshot.histograms[OPERATION_SECONDS]["get"].observations == 2
+
+
+@pytest.mark.asyncio
+async def test_writes_count_entries(backend, metrics):
+    """Test writes and deletes count their entries.
+
+    Args:
+        backend (InstrumentedBackend): The backend object.
+        metrics (Metrics): The metrics object.
+    """
+    await backend.set("key", {"data": 1}, 60)
+    await backend.set_many({"a": {}, "b": {}}, 60)
+    assert await backend.import_entries({"c": {}}, 60) == 1
+    await backend.delete("key")
+    await backend.delete_many(["a", "b", "missing"])
+
+    snapshot = metrics.snapshot()
+    assert snapshot.counters[SETS] == {"set": 1, "set_many": 2, "import_entries": 1}
+    assert snapshot.counters[DELETES] == {"delete": 1, "delete_many": 3}
+
+
+@pytest.mark.asyncio
+async def test_other_operations_are_timed(backend, metrics):
+    """Test every other operation records its duration under its name.
+
+    Args:
+        backend (InstrumentedBackend): The backend object.
+        metrics (Metrics): The metrics object.
+    """
+    await backend.set("key", {"data": 1}, 60)
+
+    assert await backend.has("key")
+    assert await backend.has_many(["key"]) == {"key": True}
+    assert await backend.touch("key", 60)
+    assert await backend.touch_many(["key"], 60) == {"key": True}
+    assert await backend.incr("count", 1, 60, 0) == 1
+    assert await backend.incr_many({"count": 1}, 60, 0) == {"count": 2}
+    assert await backend.get_counter("count") == 2
+    await backend.delete_counter("count")
+    await backend.cleanup()
+    await backend.clear()
+    async with backend.lock("key") as locked:
+        assert locked
+
+    assert set(metrics.snapshot().histograms[OPERATION_SECONDS]) == {
+        "set",
+        "has",
+        "has_many",
+        "touch",
+        "touch_many",
+        "incr",
+        "incr_many",
+        "get_counter",
+        "delete_counter",
+        "cleanup",
+        "clear",
+    }
+
+
+@pytest.mark.asyncio
+async def test_errors(metrics):
+    """Test failed operations count an error and are still timed.
+
+    Args:
+        metrics (Metrics): The metrics object.
+    """
+    wrapped = AsyncMock(spec=ICacheBackend)
+    wrapped.get.side_effect = OSError
+    backend = InstrumentedBackend(wrapped, metrics)
+
+    with pytest.raises(OSError):
+        await backend.get("key")
+
+    snapshot = metrics.snapshot()
+    assert snapshot.counters == {ERRORS: {"get": 1}}
+    assert snapshot.histograms[OPERATION_SECONDS]["get"].observations == 1
@@ -0,0 +1,151 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+import asyncpg
+import pytest
+
+from psqache.invalidation import InvalidationListener
+from psqache.tiers import LocalCache
+
+
+@pytest.fixture
+def local():
+    """Fixture for the LocalCache object."""
+    local = LocalCache()
+    for key in ("key_1", "key_2", "key_3"):
+        local.set(key, key, 60)
+    return local
+
+
+@pytest.fixture
+def listener(local):
+    """Fixture for the InvalidationListener object."""
+    return InvalidationListener(
+        "test_dsn",
+        "psqache",
+        local,
+        origin="self",
+        ping_interval=0.01,
+        max_reconnect_delay=0.01,
+    )
+
+
+@pytest.fixture
+def connection():
+    """Fixture for the listening connection."""
+    connection = AsyncMock(asyncpg.Connection)
+    connection.add_termination_listener = MagicMock()
+    return connection
+
+
+def test_handle_evicts_keys(listener, local):
+    """Test the keys named in a message are evicted.
+
+    Args:
+        listener (InvalidationListener): The InvalidationListener object.
+        local (LocalCache): The LocalCache object.
+    """
+    payload = json.dumps({"origin": "other", "keys": ["key_1", "key_2"]})
+
+    listener.handle(None, 1, "psqache", payload)
+
+    assert list(local.entries) == ["key_3"]
+
+
+def test_handle_ignores_own_messages(listener, local):
+    """Test messages sent by the same origin are ignored.
+
+    Args:
+        listener (InvalidationListener): The InvalidationListener object.
+        local (LocalCache): The LocalCache object.
+    """
+    listener.handle(None, 1, "psqache", json.dumps({"origin": "self", "keys": None}))
+
+    assert len(local) == 3
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [json.dumps({"origin": "other", "keys": None}), "not json"],
+)
+def test_handle_flushes_local_cache(listener, local, payload):
+    """Test clear and malformed messages flush the whole local cache.
+
+    Args:
+        listener (InvalidationListener): The InvalidationListener object.
+        local (LocalCache): The LocalCache object.
+        payload (str): The received message.
+    """
+    listener.handle(None, 1, "psqache", payload)
+
+    assert len(local) == 0
+
+
+@pytest.mark.asyncio
+async def test_listen_until_connection_is_lost(listener, local, connection):
+    """Test the listener pings the connection until it is terminated.
+
+    Args:
+        listener (InvalidationListener): The InvalidationListener object.
+        local (LocalCache): The LocalCache object.
+        connection (AsyncMock): The listening connection.
+    """
+
+    async def execute(query):
+        on_termination = connection.add_termination_listener.call_args.args[0]
+        on_termination(connection)
+
+    connection.execute.side_effect = execute
+
+    with patch("psqache.invalidation.asyncpg.connect", return_value=connection):
+        await listener.listen()
+
+    connection.add_listener.assert_awaited_once_with("psqache", listener.handle)
+    connection.execute.assert_awaited_once_with("SELECT 1")
+    connection.close.assert_awaited_once()
+    assert len(local) == 0
+
+
+@pytest.mark.asyncio
+async def test_run_reconnects_and_flushes(listener, local, connection):
+    """Test the listener reconnects after failures and flushes on each loss.
+
+    Args:
+        listener (InvalidationListener): The InvalidationListener object.
+        local (LocalCache): The LocalCache object.
+        connection (AsyncMock): The listening connection.
+    """
+    connected = asyncio.Event()
+    attempts = []
+
+    async def connect(dsn):
+        attempts.append(dsn)
+        if len(attempts) == 1:
+            raise OSError
+        if len(attempts) == 2:
+            connection.add_termination_listener.side_effect = lambda callback: (
+                asyncio.get_running_loop().call_soon(callback, connection)
+            )
+            return connection
+        if len(attempts) == 3:
+            connection.add_termination_listener.side_effect = None
+            connection.execute.side_effect = ConnectionResetError
+            return connection
+        connected.set()
+        connection.execute.side_effect = None
+        return connection
+
+    with patch("psqache.invalidation.asyncpg.connect", side_effect=connect):
+        listener.start()
+        listener.start()
+        await asyncio.wait_for(connected.wait(), 1)
+        local.set("key", "value", 60)
+        await listener.stop()
+        await listener.stop()
+
+    assert attempts == ["test_dsn"] * 4
+    assert listener.task is None
+    assert local.get("key") == "value"
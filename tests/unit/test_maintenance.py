@@ -0,0 +1,179 @@
+import asyncio
+from unittest.mock import AsyncMock
+from unittest.mock import MagicMock
+from unittest.mock import call
+from unittest.mock import patch
+
+import asyncpg
+import pytest
+
+from psqache.maintenance import ExpiryReaper
+from psqache.maintenance import ReaperStats
+from psqache.queries import Queries
+
+
+@pytest.fixture
+def pool():
+    """Fixture for the application pool, with 2 of 10 connections in use."""
+    pool = MagicMock(asyncpg.pool.Pool)
+    pool.get_size.return_value = 5
+    pool.get_idle_size.return_value = 3
+    pool.get_max_size.return_value = 10
+    return pool
+
+
+@pytest.fixture
+def reaper(pool):
+    """Fixture for the ExpiryReaper object."""
+    return ExpiryReaper(
+        "test_dsn",
+        pool,
+        batch_size=100,
+        rows_per_second=1000,
+        idle_interval=5,
+        backoff_interval=1,
+        max_reconnect_delay=0.01,
+    )
+
+
+@pytest.fixture
+def connection():
+    """Fixture for the connection of the reaper."""
+    connection = AsyncMock(asyncpg.Connection)
+    connection.fetchval.return_value = True
+    return connection
+
+
+def test_pool_utilization(reaper, pool):
+    """Test the utilization is the share of the maximum pool size in use.
+
+    Args:
+        reaper (ExpiryReaper): The ExpiryReaper object.
+        pool (MagicMock): The application pool.
+    """
+    assert reaper.pool_utilization() == 0.2
+    assert ExpiryReaper("test_dsn").pool_utilization() == 0.0
+
+
+@pytest.mark.asyncio
+async def test_reap(reaper, connection):
+    """Test a batch deletes at most batch_size entries and updates the stats.
+
+    Args:
+        reaper (ExpiryReaper): The ExpiryReaper object.
+        connection (AsyncMock): The connection of the reaper.
+    """
+    connection.fetchrow.return_value = {"reaped": 40, "lag": 2.5}
+
+    assert await reaper.reap(connection) == 40
+    assert await reaper.reap(connection) == 40
+
+    connection.fetchrow.assert_awaited_with(
+        Queries.cleanup_expired_cache_entries.sql,
+        100,
+    )
+    assert reaper.stats == ReaperStats(
+        leader=False,
+        reaped=80,
+        batches=2,
+        lag=2.5,
+        backoffs=0,
+    )
+
+
+@pytest.mark.asyncio
+async def test_lead_waits_for_lock(reaper, connection):
+    """Test the reaper only leads once it holds the lock.
+
+    Args:
+        reaper (ExpiryReaper): The ExpiryReaper object.
+        connection (AsyncMock): The connection of the reaper.
+    """
+    connection.fetchval.side_effect = [False, False, True]
+
+    with patch("psqache.maintenance.asyncio.sleep") as sleep:
+        await reaper.lead(connection)
+
+    assert reaper.leader
+    assert sleep.await_args_list == [call(5), call(5)]
+    connection.fetchval.assert_awaited_with(
+        Queries.lock_maintenance_task.sql,
+        "reaper",
+    )
+
+
+@pytest.mark.asyncio
+async def test_reap_forever_paces_and_backs_off(reaper, connection, pool):
+    """Test full batches are paced, partial ones idle and busy pools back off.
+
+    Args:
+        reaper (ExpiryReaper): The ExpiryReaper object.
+        connection (AsyncMock): The connection of the reaper.
+        pool (MagicMock): The application pool.
+    """
+    pool.get_size.return_value = 10
+    pool.get_idle_size.side_effect = [1, 8, 8, 8]
+    connection.fetchrow.side_effect = [
+        {"reaped": 100, "lag": 30.0},
+        {"reaped": 10, "lag": 1.0},
+        ConnectionResetError,
+    ]
+
+    with (
+        patch("psqache.maintenance.asyncpg.connect", return_value=connection),
+        patch("psqache.maintenance.time.monotonic", return_value=0.0),
+        patch("psqache.maintenance.asyncio.sleep") as sleep,
+        pytest.raises(ConnectionResetError),
+    ):
+        await reaper.reap_forever()
+
+    assert sleep.await_args_list == [call(1), call(0.1), call(5)]
+    assert reaper.stats == ReaperStats(
+        leader=False,
+        reaped=110,
+        batches=2,
+        lag=1.0,
+        backoffs=1,
+    )
+    connection.close.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_run_reconnects(reaper, connection):
+    """Test the reaper reconnects after failures until it is stopped.
+
+    Args:
+        reaper (ExpiryReaper): The ExpiryReaper object.
+        connection (AsyncMock): The connection of the reaper.
+    """
+    connected = asyncio.Event()
+    attempts = []
+
+    async def connect(dsn):
+        attempts.append(dsn)
+        if len(attempts) == 1:
+            raise OSError
+        if len(attempts) == 2:
+            connection.fetchrow.side_effect = [
+                {"reaped": 100, "lag": 0.0},
+                asyncpg.InterfaceError("closed"),
+            ]
+            return connection
+        connected.set()
+        connection.fetchval.side_effect = wait_for_lock
+        return connection
+
+    async def wait_for_lock(*args):
+        await asyncio.Event().wait()
+
+    with patch("psqache.maintenance.asyncpg.connect", side_effect=connect):
+        reaper.start()
+        reaper.start()
+        await asyncio.wait_for(connected.wait(), 1)
+        await reaper.stop()
+        await reaper.stop()
+
+    assert attempts == ["test_dsn"] * 3
+    assert reaper.task is None
+    assert reaper.batches == 1
+    assert not reaper.leader
@@ -0,0 +1,159 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from psqache.abcs import IMetricsSink
+from psqache.metrics import HITS
+from psqache.metrics import MISSES
+from psqache.metrics import POOL_SATURATION
+from psqache.metrics import QUERY_SECONDS
+from psqache.metrics import HistogramSnapshot
+from psqache.metrics import Metrics
+from psqache.metrics import OpenTelemetrySink
+from psqache.metrics import render_prometheus
+
+
+@pytest.fixture
+def metrics():
+    """Fixture for the Metrics object, with three histogram buckets."""
+    return Metrics(buckets=(0.1, 0.01, 1.0))
+
+
+def test_snapshot(metrics):
+    """Test counters, histograms and gauges are created on their first measure.
+
+    Args:
+        metrics (Metrics): The metrics object.
+    """
+    assert isinstance(metrics, IMetricsSink)
+    metrics.increment(HITS, 2, "get")
+    metrics.increment(HITS, 3, "get_many")
+    metrics.increment(HITS, 1, "get")
+    metrics.observe(QUERY_SECONDS, 0.005, "")
+    metrics.observe(QUERY_SECONDS, 0.01, "")
+    metrics.observe(QUERY_SECONDS, 5.0, "")
+    metrics.gauge(POOL_SATURATION, 0.5)
+
+    snapshot = metrics.snapshot()
+
+    assert snapshot.counters == {HITS: {"get": 3, "get_many": 3}}
+    assert snapshot.histograms == {
+        QUERY_SECONDS: {
+            "": HistogramSnapshot((0.01, 0.1, 1.0), (2, 0, 0, 1), 5.015, 3)
+        },
+    }
+    assert snapshot.gauges == {POOL_SATURATION: 0.5}
+    assert snapshot.total(HITS) == 6
+    assert snapshot.total(MISSES) == 0
+
+    metrics.reset()
+    assert metrics.snapshot() == ({}, {}, {})
+
+
+def test_hit_ratio(metrics):
+    """Test the hit ratio adds up the hits and misses of every operation.
+
+    Args:
+        metrics (Metrics): The metrics object.
+    """
+    assert metrics.snapshot().hit_ratio is None
+
+    metrics.increment(HITS, 3, "get")
+    metrics.increment(MISSES, 1, "get_many")
+
+    assert metrics.snapshot().hit_ratio == 0.75
+
+
+def test_quantile():
+    """Test quantiles are estimated by the upper bound of their bucket."""
+    histogram = HistogramSnapshot((0.01, 0.1), (6, 3, 1), 1.5, 10)
+
+    assert histogram.quantile(0.5) == 0.01
+    assert histogram.quantile(0.9) == 0.1
+    assert histogram.quantile(0.99) == float("inf")
+    assert HistogramSnapshot((0.01,), (0, 0), 0.0, 0).quantile(0.5) == 0.0
+
+
+def test_prometheus(metrics):
+    """Test the measures are exported in the Prometheus text format.
+
+    Args:
+        metrics (Metrics): The metrics object.
+    """
+    metrics.increment(HITS, 2, "get")
+    metrics.increment("custom", 1, "")
+    metrics.observe(QUERY_SECONDS, 0.05, "")
+    metrics.gauge(POOL_SATURATION, 0.25)
+
+    assert metrics.prometheus() == (
+        "# HELP psqache_hits_total Keys read that were found.\n"
+        "# TYPE psqache_hits_total counter\n"
+        'psqache_hits_total{operation="get"} 2\n'
+        "# HELP psqache_custom_total custom\n"
+        "# TYPE psqache_custom_total counter\n"
+        "psqache_custom_total 1\n"
+        "# HELP psqache_query_seconds Durations pool connections are held for"
+        " queries.\n"
+        "# TYPE psqache_query_seconds histogram\n"
+        'psqache_query_seconds_bucket{le="0.01"} 0\n'
+        'psqache_query_seconds_bucket{le="0.1"} 1\n'
+        'psqache_query_seconds_bucket{le="1.0"} 1\n'
+        'psqache_query_seconds_bucket{le="+Inf"} 1\n'
+        "psqache_query_seconds_sum 0.05\n"
+        "psqache_query_seconds_count 1\n"
+        "# HELP psqache_pool_saturation Share of the maximum size of the pool in"
+        " use.\n"
+        "# TYPE psqache_pool_saturation gauge\n"
+        "psqache_pool_saturation 0.25\n"
+    )
+
+
+def test_prometheus_operation_labels(metrics):
+    """Test the operation and bucket labels of a histogram are combined.
+
+    Args:
+        metrics (Metrics): The metrics object.
+    """
+    metrics.observe("operation_seconds", 0.5, "get")
+
+    text = render_prometheus(metrics.snapshot(), namespace="app")
+
+    assert 'app_operation_seconds_bucket{operation="get",le="1.0"} 1\n' in text
+    assert 'app_operation_seconds_count{operation="get"} 1\n' in text
+
+
+def test_open_telemetry_sink():
+    """Test the measures are recorded on instruments created once per name."""
+    meter = MagicMock()
+    sink = OpenTelemetrySink(meter)
+    assert isinstance(sink, IMetricsSink)
+
+    sink.increment(HITS, 1, "get")
+    sink.increment(HITS, 2, "get")
+    sink.increment("bytes_in", 10, "")
+    sink.observe(QUERY_SECONDS, 0.5, "")
+    sink.gauge(POOL_SATURATION, 0.75)
+
+    meter.create_counter.assert_any_call(
+        "psqache.hits",
+        unit="1",
+        description="Keys read that were found.",
+    )
+    meter.create_counter.assert_any_call(
+        "psqache.bytes_in",
+        unit="By",
+        description="Bytes of the values read from the database.",
+    )
+    assert meter.create_counter.call_count == 2
+    counter = meter.create_counter.return_value
+    assert counter.add.call_args_list[:2] == [
+        ((1, {"operation": "get"}),),
+        ((2, {"operation": "get"}),),
+    ]
+    assert (
+        counter.add.call_args_list[0].args[1] is counter.add.call_args_list[1].args[1]
+    )
+    counter.add.assert_called_with(10, None)
+    meter.create_histogram.return_value.record.assert_called_once_with(0.5, None)
+    assert meter.create_histogram.call_args.kwargs["unit"] == "s"
+    meter.create_gauge.return_value.set.assert_called_once_with(0.75)
@@ -0,0 +1,100 @@
+from unittest.mock import patch
+
+import pytest
+
+from psqache.backends import MemoryBackend
+from psqache.namespaces import TAGS_FIELD
+from psqache.namespaces import VALUE_FIELD
+from psqache.namespaces import Generations
+from psqache.namespaces import is_tagged
+from psqache.namespaces import tag_value
+
+
+@pytest.fixture
+def backend():
+    """Fixture for the backend holding the counters."""
+    return MemoryBackend()
+
+
+@pytest.fixture
+def generations(backend):
+    """Fixture for the Generations object, caching two generations."""
+    return Generations(backend, ttl=1.0, max_size=2)
+
+
+def test_tag_value():
+    """Test tagged values hold the value and the generations of its tags."""
+    tagged = tag_value({"key": "value"}, {"tenant:42": 7})
+
+    assert tagged == {TAGS_FIELD: {"tenant:42": 7}, VALUE_FIELD: {"key": "value"}}
+    assert is_tagged(tagged)
+    assert not is_tagged({"key": "value"})
+    assert not is_tagged({TAGS_FIELD: {}, VALUE_FIELD: 1, "other": 2})
+    assert not is_tagged(None)
+
+
+def test_initial():
+    """Test new counters start from the current time in milliseconds."""
+    with patch(
+        "psqache.namespaces.time.time_ns", return_value=1_700_000_000_123_456_789
+    ):
+        assert Generations.initial() == 1_700_000_000_123
+
+
+@pytest.mark.asyncio
+async def test_get_many_creates_counters(generations, backend):
+    """Test missing counters are created from the current time.
+
+    Args:
+        generations (Generations): The generations.
+        backend (MemoryBackend): The backend holding the counters.
+    """
+    with patch("psqache.namespaces.time.time_ns", return_value=5_000_000):
+        assert await generations.get_many(["b", "a"]) == {"a": 5, "b": 5}
+
+    assert await backend.incr("a", 0, 60, 0) == 5
+
+
+@pytest.mark.asyncio
+async def test_get_many_caches_generations(generations, backend):
+    """Test generations are cached for their TTL.
+
+    Args:
+        generations (Generations): The generations.
+        backend (MemoryBackend): The backend holding the counters.
+    """
+    with patch("psqache.namespaces.time.monotonic", return_value=100.0):
+        first = await generations.get_many(["a"])
+    await backend.incr("a", 1, 60, 0)
+
+    with patch("psqache.namespaces.time.monotonic", return_value=100.5):
+        assert await generations.get_many(["a"]) == first
+    with patch("psqache.namespaces.time.monotonic", return_value=101.0):
+        assert await generations.get_many(["a"]) == {"a": first["a"] + 1}
+
+
+@pytest.mark.asyncio
+async def test_get_many_bounds_cached_generations(generations):
+    """Test the least recently read generations are dropped first.
+
+    Args:
+        generations (Generations): The generations.
+    """
+    await generations.get_many(["a", "b"])
+    await generations.get_many(["a"])
+    await generations.get_many(["c"])
+
+    assert list(generations.cached) == ["a", "c"]
+
+
+@pytest.mark.asyncio
+async def test_advance(generations):
+    """Test advancing a generation increments it and caches the new one.
+
+    Args:
+        generations (Generations): The generations.
+    """
+    before = await generations.get_many(["a"])
+
+    assert await generations.advance("a") == before["a"] + 1
+    assert await generations.get_many(["a"]) == {"a": before["a"] + 1}
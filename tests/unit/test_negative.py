@@ -0,0 +1,83 @@
+from unittest.mock import patch
+
+from psqache.negative import ABSENT
+from psqache.negative import BloomFilter
+from psqache.negative import is_absent
+
+
+def test_is_absent():
+    """Test only the absent marker is absent, not None or other values."""
+    assert is_absent(ABSENT)
+    assert is_absent(dict(ABSENT))
+    assert not is_absent(None)
+    assert not is_absent({})
+    assert not is_absent({"__psqache_absent__": 2})
+    assert not is_absent([ABSENT])
+
+
+def test_bloom_filter_size():
+    """Test the filter is sized from its capacity and false-positive rate."""
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+
+    assert bloom.size == 9586
+    assert bloom.hashes == 7
+    assert len(bloom.bits) == 1199
+    assert len(bloom) == 0
+
+
+def test_bloom_filter_contains():
+    """Test added keys are found, and few other keys are."""
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    assert "key_0" not in bloom
+
+    for number in range(1000):
+        bloom.add(f"key_{number}")
+
+    assert len(bloom) == 1000
+    assert all(f"key_{number}" in bloom for number in range(1000))
+    false_positives = sum(f"other_{number}" in bloom for number in range(10_000))
+    assert false_positives < 200
+    assert 0 not in bloom
+
+
+def test_bloom_filter_clears_when_full():
+    """Test the filter is cleared before a key beyond its capacity is added."""
+    bloom = BloomFilter(capacity=2)
+    bloom.add("a")
+    bloom.add("b")
+
+    bloom.add("c")
+
+    assert len(bloom) == 1
+    assert "c" in bloom
+    assert "a" not in bloom
+
+
+def test_bloom_filter_expires():
+    """Test the filter is cleared once it is older than its maximum age."""
+    with patch("psqache.negative.time.monotonic", return_value=100.0):
+        bloom = BloomFilter(max_age=10)
+        bloom.add("a")
+    with patch("psqache.negative.time.monotonic", return_value=109.0):
+        assert "a" in bloom
+    with patch("psqache.negative.time.monotonic", return_value=110.0):
+        assert "a" not in bloom
+    assert len(bloom) == 0
+
+    with patch("psqache.negative.time.monotonic", return_value=200.0):
+        bloom.add("b")
+    with patch("psqache.negative.time.monotonic", return_value=205.0):
+        assert "b" in bloom
+
+
+def test_bloom_filter_without_max_age():
+    """Test a filter without maximum age is only cleared explicitly."""
+    with patch("psqache.negative.time.monotonic", return_value=100.0):
+        bloom = BloomFilter(max_age=None)
+        bloom.add("a")
+    with patch("psqache.negative.time.monotonic", return_value=1e9):
+        assert "a" in bloom
+
+    bloom.clear()
+
+    assert "a" not in bloom
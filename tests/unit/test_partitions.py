@@ -0,0 +1,244 @@
+import datetime
+from unittest.mock import AsyncMock
+from unittest.mock import MagicMock
+from unittest.mock import call
+
+import asyncpg
+import pytest
+
+from psqache.partitions import PartitionedPostgresBackend
+from psqache.queries import PartitionedQueries
+
+
+@pytest.fixture
+def connection():
+    """Fixture for a connection supporting transactions."""
+    connection = AsyncMock(asyncpg.Connection)
+    connection.transaction = MagicMock()
+    return connection
+
+
+@pytest.fixture
+def backend(connection):
+    """Fixture for the PartitionedPostgresBackend object."""
+    pool = AsyncMock(asyncpg.pool.Pool)
+    pool.acquire = MagicMock()
+    pool.acquire.return_value.__aenter__.return_value = connection
+    return PartitionedPostgresBackend(
+        pool,
+        bucket=datetime.timedelta(days=1),
+        partitions_ahead=7,
+    )
+
+
+def test_init(backend):
+    """Test the backend uses the partitioned queries and passes options on.
+
+    Args:
+        backend (PartitionedPostgresBackend): The backend object.
+    """
+    assert backend.queries is PartitionedQueries
+    assert backend.bucket == datetime.timedelta(days=1)
+    assert backend.partitions_ahead == 7
+    assert PartitionedPostgresBackend(storage="bytea").storage == "bytea"
+
+
+def test_init_defaults():
+    """Test the default partitions cover the default time-to-live."""
+    backend = PartitionedPostgresBackend()
+    assert backend.bucket == datetime.timedelta(days=1)
+    assert backend.partitions_ahead == 29
+    hourly = PartitionedPostgresBackend(
+        bucket=datetime.timedelta(hours=1),
+        max_ttl=datetime.timedelta(days=2),
+    )
+    assert hourly.partitions_ahead == 49
+
+
+@pytest.mark.asyncio
+async def test_set(backend, connection):
+    """Test a write locks its key before replacing the entry, in a transaction.
+
+    Args:
+        backend (PartitionedPostgresBackend): The backend object.
+        connection (AsyncMock): The connection.
+    """
+    await backend.set("test_key", {"data": "test_value"}, 60)
+
+    assert connection.execute.await_args_list == [
+        call(PartitionedQueries.lock_cache_writes.sql, ["test_key"]),
+        call(
+            PartitionedQueries.set_cache_entry.sql,
+            "test_key",
+            b'{"data":"test_value"}',
+            None,
+            60,
+        ),
+    ]
+    connection.transaction.return_value.__aenter__.assert_awaited_once()
+    connection.transaction.return_value.__aexit__.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_set_many(backend, connection):
+    """Test a batch write locks all its keys before replacing the entries.
+
+    Args:
+        backend (PartitionedPostgresBackend): The backend object.
+        connection (AsyncMock): The connection.
+    """
+    await backend.set_many({"a": {"n": 1}, "b": {"n": 2}}, 60)
+
+    assert connection.execute.await_args_list == [
+        call(PartitionedQueries.lock_cache_writes.sql, ["a", "b"]),
+        call(
+            PartitionedQueries.set_cache_entries.sql,
+            ["a", "b"],
+            [b'{"n":1}', b'{"n":2}'],
+            [None, None],
+            [60, 60],
+        ),
+    ]
+    connection.transaction.return_value.__aenter__.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_set_many_empty(backend, connection):
+    """Test a batch write of no entries does nothing.
+
+    Args:
+        backend (PartitionedPostgresBackend): The backend object.
+        connection (AsyncMock): The connection.
+    """
+    await backend.set_many({}, 60)
+
+    connection.execute.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_maintain_partitions(backend, connection):
+    """Test expired partitions are dropped before upcoming ones are created.
+
+    Args:
+        backend (PartitionedPostgresBackend): The backend object.
+        connection (AsyncMock): The connection.
+    """
+    connection.fetchval.side_effect = [2, 3]
+
+    assert await backend.maintain_partitions() == (3, 2)
+    assert connection.fetchval.await_args_list == [
+        call(
+            PartitionedQueries.drop_expired_partitions.sql,
+            datetime.timedelta(days=1),
+        ),
+        call(
+            PartitionedQueries.create_partitions.sql,
+            datetime.timedelta(days=1),
+            7,
+        ),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_cleanup(backend, connection):
+    """Test cleanup maintains the partitions, then cleans up the default one.
+
+    Args:
+        backend (PartitionedPostgresBackend): The backend object.
+        connection (AsyncMock): The connection.
+    """
+    batch_size = backend.CLEANUP_BATCH_SIZE
+    connection.fetchval.side_effect = [0, 1, batch_size, 10, 0]
+
+    await backend.cleanup()
+
+    batch = call(PartitionedQueries.cleanup_expired_cache_entries.sql, batch_size)
+    counters = call(PartitionedQueries.cleanup_expired_counters.sql, batch_size)
+    assert connection.fetchval.await_args_list[2:] == [batch, batch, counters]
+
+
+@pytest.mark.asyncio
+async def test_touch(backend, connection):
+    """Test a touch locks its key before moving the entry, in a transaction.
+
+    Args:
+        backend (PartitionedPostgresBackend): The backend object.
+        connection (AsyncMock): The connection.
+    """
+    connection.fetchval.return_value = None
+
+    assert await backend.touch("test_key", 60) is False
+    connection.execute.assert_awaited_once_with(
+        PartitionedQueries.lock_cache_writes.sql,
+        ["test_key"],
+    )
+    connection.fetchval.assert_awaited_once_with(
+        PartitionedQueries.touch_cache_entry.sql,
+        "test_key",
+        60,
+    )
+    connection.transaction.return_value.__aenter__.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_touch_many(backend, connection):
+    """Test a batch touch locks all its keys before moving the entries.
+
+    Args:
+        backend (PartitionedPostgresBackend): The backend object.
+        connection (AsyncMock): The connection.
+    """
+    connection.fetch.return_value = [{"key": "b"}]
+
+    assert await backend.touch_many(["a", "b"], 60) == {"a": False, "b": True}
+    connection.execute.assert_awaited_once_with(
+        PartitionedQueries.lock_cache_writes.sql,
+        ["a", "b"],
+    )
+    connection.fetch.assert_awaited_once_with(
+        PartitionedQueries.touch_cache_entries.sql,
+        ["a", "b"],
+        60,
+    )
+
+
+@pytest.mark.asyncio
+async def test_create_table(backend, connection):
+    """Test creating the tables also creates the upcoming partitions.
+
+    Args:
+        backend (PartitionedPostgresBackend): The backend object.
+        connection (AsyncMock): The connection.
+    """
+    connection.fetchval.side_effect = [0, 8]
+
+    await backend.create_table()
+
+    assert connection.execute.await_args_list == [
+        call(PartitionedQueries.lock_schema_changes.sql),
+        call(PartitionedQueries.create_psqache_table.sql),
+    ]
+    assert connection.fetchval.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_merge_batch(backend, connection):
+    """Test an imported batch locks its keys before merging the entries.
+
+    Args:
+        backend (PartitionedPostgresBackend): The backend object.
+        connection (AsyncMock): The connection.
+    """
+    connection.fetchval.side_effect = [["a", "b"], 1, []]
+
+    assert await backend.import_snapshot("cache.snapshot") == 1
+
+    assert connection.execute.await_args_list == [
+        call(PartitionedQueries.create_import_table.sql),
+        call(PartitionedQueries.lock_cache_writes.sql, ["a", "b"]),
+        call(PartitionedQueries.drop_import_table.sql),
+    ]
+    connection.fetchval.assert_any_await(
+        PartitionedQueries.merge_imported_entries.sql,
+        ["a", "b"],
+    )
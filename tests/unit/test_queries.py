@@ -1,3 +1,6 @@
+from psqache.queries import PartitionedQueries
+
+
 def test_create_psqache_table(queries):
     """Test the create_psqache_table method.
 
@@ -80,3 +83,175 @@ def test_drop_cache_table(queries):
     assert hasattr(queries, "drop_cache_table")
     assert "drop_cache_table" in queries._available_queries
     assert queries.drop_cache_table.sql.startswith("DROP TABLE IF EXISTS psqache")
+
+
+def test_get_cache_entries(queries):
+    """Test the get_cache_entries method.
+
+    Args:
+        queries (Queries): The queries object.
+    """
+    assert hasattr(queries, "get_cache_entries")
+    assert "get_cache_entries" in queries._available_queries
+    assert "ANY($1::TEXT [])" in queries.get_cache_entries.sql
+
+
+def test_set_cache_entries(queries):
+    """Test the set_cache_entries method.
+
+    Args:
+        queries (Queries): The queries object.
+    """
+    assert hasattr(queries, "set_cache_entries")
+    assert "set_cache_entries" in queries._available_queries
+    assert "$1::TEXT [], $2::JSONB [], $3::BYTEA [], $4::INT []" in (
+        queries.set_cache_entries.sql
+    )
+
+
+def test_delete_cache_entries(queries):
+    """Test the delete_cache_entries method.
+
+    Args:
+        queries (Queries): The queries object.
+    """
+    assert hasattr(queries, "delete_cache_entries")
+    assert "delete_cache_entries" in queries._available_queries
+
+
+def test_has_cache_entries(queries):
+    """Test the has_cache_entries method.
+
+    Args:
+        queries (Queries): The queries object.
+    """
+    assert hasattr(queries, "has_cache_entries")
+    assert "has_cache_entries" in queries._available_queries
+
+
+def test_lock_cache_entry(queries):
+    """Test the lock_cache_entry method.
+
+    Args:
+        queries (Queries): The queries object.
+    """
+    assert hasattr(queries, "lock_cache_entry")
+    assert "lock_cache_entry" in queries._available_queries
+    assert "PG_TRY_ADVISORY_XACT_LOCK(HASHTEXT($1))" in queries.lock_cache_entry.sql
+
+
+def test_get_cache_report(queries):
+    """Test the get_cache_report method.
+
+    Args:
+        queries (Queries): The queries object.
+    """
+    assert "get_cache_report" in queries._available_queries
+    assert "WIDTH_BUCKET(ttl, $1::INT [])" in queries.get_cache_report.sql
+    assert "PG_PARTITION_TREE" in PartitionedQueries.get_cache_report.sql
+
+
+def test_iteration_queries(queries):
+    """Test the iteration queries filter on an optional prefix, in key order.
+
+    Args:
+        queries (Queries): The queries object.
+    """
+    for name in ("iter_cache_keys", "iter_cache_entries"):
+        for schema in (queries, PartitionedQueries):
+            sql = getattr(schema, name).sql
+            assert "$1::TEXT IS NULL OR STARTS_WITH(key, $1::TEXT)" in sql
+            assert sql.endswith("ORDER BY key;")
+
+
+def test_import_queries(queries):
+    """Test imports stage entries in a temporary table and merge them.
+
+    Args:
+        queries (Queries): The queries object.
+    """
+    for schema in (queries, PartitionedQueries):
+        assert "CREATE TEMPORARY TABLE psqache_import" in (
+            schema.create_import_table.sql
+        )
+        assert schema.drop_import_table.sql == (
+            "DROP TABLE IF EXISTS pg_temp.psqache_import;"
+        )
+        assert "FROM psqache_import" in schema.next_import_keys.sql
+        assert "FROM psqache_import" in schema.merge_imported_entries.sql
+        # Snapshots are copied back in the column order of the staging table.
+        assert schema.export_cache_entries.sql.startswith(
+            "SELECT\nkey,\nvalue,\npayload,\nttl,\ncreated_at\n",
+        )
+    assert "ON CONFLICT (key)" in queries.merge_imported_entries.sql
+    assert "DELETE FROM psqache_partitioned" in (
+        PartitionedQueries.merge_imported_entries.sql
+    )
+
+
+def test_partitioned_queries(queries):
+    """Test the partitioned queries cover every query of the regular ones.
+
+    Args:
+        queries (Queries): The queries object.
+    """
+    assert set(queries._available_queries) <= set(
+        PartitionedQueries._available_queries,
+    )
+    assert "PARTITION BY RANGE (expires_at)" in (
+        PartitionedQueries.create_psqache_table.sql
+    )
+    assert "create_partitions" in PartitionedQueries._available_queries
+    assert "drop_expired_partitions" in PartitionedQueries._available_queries
+    assert "lock_cache_writes" in PartitionedQueries._available_queries
+
+
+def test_partitioned_queries_share_queries(queries):
+    """Test the queries not overridden run the shared ones on the partitions.
+
+    Args:
+        queries (Queries): The queries object.
+    """
+    assert "FROM psqache_partitioned" in PartitionedQueries.get_cache_entry.sql
+    assert "FROM psqache\n" in queries.get_cache_entry.sql
+    assert PartitionedQueries.lock_cache_entry.sql == queries.lock_cache_entry.sql
+    assert "psqache_counters" in PartitionedQueries.increment_counter.sql
+    assert PartitionedQueries.delete_counter.sql == queries.delete_counter.sql
+    assert "psqache_counters" in PartitionedQueries.create_psqache_table.sql
+    assert PartitionedQueries.lock_cache_writes.sql.count(";") == 1
+
+
+def test_batch_writes_in_key_order(queries):
+    """Test the batch writes lock their rows in key order.
+
+    Args:
+        queries (Queries): The queries object.
+    """
+    for name in ("set_cache_entries", "delete_cache_entries", "touch_cache_entries"):
+        assert "ORDER BY" in getattr(queries, name).sql
+        assert "ORDER BY" in getattr(PartitionedQueries, name).sql
+    assert "FOR UPDATE" in queries.delete_cache_entries.sql
+    assert "FOR UPDATE" in PartitionedQueries.touch_cache_entries.sql
+
+
+def test_create_table_migrates_storage_layouts(queries):
+    """Test tables of earlier versions get the BYTEA storage layout.
+
+    Args:
+        queries (Queries): The queries object.
+    """
+    sql = queries.create_psqache_table.sql
+    assert "ADD COLUMN IF NOT EXISTS payload BYTEA" in sql
+    assert "ALTER COLUMN value DROP NOT NULL" in sql
+    assert "ADD CONSTRAINT psqache_check" in sql
+
+
+def test_set_queries_can_be_prepared(queries):
+    """Test the set queries are plain statements, which can be prepared.
+
+    Args:
+        queries (Queries): The queries object.
+    """
+    for name in ("set_cache_entry", "set_cache_entries"):
+        assert not getattr(queries, name).sql.startswith("DO")
+        assert not getattr(PartitionedQueries, name).sql.startswith("DO")
@@ -0,0 +1,351 @@
+import asyncio
+from collections import deque
+from unittest.mock import AsyncMock
+
+import pytest
+
+from psqache.abcs import ICacheBackend
+from psqache.backends import PostgresBackend
+from psqache.replicas import ReplicaStats
+from psqache.replicas import ReplicatedBackend
+
+
+@pytest.fixture
+def primary():
+    """Fixture for the backend of the primary."""
+    return AsyncMock(spec=ICacheBackend)
+
+
+@pytest.fixture
+def replicas():
+    """Fixture for the backends of two replicas."""
+    return [AsyncMock(spec=PostgresBackend), AsyncMock(spec=PostgresBackend)]
+
+
+@pytest.fixture
+def backend(primary, replicas):
+    """Fixture for the ReplicatedBackend object."""
+    backend = ReplicatedBackend(primary, replicas, lag_interval=60)
+    # Lag is not measured unless a test asks for it.
+    backend._measured = float("inf")
+    return backend
+
+
+def slow(value, delay=1.0):
+    """Build a read answering after a delay, like a slow replica.
+
+    Args:
+        value (Any): The value to return, or an exception to raise.
+        delay (float): The delay in seconds.
+
+    Returns:
+        Callable: The coroutine function of the read.
+    """
+
+    async def read(*args):
+        await asyncio.sleep(delay)
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    return read
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("method", "args"),
+    [
+        ("get", ("key",)),
+        ("get_entry", ("key",)),
+        ("has", ("key",)),
+        ("get_many", (["key"],)),
+        ("get_entries", (["key"],)),
+        ("has_many", (["key"],)),
+    ],
+)
+async def test_reads_go_to_replicas(backend, primary, replicas, method, args):
+    """Test the reads are served by a replica, not by the primary.
+
+    Args:
+        backend (ReplicatedBackend): The backend object.
+        primary (AsyncMock): The backend of the primary.
+        replicas (list[AsyncMock]): The backends of the replicas.
+        method (str): The name of the read.
+        args (tuple): The arguments of the read.
+    """
+    getattr(replicas[0], method).return_value = "result"
+    getattr(replicas[1], method).return_value = "result"
+
+    assert await getattr(backend, method)(*args) == "result"
+
+    getattr(primary, method).assert_not_awaited()
+    assert backend.stats == ReplicaStats(1, 0, 0, 0, (None, None))
+    assert isinstance(backend, ICacheBackend)
+
+
+@pytest.mark.asyncio
+async def test_writes_go_to_primary(backend, primary, replicas):
+    """Test the writes are sent to the primary.
+
+    Args:
+        backend (ReplicatedBackend): The backend object.
+        primary (AsyncMock): The backend of the primary.
+        replicas (list[AsyncMock]): The backends of the replicas.
+    """
+    await backend.set("key", {"data": 1}, 60)
+
+    primary.set.assert_awaited_once_with("key", {"data": 1}, 60)
+    replicas[0].set.assert_not_awaited()
+
+
+def test_choose(backend):
+    """Test reads go to the least busy replica, idle ones taking turns.
+
+    Args:
+        backend (ReplicatedBackend): The backend object.
+    """
+    assert {backend.choose(), backend.choose()} == {0, 1}
+
+    backend.in_flight = [3, 1]
+    assert backend.choose() == 1
+    assert backend.choose(exclude=1) == 0
+
+    backend.healthy = [False, False]
+    assert backend.choose() is None
+
+
+@pytest.mark.asyncio
+async def test_measure_lag(replicas):
+    """Test lagging replicas and replicas failing to answer are skipped.
+
+    Args:
+        replicas (list[AsyncMock]): The backends of the replicas.
+    """
+    replicas.append(AsyncMock(spec=PostgresBackend))
+    backend = ReplicatedBackend(AsyncMock(spec=ICacheBackend), replicas)
+    replicas[0].replication_lag.return_value = 0.2
+    replicas[1].replication_lag.return_value = 5.0
+    replicas[2].replication_lag.side_effect = OSError
+
+    await backend.measure_lag()
+
+    assert backend.lags == [0.2, 5.0, None]
+    assert backend.healthy == [True, False, False]
+
+
+@pytest.mark.asyncio
+async def test_schedule_lag_measure(primary, replicas):
+    """Test the lag is measured in the background, once per interval.
+
+    Args:
+        primary (AsyncMock): The backend of the primary.
+        replicas (list[AsyncMock]): The backends of the replicas.
+    """
+    backend = ReplicatedBackend(primary, replicas, lag_interval=60)
+    for replica in replicas:
+        replica.replication_lag.return_value = 0.0
+
+    await backend.get("key")
+    await backend.get("key")
+    await backend._measuring
+
+    for replica in replicas:
+        replica.replication_lag.assert_awaited_once_with()
+    assert backend.lags == [0.0, 0.0]
+
+
+@pytest.mark.asyncio
+async def test_fallback_without_replica(backend, primary, replicas):
+    """Test reads fall back to the primary when no replica is available.
+
+    Args:
+        backend (ReplicatedBackend): The backend object.
+        primary (AsyncMock): The backend of the primary.
+        replicas (list[AsyncMock]): The backends of the replicas.
+    """
+    backend.healthy = [False, False]
+    primary.get.return_value = {"data": 1}
+
+    assert await backend.get("key") == {"data": 1}
+    replicas[0].get.assert_not_awaited()
+    assert backend.stats.primary_reads == 1
+
+
+@pytest.mark.asyncio
+async def test_fallback_on_error(backend, primary, replicas):
+    """Test a failed replica read falls back to the primary.
+
+    Args:
+        backend (ReplicatedBackend): The backend object.
+        primary (AsyncMock): The backend of the primary.
+        replicas (list[AsyncMock]): The backends of the replicas.
+    """
+    backend.healthy = [True, False]
+    replicas[0].get.side_effect = OSError
+    primary.get.return_value = {"data": 1}
+
+    assert await backend.get("key") == {"data": 1}
+    assert backend.healthy == [False, False]
+    assert backend.stats == ReplicaStats(1, 1, 0, 1, (None, None))
+    assert backend.in_flight == [0, 0]
+
+
+def test_record_latency(backend):
+    """Test the hedging delay follows the p95 of the recent latencies.
+
+    Args:
+        backend (ReplicatedBackend): The backend object.
+    """
+    backend.latencies = deque(maxlen=100)
+    for latency in range(99):
+        backend.record_latency(latency / 1000)
+    assert backend.hedge_delay is None
+
+    backend.record_latency(0.099)
+    assert backend.hedge_delay == pytest.approx(0.095)
+
+    for _ in range(100):
+        backend.record_latency(0.0)
+    assert backend.hedge_delay == backend.min_hedge_delay
+
+
+@pytest.mark.asyncio
+async def test_hedged_read(backend, replicas):
+    """Test a slow read is sent to a second replica, whose answer wins.
+
+    Args:
+        backend (ReplicatedBackend): The backend object.
+        replicas (list[AsyncMock]): The backends of the replicas.
+    """
+    backend.hedge_delay = 0.01
+    backend.in_flight = [0, 1]
+    replicas[0].get.side_effect = slow({"from": 0})
+    replicas[1].get.side_effect = slow({"from": 1}, 0)
+
+    assert await backend.get("key") == {"from": 1}
+    await asyncio.sleep(0)
+
+    assert backend.stats == ReplicaStats(2, 0, 1, 0, (None, None))
+    assert backend.in_flight == [0, 1]
+
+
+@pytest.mark.asyncio
+async def test_hedged_read_fast(backend, replicas):
+    """Test a read answering within the hedging delay is not hedged.
+
+    Args:
+        backend (ReplicatedBackend): The backend object.
+        replicas (list[AsyncMock]): The backends of the replicas.
+    """
+    backend.hedge_delay = 1.0
+    replicas[0].get.return_value = {"data": 1}
+    replicas[1].get.return_value = {"data": 1}
+
+    assert await backend.get("key") == {"data": 1}
+    assert backend.stats.hedged_reads == 0
+
+
+@pytest.mark.asyncio
+async def test_hedged_read_first_fails(backend, replicas):
+    """Test the hedge still answers when the first replica fails meanwhile.
+
+    Args:
+        backend (ReplicatedBackend): The backend object.
+        replicas (list[AsyncMock]): The backends of the replicas.
+    """
+    backend.hedge_delay = 0.01
+    backend.in_flight = [0, 1]
+    replicas[0].get.side_effect = slow(OSError(), 0.02)
+    replicas[1].get.side_effect = slow({"from": 1}, 0.05)
+
+    assert await backend.get("key") == {"from": 1}
+    assert backend.healthy == [False, True]
+
+
+@pytest.mark.asyncio
+async def test_hedged_read_all_fail(backend, primary, replicas):
+    """Test the read falls back to the primary when every replica fails.
+
+    Args:
+        backend (ReplicatedBackend): The backend object.
+        primary (AsyncMock): The backend of the primary.
+        replicas (list[AsyncMock]): The backends of the replicas.
+    """
+    backend.hedge_delay = 0.01
+    replicas[0].get.side_effect = slow(OSError(), 0.02)
+    replicas[1].get.side_effect = slow(OSError(), 0.02)
+    primary.get.return_value = {"data": 1}
+
+    assert await backend.get("key") == {"data": 1}
+    assert backend.stats == ReplicaStats(2, 1, 1, 2, (None, None))
+
+
+@pytest.mark.asyncio
+async def test_hedged_read_single_replica(backend, replicas):
+    """Test a slow read waits for its replica when there is no other one.
+
+    Args:
+        backend (ReplicatedBackend): The backend object.
+        replicas (list[AsyncMock]): The backends of the replicas.
+    """
+    backend.hedge_delay = 0.01
+    backend.healthy = [True, False]
+    replicas[0].get.side_effect = slow({"from": 0}, 0.02)
+
+    assert await backend.get("key") == {"from": 0}
+    assert backend.stats.hedged_reads == 0
+
+
+@pytest.mark.asyncio
+async def test_close(primary, replicas):
+    """Test closing stops measuring the lag and closes every backend.
+
+    Args:
+        primary (AsyncMock): The backend of the primary.
+        replicas (list[AsyncMock]): The backends of the replicas.
+    """
+    backend = ReplicatedBackend(primary, replicas)
+    for replica in replicas:
+        replica.replication_lag.side_effect = slow(0.0)
+    await backend.get("key")
+
+    await backend.close()
+
+    assert backend._measuring.cancelled()
+    primary.close.assert_awaited_once_with()
+    for replica in replicas:
+        replica.close.assert_awaited_once_with()
+
+
+@pytest.mark.asyncio
+async def test_close_without_measure(backend, primary):
+    """Test closing before the lag was ever measured.
+
+    Args:
+        backend (ReplicatedBackend): The backend object.
+        primary (AsyncMock): The backend of the primary.
+    """
+    await backend.close()
+
+    primary.close.assert_awaited_once_with()
+
+
+@pytest.mark.asyncio
+async def test_lag_measures_do_not_overlap(primary, replicas):
+    """Test the lag is not measured again while a measure is running.
+
+    Args:
+        primary (AsyncMock): The backend of the primary.
+        replicas (list[AsyncMock]): The backends of the replicas.
+    """
+    backend = ReplicatedBackend(primary, replicas, lag_interval=0)
+    for replica in replicas:
+        replica.replication_lag.side_effect = slow(0.0, 0.01)
+
+    await backend.get("key")
+    await asyncio.sleep(0)
+    await backend.get("key")
+    await backend._measuring
+
+    for replica in replicas:
+        replica.replication_lag.assert_awaited_once_with()
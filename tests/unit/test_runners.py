@@ -0,0 +1,123 @@
+import asyncio
+import threading
+
+import pytest
+
+from psqache.runners import LoopThread
+from psqache.runners import resolve
+
+
+@pytest.fixture
+def runner():
+    """Fixture for a started LoopThread, stopped after the test."""
+    runner = LoopThread(name="test-loop")
+    yield runner
+    runner.stop()
+
+
+async def current_thread() -> str:
+    """Return the name of the thread running the coroutine."""
+    return threading.current_thread().name
+
+
+def test_run(runner):
+    """Test coroutines run on the loop thread, which is started on first use.
+
+    Args:
+        runner (LoopThread): The loop thread.
+    """
+    assert runner.loop is None
+    assert runner.run(current_thread()) == "test-loop"
+    assert runner.thread.daemon
+    assert runner.start() is runner.loop
+
+
+def test_run_reuses_loop(runner):
+    """Test every call runs on the same loop.
+
+    Args:
+        runner (LoopThread): The loop thread.
+    """
+
+    async def running_loop():
+        return asyncio.get_running_loop()
+
+    assert {runner.run(running_loop()) for _ in range(3)} == {runner.loop}
+
+
+def test_resolve(runner):
+    """Test awaitables that are not coroutines can be run through resolve.
+
+    Args:
+        runner (LoopThread): The loop thread.
+    """
+    assert runner.run(resolve(asyncio.sleep(0, "result"))) == "result"
+
+
+def test_run_propagates_exceptions(runner):
+    """Test exceptions raised by a coroutine are raised to the caller.
+
+    Args:
+        runner (LoopThread): The loop thread.
+    """
+
+    async def fail():
+        raise KeyError("test_key")
+
+    with pytest.raises(KeyError, match="test_key"):
+        runner.run(fail())
+
+
+def test_run_from_threads(runner):
+    """Test many threads can submit coroutines concurrently.
+
+    Args:
+        runner (LoopThread): The loop thread.
+    """
+    results = []
+
+    async def work(number):
+        await asyncio.sleep(0.01)
+        return number
+
+    threads = [
+        threading.Thread(target=lambda n=n: results.append(runner.run(work(n))))
+        for n in range(10)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(results) == list(range(10))
+
+
+def test_run_from_loop_thread(runner):
+    """Test calling run from the loop thread fails instead of deadlocking.
+
+    Args:
+        runner (LoopThread): The loop thread.
+    """
+
+    async def nested():
+        return runner.run(current_thread())
+
+    with pytest.raises(RuntimeError, match="cannot be called from the loop thread"):
+        runner.run(nested())
+
+
+def test_stop(runner):
+    """Test stopping closes the loop and a later call starts a new one.
+
+    Args:
+        runner (LoopThread): The loop thread.
+    """
+    runner.stop()
+    runner.run(current_thread())
+    loop, thread = runner.loop, runner.thread
+
+    runner.stop()
+
+    assert loop.is_closed()
+    assert not thread.is_alive()
+    assert runner.loop is None
+    runner.stop()
@@ -0,0 +1,95 @@
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+import pytest
+
+from psqache.abcs import ISerializer
+from psqache.serializers import JsonSerializer
+from psqache.serializers import MsgpackSerializer
+from psqache.serializers import OrjsonSerializer
+from psqache.serializers import PickleSerializer
+from psqache.serializers import get_serializer
+
+
+@pytest.fixture
+def module():
+    """Fixture for an optional serialization package."""
+    module = MagicMock()
+    module.dumps.return_value = b"dumped"
+    module.packb.return_value = b"packed"
+    return module
+
+
+def test_json_serializer():
+    """Test the JsonSerializer produces compact JSON and reads it back."""
+    serializer = JsonSerializer()
+    assert isinstance(serializer, ISerializer)
+    assert serializer.json
+    assert serializer.dumps({"data": [1, 2]}) == b'{"data":[1,2]}'
+    assert serializer.loads(b'{"data":[1,2]}') == {"data": [1, 2]}
+
+
+def test_pickle_serializer():
+    """Test the PickleSerializer roundtrips values JSON cannot represent."""
+    serializer = PickleSerializer()
+    assert isinstance(serializer, ISerializer)
+    assert not serializer.json
+    value = {"data": {1, 2}, "tuple": (1, 2)}
+    assert serializer.loads(serializer.dumps(value)) == value
+
+
+def test_orjson_serializer(module):
+    """Test the OrjsonSerializer delegates to the orjson package.
+
+    Args:
+        module (MagicMock): The orjson package.
+    """
+    with patch("psqache.serializers.importlib.import_module", return_value=module):
+        serializer = OrjsonSerializer()
+    assert isinstance(serializer, ISerializer)
+    assert serializer.json
+    assert serializer.dumps({"data": 1}) == b"dumped"
+    serializer.loads(b"dumped")
+    module.loads.assert_called_once_with(b"dumped")
+
+
+def test_msgpack_serializer(module):
+    """Test the MsgpackSerializer delegates to the msgpack package.
+
+    Args:
+        module (MagicMock): The msgpack package.
+    """
+    with patch("psqache.serializers.importlib.import_module", return_value=module):
+        serializer = MsgpackSerializer()
+    assert isinstance(serializer, ISerializer)
+    assert not serializer.json
+    assert serializer.dumps({"data": 1}) == b"packed"
+    serializer.loads(b"packed")
+    module.unpackb.assert_called_once_with(b"packed")
+
+
+@pytest.mark.parametrize("serializer", [OrjsonSerializer, MsgpackSerializer])
+def test_missing_package(serializer):
+    """Test optional serializers fail clearly when their package is missing.
+
+    Args:
+        serializer (type): The serializer class.
+    """
+    with (
+        patch(
+            "psqache.serializers.importlib.import_module",
+            side_effect=ImportError,
+        ),
+        pytest.raises(ImportError, match=f"The {serializer.name} serializer"),
+    ):
+        serializer()
+
+
+def test_get_serializer():
+    """Test serializers are looked up by name and instances are passed through."""
+    assert isinstance(get_serializer("json"), JsonSerializer)
+    assert isinstance(get_serializer("pickle"), PickleSerializer)
+    serializer = PickleSerializer()
+    assert get_serializer(serializer) is serializer
+    with pytest.raises(ValueError, match="Unknown serializer"):
+        get_serializer("yaml")
@@ -0,0 +1,218 @@
+from unittest.mock import AsyncMock
+
+import pytest
+
+from psqache.abcs import ICacheBackend
+from psqache.backends import MemoryBackend
+from psqache.shards import ShardedBackend
+from psqache.shards import ShardStats
+from psqache.shards import jump_hash
+from psqache.shards import key_hash
+
+
+@pytest.fixture
+def shards():
+    """Fixture for the backends of three shards."""
+    return [MemoryBackend(), MemoryBackend(), MemoryBackend()]
+
+
+@pytest.fixture
+def backend(shards):
+    """Fixture for the ShardedBackend object."""
+    return ShardedBackend(shards)
+
+
+def test_key_hash():
+    """Test keys hash to stable unsigned 64-bit integers."""
+    assert key_hash("key") == key_hash("key")
+    assert key_hash("key") != key_hash("other")
+    assert 0 <= key_hash("key") < 2**64
+
+
+def test_jump_hash_balance():
+    """Test jump hashing spreads keys evenly over the buckets."""
+    counts = [0] * 4
+    for number in range(4000):
+        counts[jump_hash(key_hash(str(number)), 4)] += 1
+
+    assert all(900 < count < 1100 for count in counts)
+    assert jump_hash(key_hash("key"), 1) == 0
+
+
+def test_jump_hash_minimal_movement():
+    """Test adding a bucket only moves keys to the new bucket."""
+    hashes = [key_hash(str(number)) for number in range(4000)]
+    moved = [
+        (jump_hash(hashed, 4), jump_hash(hashed, 5))
+        for hashed in hashes
+        if jump_hash(hashed, 4) != jump_hash(hashed, 5)
+    ]
+
+    assert all(after == 4 for _, after in moved)
+    assert 700 < len(moved) < 900
+
+
+def test_requires_a_shard():
+    """Test a sharded backend cannot be created without shards."""
+    with pytest.raises(ValueError, match="at least one shard"):
+        ShardedBackend([])
+
+
+@pytest.mark.asyncio
+async def test_single_key_operations(backend, shards):
+    """Test single-key operations run on the shard of their key only.
+
+    Args:
+        backend (ShardedBackend): The backend object.
+        shards (list[MemoryBackend]): The backends of the shards.
+    """
+    assert isinstance(backend, ICacheBackend)
+    shard = shards[backend.shard_of("key")]
+
+    await backend.set("key", {"data": 1}, 60)
+    assert shard.entries.keys() == {"key"}
+    assert sum(len(other.entries) for other in shards) == 1
+    assert await backend.get("key") == {"data": 1}
+    assert (await backend.get_entry("key")).value == {"data": 1}
+    assert await backend.has("key")
+    assert await backend.touch("key", 120)
+    assert await backend.incr("count", 2, 60, 0) == 2
+    assert shards[backend.shard_of("count")].counters.keys() == {"count"}
+    assert await backend.get_counter("count") == 2
+    await backend.delete_counter("count")
+    assert await backend.get_counter("count") is None
+
+    await backend.delete("key")
+    assert await backend.get("key") is None
+
+
+@pytest.mark.asyncio
+async def test_batch_operations(backend, shards):
+    """Test batch operations are split per shard and merged back.
+
+    Args:
+        backend (ShardedBackend): The backend object.
+        shards (list[MemoryBackend]): The backends of the shards.
+    """
+    keys = [f"key_{number}" for number in range(30)]
+
+    await backend.set_many({key: {"key": key} for key in keys}, 60)
+
+    assert all(shard.entries for shard in shards)
+    for key in keys:
+        assert key in shards[backend.shard_of(key)].entries
+    assert await backend.get_many([*keys, "missing"]) == {
+        key: {"key": key} for key in keys
+    }
+    entries = await backend.get_entries([*keys, "missing"])
+    assert {key: entry.value for key, entry in entries.items()} == {
+        key: {"key": key} for key in keys
+    }
+    assert await backend.import_entries({key: {} for key in keys}, 60) == len(keys)
+    assert await backend.get_many(keys) == dict.fromkeys(keys, {})
+    assert list(await backend.has_many(["missing", *keys])) == ["missing", *keys]
+    touched = await backend.touch_many(["missing", *keys], 60)
+    assert touched == {"missing": False} | dict.fromkeys(keys, True)
+    assert await backend.incr_many(dict.fromkeys(keys, 1), 60, 0) == dict.fromkeys(
+        keys,
+        1,
+    )
+
+    await backend.delete_many(keys[:10])
+    assert sum(len(shard.entries) for shard in shards) == 20
+
+
+@pytest.mark.asyncio
+async def test_fan_out(backend, shards):
+    """Test clear and cleanup run on every shard.
+
+    Args:
+        backend (ShardedBackend): The backend object.
+        shards (list[MemoryBackend]): The backends of the shards.
+    """
+    await backend.set_many({f"key_{number}": {} for number in range(30)}, 60)
+
+    await backend.cleanup()
+    assert sum(len(shard.entries) for shard in shards) == 30
+
+    await backend.clear()
+    assert not any(shard.entries for shard in shards)
+    assert [stats.operations for stats in backend.stats] == [3, 3, 3]
+
+
+@pytest.mark.asyncio
+async def test_add_shard(backend, shards):
+    """Test a new shard takes over a share of the keys.
+
+    Args:
+        backend (ShardedBackend): The backend object.
+        shards (list[MemoryBackend]): The backends of the shards.
+    """
+    keys = [f"key_{number}" for number in range(100)]
+    before = {key: backend.shard_of(key) for key in keys}
+
+    backend.add_shard(MemoryBackend())
+
+    moved = [key for key in keys if backend.shard_of(key) != before[key]]
+    assert moved
+    assert all(backend.shard_of(key) == 3 for key in moved)
+    assert len(backend.stats) == 4
+
+
+@pytest.mark.asyncio
+async def test_stats(backend):
+    """Test the latencies and errors of each shard are recorded.
+
+    Args:
+        backend (ShardedBackend): The backend object.
+    """
+    failing = AsyncMock(spec=ICacheBackend)
+    failing.get.side_effect = OSError
+    backend.shards[backend.shard_of("key")] = failing
+
+    with pytest.raises(OSError):
+        await backend.get("key")
+
+    stats = backend.stats[backend.shard_of("key")]
+    assert stats.operations == 1
+    assert stats.errors == 1
+    assert 0 < stats.p50 <= stats.p95 <= stats.p99
+    assert ShardStats(0, 0, 0.0, 0.0, 0.0) in backend.stats
+
+
+@pytest.mark.asyncio
+async def test_lock_and_close():
+    """Test the lock is taken on the shard of the key and close fans out."""
+    shards = [AsyncMock(spec=ICacheBackend), AsyncMock(spec=ICacheBackend)]
+    backend = ShardedBackend(shards)
+    shard = shards[backend.shard_of("key")]
+    shard.lock.return_value.__aenter__.return_value = True
+
+    async with backend.lock("key") as locked:
+        assert locked is True
+    shard.lock.assert_called_once_with("key")
+
+    await backend.close()
+    for shard in shards:
+        shard.close.assert_awaited_once_with()
+
+
+@pytest.mark.asyncio
+async def test_iteration(backend, shards):
+    """Test iterating goes over the entries of every shard in turn.
+
+    Args:
+        backend (ShardedBackend): The ShardedBackend object.
+        shards (list[MemoryBackend]): The shard backends.
+    """
+    mapping = {f"key_{index}": index for index in range(30)}
+    await backend.set_many(mapping, 60)
+
+    keys = [key async for chunk in backend.iter_keys("key_", 4) for key in chunk]
+    items = {}
+    async for chunk in backend.iter_items(None, 4):
+        items.update(chunk)
+
+    assert sorted(keys) == sorted(mapping)
+    assert items == mapping
+    assert keys[: len(shards[0].entries)] == sorted(shards[0].entries)
@@ -0,0 +1,502 @@
+import asyncio
+from unittest.mock import AsyncMock
+from unittest.mock import patch
+
+import pytest
+
+from psqache.abcs import CacheEntry
+from psqache.abcs import ICacheBackend
+from psqache.backends import PostgresBackend
+from psqache.tiers import MISSING
+from psqache.tiers import LocalCache
+from psqache.tiers import TieredBackend
+from psqache.tiers import approximate_size
+
+
+@pytest.fixture
+def clock():
+    """Fixture for a controllable monotonic clock."""
+    with patch("psqache.tiers.time.monotonic", return_value=1000.0) as monotonic:
+        yield monotonic
+
+
+@pytest.fixture
+def local():
+    """Fixture for the LocalCache object."""
+    return LocalCache(max_entries=3, max_bytes=1000, sizeof=lambda value: 100)
+
+
+@pytest.fixture
+def backend():
+    """Fixture for the wrapped cache backend."""
+    return AsyncMock(spec=ICacheBackend)
+
+
+@pytest.fixture
+def tiered_backend(backend, local):
+    """Fixture for the TieredBackend object."""
+    return TieredBackend(backend, local=local, local_ttl=30)
+
+
+def test_approximate_size():
+    """Test nested containers are accounted for in the approximate size."""
+    flat = approximate_size({})
+    nested = approximate_size({"key": ["value", ("item",), {"set"}]})
+    assert nested > flat
+
+
+def test_local_cache_get_set(local, clock):
+    """Test values can be read back until they expire.
+
+    Args:
+        local (LocalCache): The LocalCache object.
+        clock (MagicMock): The patched monotonic clock.
+    """
+    local.set("key", {"data": 1}, 10)
+    assert local.get("key") == {"data": 1}
+    assert local.get("other") is MISSING
+
+    clock.return_value = 1010.0
+    assert local.get("key") is MISSING
+    assert len(local) == 0
+    assert local.size == 0
+
+
+def test_local_cache_evicts_least_recently_used(local, clock):
+    """Test the least recently used entry is evicted past max_entries.
+
+    Args:
+        local (LocalCache): The LocalCache object.
+        clock (MagicMock): The patched monotonic clock.
+    """
+    for key in ("key_1", "key_2", "key_3"):
+        local.set(key, key, 10)
+    local.get("key_1")
+    local.set("key_4", "key_4", 10)
+
+    assert local.get("key_2") is MISSING
+    assert [key for key in ("key_1", "key_3", "key_4") if local.get(key) == key] == [
+        "key_1",
+        "key_3",
+        "key_4",
+    ]
+
+
+def test_local_cache_evicts_past_byte_budget(clock):
+    """Test entries are evicted when the byte budget is exceeded.
+
+    Args:
+        clock (MagicMock): The patched monotonic clock.
+    """
+    local = LocalCache(max_entries=10, max_bytes=10, sizeof=len)
+    local.set("key_1", "123456", 10)
+    local.set("key_2", "123456", 10)
+    local.set("key_3", "12345678901", 10)
+
+    assert local.get("key_1") is MISSING
+    assert local.get("key_2") == "123456"
+    assert local.get("key_3") is MISSING
+    assert local.size == 6
+
+
+def test_local_cache_ignores_non_positive_ttl(local, clock):
+    """Test values with no time left to live are not held.
+
+    Args:
+        local (LocalCache): The LocalCache object.
+        clock (MagicMock): The patched monotonic clock.
+    """
+    local.set("key", "value", 0)
+    assert local.get("key") is MISSING
+
+
+def test_local_cache_delete_clear_cleanup(local, clock):
+    """Test entries can be deleted, cleared and cleaned up.
+
+    Args:
+        local (LocalCache): The LocalCache object.
+        clock (MagicMock): The patched monotonic clock.
+    """
+    local.set("key_1", "value", 10)
+    local.set("key_2", "value", 20)
+    local.delete("key_1")
+    local.delete("missing")
+    assert local.get("key_1") is MISSING
+
+    local.set("key_3", "value", 5)
+    clock.return_value = 1006.0
+    local.cleanup()
+    assert list(local.entries) == ["key_2"]
+
+    local.clear()
+    assert len(local) == 0
+    assert local.size == 0
+
+
+@pytest.mark.asyncio
+async def test_get_fills_local_tier(tiered_backend, backend, clock):
+    """Test a miss is read from the backend and served locally afterwards.
+
+    Args:
+        tiered_backend (TieredBackend): The TieredBackend object.
+        backend (AsyncMock): The wrapped backend object.
+        clock (MagicMock): The patched monotonic clock.
+    """
+    backend.get_entry.return_value = CacheEntry({"data": 1}, 3600, 3000.0)
+
+    assert await tiered_backend.get("key") == {"data": 1}
+    assert await tiered_backend.get("key") == {"data": 1}
+    backend.get_entry.assert_awaited_once_with("key")
+
+    clock.return_value = 1031.0
+    await tiered_backend.get("key")
+    assert backend.get_entry.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_get_holds_short_lived_entries_until_they_expire(
+    tiered_backend,
+    backend,
+    clock,
+):
+    """Test an entry expiring before `local_ttl` is not served past its expiry.
+
+    Args:
+        tiered_backend (TieredBackend): The TieredBackend object.
+        backend (AsyncMock): The wrapped backend object.
+        clock (MagicMock): The patched monotonic clock.
+    """
+    backend.get_entry.side_effect = [CacheEntry({"data": 1}, 10, 2.0), None]
+
+    assert await tiered_backend.get("key") == {"data": 1}
+    clock.return_value = 1001.0
+    assert await tiered_backend.get("key") == {"data": 1}
+    clock.return_value = 1003.0
+    assert await tiered_backend.get("key") is None
+    assert backend.get_entry.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_get_entry_fills_local_tier(tiered_backend, backend, clock):
+    """Test an entry read with its expiry is held locally until it expires.
+
+    Args:
+        tiered_backend (TieredBackend): The TieredBackend object.
+        backend (AsyncMock): The wrapped backend object.
+        clock (MagicMock): The patched monotonic clock.
+    """
+    backend.get_entry.side_effect = [CacheEntry({"data": 1}, 60, 5.0), None]
+
+    assert await tiered_backend.get_entry("key") == CacheEntry({"data": 1}, 60, 5.0)
+    assert tiered_backend.local.entries["key"].expires_at == 1005.0
+    assert await tiered_backend.get_entry("other") is None
+    assert "other" not in tiered_backend.local.entries
+
+
+@pytest.mark.asyncio
+async def test_get_skips_fill_invalidated_during_read(tiered_backend, backend, clock):
+    """Test a value deleted or rewritten while it is read is not held locally.
+
+    Args:
+        tiered_backend (TieredBackend): The TieredBackend object.
+        backend (AsyncMock): The wrapped backend object.
+        clock (MagicMock): The patched monotonic clock.
+    """
+    started = asyncio.Event()
+    release = asyncio.Event()
+
+    async def get_entry(_key):
+        started.set()
+        await release.wait()
+        return CacheEntry("stale", 3600, 3000.0)
+
+    backend.get_entry.side_effect = get_entry
+    read = asyncio.create_task(tiered_backend.get("key"))
+    await started.wait()
+    await tiered_backend.delete("key")
+    release.set()
+
+    assert await read == "stale"
+    assert tiered_backend.local.get("key") is MISSING
+
+    started.clear()
+    release.clear()
+    read = asyncio.create_task(tiered_backend.get("key"))
+    await started.wait()
+    await tiered_backend.set("key", "fresh", 60)
+    release.set()
+    await read
+    assert tiered_backend.local.get("key") == "fresh"
+
+
+@pytest.mark.asyncio
+async def test_get_many_skips_fill_invalidated_during_read(
+    tiered_backend,
+    backend,
+    clock,
+):
+    """Test values evicted while a batch is read are not held locally.
+
+    Args:
+        tiered_backend (TieredBackend): The TieredBackend object.
+        backend (AsyncMock): The wrapped backend object.
+        clock (MagicMock): The patched monotonic clock.
+    """
+    started = asyncio.Event()
+    release = asyncio.Event()
+
+    async def get_entries(_keys):
+        started.set()
+        await release.wait()
+        return {"key_1": CacheEntry("stale", 3600, 3000.0)}
+
+    backend.get_entries.side_effect = get_entries
+    read = asyncio.create_task(tiered_backend.get_many(["key_1"]))
+    await started.wait()
+    tiered_backend.local.clear()
+    release.set()
+
+    assert await read == {"key_1": "stale"}
+    assert tiered_backend.local.get("key_1") is MISSING
+
+
+@pytest.mark.asyncio
+async def test_get_does_not_hold_misses(tiered_backend, backend, clock):
+    """Test missing keys are not held in the local tier.
+
+    Args:
+        tiered_backend (TieredBackend): The TieredBackend object.
+        backend (AsyncMock): The wrapped backend object.
+        clock (MagicMock): The patched monotonic clock.
+    """
+    backend.get_entry.return_value = None
+
+    assert await tiered_backend.get("key") is None
+    assert tiered_backend.local.get("key") is MISSING
+
+
+@pytest.mark.asyncio
+async def test_set_writes_through(tiered_backend, backend, clock):
+    """Test writes reach the backend and cap the local time to live.
+
+    Args:
+        tiered_backend (TieredBackend): The TieredBackend object.
+        backend (AsyncMock): The wrapped backend object.
+        clock (MagicMock): The patched monotonic clock.
+    """
+    await tiered_backend.set("key", {"data": 1}, 5)
+
+    backend.set.assert_awaited_once_with("key", {"data": 1}, 5)
+    assert tiered_backend.local.entries["key"].expires_at == 1005.0
+
+
+@pytest.mark.asyncio
+async def test_failed_set_leaves_local_tier_untouched(tiered_backend, backend, clock):
+    """Test a failed write does not update the local tier.
+
+    Args:
+        tiered_backend (TieredBackend): The TieredBackend object.
+        backend (AsyncMock): The wrapped backend object.
+        clock (MagicMock): The patched monotonic clock.
+    """
+    backend.set.side_effect = ConnectionError
+
+    with pytest.raises(ConnectionError):
+        await tiered_backend.set("key", {"data": 1}, 5)
+    assert tiered_backend.local.get("key") is MISSING
+
+
+@pytest.mark.asyncio
+async def test_delete_clear_cleanup(tiered_backend, backend, clock):
+    """Test delete, clear and cleanup apply to both tiers.
+
+    Args:
+        tiered_backend (TieredBackend): The TieredBackend object.
+        backend (AsyncMock): The wrapped backend object.
+        clock (MagicMock): The patched monotonic clock.
+    """
+    await tiered_backend.set("key_1", "value", 60)
+    await tiered_backend.set("key_2", "value", 60)
+
+    await tiered_backend.delete("key_1")
+    backend.delete.assert_awaited_once_with("key_1")
+    assert tiered_backend.local.get("key_1") is MISSING
+
+    await tiered_backend.cleanup()
+    backend.cleanup.assert_awaited_once()
+    assert tiered_backend.local.get("key_2") == "value"
+
+    await tiered_backend.clear()
+    backend.clear.assert_awaited_once()
+    assert len(tiered_backend.local) == 0
+
+
+@pytest.mark.asyncio
+async def test_has(tiered_backend, backend, clock):
+    """Test has only queries the backend for keys not held locally.
+
+    Args:
+        tiered_backend (TieredBackend): The TieredBackend object.
+        backend (AsyncMock): The wrapped backend object.
+        clock (MagicMock): The patched monotonic clock.
+    """
+    backend.has.return_value = False
+    await tiered_backend.set("key", "value", 60)
+
+    assert await tiered_backend.has("key") is True
+    assert await tiered_backend.has("other") is False
+    backend.has.assert_awaited_once_with("other")
+
+
+@pytest.mark.asyncio
+async def test_get_many(tiered_backend, backend, clock):
+    """Test get_many only queries the keys not held locally.
+
+    Args:
+        tiered_backend (TieredBackend): The TieredBackend object.
+        backend (AsyncMock): The wrapped backend object.
+        clock (MagicMock): The patched monotonic clock.
+    """
+    await tiered_backend.set("key_1", "value_1", 60)
+    backend.get_entries.return_value = {
+        "key_2": CacheEntry("value_2", 60, 50.0),
+        "key_3": CacheEntry(None, 60, 50.0),
+    }
+
+    result = await tiered_backend.get_many(["key_1", "key_2", "key_3"])
+
+    backend.get_entries.assert_awaited_once_with(["key_2", "key_3"])
+    assert result == {"key_1": "value_1", "key_2": "value_2", "key_3": None}
+    assert tiered_backend.local.get("key_2") == "value_2"
+    assert tiered_backend.local.get("key_3") is MISSING
+
+    assert await tiered_backend.get_many(["key_1", "key_2"]) == {
+        "key_1": "value_1",
+        "key_2": "value_2",
+    }
+    backend.get_entries.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_get_many_holds_short_lived_entries_until_they_expire(
+    tiered_backend,
+    backend,
+    clock,
+):
+    """Test entries expiring before `local_ttl` are held as long as they live.
+
+    Args:
+        tiered_backend (TieredBackend): The TieredBackend object.
+        backend (AsyncMock): The wrapped backend object.
+        clock (MagicMock): The patched monotonic clock.
+    """
+    backend.get_entries.return_value = {
+        "short": CacheEntry("value_1", 10, 2.0),
+        "long": CacheEntry("value_2", 3600, 3000.0),
+    }
+
+    await tiered_backend.get_many(["short", "long"])
+
+    assert tiered_backend.local.entries["short"].expires_at == 1002.0
+    assert tiered_backend.local.entries["long"].expires_at == 1030.0
+
+
+@pytest.mark.asyncio
+async def test_set_many_and_delete_many(tiered_backend, backend, clock):
+    """Test set_many and delete_many apply to both tiers.
+
+    Args:
+        tiered_backend (TieredBackend): The TieredBackend object.
+        backend (AsyncMock): The wrapped backend object.
+        clock (MagicMock): The patched monotonic clock.
+    """
+    await tiered_backend.set_many({"key_1": 1, "key_2": 2}, 60)
+    backend.set_many.assert_awaited_once_with({"key_1": 1, "key_2": 2}, 60)
+    assert tiered_backend.local.get("key_2") == 2
+
+    await tiered_backend.delete_many(["key_1", "key_2"])
+    backend.delete_many.assert_awaited_once_with(["key_1", "key_2"])
+    assert len(tiered_backend.local) == 0
+
+
+@pytest.mark.asyncio
+async def test_imports_drop_local_copies(local, clock):
+    """Test imports leave the local tier to the entries the backend keeps.
+
+    Args:
+        local (LocalCache): The LocalCache object.
+        clock (MagicMock): The patched monotonic clock.
+    """
+    backend = AsyncMock(spec=PostgresBackend)
+    backend.import_entries.return_value = 1
+    backend.import_snapshot.return_value = 2
+    tiered_backend = TieredBackend(backend, local=local, local_ttl=30)
+    await tiered_backend.set_many({"key_1": "value_1", "key_2": "value_2"}, 60)
+
+    assert await tiered_backend.import_entries({"key_1": "imported"}, 60) == 1
+    backend.import_entries.assert_awaited_once_with({"key_1": "imported"}, 60)
+    assert tiered_backend.local.get("key_1") is MISSING
+    assert tiered_backend.local.get("key_2") == "value_2"
+
+    assert await tiered_backend.import_snapshot("cache.snapshot") == 2
+    backend.import_snapshot.assert_awaited_once_with("cache.snapshot")
+    assert len(tiered_backend.local) == 0
+
+
+@pytest.mark.asyncio
+async def test_has_many(tiered_backend, backend, clock):
+    """Test has_many only queries the keys not held locally.
+
+    Args:
+        tiered_backend (TieredBackend): The TieredBackend object.
+        backend (AsyncMock): The wrapped backend object.
+        clock (MagicMock): The patched monotonic clock.
+    """
+    await tiered_backend.set("key_1", "value", 60)
+    backend.has_many.return_value = {"key_2": True}
+
+    result = await tiered_backend.has_many(["key_1", "key_2"])
+
+    backend.has_many.assert_awaited_once_with(["key_2"])
+    assert result == {"key_1": True, "key_2": True}
+
+    assert await tiered_backend.has_many(["key_1"]) == {"key_1": True}
+    backend.has_many.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_touch(tiered_backend, backend, clock):
+    """Test touch extends local entries, capped, and drops missing ones.
+
+    Args:
+        tiered_backend (TieredBackend): The TieredBackend object.
+        backend (AsyncMock): The wrapped backend object.
+        clock (MagicMock): The patched monotonic clock.
+    """
+    tiered_backend.local.set("key", {"data": 1}, 5)
+    tiered_backend.local.set("gone", {"data": 2}, 5)
+    backend.touch.return_value = True
+    backend.touch_many.return_value = {"gone": False, "remote": True}
+
+    assert await tiered_backend.touch("key", 600) is True
+    assert await tiered_backend.touch_many(["gone", "remote"], 600) == {
+        "gone": False,
+        "remote": True,
+    }
+
+    backend.touch.assert_awaited_once_with("key", 600)
+    backend.touch_many.assert_awaited_once_with(["gone", "remote"], 600)
+    assert tiered_backend.local.entries["key"].expires_at == 1030.0
+    assert tiered_backend.local.get("gone") is MISSING
+    assert tiered_backend.local.get("remote") is MISSING
+
+
+def test_default_local_cache(backend):
+    """Test a default LocalCache is created when none is given.
+
+    Args:
+        backend (AsyncMock): The wrapped backend object.
+    """
+    tiered_backend = TieredBackend(backend)
+    assert isinstance(tiered_backend.local, LocalCache)
+    assert isinstance(tiered_backend, ICacheBackend)